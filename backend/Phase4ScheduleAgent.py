@@ -1,11 +1,15 @@
 import json
 import time
-import re
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from loguru import logger
 import random
-from services import llm_service
+from config import settings
+from services import llm_service, async_llm_service
+from json_utils import extract_json
+from llm_resilience import first_degraded, keep_degraded, mark_degraded
 
 class Phase4ScheduleAgent:
     """Phase 4: Interview scheduling and optimization agent."""
@@ -50,76 +54,66 @@ class Phase4ScheduleAgent:
         
         return time_slots
 
+    RANKING_PERSPECTIVES = ["技术专家视角", "HR招聘视角", "职业规划师视角"]
+
     @staticmethod
     def multi_llm_recommendation_ranking(user_profile: Dict[str, Any], selected_jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
         """多LLM讨论职位推荐度排序"""
         try:
             logger.info(f"Starting multi-LLM recommendation ranking for {len(selected_jobs)} jobs")
             
-            # 准备用户和职位信息
-            ranking_context = f"""
-            用户个人信息：
-            {json.dumps(user_profile, ensure_ascii=False, indent=2)}
-            
-            候选职位列表：
-            {json.dumps(selected_jobs, ensure_ascii=False, indent=2)}
-            
-            请根据以下标准对职位进行推荐度排序：
-            1. 技能匹配度 (40%)
-            2. 职业发展前景 (25%)
-            3. 薪资待遇 (20%)
-            4. 公司声誉和文化匹配 (15%)
-            
-            请输出JSON格式的排序结果：
-            {{
-                "rankings": [
-                    {{
-                        "job_index": 0,
-                        "company_name": "公司名称",
-                        "position": "职位名称", 
-                        "recommendation_score": 85,
-                        "ranking_reason": "推荐理由"
-                    }}
-                ],
-                "analysis_perspective": "你的分析角度"
-            }}
-            """
+            ranking_context = Phase4ScheduleAgent._build_ranking_context(user_profile, selected_jobs)
             
             # 模拟三个LLM的响应
             llm_responses = []
-            perspectives = ["技术专家视角", "HR招聘视角", "职业规划师视角"]
+            degraded = None
             
-            for i, perspective in enumerate(perspectives):
+            for i, perspective in enumerate(Phase4ScheduleAgent.RANKING_PERSPECTIVES):
                 # 调用真实的LLM服务
                 try:
                     response = llm_service.call_phase4_models(ranking_context + f"\n分析角度：{perspective}")
-                    if response and len(response) > 0:
-                        llm_response = response[0]  # 取第一个模型的响应
-                    else:
-                        # 如果LLM调用失败，使用mock数据
-                        llm_response = json.dumps(Phase4ScheduleAgent._generate_mock_ranking_response(selected_jobs, perspective, i))
                 except Exception as e:
                     logger.warning(f"LLM call failed for {perspective}: {e}, using mock data")
-                    llm_response = json.dumps(Phase4ScheduleAgent._generate_mock_ranking_response(selected_jobs, perspective, i))
+                    response = None
+                degraded = degraded or first_degraded(response)
                 
-                llm_responses.append({
-                    "llm_id": f"LLM_{i+1}",
-                    "perspective": perspective,
-                    "response": llm_response
-                })
+                llm_responses.append(
+                    Phase4ScheduleAgent._build_ranking_response(response, selected_jobs, perspective, i)
+                )
             
-            # 综合LLM意见生成最终排序
-            final_ranking = Phase4ScheduleAgent._synthesize_final_ranking(llm_responses, selected_jobs)
+            return mark_degraded(Phase4ScheduleAgent._build_ranking_result(llm_responses, selected_jobs), degraded)
             
+        except Exception as e:
+            logger.error(f"Error in multi-LLM ranking: {e}")
             return {
-                "success": True,
-                "message": "Multi-LLM recommendation ranking completed",
-                "data": {
-                    "final_ranking": final_ranking,
-                    "llm_discussions": llm_responses,
-                    "ranking_timestamp": datetime.now().isoformat()
-                }
+                "success": False,
+                "message": f"Multi-LLM ranking failed: {str(e)}",
+                "data": {}
             }
+
+    @staticmethod
+    async def amulti_llm_recommendation_ranking(user_profile: Dict[str, Any], selected_jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Awaitable variant of multi_llm_recommendation_ranking."""
+        try:
+            logger.info(f"Starting multi-LLM recommendation ranking for {len(selected_jobs)} jobs")
+            
+            ranking_context = Phase4ScheduleAgent._build_ranking_context(user_profile, selected_jobs)
+            llm_responses = []
+            degraded = None
+            
+            for i, perspective in enumerate(Phase4ScheduleAgent.RANKING_PERSPECTIVES):
+                try:
+                    response = await async_llm_service.acall_phase4_models(ranking_context + f"\n分析角度：{perspective}")
+                except Exception as e:
+                    logger.warning(f"LLM call failed for {perspective}: {e}, using mock data")
+                    response = None
+                degraded = degraded or first_degraded(response)
+                
+                llm_responses.append(
+                    Phase4ScheduleAgent._build_ranking_response(response, selected_jobs, perspective, i)
+                )
+            
+            return mark_degraded(Phase4ScheduleAgent._build_ranking_result(llm_responses, selected_jobs), degraded)
             
         except Exception as e:
             logger.error(f"Error in multi-LLM ranking: {e}")
@@ -129,6 +123,70 @@ class Phase4ScheduleAgent:
                 "data": {}
             }
 
+    @staticmethod
+    def _build_ranking_context(user_profile: Dict[str, Any], selected_jobs: List[Dict[str, Any]]) -> str:
+        """构建推荐度排序提示"""
+        # 准备用户和职位信息
+        ranking_context = f"""
+        用户个人信息：
+        {json.dumps(user_profile, ensure_ascii=False, indent=2)}
+        
+        候选职位列表：
+        {json.dumps(selected_jobs, ensure_ascii=False, indent=2)}
+        
+        请根据以下标准对职位进行推荐度排序：
+        1. 技能匹配度 (40%)
+        2. 职业发展前景 (25%)
+        3. 薪资待遇 (20%)
+        4. 公司声誉和文化匹配 (15%)
+        
+        请输出JSON格式的排序结果：
+        {{
+            "rankings": [
+                {{
+                    "job_index": 0,
+                    "company_name": "公司名称",
+                    "position": "职位名称", 
+                    "recommendation_score": 85,
+                    "ranking_reason": "推荐理由"
+                }}
+            ],
+            "analysis_perspective": "你的分析角度"
+        }}
+        """
+        return ranking_context
+
+    @staticmethod
+    def _build_ranking_response(response: Optional[List[str]], selected_jobs: List[Dict[str, Any]], 
+                                perspective: str, index: int) -> Dict[str, Any]:
+        """整理单个视角的排序响应，LLM无结果时使用mock数据"""
+        if response and len(response) > 0:
+            llm_response = response[0]  # 取第一个模型的响应
+        else:
+            # 如果LLM调用失败，使用mock数据
+            llm_response = json.dumps(Phase4ScheduleAgent._generate_mock_ranking_response(selected_jobs, perspective, index))
+        
+        return {
+            "llm_id": f"LLM_{index+1}",
+            "perspective": perspective,
+            "response": llm_response
+        }
+
+    @staticmethod
+    def _build_ranking_result(llm_responses: List[Dict[str, Any]], selected_jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """综合LLM意见生成最终排序"""
+        final_ranking = Phase4ScheduleAgent._synthesize_final_ranking(llm_responses, selected_jobs)
+        
+        return {
+            "success": True,
+            "message": "Multi-LLM recommendation ranking completed",
+            "data": {
+                "final_ranking": final_ranking,
+                "llm_discussions": llm_responses,
+                "ranking_timestamp": datetime.now().isoformat()
+            }
+        }
+
     @staticmethod
     def _generate_mock_ranking_response(jobs: List[Dict[str, Any]], perspective: str, seed: int) -> Dict[str, Any]:
         """生成模拟的LLM排序响应，包含详细的分析理由"""
@@ -300,79 +358,52 @@ class Phase4ScheduleAgent:
         try:
             logger.info("Generating final interview schedule")
             
-            # 构建LLM提示
-            schedule_prompt = f"""
-            根据以下信息生成最优的面试日程安排：
-            
-            职位推荐排序（按优先级排列）：
-            {json.dumps(ranked_jobs, ensure_ascii=False, indent=2)}
-            
-            各公司可选时间段：
-            {json.dumps(available_slots, ensure_ascii=False, indent=2)}
-            
-            用户偏好设置：
-            {json.dumps(user_preferences, ensure_ascii=False, indent=2)}
-            
-            请生成最优的面试安排，考虑以下原则：
-            1. 优先安排推荐度高的职位
-            2. 避免时间冲突
-            3. 合理分配面试间隔
-            4. 考虑用户的时间偏好
-            5. 每天面试数量不超过用户设定的最大值
-            
-            请输出JSON格式的日程安排：
-            {{
-                "schedule": [
-                    {{
-                        "date": "2024-01-20",
-                        "interviews": [
-                            {{
-                                "time": "09:00-12:00",
-                                "company_name": "公司名称",
-                                "position": "职位名称",
-                                "priority_rank": 1,
-                                "preparation_tips": "面试准备建议"
-                            }}
-                        ]
-                    }}
-                ],
-                "schedule_summary": {{
-                    "total_interviews": 5,
-                    "schedule_span_days": 7,
-                    "average_interviews_per_day": 0.7,
-                    "optimization_notes": "调度优化说明"
-                }}
-            }}
-            """
+            schedule_prompt = Phase4ScheduleAgent._build_schedule_prompt(ranked_jobs, available_slots, user_preferences)
             
             # 调用LLM服务生成日程
+            schedule_responses = []
             try:
                 schedule_responses = llm_service.call_phase4_models(schedule_prompt)
-                print(schedule_responses)
-                if schedule_responses and len(schedule_responses) > 0:
-                    schedule_result = json.loads(schedule_responses[0])
-                    
-                else:
-                    schedule_result = Phase4ScheduleAgent._generate_mock_schedule(ranked_jobs, available_slots, user_preferences)
+                schedule_result = Phase4ScheduleAgent._parse_schedule_responses(
+                    schedule_responses, ranked_jobs, available_slots, user_preferences
+                )
             except Exception as e:
                 logger.warning(f"LLM schedule generation failed: {e}, using mock data")
                 schedule_result = Phase4ScheduleAgent._generate_mock_schedule(ranked_jobs, available_slots, user_preferences)
             
-            # 增加扁平化 interviews 列表
-            flat_interviews = []
-            for day in schedule_result.get("schedule", []):
-                date = day.get("date")
-                for interview in day.get("interviews", []):
-                    flat_item = interview.copy()
-                    flat_item["date"] = date
-                    flat_interviews.append(flat_item)
-            schedule_result["flat_interviews"] = flat_interviews
+            return mark_degraded(Phase4ScheduleAgent._finalize_schedule(schedule_result), first_degraded(schedule_responses))
             
+        except Exception as e:
+            logger.error(f"Error generating final schedule: {e}")
             return {
-                "success": True,
-                "message": "Final interview schedule generated successfully",
-                "data": schedule_result
+                "success": False,
+                "message": f"Schedule generation failed: {str(e)}",
+                "data": {}
             }
+
+    @staticmethod
+    async def agenerate_final_interview_schedule(
+        ranked_jobs: List[Dict[str, Any]], 
+        available_slots: Dict[str, List[str]], 
+        user_preferences: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Awaitable variant of generate_final_interview_schedule."""
+        try:
+            logger.info("Generating final interview schedule")
+            
+            schedule_prompt = Phase4ScheduleAgent._build_schedule_prompt(ranked_jobs, available_slots, user_preferences)
+            
+            schedule_responses = []
+            try:
+                schedule_responses = await async_llm_service.acall_phase4_models(schedule_prompt)
+                schedule_result = Phase4ScheduleAgent._parse_schedule_responses(
+                    schedule_responses, ranked_jobs, available_slots, user_preferences
+                )
+            except Exception as e:
+                logger.warning(f"LLM schedule generation failed: {e}, using mock data")
+                schedule_result = Phase4ScheduleAgent._generate_mock_schedule(ranked_jobs, available_slots, user_preferences)
+            
+            return mark_degraded(Phase4ScheduleAgent._finalize_schedule(schedule_result), first_degraded(schedule_responses))
             
         except Exception as e:
             logger.error(f"Error generating final schedule: {e}")
@@ -382,6 +413,90 @@ class Phase4ScheduleAgent:
                 "data": {}
             }
 
+    @staticmethod
+    def _build_schedule_prompt(
+        ranked_jobs: List[Dict[str, Any]], 
+        available_slots: Dict[str, List[str]], 
+        user_preferences: Dict[str, Any]
+    ) -> str:
+        """构建面试日程生成提示"""
+        # 构建LLM提示
+        schedule_prompt = f"""
+        根据以下信息生成最优的面试日程安排：
+        
+        职位推荐排序（按优先级排列）：
+        {json.dumps(ranked_jobs, ensure_ascii=False, indent=2)}
+        
+        各公司可选时间段：
+        {json.dumps(available_slots, ensure_ascii=False, indent=2)}
+        
+        用户偏好设置：
+        {json.dumps(user_preferences, ensure_ascii=False, indent=2)}
+        
+        请生成最优的面试安排，考虑以下原则：
+        1. 优先安排推荐度高的职位
+        2. 避免时间冲突
+        3. 合理分配面试间隔
+        4. 考虑用户的时间偏好
+        5. 每天面试数量不超过用户设定的最大值
+        
+        请输出JSON格式的日程安排：
+        {{
+            "schedule": [
+                {{
+                    "date": "2024-01-20",
+                    "interviews": [
+                        {{
+                            "time": "09:00-12:00",
+                            "company_name": "公司名称",
+                            "position": "职位名称",
+                            "priority_rank": 1,
+                            "preparation_tips": "面试准备建议"
+                        }}
+                    ]
+                }}
+            ],
+            "schedule_summary": {{
+                "total_interviews": 5,
+                "schedule_span_days": 7,
+                "average_interviews_per_day": 0.7,
+                "optimization_notes": "调度优化说明"
+            }}
+        }}
+        """
+        return schedule_prompt
+
+    @staticmethod
+    def _parse_schedule_responses(
+        schedule_responses: List[str], 
+        ranked_jobs: List[Dict[str, Any]], 
+        available_slots: Dict[str, List[str]], 
+        user_preferences: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """解析LLM日程响应，无响应时使用mock数据"""
+        if schedule_responses and len(schedule_responses) > 0:
+            return json.loads(schedule_responses[0])
+        return Phase4ScheduleAgent._generate_mock_schedule(ranked_jobs, available_slots, user_preferences)
+
+    @staticmethod
+    def _finalize_schedule(schedule_result: Dict[str, Any]) -> Dict[str, Any]:
+        """补充扁平化 interviews 字段并组装返回数据"""
+        # 增加扁平化 interviews 列表
+        flat_interviews = []
+        for day in schedule_result.get("schedule", []):
+            date = day.get("date")
+            for interview in day.get("interviews", []):
+                flat_item = interview.copy()
+                flat_item["date"] = date
+                flat_interviews.append(flat_item)
+        schedule_result["flat_interviews"] = flat_interviews
+        
+        return {
+            "success": True,
+            "message": "Final interview schedule generated successfully",
+            "data": schedule_result
+        }
+
     @staticmethod
     def _generate_mock_schedule(ranked_jobs: List[Dict[str, Any]], available_slots: Dict[str, List[str]], user_preferences: Dict[str, Any]) -> Dict[str, Any]:
         """生成更健壮的模拟面试日程，保证可用"""
@@ -495,6 +610,51 @@ class Phase4ScheduleAgent:
                 "data": {}
             }
 
+    @staticmethod
+    async def amulti_agent_discussion(interviews: List[Dict[str, Any]], user_preferences: Dict[str, Any]) -> Dict[str, Any]:
+        """Awaitable variant of multi_agent_discussion."""
+        try:
+            logger.info(f"Starting Phase4 complete workflow for {len(interviews)} positions")
+            
+            # Step 1: 多LLM推荐度排序
+            user_profile = user_preferences.get('user_profile', {})
+            ranking_result = await Phase4ScheduleAgent.amulti_llm_recommendation_ranking(user_profile, interviews)
+            
+            if not ranking_result["success"]:
+                return ranking_result
+            
+            ranked_jobs = ranking_result["data"]["final_ranking"]
+            
+            # Step 2: 生成每个公司的可选时间段
+            available_slots = Phase4ScheduleAgent.generate_interview_time_slots(interviews)
+            
+            # Step 3: 生成最终面试日程
+            schedule_result = await Phase4ScheduleAgent.agenerate_final_interview_schedule(
+                ranked_jobs, available_slots, user_preferences
+            )
+            
+            if not schedule_result["success"]:
+                return schedule_result
+            
+            return {
+                "success": True,
+                "message": "Phase4 complete workflow finished successfully",
+                "data": {
+                    "recommendation_ranking": ranking_result["data"],
+                    "available_time_slots": available_slots,
+                    "final_schedule": schedule_result["data"],
+                    "workflow_timestamp": datetime.now().isoformat()
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in Phase4 workflow: {e}")
+            return {
+                "success": False,
+                "message": f"Phase4 workflow failed: {str(e)}",
+                "data": {}
+            }
+
     @staticmethod
     def optimize_schedule(interviews: List[Dict[str, Any]], constraints: Dict[str, Any]) -> Dict[str, Any]:
         """保持原有的优化方法"""
@@ -534,42 +694,33 @@ class Phase4ScheduleAgent:
                 "data": {}
             }
     
-    @staticmethod
-    def multi_llm_recommendation(personal_info: Dict[str, Any], jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Multi-LLM job recommendation analysis with detailed reasoning."""
-        try:
-            logger.info(f"Starting multi-LLM recommendation for {len(jobs)} jobs")
-            
-            # 定义三个不同角度的分析师
-            analysts = [
-                {
-                    "id": "tech_expert",
-                    "name": "技术专家分析师",
-                    "perspective": "技术专家视角", 
-                    "focus": "技能匹配度和技术发展前景",
-                    "weight": 1.2  # 技术专家权重稍高
-                },
-                {
-                    "id": "hr_specialist", 
-                    "name": "HR招聘专家",
-                    "perspective": "HR招聘视角",
-                    "focus": "文化匹配和团队适应性",
-                    "weight": 1.0
-                },
-                {
-                    "id": "career_planner",
-                    "name": "职业规划师",
-                    "perspective": "职业规划师视角",
-                    "focus": "职业发展路径和成长空间", 
-                    "weight": 1.1
-                }
-            ]
-            
-            llm_analysis = []
-            all_rankings = []
-            
-            # 构建LLM分析提示
-            analysis_prompt_template = """
+    # 三个不同角度的分析师
+    ANALYSTS = [
+        {
+            "id": "tech_expert",
+            "name": "技术专家分析师",
+            "perspective": "技术专家视角", 
+            "focus": "技能匹配度和技术发展前景",
+            "weight": 1.2  # 技术专家权重稍高
+        },
+        {
+            "id": "hr_specialist", 
+            "name": "HR招聘专家",
+            "perspective": "HR招聘视角",
+            "focus": "文化匹配和团队适应性",
+            "weight": 1.0
+        },
+        {
+            "id": "career_planner",
+            "name": "职业规划师",
+            "perspective": "职业规划师视角",
+            "focus": "职业发展路径和成长空间", 
+            "weight": 1.1
+        }
+    ]
+
+    # LLM分析提示模板
+    ANALYSIS_PROMPT_TEMPLATE = """
             请作为{perspective}，分析以下候选人与职位的匹配情况：
             
             候选人信息：
@@ -608,149 +759,321 @@ class Phase4ScheduleAgent:
                 ]
             }}
             """
+
+    @staticmethod
+    def multi_llm_recommendation(personal_info: Dict[str, Any], jobs: List[Dict[str, Any]],
+                                 single_model: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Multi-LLM job recommendation analysis with detailed reasoning.
+        
+        三位分析师并发执行；single_model为True时每位分析师只调用分配给自己的模型，
+        否则并发调用全部Phase 4模型并采用最先返回的有效结果。
+        """
+        try:
+            logger.info(f"Starting multi-LLM recommendation for {len(jobs)} jobs")
             
-            # 为每个分析师生成分析结果
-            for analyst in analysts:
-                try:
-                    # 准备提示文本
-                    prompt = analysis_prompt_template.format(
-                        perspective=analyst["perspective"],
-                        focus=analyst["focus"],
-                        personal_info=json.dumps(personal_info, ensure_ascii=False, indent=2),
-                        job_info=json.dumps(jobs, ensure_ascii=False, indent=2)
-                    )
-                    
-                    # 调用LLM服务
-                    llm_response = None
-                    try:
-                        responses = llm_service.call_phase4_models(prompt)
-                        if responses and len(responses) > 0:
-                            # 尝试解析第一个响应
-                            response_text = responses[0]
-                            # 提取JSON部分
-                            import re
-                            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                            if json_match:
-                                llm_response = json.loads(json_match.group())
-                    except Exception as e:
-                        logger.warning(f"LLM call failed for {analyst['name']}: {e}")
-                    
-                    # 如果LLM调用失败，使用mock数据
-                    if not llm_response:
-                        mock_data = Phase4ScheduleAgent._generate_mock_ranking_response(
-                            jobs, analyst["perspective"], hash(analyst["id"]) % 1000
-                        )
-                        llm_response = {
-                            "analyst_info": mock_data.get("analyst_info", {}),
-                            "job_analysis": mock_data.get("rankings", [])
-                        }
-                    
-                    # 标准化分析结果
-                    analyst_result = {
-                        "analyst_id": analyst["id"],
-                        "analyst_name": analyst["name"],
-                        "perspective": analyst["perspective"],
-                        "focus": analyst["focus"],
-                        "weight": analyst["weight"],
-                        "analyst_info": llm_response.get("analyst_info", {}),
-                        "rankings": []
-                    }
-                    
-                    # 处理每个职位的分析
-                    job_analysis = llm_response.get("job_analysis", llm_response.get("rankings", []))
-                    for job_result in job_analysis:
-                        ranking_item = {
-                            "job_index": job_result.get("job_index", 0),
-                            "job_title": job_result.get("job_title", job_result.get("position", "")),
-                            "company": job_result.get("company_name", job_result.get("company", "")),
-                            "score": job_result.get("score", job_result.get("recommendation_score", 75)),
-                            "detailed_scores": job_result.get("detailed_scores", {}),
-                            "reason": job_result.get("analysis_reason", job_result.get("ranking_reason", "分析中..."))
-                        }
-                        analyst_result["rankings"].append(ranking_item)
-                        all_rankings.append(ranking_item)
-                    
-                    llm_analysis.append(analyst_result)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing analyst {analyst['name']}: {e}")
+            analysts = Phase4ScheduleAgent.ANALYSTS
+            # 分析师线程只等待结果，LLM调用都在共享的 model_executor 中执行，
+            # 并发上限为 settings.phase4_max_concurrency
+            model_executor = ThreadPoolExecutor(max_workers=max(1, settings.phase4_max_concurrency),
+                                                thread_name_prefix="phase4")
+            try:
+                with ThreadPoolExecutor(max_workers=len(analysts), thread_name_prefix="phase4-analyst") as executor:
+                    analyst_results = list(executor.map(
+                        lambda item: Phase4ScheduleAgent._run_analyst(
+                            item[1], item[0], personal_info, jobs, single_model, model_executor
+                        ),
+                        enumerate(analysts)
+                    ))
+            finally:
+                # 不等待已达到quorum后仍在进行的请求
+                model_executor.shutdown(wait=False, cancel_futures=True)
+            
+            llm_analysis = [result for result in analyst_results if result is not None]
+            return Phase4ScheduleAgent._aggregate_recommendation(personal_info, jobs, llm_analysis)
+            
+        except Exception as e:
+            logger.error(f"Error in multi-LLM recommendation: {e}")
+            return Phase4ScheduleAgent._recommendation_error(e)
+
+    @staticmethod
+    async def amulti_llm_recommendation(personal_info: Dict[str, Any], jobs: List[Dict[str, Any]],
+                                        single_model: Optional[bool] = None) -> Dict[str, Any]:
+        """Awaitable variant of multi_llm_recommendation."""
+        try:
+            result = None
+            async for event in Phase4ScheduleAgent.astream_multi_llm_recommendation(personal_info, jobs, single_model):
+                if event["event"] == "final":
+                    result = event["data"]
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error in multi-LLM recommendation: {e}")
+            return Phase4ScheduleAgent._recommendation_error(e)
+
+    @staticmethod
+    async def astream_multi_llm_recommendation(personal_info: Dict[str, Any], jobs: List[Dict[str, Any]],
+                                               single_model: Optional[bool] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        并发执行分析师 × 模型矩阵，按完成顺序逐个产出分析师结果，最后产出综合排序。
+        
+        产出事件格式：{"event": "analyst" | "final", "data": {...}}
+        所有LLM调用共享 settings.phase4_max_concurrency 的并发上限。
+        """
+        logger.info(f"Starting multi-LLM recommendation for {len(jobs)} jobs")
+        
+        semaphore = asyncio.Semaphore(max(1, settings.phase4_max_concurrency))
+        tasks = [
+            asyncio.ensure_future(
+                Phase4ScheduleAgent._arun_analyst(analyst, index, personal_info, jobs, single_model, semaphore)
+            )
+            for index, analyst in enumerate(Phase4ScheduleAgent.ANALYSTS)
+        ]
+        completed = {}
+        try:
+            for future in asyncio.as_completed(tasks):
+                index, analyst_result = await future
+                if analyst_result is None:
                     continue
+                completed[index] = analyst_result
+                yield {"event": "analyst", "data": analyst_result}
             
-            # 综合所有分析师的结果生成最终排序
-            final_ranking = []
-            for i, job in enumerate(jobs):
-                # 收集所有分析师对该职位的评分
-                job_scores = []
-                job_reasons = []
-                weighted_score = 0
-                total_weight = 0
-                
-                for analysis in llm_analysis:
-                    for ranking in analysis["rankings"]:
-                        if ranking["job_index"] == i:
-                            score = ranking["score"]
-                            weight = analysis["weight"]
-                            job_scores.append(score)
-                            job_reasons.append(f"{analysis['analyst_name']}: {ranking['reason']}")
-                            weighted_score += score * weight
-                            total_weight += weight
-                            break
-                
-                if total_weight > 0:
-                    avg_score = weighted_score / total_weight
-                else:
-                    avg_score = 70  # 默认分数
-                
-                final_ranking.append({
-                    "rank": 0,  # 将在排序后更新
-                    "job_index": i,
-                    "job_title": job.get("job_title", ""),
-                    "company": job.get("company_name", ""),
-                    "score": round(avg_score, 1),
-                    "individual_scores": job_scores,
-                    "consensus": "高" if len(job_scores) > 1 and max(job_scores) - min(job_scores) <= 10 else "中等",
-                    "analysis_summary": " | ".join(job_reasons[:2])  # 显示前两个主要理由
-                })
+            # 按分析师固定顺序综合，保证结果与完成顺序无关
+            llm_analysis = [completed[index] for index in sorted(completed)]
+            yield {
+                "event": "final",
+                "data": Phase4ScheduleAgent._aggregate_recommendation(personal_info, jobs, llm_analysis)
+            }
+        finally:
+            # 客户端断开时取消仍在进行的调用
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _analyst_models(index: int, single_model: Optional[bool]) -> List[str]:
+        """确定分析师需要调用的模型：单模型模式下按顺序轮流分配"""
+        if single_model is None:
+            single_model = settings.phase4_analyst_single_model
+        models = settings.phase4_models_list
+        if single_model and models:
+            return [models[index % len(models)]]
+        return models
+
+    @staticmethod
+    def _run_analyst(analyst: Dict[str, Any], index: int, personal_info: Dict[str, Any], 
+                     jobs: List[Dict[str, Any]], single_model: Optional[bool],
+                     executor: Optional[ThreadPoolExecutor] = None) -> Optional[Dict[str, Any]]:
+        """执行单个分析师的分析，多模型时采用最先返回的可解析结果"""
+        try:
+            prompt = Phase4ScheduleAgent._build_analyst_prompt(analyst, personal_info, jobs)
+            models = Phase4ScheduleAgent._analyst_models(index, single_model)
             
-            # 按综合分数排序
-            final_ranking.sort(key=lambda x: x["score"], reverse=True)
+            # 调用LLM服务
+            llm_response, model_used = None, None
+            try:
+                results = llm_service.call_phase4_models_detailed(
+                    prompt, models=models, quorum=1,
+                    validate=Phase4ScheduleAgent._is_parseable_analysis, executor=executor
+                )
+                llm_response, model_used = Phase4ScheduleAgent._parse_analyst_results(results)
+            except Exception as e:
+                logger.warning(f"LLM call failed for {analyst['name']}: {e}")
             
-            # 更新最终排名
-            for i, item in enumerate(final_ranking):
-                item["rank"] = i + 1
+            analyst_result = Phase4ScheduleAgent._build_analyst_result(analyst, llm_response, jobs)
+            analyst_result["model_used"] = model_used
+            return analyst_result
             
-            # 生成综合分析总结
-            candidate_name = personal_info.get("name", "候选人")
-            job_count = len(jobs)
-            top_job = final_ranking[0] if final_ranking else None
+        except Exception as e:
+            logger.error(f"Error processing analyst {analyst['name']}: {e}")
+            return None
+
+    @staticmethod
+    async def _arun_analyst(analyst: Dict[str, Any], index: int, personal_info: Dict[str, Any], 
+                            jobs: List[Dict[str, Any]], single_model: Optional[bool],
+                            semaphore: asyncio.Semaphore) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """_run_analyst 的异步版本，返回 (分析师序号, 分析结果)"""
+        try:
+            prompt = Phase4ScheduleAgent._build_analyst_prompt(analyst, personal_info, jobs)
+            models = Phase4ScheduleAgent._analyst_models(index, single_model)
             
-            if top_job:
-                final_summary = f"经过{len(llm_analysis)}位AI分析师的多维度评估，为{candidate_name}分析了{job_count}个职位机会。"
-                final_summary += f"最推荐的是{top_job['company']}的{top_job['job_title']}职位（综合评分：{top_job['score']}分）。"
-                final_summary += f"分析师们的意见共识度为{top_job['consensus']}，建议优先考虑该职位的面试安排。"
-            else:
-                final_summary = f"未能为{candidate_name}找到合适的职位推荐，建议调整搜索条件或提升相关技能。"
+            llm_response, model_used = None, None
+            try:
+                results = await async_llm_service.acall_phase4_models_detailed(
+                    prompt, models=models, quorum=1, semaphore=semaphore,
+                    validate=Phase4ScheduleAgent._is_parseable_analysis
+                )
+                llm_response, model_used = Phase4ScheduleAgent._parse_analyst_results(results)
+            except Exception as e:
+                logger.warning(f"LLM call failed for {analyst['name']}: {e}")
             
-            return {
-                "success": True,
-                "llm_analysis": llm_analysis,
-                "final_ranking": final_ranking, 
-                "final_summary": final_summary,
-                "analysis_time": datetime.now().isoformat(),
-                "candidate_name": candidate_name,
-                "total_analysts": len(llm_analysis),
-                "total_jobs": job_count
-            }
+            analyst_result = Phase4ScheduleAgent._build_analyst_result(analyst, llm_response, jobs)
+            analyst_result["model_used"] = model_used
+            return index, analyst_result
             
         except Exception as e:
-            logger.error(f"Error in multi-LLM recommendation: {e}")
-            return {
-                "success": False,
-                "error": str(e),
-                "llm_analysis": [],
-                "final_ranking": [],
-                "final_summary": "分析过程中出现错误，请重试"
+            logger.error(f"Error processing analyst {analyst['name']}: {e}")
+            return index, None
+
+    @staticmethod
+    def _build_analyst_prompt(analyst: Dict[str, Any], personal_info: Dict[str, Any], jobs: List[Dict[str, Any]]) -> str:
+        """为单个分析师准备提示文本"""
+        return Phase4ScheduleAgent.ANALYSIS_PROMPT_TEMPLATE.format(
+            perspective=analyst["perspective"],
+            focus=analyst["focus"],
+            personal_info=json.dumps(personal_info, ensure_ascii=False, indent=2),
+            job_info=json.dumps(jobs, ensure_ascii=False, indent=2)
+        )
+
+    @staticmethod
+    def _parse_analyst_responses(responses: List[str]) -> Optional[Dict[str, Any]]:
+        """从模型响应中提取分析师JSON结果"""
+        if responses and len(responses) > 0:
+            # 尝试解析第一个响应
+            response_text = responses[0]
+            # 提取JSON部分
+            return extract_json(response_text)
+        return None
+
+    @staticmethod
+    def _is_parseable_analysis(content: str) -> bool:
+        """quorum只计入能解析出分析结果的响应，HTTP成功但内容无法解析时继续等待其他模型"""
+        return bool(Phase4ScheduleAgent._parse_analyst_responses([content]))
+
+    @staticmethod
+    def _parse_analyst_results(results: List[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """从并发调用结果中取第一个可解析的响应，返回 (分析结果, 使用的模型)"""
+        for result in results:
+            if not result["success"]:
+                continue
+            try:
+                llm_response = Phase4ScheduleAgent._parse_analyst_responses([result["content"]])
+            except (json.JSONDecodeError, TypeError) as e:
+                logger.warning(f"Failed to parse analyst response from {result['model']}: {e}")
+                continue
+            if llm_response:
+                return llm_response, result["model"]
+        return None, None
+
+    @staticmethod
+    def _build_analyst_result(analyst: Dict[str, Any], llm_response: Optional[Dict[str, Any]], 
+                              jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """标准化单个分析师的分析结果，LLM失败时使用mock数据"""
+        # 如果LLM调用失败，使用mock数据
+        if not llm_response:
+            mock_data = Phase4ScheduleAgent._generate_mock_ranking_response(
+                jobs, analyst["perspective"], hash(analyst["id"]) % 1000
+            )
+            llm_response = {
+                "analyst_info": mock_data.get("analyst_info", {}),
+                "job_analysis": mock_data.get("rankings", [])
+            }
+        
+        # 标准化分析结果
+        analyst_result = {
+            "analyst_id": analyst["id"],
+            "analyst_name": analyst["name"],
+            "perspective": analyst["perspective"],
+            "focus": analyst["focus"],
+            "weight": analyst["weight"],
+            "analyst_info": llm_response.get("analyst_info", {}),
+            "rankings": []
+        }
+        
+        # 处理每个职位的分析
+        job_analysis = llm_response.get("job_analysis", llm_response.get("rankings", []))
+        for job_result in job_analysis:
+            ranking_item = {
+                "job_index": job_result.get("job_index", 0),
+                "job_title": job_result.get("job_title", job_result.get("position", "")),
+                "company": job_result.get("company_name", job_result.get("company", "")),
+                "score": job_result.get("score", job_result.get("recommendation_score", 75)),
+                "detailed_scores": job_result.get("detailed_scores", {}),
+                "reason": job_result.get("analysis_reason", job_result.get("ranking_reason", "分析中..."))
             }
+            analyst_result["rankings"].append(ranking_item)
+        
+        return analyst_result
+
+    @staticmethod
+    def _aggregate_recommendation(personal_info: Dict[str, Any], jobs: List[Dict[str, Any]], 
+                                  llm_analysis: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """综合所有分析师的结果生成最终排序和总结"""
+        # 综合所有分析师的结果生成最终排序
+        final_ranking = []
+        for i, job in enumerate(jobs):
+            # 收集所有分析师对该职位的评分
+            job_scores = []
+            job_reasons = []
+            weighted_score = 0
+            total_weight = 0
+            
+            for analysis in llm_analysis:
+                for ranking in analysis["rankings"]:
+                    if ranking["job_index"] == i:
+                        score = ranking["score"]
+                        weight = analysis["weight"]
+                        job_scores.append(score)
+                        job_reasons.append(f"{analysis['analyst_name']}: {ranking['reason']}")
+                        weighted_score += score * weight
+                        total_weight += weight
+                        break
+            
+            if total_weight > 0:
+                avg_score = weighted_score / total_weight
+            else:
+                avg_score = 70  # 默认分数
+            
+            final_ranking.append({
+                "rank": 0,  # 将在排序后更新
+                "job_index": i,
+                "job_title": job.get("job_title", ""),
+                "company": job.get("company_name", ""),
+                "score": round(avg_score, 1),
+                "individual_scores": job_scores,
+                "consensus": "高" if len(job_scores) > 1 and max(job_scores) - min(job_scores) <= 10 else "中等",
+                "analysis_summary": " | ".join(job_reasons[:2])  # 显示前两个主要理由
+            })
+        
+        # 按综合分数排序
+        final_ranking.sort(key=lambda x: x["score"], reverse=True)
+        
+        # 更新最终排名
+        for i, item in enumerate(final_ranking):
+            item["rank"] = i + 1
+        
+        # 生成综合分析总结
+        candidate_name = personal_info.get("name", "候选人")
+        job_count = len(jobs)
+        top_job = final_ranking[0] if final_ranking else None
+        
+        if top_job:
+            final_summary = f"经过{len(llm_analysis)}位AI分析师的多维度评估，为{candidate_name}分析了{job_count}个职位机会。"
+            final_summary += f"最推荐的是{top_job['company']}的{top_job['job_title']}职位（综合评分：{top_job['score']}分）。"
+            final_summary += f"分析师们的意见共识度为{top_job['consensus']}，建议优先考虑该职位的面试安排。"
+        else:
+            final_summary = f"未能为{candidate_name}找到合适的职位推荐，建议调整搜索条件或提升相关技能。"
+        
+        return {
+            "success": True,
+            "llm_analysis": llm_analysis,
+            "final_ranking": final_ranking, 
+            "final_summary": final_summary,
+            "analysis_time": datetime.now().isoformat(),
+            "candidate_name": candidate_name,
+            "total_analysts": len(llm_analysis),
+            "total_jobs": job_count
+        }
+
+    @staticmethod
+    def _recommendation_error(error: Exception) -> Dict[str, Any]:
+        """推荐分析失败时的返回结构"""
+        return {
+            "success": False,
+            "error": str(error),
+            "llm_analysis": [],
+            "final_ranking": [],
+            "final_summary": "分析过程中出现错误，请重试"
+        }
 
     @staticmethod
     def _generate_llm_summary(personal_info: Dict[str, Any], final_ranking: List[Dict[str, Any]], llm_analysis: List[Dict[str, Any]]) -> str:
@@ -786,9 +1109,10 @@ class Phase4ScheduleAgent:
                 summary_responses = llm_service.call_phase4_models(summary_prompt)
                 if summary_responses and len(summary_responses) > 0:
                     summary = summary_responses[0]
-                    # 如果LLM返回的是演示数据，使用降级方案
-                    if "演示模式" in summary:
-                        return Phase4ScheduleAgent._generate_fallback_summary(personal_info, final_ranking)
+                    # 如果LLM返回的是演示数据，使用降级方案，并保留 degraded 标记
+                    if "演示模式" in summary or first_degraded(summary_responses) is not None:
+                        return keep_degraded(first_degraded(summary_responses),
+                                             Phase4ScheduleAgent._generate_fallback_summary(personal_info, final_ranking))
                     return summary
                 else:
                     return Phase4ScheduleAgent._generate_fallback_summary(personal_info, final_ranking)
@@ -13,28 +13,47 @@
 #     HRFeedbackCreate, InterviewCreate, ScheduleCreate
 # )
 
-import json
 import time
-from datetime import datetime
-from typing import List, Dict, Any
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
 from loguru import logger
-from openai import OpenAI
 import os
 import httpx
-import re
 
-from services import chromadb_service
-
-client = OpenAI(   
-        api_key="sk-Z43OD6lBJ88hB6QgAGdKdSpBxg1A892PNzj9PAw8bar6DYdc",
-        base_url="https://api.chatanywhere.tech/v1"
-    )
+from config import settings
+from services import chromadb_service, rate_limiters
+from json_utils import extract_json
+from http_clients import http_clients
 
 class SearchAgent:
     """Job search agent using OpenAI gpt-4o-search-preview for web search."""
+    
+    SEARCH_MODEL = "gpt-4o-search-preview"
+    
+    # 默认覆盖的招聘网站（顺序模式使用）
+    DEFAULT_SOURCES = "智联招聘、前程无忧(51job)、BOSS直聘、猎聘网、拉勾网、58同城、LinkedIn等主流招聘网站"
+    
+    # 并发模式下每个批次使用互不重叠的搜索范围，避免不同批次返回相同职位
+    SOURCE_GROUPS = [
+        "智联招聘、前程无忧(51job)",
+        "BOSS直聘、拉勾网",
+        "猎聘网、LinkedIn",
+        "58同城、应届生求职网",
+        "各公司官网的招聘页面"
+    ]
+    # 批次数超过网站分组时，再按职级拆分子查询
+    LEVEL_FOCUS = ["初级/应届", "中级", "高级/资深", "技术专家/管理岗"]
        
     @staticmethod
-    def search_jobs(search_query: str, location: str = None, max_results: int = 20) -> Dict[str, Any]:
+    def search_jobs(search_query: str, location: str = None, max_results: int = 20,
+                    parallel: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        搜索职位。按每批10条拆分请求：
+        - 顺序模式：每批提示中带上已获取职位的排除列表
+        - 并发模式（默认，SEARCH_PARALLEL）：各批次使用互不重叠的网站/职级范围同时请求，最后按职位+公司去重
+        """
         logger.info(f"Starting GPT-4o web search for: {search_query}")
         
         # 限制每次查询的职位数量为5条
@@ -42,30 +61,139 @@ class SearchAgent:
         # 计算需要进行的查询次数
         num_batches = (max_results + batch_size - 1) // batch_size
         
-        jobs = []
-        companies = {}
-        excluded_jobs = set()  # 用于跟踪已获取的职位，避免重复
+        if parallel is None:
+            parallel = settings.search_parallel
+        
+        # excluded_jobs 用于跟踪已获取的职位，避免重复；pending_embeddings 为待写入向量数据库的 (id, text, metadata)
+        state = {"jobs": [], "companies": {}, "excluded_jobs": set(), "pending_embeddings": []}
         
         try:
-            for batch in range(num_batches):
-                remaining = min(batch_size, max_results - len(jobs))
-                if remaining <= 0:
-                    break
-                    
-                # 构建排除已获取职位的提示
-                exclusion_text = ""
-                if excluded_jobs:
-                    excluded_list = list(excluded_jobs)
-                    # 只展示前5个已排除的职位，避免提示过长
-                    display_exclusions = excluded_list[:5]
-                    if len(excluded_list) > 5:
-                        display_exclusions.append(f"...等{len(excluded_list)}个职位")
-                    exclusion_text = f"\n请不要提供以下已获取的职位: {', '.join(display_exclusions)}，确保返回全新不同的职位信息。"
+            # 未配置key时直接失败，而不是每个批次各自报错后返回空结果
+            SearchAgent._require_api_key()
+            if parallel and num_batches > 1:
+                SearchAgent._search_batches_parallel(search_query, location, max_results, batch_size, num_batches, state)
+            else:
+                SearchAgent._search_batches_sequential(search_query, location, max_results, batch_size, num_batches, state)
+            
+            SearchAgent._store_embeddings(state["pending_embeddings"])
+            
+            jobs = state["jobs"]
+            return {
+                "success": True,
+                "message": f"提取了 {len(jobs)} 条职位信息",
+                "data": {
+                    "jobs": jobs,
+                    "companies": list(state["companies"].values()),
+                    "search_query": search_query
+                }
+            }
+
+        except Exception as e:
+            logger.error(f"[GPT Web Search] Error: {e}")
+            return {
+                "success": False,
+                "message": f"搜索失败：{str(e)}",
+                "data": {"jobs": [], "companies": []}
+            }
+    
+    @staticmethod
+    def _search_batches_sequential(search_query: str, location: str, max_results: int, batch_size: int,
+                                   num_batches: int, state: Dict[str, Any]):
+        """逐批请求，每批提示带上已获取职位的排除列表"""
+        jobs = state["jobs"]
+        excluded_jobs = state["excluded_jobs"]
+        
+        for batch in range(num_batches):
+            remaining = min(batch_size, max_results - len(jobs))
+            if remaining <= 0:
+                break
                 
-                logger.info(f"Requesting batch {batch+1}/{num_batches}, remaining: {remaining}")
+            # 构建排除已获取职位的提示
+            exclusion_text = ""
+            if excluded_jobs:
+                excluded_list = list(excluded_jobs)
+                # 只展示前5个已排除的职位，避免提示过长
+                display_exclusions = excluded_list[:5]
+                if len(excluded_list) > 5:
+                    display_exclusions.append(f"...等{len(excluded_list)}个职位")
+                exclusion_text = f"\n请不要提供以下已获取的职位: {', '.join(display_exclusions)}，确保返回全新不同的职位信息。"
+            
+            logger.info(f"Requesting batch {batch+1}/{num_batches}, remaining: {remaining}")
+            
+            prompt = SearchAgent._build_search_prompt(
+                search_query, location, remaining, SearchAgent.DEFAULT_SOURCES, exclusion_text
+            )
+            batch_jobs = SearchAgent._request_batch(prompt, batch)
+            if batch_jobs is None:
+                continue
+            
+            SearchAgent._merge_batch_jobs(batch_jobs, search_query, max_results, state)
+            logger.info(f"Batch {batch+1} completed. Total jobs so far: {len(jobs)}")
+            
+            # 如果已经获取足够的职位，提前结束
+            if len(jobs) >= max_results:
+                break
+    
+    @staticmethod
+    def _search_batches_parallel(search_query: str, location: str, max_results: int, batch_size: int,
+                                 num_batches: int, state: Dict[str, Any]):
+        """各批次使用互不重叠的搜索范围并发请求，按完成顺序合并去重"""
+        prompts = []
+        for batch in range(num_batches):
+            count = min(batch_size, max_results - batch * batch_size)
+            sources, focus = SearchAgent._batch_directive(batch)
+            focus_text = f"\n本次只关注{focus}级别的职位。" if focus else ""
+            prompts.append(SearchAgent._build_search_prompt(search_query, location, count, sources, focus_text))
+        
+        max_workers = max(1, min(num_batches, settings.search_max_concurrency))
+        logger.info(f"Requesting {num_batches} batches concurrently (max_workers={max_workers})")
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-search") as executor:
+            # 复制contextvar，线程内的请求保持调用方的限流优先级（后台任务为batch）
+            futures = {
+                executor.submit(contextvars.copy_context().run, SearchAgent._request_batch, prompt, batch): batch
+                for batch, prompt in enumerate(prompts)
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    batch_jobs = future.result()
+                except Exception as e:
+                    # 单个批次失败不影响其他批次
+                    logger.warning(f"Batch {batch+1} failed: {e}")
+                    continue
+                if batch_jobs is None:
+                    continue
                 
-                prompt = f"""
-请使用网络搜索功能，从智联招聘、前程无忧(51job)、BOSS直聘、猎聘网、拉勾网、58同城、LinkedIn等主流招聘网站查询"{search_query}"相关的招聘信息，工作地点是"{location}"并提取{remaining}条有效结果，整理为如下JSON数组：
+                SearchAgent._merge_batch_jobs(batch_jobs, search_query, max_results, state)
+                logger.info(f"Batch {batch+1} completed. Total jobs so far: {len(state['jobs'])}")
+    
+    @staticmethod
+    def _store_embeddings(pending: List[tuple]):
+        """批量写入向量数据库；默认在后台线程执行，不阻塞搜索结果返回"""
+        if not pending:
+            return
+        job_ids, job_texts, metadatas = (list(column) for column in zip(*pending))
+        if settings.chroma_background_ingest:
+            chromadb_service.ingest_job_postings_background(job_ids, job_texts, metadatas)
+            logger.info(f"Queued {len(job_ids)} job postings for background embedding")
+        else:
+            chromadb_service.add_job_postings_bulk(job_ids, job_texts, metadatas)
+    
+    @staticmethod
+    def _batch_directive(batch: int):
+        """返回批次对应的 (网站范围, 职级关注点)"""
+        groups = SearchAgent.SOURCE_GROUPS
+        sources = groups[batch % len(groups)]
+        round_index = batch // len(groups)
+        focus = SearchAgent.LEVEL_FOCUS[(round_index - 1) % len(SearchAgent.LEVEL_FOCUS)] if round_index > 0 else None
+        return sources, focus
+    
+    @staticmethod
+    def _build_search_prompt(search_query: str, location: str, count: int, sources: str, extra_text: str = "") -> str:
+        """构建搜索提示"""
+        return f"""
+请使用网络搜索功能，从{sources}查询"{search_query}"相关的招聘信息，工作地点是"{location}"并提取{count}条有效结果，整理为如下JSON数组：
 
 [
   {{
@@ -81,95 +209,93 @@ class SearchAgent:
   ...
 ]
 
-{exclusion_text}
+{extra_text}
 请确保输出内容为严格 JSON 格式，且职位信息完整详细。
 """
+    
+    @staticmethod
+    def _require_api_key():
+        if not settings.search_api_key:
+            raise RuntimeError("SEARCH_API_KEY is not configured; set it in .env to enable web job search")
+    
+    @staticmethod
+    def _request_batch(prompt: str, batch: int) -> Optional[List[Dict[str, Any]]]:
+        """执行一次搜索请求并解析职位数组；没有找到JSON时返回None"""
+        SearchAgent._require_api_key()
+        client = http_clients.openai(settings.search_api_key, settings.search_api_base)
+        # 与LLMService共用按模型的限流队列
+        with rate_limiters.limit(SearchAgent.SEARCH_MODEL, settings.llm_rate_limit_output_tokens):
+            completion = client.chat.completions.create(
+                model=SearchAgent.SEARCH_MODEL,
+                web_search_options={},
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                timeout=60,
+                max_tokens=4000,
+                temperature=0.7,
+                # response_format={ "type": "json_object" }
+            )
 
-                completion = client.chat.completions.create(
-                    model="gpt-4o-search-preview",
-                    web_search_options={},
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ],
-                    timeout=60,
-                    max_tokens=4000,
-                    temperature=0.7,
-                    # response_format={ "type": "json_object" }
-                )
-
-                raw_output = completion.choices[0].message.content
-                # print(raw_output)
-
-                json_match = re.search(r'\[.*\]', raw_output, re.DOTALL)
-                if not json_match:
-                    logger.warning(f"No JSON found in GPT response for batch {batch+1}. Continuing to next batch.")
-                    continue
-
-                batch_jobs = json.loads(json_match.group())
-                
-                # 处理本批次获取的职位
-                for job in batch_jobs:
-                    # 创建职位的唯一标识
-                    job_key = f"{job.get('job_title', '未知职位')}_{job.get('company_name', '未知公司')}".lower()
-                    
-                    # 如果是重复职位，跳过
-                    if job_key in excluded_jobs:
-                        continue
-                        
-                    # 添加到已处理列表
-                    excluded_jobs.add(job_key)
-                    
-                    # 添加元数据
-                    job['search_query'] = search_query
-                    job['extracted_at'] = datetime.utcnow().isoformat()
-                    jobs.append(job)
-                    
-                    # 处理公司信息
-                    comp = job.get("company_name")
-                    if comp:
-                        if comp not in companies:
-                            companies[comp] = {
-                                "name": comp,
-                                "jobs_count": 1,
-                                "locations": [job.get("location", "")]
-                            }
-                        else:
-                            companies[comp]["jobs_count"] += 1
-                            loc = job.get("location", "")
-                            if loc not in companies[comp]["locations"]:
-                                companies[comp]["locations"].append(loc)
+        raw_output = completion.choices[0].message.content
+        # print(raw_output)
 
-                    # 添加到向量数据库
-                    job_text = f"{job['job_title']} {job['company_name']} {job['description']}"
-                    chromadb_service.add_job_posting(
-                        job_id=f"gptweb_{int(time.time())}_{len(jobs)}",
-                        job_text=job_text,
-                        metadata=job
-                    )
-                
-                logger.info(f"Batch {batch+1} completed. Total jobs so far: {len(jobs)}")
+        # 联网搜索模型的回复中常带有 [1] 之类的引用标记，只接受职位对象数组
+        batch_jobs = extract_json(raw_output, expect=list,
+                                  validate=lambda items: all(isinstance(item, dict) for item in items))
+        if batch_jobs is None:
+            logger.warning(f"No JSON found in GPT response for batch {batch+1}. Continuing to next batch.")
+        return batch_jobs
+    
+    @staticmethod
+    def _merge_batch_jobs(batch_jobs: List[Dict[str, Any]], search_query: str, max_results: int, state: Dict[str, Any]):
+        """合并一个批次的职位：按职位+公司去重，汇总公司信息并写入向量数据库"""
+        jobs = state["jobs"]
+        companies = state["companies"]
+        excluded_jobs = state["excluded_jobs"]
+        
+        # 处理本批次获取的职位
+        for job in batch_jobs:
+            if len(jobs) >= max_results:
+                break
+            
+            # 创建职位的唯一标识
+            job_key = f"{job.get('job_title', '未知职位')}_{job.get('company_name', '未知公司')}".lower()
+            
+            # 如果是重复职位，跳过
+            if job_key in excluded_jobs:
+                continue
                 
-                # 如果已经获取足够的职位，提前结束
-                if len(jobs) >= max_results:
-                    break
+            # 添加到已处理列表
+            excluded_jobs.add(job_key)
+            
+            # 添加元数据
+            job['search_query'] = search_query
+            job['extracted_at'] = datetime.now(timezone.utc).isoformat()
+            jobs.append(job)
+            
+            # 处理公司信息
+            comp = job.get("company_name")
+            if comp:
+                if comp not in companies:
+                    companies[comp] = {
+                        "name": comp,
+                        "jobs_count": 1,
+                        "locations": [job.get("location", "")]
+                    }
+                else:
+                    companies[comp]["jobs_count"] += 1
+                    loc = job.get("location", "")
+                    if loc not in companies[comp]["locations"]:
+                        companies[comp]["locations"].append(loc)
 
-            return {
-                "success": True,
-                "message": f"提取了 {len(jobs)} 条职位信息",
-                "data": {
-                    "jobs": jobs,
-                    "companies": list(companies.values()),
-                    "search_query": search_query
-                }
-            }
-
-        except Exception as e:
-            logger.error(f"[GPT Web Search] Error: {e}")
-            return {
-                "success": False,
-                "message": f"搜索失败：{str(e)}",
-                "data": {"jobs": [], "companies": []}
-            }
+            # 待写入向量数据库（全部批次结束后统一批量写入）
+            # 技能写入文档，便于按技能做 where_document 过滤
+            skills = job.get('skills') or []
+            skills_text = ' '.join(map(str, skills)) if isinstance(skills, list) else str(skills)
+            job_text = f"{job.get('job_title', '')} {job.get('company_name', '')} {job.get('description', '')} {skills_text}"
+            job_id = chromadb_service.make_job_id(job.get("job_title"), job.get("company_name"), job.get("location"))
+            state["pending_embeddings"].append((job_id, job_text, job))
 
 if __name__ == "__main__":
 
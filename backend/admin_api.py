@@ -3,12 +3,17 @@ ChromaDB 管理 API - 展示和管理向量数据库中的内容
 """
 
 from fastapi import APIRouter, Query, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from loguru import logger
 import json
 
-from services import chromadb_service
+from services import chromadb_service, circuit_breakers, rate_limiters, model_router
+from llm_cache import llm_cache
+from prompt_budget import prompt_budget
+from prompt_templates import prompt_templates
+from config import settings
 from database import SessionLocal, get_db
 
 # 创建路由
@@ -17,9 +22,10 @@ admin_router = APIRouter(prefix="/admin", tags=["管理接口"])
 # 数据模型
 class JobEmbedding(BaseModel):
     id: str
-    document: str
+    document: Optional[str] = None
     metadata: Dict[str, Any]
     distance: Optional[float] = None
+    score: Optional[float] = None
 
 class QueryResult(BaseModel):
     total: int
@@ -29,42 +35,52 @@ class QueryResult(BaseModel):
 async def list_job_embeddings(
     query: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    company: Optional[str] = None,
+    location: Optional[str] = None,
+    include_documents: bool = True,
+    mode: str = Query("hybrid", pattern="^(hybrid|vector)$")
 ):
     """
     获取 ChromaDB 中的职位嵌入向量数据
     
-    - 可选的搜索查询
-    - 分页支持
+    - 可选的搜索查询（默认 BM25 + 向量混合检索，mode=vector 仅向量检索）
+    - 分页支持：列表模式 limit/offset 直接下推到 ChromaDB；检索模式取前 offset+limit 条后分页，
+      total 为召回的条数
+    - 过滤条件两种模式一致：company 按公司名精确匹配，location 按解析出的城市匹配
+      （如 "北京·朝阳区" 与 "北京" 视为同一地点）
     """
     try:
         if query:
-            # 如果有查询，进行语义搜索
-            results = chromadb_service.search_similar_jobs(query, limit)
+            # 如果有查询，进行检索
+            filters = {"location": location, "company": company}
+            search = chromadb_service.search_similar_jobs if mode == "vector" else chromadb_service.hybrid_search_jobs
+            results = await run_in_threadpool(search, query, offset + limit, **filters)
             
             embeddings = []
-            for result in results:
+            for result in results[offset:]:
                 embeddings.append(JobEmbedding(
                     id=result["id"],
-                    document=result["document"],
+                    document=result["document"] if include_documents else None,
                     metadata=result["metadata"],
-                    distance=result["distance"]
+                    distance=result["distance"],
+                    score=result.get("score")
                 ))
             
             return QueryResult(
-                total=len(embeddings),
+                total=len(results),
                 results=embeddings
             )
         else:
-            # 没有查询，获取所有数据
-            # 注意：ChromaDB 本身不支持分页，这里我们获取所有数据后手动分页
-            all_results = chromadb_service.get_all_job_embeddings()
+            where = chromadb_service.job_attribute_where(location, company)
             
-            # 手动分页
-            paginated_results = all_results[offset:offset+limit]
+            page = await run_in_threadpool(
+                chromadb_service.get_job_embeddings,
+                limit, offset, where, include_documents, True
+            )
             
             embeddings = []
-            for result in paginated_results:
+            for result in page["results"]:
                 embeddings.append(JobEmbedding(
                     id=result["id"],
                     document=result["document"],
@@ -72,7 +88,7 @@ async def list_job_embeddings(
                 ))
             
             return QueryResult(
-                total=len(all_results),
+                total=page["total"],
                 results=embeddings
             )
     except Exception as e:
@@ -112,3 +128,52 @@ async def get_chroma_stats():
     except Exception as e:
         logger.error(f"Error getting ChromaDB stats: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting stats: {str(e)}")
+
+@admin_router.get("/llm-cache/stats")
+async def get_llm_cache_stats():
+    """获取LLM响应缓存的命中统计"""
+    try:
+        return llm_cache.get_stats()
+    except Exception as e:
+        logger.error(f"Error getting LLM cache stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error getting cache stats: {str(e)}")
+
+@admin_router.get("/llm-circuits")
+async def get_llm_circuits():
+    """获取各模型熔断器状态（closed / open / half_open）"""
+    return circuit_breakers.snapshot()
+
+@admin_router.get("/prompt-budget/stats")
+async def get_prompt_budget_stats():
+    """按提示词名称统计输入token数（调用次数、平均/最大输入token、被截断次数）"""
+    return prompt_budget.stats()
+
+@admin_router.get("/prompt-templates/stats")
+async def get_prompt_template_stats():
+    """稳定前缀的使用次数，以及提供方返回的prompt缓存命中（cached_tokens）"""
+    return prompt_templates.stats()
+
+@admin_router.get("/llm-rate-limits")
+async def get_llm_rate_limits():
+    """各模型的限流配置、在途/排队请求数和按优先级统计的排队等待时间"""
+    return rate_limiters.snapshot()
+
+@admin_router.get("/llm-routing")
+async def get_llm_routing():
+    """各阶段候选模型的当前路由顺序，以及各模型最近调用的延迟（p50/p90）和错误率"""
+    return {
+        "phases": {phase: model_router.rank(settings.phase_candidates(phase))
+                   for phase in ("phase1", "phase2", "phase3")},
+        "hedging_enabled": settings.llm_hedging_enabled,
+        "models": model_router.snapshot()
+    }
+
+@admin_router.delete("/llm-cache")
+async def clear_llm_cache():
+    """清空LLM响应缓存"""
+    try:
+        llm_cache.clear()
+        return {"success": True, "message": "LLM cache cleared"}
+    except Exception as e:
+        logger.error(f"Error clearing LLM cache: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error clearing cache: {str(e)}")
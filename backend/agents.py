@@ -3,13 +3,27 @@ Core Agent implementations for Job Planner Assistant.
 """
 
 import json
+import re
 import time
+import asyncio
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from sqlalchemy.orm import Session
 from loguru import logger
 
-from services import llm_service, serper_service, chromadb_service, text_service
+from config import settings
+from services import llm_service, async_llm_service, serper_service, chromadb_service, text_service
+from json_utils import StreamingJSONSectionParser, extract_json
+from skill_matching import SkillMatchEngine, improvement_priority
+from llm_resilience import mark_degraded, first_degraded, keep_degraded
+from prompt_budget import prompt_budget, PromptSection, compact_json
+from prompt_templates import prompt_templates
+from rate_limiter import request_priority
+from hr_scoring import ResumeFeatures, score_metric, score_metrics, weighted_score
+from llm_schemas import (
+    EnhancedResumeOutput, OptimizedResumeOutput, HRFeedbackOutput,
+    InterviewQuestionsOutput, AnswerEvaluationOutput, ScheduleSynthesisOutput
+)
 from database import (
     get_db, create_job_posting, create_resume, create_hr_feedback, 
     create_interview, create_schedule, JobPostingCreate, ResumeCreate,
@@ -19,6 +33,9 @@ from database import (
 from SearchAgent import SearchAgent
 from Phase4ScheduleAgent import Phase4ScheduleAgent as Phase4Agent
 
+# 评分字符串（如 "85分"）中的数字
+_NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+
 def ensure_dict(obj):
     """确保对象是字典格式"""
     if hasattr(obj, 'dict'):
@@ -40,6 +57,192 @@ def safe_get(obj, key, default=None):
 class Phase2ResumeAgent:
     """Phase 2: Enhanced Resume generation and optimization agent."""
     
+    # 简历生成的稳定前缀（system）：不含任何按请求变化的内容，以便命中提供方的prompt缓存
+    RESUME_SYSTEM_PROMPT = """
+你是一位顶级的简历撰写专家和职业规划师，具有15年以上的招聘和求职经验。请根据用户提供的目标职位、求职者档案和分析报告，为求职者创建一份极具竞争力的个性化简历。
+
+请生成以下JSON格式的简历：
+
+```json
+{
+    "personal_info": {
+        "name": "候选人姓名",
+        "email": "邮箱地址",
+        "phone": "联系电话",
+        "location": "居住地址",
+        "linkedin": "LinkedIn链接（如有）",
+        "github": "GitHub链接（如有）",
+        "portfolio": "作品集链接（如有）"
+    },
+    "professional_summary": "个人简介（200-250字，融入企业价值观，突出核心竞争力和与职位的匹配度）",
+    "core_competencies": [
+        "核心竞争力1（结合职位要求）",
+        "核心竞争力2（突出匹配优势）",
+        "核心竞争力3（体现发展潜力）"
+    ],
+    "highlighted_skills": {
+        "technical_skills": ["技术技能1", "技术技能2", "技术技能3"],
+        "frameworks_tools": ["框架工具1", "框架工具2", "框架工具3"],
+        "soft_skills": ["软技能1", "软技能2", "软技能3"]
+    },
+    "professional_experience": [
+        {
+            "company": "公司名称",
+            "position": "职位名称",
+            "location": "工作地点",
+            "duration": "工作时间",
+            "employment_type": "工作类型（全职/兼职/实习）",
+            "company_description": "公司简介（1-2句话）",
+            "responsibilities": [
+                "核心职责1（与目标职位高度相关）",
+                "核心职责2（体现技能匹配）",
+                "核心职责3（展现成长轨迹）"
+            ],
+            "key_achievements": [
+                "关键成果1（用数字量化，体现业务价值）",
+                "关键成果2（突出技术能力和解决问题的能力）",
+                "关键成果3（展现团队协作和领导力）"
+            ],
+            "technologies_used": ["相关技术1", "相关技术2", "相关技术3"]
+        }
+    ],
+    "key_projects": [
+        {
+            "name": "项目名称",
+            "role": "项目角色",
+            "duration": "项目周期",
+            "team_size": "团队规模",
+            "project_scale": "项目规模描述",
+            "description": "项目描述（突出与目标职位的相关性）",
+            "key_responsibilities": [
+                "核心职责1（技术深度）",
+                "核心职责2（业务理解）",
+                "核心职责3（团队协作）"
+            ],
+            "technologies_stack": {
+                "frontend": ["前端技术"],
+                "backend": ["后端技术"],
+                "database": ["数据库技术"],
+                "tools": ["开发工具"]
+            },
+            "achievements_metrics": [
+                "量化成果1（性能提升/成本节约等）",
+                "量化成果2（用户增长/效率提升等）",
+                "量化成果3（质量改进/创新突破等）"
+            ],
+            "challenges_solutions": "遇到的挑战及解决方案（体现问题解决能力）"
+        }
+    ],
+    "education": [
+        {
+            "institution": "学校名称",
+            "degree": "学位类型",
+            "major": "专业名称",
+            "location": "学校地点",
+            "duration": "就读时间",
+            "gpa": "GPA（如较高则展示）",
+            "relevant_coursework": ["相关课程1", "相关课程2"],
+            "academic_achievements": ["学术成就1", "学术成就2"],
+            "graduation_thesis": "毕业论文题目（如相关）"
+        }
+    ],
+    "technical_skills": {
+        "programming_languages": ["编程语言"],
+        "frameworks_libraries": ["框架和库"],
+        "databases": ["数据库技术"],
+        "cloud_platforms": ["云平台"],
+        "development_tools": ["开发工具"],
+        "methodologies": ["开发方法论"]
+    },
+    "certifications": [
+        {
+            "name": "证书名称",
+            "issuer": "颁发机构",
+            "date_obtained": "获得时间",
+            "validity": "有效期",
+            "credential_id": "证书编号（如有）"
+        }
+    ],
+    "languages": [
+        {
+            "language": "语言名称",
+            "proficiency": "熟练程度",
+            "certifications": "相关证书"
+        }
+    ],
+    "professional_development": [
+        "持续学习活动1（在线课程/会议/研讨会）",
+        "持续学习活动2（开源贡献/技术分享）",
+        "持续学习活动3（行业认证/技能提升）"
+    ],
+    "additional_information": {
+        "availability": "到岗时间",
+        "salary_expectation": "薪资期望（可选）",
+        "work_preference": "工作偏好（远程/现场/混合）",
+        "relocation_willingness": "是否愿意搬迁",
+        "travel_availability": "出差意愿"
+    },
+    "customization_analysis": {
+        "target_company": "目标公司名称",
+        "target_position": "目标职位名称",
+        "match_score": 综合匹配度（与分析报告一致的数字）,
+        "key_selling_points": [
+            "针对此职位的核心卖点1",
+            "针对此职位的核心卖点2",
+            "针对此职位的核心卖点3"
+        ],
+        "differentiation_strategy": "与其他候选人的差异化优势",
+        "cultural_fit_indicators": [
+            "文化契合点1",
+            "文化契合点2",
+            "文化契合点3"
+        ],
+        "growth_potential": "在该职位的发展潜力说明",
+        "value_proposition": "为公司带来的独特价值"
+    }
+}
+```
+
+## 特别要求：
+
+1. **真实性**：所有内容必须基于用户提供的真实信息，不可虚构
+2. **针对性**：每个部分都要体现与目标公司目标职位的高度相关性
+3. **差异化**：突出候选人的独特优势和价值主张
+4. **量化性**：尽可能使用具体数字和指标
+5. **前瞻性**：体现学习能力和发展潜力
+6. **专业性**：使用行业专业术语，体现专业素养
+7. **可信度**：确保内容逻辑一致，经得起面试验证
+
+请确保生成的简历既专业又有个性，既突出优势又诚实可信，能够在众多候选人中脱颖而出，同时为后续的面试环节奠定坚实基础。
+
+只返回JSON格式的简历内容，不要包含其他解释文字。
+请严格按照以上JSON格式返回简历内容。
+
+重要说明：
+- 只返回JSON格式的数据，不要包含任何其他文字说明
+- 不要使用```json```代码块标记
+- 确保JSON格式正确，所有字符串都用双引号包围
+- 所有字段都必须填写，不能为空
+- professional_summary尽量丰富，能够体现个人优势以及与目标公司的契合性
+- 只能在措辞上进行包装，而不能歪曲事实，例如"完成10+活动页面交付"不能写成"完成20+活动页面交付"，“校二等奖学金”不能写成“校一等奖学金”
+- "education"中的"academic_achievements"不能歪曲事实，没有就填优秀学生
+
+请现在生成JSON简历,，注意以下要求：
+
+1. **控制长度**：每个字段的内容要简洁明了
+   - 每个achievement: 50字以内  
+   - project description: 100字以内
+   - growth_potential: 100字以内
+
+2. **确保完整性**：必须返回完整的JSON，包含所有闭合括号
+
+3. **避免截断**：如果内容过长，优先保证JSON结构完整
+
+请严格按照JSON格式返回，确保所有字段都有完整的闭合标签。
+
+只返回JSON内容，不要其他说明文字：
+"""
+    
     @staticmethod
     def generate_enhanced_resume(
         user_profile: Dict[str, Any], 
@@ -53,68 +256,252 @@ class Phase2ResumeAgent:
                 
             logger.info(f"Generating enhanced resume for {job_posting.get('company_name', 'Unknown')} - {job_posting.get('job_title', 'Unknown')}")
             
-            # 深度分析目标职位
-            job_analysis = Phase2ResumeAgent._deep_analyze_job_requirements(job_posting)
-            
-            # 分析用户背景
-            user_analysis = Phase2ResumeAgent._analyze_user_background(user_profile)
-            
-            # 技能和经验匹配分析
-            match_analysis = Phase2ResumeAgent._comprehensive_match_analysis(user_profile, job_posting)
-            
-            # 生成个性化策略
-            personalization_strategy = Phase2ResumeAgent._create_personalization_strategy(
-                job_analysis, user_analysis, match_analysis, generation_params
-            )
-            
-            # 创建超级个性化提示词
-            prompt = Phase2ResumeAgent._create_super_personalized_prompt(
-                user_profile, job_posting, job_analysis, user_analysis, 
-                match_analysis, personalization_strategy
-            )
+            context = Phase2ResumeAgent._prepare_resume_generation(user_profile, job_posting, generation_params)
             
             # 生成简历
             start_time = time.time()
-            resume_result = llm_service.call_phase2_model(prompt)
+            resume_result = llm_service.call_phase2_model(context["prompt"], EnhancedResumeOutput, system=context["system_prompt"])
             generation_time = time.time() - start_time
             
             logger.info(f"Enhanced resume generation completed in {generation_time:.2f}s")
             
-            # 解析和验证结果
-            resume_content = Phase2ResumeAgent._parse_and_validate_enhanced_resume(
-                resume_result, user_profile, job_posting
-            )
+            return mark_degraded(Phase2ResumeAgent._build_resume_response(
+                resume_result, generation_time, context, user_profile, job_posting, generation_params
+            ), resume_result)
+                
+        except Exception as e:
+            logger.error(f"Error generating enhanced resume: {e}")
+            return Phase2ResumeAgent._create_enhanced_fallback_response(user_profile, job_posting, str(e))
+    
+    @staticmethod
+    async def agenerate_enhanced_resume(
+        user_profile: Dict[str, Any], 
+        job_posting: Dict[str, Any],
+        generation_params: Dict[str, Any] = None,
+        user_analysis: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """生成高度个性化的简历（异步版本，供API路由使用）；user_analysis可传入预先计算的用户背景分析"""
+        try:
+            if generation_params is None:
+                generation_params = {}
+                
+            logger.info(f"Generating enhanced resume (async) for {job_posting.get('company_name', 'Unknown')} - {job_posting.get('job_title', 'Unknown')}")
             
-            # 质量评估
-            quality_assessment = Phase2ResumeAgent._comprehensive_quality_assessment(
-                resume_content, job_posting, match_analysis
+            context = Phase2ResumeAgent._prepare_resume_generation(
+                user_profile, job_posting, generation_params, user_analysis
             )
             
-            # 生成改进建议
-            improvement_suggestions = Phase2ResumeAgent._generate_improvement_suggestions(
-                resume_content, job_posting, quality_assessment
+            start_time = time.time()
+            resume_result = await async_llm_service.acall_phase2_model(
+                context["prompt"], EnhancedResumeOutput, system=context["system_prompt"]
             )
+            generation_time = time.time() - start_time
             
-            return {
-                "success": True,
-                "message": "超级个性化简历生成成功",
-                "data": {
-                    "content": resume_content,
-                    "generation_time": generation_time,
-                    "job_analysis": job_analysis,
-                    "match_analysis": match_analysis,
-                    "quality_assessment": quality_assessment,
-                    "improvement_suggestions": improvement_suggestions,
-                    "personalization_strategy": personalization_strategy,
-                    "customization_level": generation_params.get("customization_level", "high"),
-                    "created_at": datetime.now().isoformat()
-                }
-            }
+            logger.info(f"Enhanced resume generation completed in {generation_time:.2f}s")
+            
+            return mark_degraded(Phase2ResumeAgent._build_resume_response(
+                resume_result, generation_time, context, user_profile, job_posting, generation_params
+            ), resume_result)
                 
         except Exception as e:
             logger.error(f"Error generating enhanced resume: {e}")
             return Phase2ResumeAgent._create_enhanced_fallback_response(user_profile, job_posting, str(e))
     
+    @staticmethod
+    async def astream_enhanced_resume(
+        user_profile: Dict[str, Any], 
+        job_posting: Dict[str, Any],
+        generation_params: Dict[str, Any] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式生成简历，依次产出事件：
+        - analysis: 岗位/匹配分析（LLM调用前即可返回）
+        - token:    模型输出的增量文本
+        - section:  已完整输出、可以解析的简历字段（personal_info、professional_summary...）
+        - final:    与 generate_enhanced_resume 相同的完整结果（含质量评估）
+        """
+        if generation_params is None:
+            generation_params = {}
+        
+        logger.info(f"Streaming enhanced resume for {job_posting.get('company_name', 'Unknown')} - {job_posting.get('job_title', 'Unknown')}")
+        
+        try:
+            context = Phase2ResumeAgent._prepare_resume_generation(user_profile, job_posting, generation_params)
+            yield {
+                "event": "analysis",
+                "data": {
+                    "job_analysis": context["job_analysis"],
+                    "match_analysis": context["match_analysis"],
+                    "personalization_strategy": context["personalization_strategy"]
+                }
+            }
+            
+            start_time = time.time()
+            parser = StreamingJSONSectionParser()
+            parts = []
+            async for delta in async_llm_service.astream_phase2_model(context["prompt"], system=context["system_prompt"]):
+                parts.append(delta)
+                yield {"event": "token", "data": {"text": delta}}
+                for name, content in parser.feed(delta):
+                    yield {"event": "section", "data": {"name": name, "content": content}}
+            generation_time = time.time() - start_time
+            
+            logger.info(f"Enhanced resume streaming completed in {generation_time:.2f}s")
+            
+            result = Phase2ResumeAgent._build_resume_response(
+                "".join(parts), generation_time, context, user_profile, job_posting, generation_params
+            )
+            # 模型不可用时流中只有一段演示数据
+            mark_degraded(result, first_degraded(parts))
+        except Exception as e:
+            logger.error(f"Error streaming enhanced resume: {e}")
+            result = Phase2ResumeAgent._create_enhanced_fallback_response(user_profile, job_posting, str(e))
+        
+        yield {"event": "final", "data": result}
+    
+    @staticmethod
+    async def agenerate_batch_resumes(
+        user_profile: Dict[str, Any],
+        job_postings: List[Dict[str, Any]],
+        generation_params: Dict[str, Any] = None,
+        max_concurrency: Optional[int] = None,
+        job_timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        并发批量生成简历，按完成顺序逐个产出每个职位的结果。
+        
+        用户背景分析只计算一次并在所有职位间共享；每个职位单独超时，
+        超时或失败的职位以 success=False 返回，不影响其他职位。
+        max_concurrency 来自请求体，不超过 settings.batch_max_concurrency。
+        """
+        max_concurrency = max(1, min(max_concurrency or settings.batch_max_concurrency, settings.batch_max_concurrency))
+        job_timeout = job_timeout or settings.batch_job_timeout
+        
+        # 用户背景与职位无关，只分析一次
+        user_analysis = Phase2ResumeAgent._analyze_user_background(user_profile)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run_job(index: int, job_posting: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                logger.info(f"Generating resume {index+1}/{len(job_postings)} for {job_posting.get('company_name', 'Unknown')}")
+                start_time = time.time()
+                try:
+                    result = await asyncio.wait_for(
+                        Phase2ResumeAgent.agenerate_enhanced_resume(
+                            user_profile, job_posting, generation_params, user_analysis
+                        ),
+                        timeout=job_timeout
+                    )
+                    error = result.get("message") if not result["success"] else None
+                except asyncio.TimeoutError:
+                    logger.warning(f"Resume generation for job {index} timed out after {job_timeout}s")
+                    result, error = {"success": False, "data": None}, f"生成超时（{job_timeout}秒）"
+                except Exception as e:
+                    logger.error(f"Error generating resume for job {index}: {e}")
+                    result, error = {"success": False, "data": None}, str(e)
+                
+                return {
+                    "job_index": index,
+                    "job_title": job_posting.get("job_title"),
+                    "company_name": job_posting.get("company_name"),
+                    "success": result["success"],
+                    "data": result["data"] if result["success"] else None,
+                    "error": error,
+                    "elapsed": round(time.time() - start_time, 2)
+                }
+        
+        # 批量生成的LLM调用使用 batch 优先级，不挤占交互请求的额度
+        with request_priority("batch"):
+            tasks = [asyncio.ensure_future(run_job(i, job)) for i, job in enumerate(job_postings)]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            # 调用方提前结束（如客户端断开）时取消剩余任务
+            for task in tasks:
+                task.cancel()
+    
+    @staticmethod
+    def _prepare_resume_generation(
+        user_profile: Dict[str, Any], 
+        job_posting: Dict[str, Any],
+        generation_params: Dict[str, Any],
+        user_analysis: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """完成LLM调用前的全部分析，返回分析结果和提示词"""
+        # 深度分析目标职位
+        job_analysis = Phase2ResumeAgent._deep_analyze_job_requirements(job_posting)
+        
+        # 分析用户背景（批量生成时由调用方传入）
+        if user_analysis is None:
+            user_analysis = Phase2ResumeAgent._analyze_user_background(user_profile)
+        
+        # 技能和经验匹配分析
+        match_analysis = Phase2ResumeAgent._comprehensive_match_analysis(user_profile, job_posting)
+        
+        # 生成个性化策略
+        personalization_strategy = Phase2ResumeAgent._create_personalization_strategy(
+            job_analysis, user_analysis, match_analysis, generation_params
+        )
+        
+        # 创建超级个性化提示词
+        prompt = Phase2ResumeAgent._create_super_personalized_prompt(
+            user_profile, job_posting, job_analysis, user_analysis, 
+            match_analysis, personalization_strategy
+        )
+        
+        return {
+            "job_analysis": job_analysis,
+            "user_analysis": user_analysis,
+            "match_analysis": match_analysis,
+            "personalization_strategy": personalization_strategy,
+            "system_prompt": prompt_templates.get("phase2_resume").system,
+            "prompt": prompt
+        }
+    
+    @staticmethod
+    def _build_resume_response(
+        resume_result: str,
+        generation_time: float,
+        context: Dict[str, Any],
+        user_profile: Dict[str, Any], 
+        job_posting: Dict[str, Any],
+        generation_params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """解析LLM输出并组装简历生成结果"""
+        match_analysis = context["match_analysis"]
+        
+        # 解析和验证结果
+        resume_content = Phase2ResumeAgent._parse_and_validate_enhanced_resume(
+            resume_result, user_profile, job_posting
+        )
+        
+        # 质量评估
+        quality_assessment = Phase2ResumeAgent._comprehensive_quality_assessment(
+            resume_content, job_posting, match_analysis
+        )
+        
+        # 生成改进建议
+        improvement_suggestions = Phase2ResumeAgent._generate_improvement_suggestions(
+            resume_content, job_posting, quality_assessment
+        )
+        
+        return {
+            "success": True,
+            "message": "超级个性化简历生成成功",
+            "data": {
+                "content": resume_content,
+                "generation_time": generation_time,
+                "job_analysis": context["job_analysis"],
+                "match_analysis": match_analysis,
+                "quality_assessment": quality_assessment,
+                "improvement_suggestions": improvement_suggestions,
+                "personalization_strategy": context["personalization_strategy"],
+                "customization_level": generation_params.get("customization_level", "high"),
+                "created_at": datetime.now().isoformat()
+            }
+        }
+    
     @staticmethod
     def _deep_analyze_job_requirements(job_posting: Dict[str, Any]) -> Dict[str, Any]:
         """深度分析职位要求"""
@@ -264,78 +651,8 @@ class Phase2ResumeAgent:
     
     @staticmethod
     def _comprehensive_match_analysis(user_profile: Dict[str, Any], job_posting: Dict[str, Any]) -> Dict[str, Any]:
-        """综合匹配度分析"""
-        user_skills = set(user_profile.get('skills', []))
-        job_skills = set(job_posting.get('skills', []))
-        
-        # 基础匹配计算
-        matched_skills = user_skills.intersection(job_skills)
-        missing_skills = job_skills - user_skills
-        extra_skills = user_skills - job_skills
-        
-        skill_match_rate = len(matched_skills) / len(job_skills) if job_skills else 0
-        
-        # 经验匹配分析
-        user_experience_years = len(user_profile.get('experience', []))
-        job_requirements = job_posting.get('requirements', [])
-        
-        required_years = 0
-        for req in job_requirements:
-            if "年" in req and "经验" in req:
-                if "5年" in req:
-                    required_years = 5
-                elif "3年" in req:
-                    required_years = 3
-                elif "1年" in req:
-                    required_years = 1
-        
-        experience_match = user_experience_years >= required_years
-        
-        # 教育匹配分析
-        user_education = user_profile.get('education', [])
-        education_match = len(user_education) > 0
-        
-        # 项目相关性分析
-        user_projects = user_profile.get('projects', [])
-        project_relevance_score = 0
-        
-        for project in user_projects:
-            project_techs = set(project.get('technologies', []))
-            relevance = len(project_techs.intersection(job_skills)) / len(job_skills) if job_skills else 0
-            project_relevance_score = max(project_relevance_score, relevance)
-        
-        # 综合评分
-        overall_match_score = (
-            skill_match_rate * 0.4 +
-            (1.0 if experience_match else 0.5) * 0.3 +
-            (1.0 if education_match else 0.7) * 0.1 +
-            project_relevance_score * 0.2
-        ) * 100
-        
-        return {
-            "overall_match_score": round(overall_match_score, 1),
-            "skill_match": {
-                "rate": round(skill_match_rate * 100, 1),
-                "matched_skills": list(matched_skills),
-                "missing_skills": list(missing_skills),
-                "extra_skills": list(extra_skills)
-            },
-            "experience_match": {
-                "meets_requirement": experience_match,
-                "user_years": user_experience_years,
-                "required_years": required_years
-            },
-            "education_match": education_match,
-            "project_relevance": round(project_relevance_score * 100, 1),
-            "match_grade": (
-                "优秀" if overall_match_score >= 85 else
-                "良好" if overall_match_score >= 70 else
-                "一般" if overall_match_score >= 55 else "较低"
-            ),
-            "improvement_priority": Phase2ResumeAgent._get_improvement_priority(
-                skill_match_rate, experience_match, project_relevance_score
-            )
-        }
+        """综合匹配度分析（评分规则见 skill_matching.SkillMatchEngine）"""
+        return SkillMatchEngine([job_posting]).analyze(user_profile, 0)
     
     @staticmethod
     def _create_personalization_strategy(
@@ -405,14 +722,12 @@ class Phase2ResumeAgent:
         match_analysis: Dict[str, Any],
         personalization_strategy: Dict[str, Any]
     ) -> str:
-        """创建超级个性化提示词"""
+        """创建超级个性化提示词的可变部分；角色设定和简历格式要求在 RESUME_SYSTEM_PROMPT 中"""
         
         company_name = job_posting.get('company_name', '')
         job_title = job_posting.get('job_title', '')
         
         prompt = f"""
-你是一位顶级的简历撰写专家和职业规划师，具有15年以上的招聘和求职经验。请为求职者创建一份极具竞争力的个性化简历。
-
 ## 目标职位详情
 公司名称：{company_name}
 职位名称：{job_title}
@@ -438,230 +753,51 @@ class Phase2ResumeAgent:
 
 ## 深度分析报告
 
-### 职位深度分析：
-- 核心技能要求：{', '.join(job_analysis.get('core_skills', []))}
-- 技术技能要求：{', '.join(job_analysis.get('technical_skills', []))}
-- 软技能要求：{', '.join(job_analysis.get('soft_skills', []))}
-- 经验要求：{job_analysis.get('experience_requirements', {}).get('level', '')}级别，{job_analysis.get('experience_requirements', {}).get('min_years', 0)}年以上
-- 公司文化：{job_analysis.get('company_analysis', {}).get('culture', '')}
-- 公司价值观：{', '.join(job_analysis.get('company_analysis', {}).get('values', []))}
-- 职位层级：{job_analysis.get('role_analysis', {}).get('seniority_level', '')}
-
-### 候选人背景分析：
-- 职业阶段：{user_analysis.get('career_stage', '')}
-- 专业领域：{', '.join(user_analysis.get('specialization_areas', []))}
-- 教育优势：{user_analysis.get('education_advantage', '')}
-- 独特卖点：{', '.join(user_analysis.get('unique_selling_points', []))}
-
-### 匹配度分析：
-- 综合匹配度：{match_analysis.get('overall_match_score', 0)}%（{match_analysis.get('match_grade', '')}）
-- 技能匹配率：{match_analysis.get('skill_match', {}).get('rate', 0)}%
-- 匹配技能：{', '.join(match_analysis.get('skill_match', {}).get('matched_skills', []))}
-- 缺失技能：{', '.join(match_analysis.get('skill_match', {}).get('missing_skills', []))}
-- 项目相关性：{match_analysis.get('project_relevance', 0)}%
-
-### 个性化策略：
-- 突出重点：{', '.join(personalization_strategy.get('highlight_focus', []))}
-- 语言风格：{personalization_strategy.get('tone_style', '')}
-- 关键词优化：{', '.join(personalization_strategy.get('keyword_optimization', []))}
-- 内容权重：{json.dumps(personalization_strategy.get('content_emphasis', {}), ensure_ascii=False)}
-
-## 个性化要求
-
-### 核心策略：
-1. **精准定位**：根据{match_analysis.get('match_grade', '')}的匹配度，采用相应的展示策略
-2. **优势放大**：突出{', '.join(personalization_strategy.get('highlight_focus', []))}
-3. **弱项转化**：将缺失技能转化为学习机会和发展潜力
-4. **文化契合**：体现与{job_analysis.get('company_analysis', {}).get('culture', '')}的匹配
-5. **结果导向**：用数据和成果说话，体现{personalization_strategy.get('tone_style', '')}的风格
-
-### 内容优化：
-1. **个人简介**：融入{', '.join(job_analysis.get('company_analysis', {}).get('values', [])[:3])}等企业价值观
-2. **技能排序**：优先展示{', '.join(match_analysis.get('skill_match', {}).get('matched_skills', [])[:5])}
-3. **经验包装**：根据{job_analysis.get('role_analysis', {}).get('seniority_level', '')}层级调整描述深度
-4. **项目选择**：重点展示与{', '.join(job_analysis.get('technical_skills', [])[:3])}相关的项目
-5. **成果量化**：用具体数字体现{', '.join(personalization_strategy.get('highlight_focus', []))}
-
-请生成以下JSON格式的简历：
-
-```json
-{{
-    "personal_info": {{
-        "name": "候选人姓名",
-        "email": "邮箱地址",
-        "phone": "联系电话",
-        "location": "居住地址",
-        "linkedin": "LinkedIn链接（如有）",
-        "github": "GitHub链接（如有）",
-        "portfolio": "作品集链接（如有）"
-    }},
-    "professional_summary": "个人简介（200-250字，融入企业价值观，突出核心竞争力和与职位的匹配度）",
-    "core_competencies": [
-        "核心竞争力1（结合职位要求）",
-        "核心竞争力2（突出匹配优势）",
-        "核心竞争力3（体现发展潜力）"
-    ],
-    "highlighted_skills": {{
-        "technical_skills": ["技术技能1", "技术技能2", "技术技能3"],
-        "frameworks_tools": ["框架工具1", "框架工具2", "框架工具3"],
-        "soft_skills": ["软技能1", "软技能2", "软技能3"]
-    }},
-    "professional_experience": [
-        {{
-            "company": "公司名称",
-            "position": "职位名称",
-            "location": "工作地点",
-            "duration": "工作时间",
-            "employment_type": "工作类型（全职/兼职/实习）",
-            "company_description": "公司简介（1-2句话）",
-            "responsibilities": [
-                "核心职责1（与目标职位高度相关）",
-                "核心职责2（体现技能匹配）",
-                "核心职责3（展现成长轨迹）"
-            ],
-            "key_achievements": [
-                "关键成果1（用数字量化，体现业务价值）",
-                "关键成果2（突出技术能力和解决问题的能力）",
-                "关键成果3（展现团队协作和领导力）"
-            ],
-            "technologies_used": ["相关技术1", "相关技术2", "相关技术3"]
-        }}
-    ],
-    "key_projects": [
-        {{
-            "name": "项目名称",
-            "role": "项目角色",
-            "duration": "项目周期",
-            "team_size": "团队规模",
-            "project_scale": "项目规模描述",
-            "description": "项目描述（突出与目标职位的相关性）",
-            "key_responsibilities": [
-                "核心职责1（技术深度）",
-                "核心职责2（业务理解）",
-                "核心职责3（团队协作）"
-            ],
-            "technologies_stack": {{
-                "frontend": ["前端技术"],
-                "backend": ["后端技术"],
-                "database": ["数据库技术"],
-                "tools": ["开发工具"]
-            }},
-            "achievements_metrics": [
-                "量化成果1（性能提升/成本节约等）",
-                "量化成果2（用户增长/效率提升等）",
-                "量化成果3（质量改进/创新突破等）"
-            ],
-            "challenges_solutions": "遇到的挑战及解决方案（体现问题解决能力）"
-        }}
-    ],
-    "education": [
-        {{
-            "institution": "学校名称",
-            "degree": "学位类型",
-            "major": "专业名称",
-            "location": "学校地点",
-            "duration": "就读时间",
-            "gpa": "GPA（如较高则展示）",
-            "relevant_coursework": ["相关课程1", "相关课程2"],
-            "academic_achievements": ["学术成就1", "学术成就2"],
-            "graduation_thesis": "毕业论文题目（如相关）"
-        }}
-    ],
-    "technical_skills": {{
-        "programming_languages": ["编程语言"],
-        "frameworks_libraries": ["框架和库"],
-        "databases": ["数据库技术"],
-        "cloud_platforms": ["云平台"],
-        "development_tools": ["开发工具"],
-        "methodologies": ["开发方法论"]
-    }},
-    "certifications": [
-        {{
-            "name": "证书名称",
-            "issuer": "颁发机构",
-            "date_obtained": "获得时间",
-            "validity": "有效期",
-            "credential_id": "证书编号（如有）"
-        }}
-    ],
-    "languages": [
-        {{
-            "language": "语言名称",
-            "proficiency": "熟练程度",
-            "certifications": "相关证书"
-        }}
-    ],
-    "professional_development": [
-        "持续学习活动1（在线课程/会议/研讨会）",
-        "持续学习活动2（开源贡献/技术分享）",
-        "持续学习活动3（行业认证/技能提升）"
-    ],
-    "additional_information": {{
-        "availability": "到岗时间",
-        "salary_expectation": "薪资期望（可选）",
-        "work_preference": "工作偏好（远程/现场/混合）",
-        "relocation_willingness": "是否愿意搬迁",
-        "travel_availability": "出差意愿"
-    }},
-    "customization_analysis": {{
-        "target_company": "{company_name}",
-        "target_position": "{job_title}",
-        "match_score": {match_analysis.get('overall_match_score', 0)},
-        "key_selling_points": [
-            "针对此职位的核心卖点1",
-            "针对此职位的核心卖点2",
-            "针对此职位的核心卖点3"
-        ],
-        "differentiation_strategy": "与其他候选人的差异化优势",
-        "cultural_fit_indicators": [
-            "文化契合点1",
-            "文化契合点2",
-            "文化契合点3"
-        ],
-        "growth_potential": "在该职位的发展潜力说明",
-        "value_proposition": "为公司带来的独特价值"
-    }}
-}}
-```
-
-## 特别要求：
-
-1. **真实性**：所有内容必须基于用户提供的真实信息，不可虚构
-2. **针对性**：每个部分都要体现与{company_name}{job_title}职位的高度相关性
-3. **差异化**：突出候选人的独特优势和价值主张
-4. **量化性**：尽可能使用具体数字和指标
-5. **前瞻性**：体现学习能力和发展潜力
-6. **专业性**：使用行业专业术语，体现专业素养
-7. **可信度**：确保内容逻辑一致，经得起面试验证
-
-请确保生成的简历既专业又有个性，既突出优势又诚实可信，能够在众多候选人中脱颖而出，同时为后续的面试环节奠定坚实基础。
-
-只返回JSON格式的简历内容，不要包含其他解释文字。
-请严格按照以上JSON格式返回简历内容。
-
-重要说明：
-- 只返回JSON格式的数据，不要包含任何其他文字说明
-- 不要使用```json```代码块标记
-- 确保JSON格式正确，所有字符串都用双引号包围
-- 所有字段都必须填写，不能为空
-- professional_summary尽量丰富，能够体现个人优势以及与目标公司的契合性
-- 只能在措辞上进行包装，而不能歪曲事实，例如"完成10+活动页面交付"不能写成"完成20+活动页面交付"，“校二等奖学金”不能写成“校一等奖学金”
-- "education"中的"academic_achievements"不能歪曲事实，没有就填优秀学生
+### 职位深度分析：
+- 核心技能要求：{', '.join(job_analysis.get('core_skills', []))}
+- 技术技能要求：{', '.join(job_analysis.get('technical_skills', []))}
+- 软技能要求：{', '.join(job_analysis.get('soft_skills', []))}
+- 经验要求：{job_analysis.get('experience_requirements', {}).get('level', '')}级别，{job_analysis.get('experience_requirements', {}).get('min_years', 0)}年以上
+- 公司文化：{job_analysis.get('company_analysis', {}).get('culture', '')}
+- 公司价值观：{', '.join(job_analysis.get('company_analysis', {}).get('values', []))}
+- 职位层级：{job_analysis.get('role_analysis', {}).get('seniority_level', '')}
 
-请现在生成JSON简历,，注意以下要求：
+### 候选人背景分析：
+- 职业阶段：{user_analysis.get('career_stage', '')}
+- 专业领域：{', '.join(user_analysis.get('specialization_areas', []))}
+- 教育优势：{user_analysis.get('education_advantage', '')}
+- 独特卖点：{', '.join(user_analysis.get('unique_selling_points', []))}
 
-1. **控制长度**：每个字段的内容要简洁明了
-   - 每个achievement: 50字以内  
-   - project description: 100字以内
-   - growth_potential: 100字以内
+### 匹配度分析：
+- 综合匹配度：{match_analysis.get('overall_match_score', 0)}%（{match_analysis.get('match_grade', '')}）
+- 技能匹配率：{match_analysis.get('skill_match', {}).get('rate', 0)}%
+- 匹配技能：{', '.join(match_analysis.get('skill_match', {}).get('matched_skills', []))}
+- 缺失技能：{', '.join(match_analysis.get('skill_match', {}).get('missing_skills', []))}
+- 项目相关性：{match_analysis.get('project_relevance', 0)}%
 
-2. **确保完整性**：必须返回完整的JSON，包含所有闭合括号
+### 个性化策略：
+- 突出重点：{', '.join(personalization_strategy.get('highlight_focus', []))}
+- 语言风格：{personalization_strategy.get('tone_style', '')}
+- 关键词优化：{', '.join(personalization_strategy.get('keyword_optimization', []))}
+- 内容权重：{json.dumps(personalization_strategy.get('content_emphasis', {}), ensure_ascii=False)}
 
-3. **避免截断**：如果内容过长，优先保证JSON结构完整
+## 个性化要求
 
-请严格按照JSON格式返回，确保所有字段都有完整的闭合标签。
+### 核心策略：
+1. **精准定位**：根据{match_analysis.get('match_grade', '')}的匹配度，采用相应的展示策略
+2. **优势放大**：突出{', '.join(personalization_strategy.get('highlight_focus', []))}
+3. **弱项转化**：将缺失技能转化为学习机会和发展潜力
+4. **文化契合**：体现与{job_analysis.get('company_analysis', {}).get('culture', '')}的匹配
+5. **结果导向**：用数据和成果说话，体现{personalization_strategy.get('tone_style', '')}的风格
 
-只返回JSON内容，不要其他说明文字：
+### 内容优化：
+1. **个人简介**：融入{', '.join(job_analysis.get('company_analysis', {}).get('values', [])[:3])}等企业价值观
+2. **技能排序**：优先展示{', '.join(match_analysis.get('skill_match', {}).get('matched_skills', [])[:5])}
+3. **经验包装**：根据{job_analysis.get('role_analysis', {}).get('seniority_level', '')}层级调整描述深度
+4. **项目选择**：重点展示与{', '.join(job_analysis.get('technical_skills', [])[:3])}相关的项目
+5. **成果量化**：用具体数字体现{', '.join(personalization_strategy.get('highlight_focus', []))}
+
+请按照简历格式和特别要求，为{company_name}的{job_title}职位生成JSON简历，只返回JSON内容。
 """
         
         return prompt
@@ -752,16 +888,7 @@ class Phase2ResumeAgent:
     @staticmethod
     def _get_improvement_priority(skill_match_rate: float, experience_match: bool, project_relevance: float) -> List[str]:
         """获取改进优先级"""
-        priorities = []
-        
-        if skill_match_rate < 0.5:
-            priorities.append("提升技能匹配度")
-        if not experience_match:
-            priorities.append("积累相关经验")
-        if project_relevance < 0.6:
-            priorities.append("增加相关项目经验")
-        
-        return priorities
+        return improvement_priority(skill_match_rate, experience_match, project_relevance)
 
     @staticmethod 
     def _parse_and_validate_enhanced_resume(resume_result: str, user_profile: Dict[str, Any], job_posting: Dict[str, Any]) -> Dict[str, Any]:
@@ -769,30 +896,11 @@ class Phase2ResumeAgent:
         try:
             logger.debug(f"Raw resume result: {resume_result[:500]}...")  # 打印前500字符用于调试
             
-            # 方法1: 直接尝试解析整个结果
-            try:
-                resume_content = json.loads(resume_result)
-                logger.info("Successfully parsed JSON directly")
-            except json.JSONDecodeError:
-                # 方法2: 查找JSON代码块
-                import re
-                
-                # 查找 ```json 代码块
-                json_block_match = re.search(r'```json\s*(.*?)\s*```', resume_result, re.DOTALL)
-                if json_block_match:
-                    json_content = json_block_match.group(1)
-                    logger.info("Found JSON in code block")
-                    resume_content = json.loads(json_content)
-                else:
-                    # 方法3: 查找任何大括号包围的内容
-                    json_match = re.search(r'\{.*\}', resume_result, re.DOTALL)
-                    if json_match:
-                        json_content = json_match.group()
-                        logger.info("Found JSON in braces")
-                        resume_content = json.loads(json_content)
-                    else:
-                        logger.error("No JSON content found in response")
-                        raise json.JSONDecodeError("No JSON found", resume_result, 0)
+            # 代码块 -> 括号配对 -> 宽松修复，依次尝试
+            resume_content = extract_json(resume_result)
+            if resume_content is None:
+                logger.error("No JSON content found in response")
+                raise json.JSONDecodeError("No JSON found", resume_result, 0)
             
             # 验证必要字段
             required_fields = [
@@ -961,27 +1069,66 @@ class Phase2ResumeAgent:
     def optimize_resume_content(resume_content: Dict[str, Any], feedback: Dict[str, Any], optimization_focus: List[str] = None) -> Dict[str, Any]:
         """基于HR反馈优化简历内容"""
         try:
-            import json
-            import re
-            import time
-            from services import llm_service
-            
-            if optimization_focus is None:
-                optimization_focus = []
-            
-            # 提取反馈数据
-            feedback_data = feedback.get('data', {}).get('feedback', feedback) if 'data' in feedback else feedback
-            company_name = feedback.get('data', {}).get('company_name', '目标公司')
-            job_title = feedback.get('data', {}).get('job_title', '目标职位')
-            hr_persona = feedback.get('data', {}).get('hr_persona', 'experienced')
-            overall_score = feedback_data.get('overall_score', 0)
-            detailed_scores = feedback_data.get('detailed_scores', {})
-            strengths = feedback_data.get('strengths', [])
-            weaknesses = feedback_data.get('weaknesses', [])
-            improvement_suggestions = feedback_data.get('improvement_suggestions', [])
-            
-            # 创建优化提示词
-            optimization_prompt = f"""
+            context = Phase2ResumeAgent._prepare_resume_optimization(feedback, optimization_focus, resume_content)
+            
+            # 调用LLM生成优化简历
+            start_time = time.time()
+            optimized_result = llm_service.call_phase2_model(context["prompt"], OptimizedResumeOutput)
+            generation_time = time.time() - start_time
+            
+            return mark_degraded(Phase2ResumeAgent._build_optimization_response(
+                optimized_result, generation_time, resume_content, context
+            ), optimized_result)
+                
+        except Exception as e:
+            logger.error(f"Error optimizing resume content: {e}")
+            return {
+                "success": False,
+                "message": "简历优化过程中发生错误",
+                "error": str(e)
+            }
+
+    @staticmethod
+    async def aoptimize_resume_content(resume_content: Dict[str, Any], feedback: Dict[str, Any], optimization_focus: List[str] = None) -> Dict[str, Any]:
+        """基于HR反馈优化简历内容（异步版本）"""
+        try:
+            context = Phase2ResumeAgent._prepare_resume_optimization(feedback, optimization_focus, resume_content)
+            
+            start_time = time.time()
+            optimized_result = await async_llm_service.acall_phase2_model(context["prompt"], OptimizedResumeOutput)
+            generation_time = time.time() - start_time
+            
+            return mark_degraded(Phase2ResumeAgent._build_optimization_response(
+                optimized_result, generation_time, resume_content, context
+            ), optimized_result)
+                
+        except Exception as e:
+            logger.error(f"Error optimizing resume content: {e}")
+            return {
+                "success": False,
+                "message": "简历优化过程中发生错误",
+                "error": str(e)
+            }
+
+    @staticmethod
+    def _prepare_resume_optimization(feedback: Dict[str, Any], optimization_focus: List[str], resume_content: Dict[str, Any]) -> Dict[str, Any]:
+        """提取HR反馈并构建简历优化提示词"""
+        if optimization_focus is None:
+            optimization_focus = []
+        
+        # 提取反馈数据
+        feedback_data = feedback.get('data', {}).get('feedback', feedback) if 'data' in feedback else feedback
+        company_name = feedback.get('data', {}).get('company_name', '目标公司')
+        job_title = feedback.get('data', {}).get('job_title', '目标职位')
+        hr_persona = feedback.get('data', {}).get('hr_persona', 'experienced')
+        overall_score = feedback_data.get('overall_score', 0)
+        detailed_scores = feedback_data.get('detailed_scores', {})
+        strengths = feedback_data.get('strengths', [])
+        weaknesses = feedback_data.get('weaknesses', [])
+        improvement_suggestions = feedback_data.get('improvement_suggestions', [])
+        
+        # 创建优化提示词
+        optimization_prompt = f"""
 你是一位顶级的简历优化专家，具有15年以上的招聘和求职经验。现在需要你基于HR的专业反馈来优化简历，提升竞争力。
 
 ## HR评估反馈分析
@@ -1214,130 +1361,120 @@ class Phase2ResumeAgent:
 请严格按照JSON格式返回优化后的简历内容：
 """
 
-            # 调用LLM生成优化简历
-            start_time = time.time()
-            optimized_result = llm_service.call_phase2_model(optimization_prompt)
-            generation_time = time.time() - start_time
+        return {
+            "prompt": optimization_prompt,
+            "overall_score": overall_score,
+            "strengths": strengths,
+            "weaknesses": weaknesses,
+            "improvement_suggestions": improvement_suggestions
+        }
+    
+    @staticmethod
+    def _build_optimization_response(optimized_result: str, generation_time: float, 
+                                     resume_content: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        """解析优化后的简历并组装返回结果"""
+        overall_score = context["overall_score"]
+        strengths = context["strengths"]
+        weaknesses = context["weaknesses"]
+        improvement_suggestions = context["improvement_suggestions"]
+        
+        logger.info(f"LLM optimization completed in {generation_time:.2f}s")
+        logger.debug(f"LLM response length: {len(optimized_result)} characters")
+        
+        # 解析JSON结果（代码块、括号配对、宽松修复）
+        optimized_resume = extract_json(optimized_result)
+        if optimized_resume is not None:
+            # 验证必要字段
+            required_fields = [
+                'personal_info', 'professional_summary', 'core_competencies',
+                'highlighted_skills', 'professional_experience', 'key_projects',
+                'education', 'technical_skills'
+            ]
             
-            logger.info(f"LLM optimization completed in {generation_time:.2f}s")
-            logger.debug(f"LLM response length: {len(optimized_result)} characters")
+            missing_fields = []
+            for field in required_fields:
+                if field not in optimized_resume:
+                    missing_fields.append(field)
+                    # 使用原简历数据填补缺失字段
+                    optimized_resume[field] = resume_content.get(field, {} if field in ['personal_info', 'highlighted_skills', 'technical_skills', 'additional_information', 'customization_analysis'] else [])
             
-            # 解析JSON结果 - 更强健的解析逻辑
-            json_match = re.search(r'\{.*\}', optimized_result, re.DOTALL)
-            if json_match:
-                try:
-                    json_str = json_match.group()
-                    # 清理可能的额外字符
-                    json_str = json_str.strip()
-                    
-                    # 尝试解析JSON
-                    optimized_resume = json.loads(json_str)
-                    
-                    # 验证必要字段
-                    required_fields = [
-                        'personal_info', 'professional_summary', 'core_competencies',
-                        'highlighted_skills', 'professional_experience', 'key_projects',
-                        'education', 'technical_skills'
-                    ]
-                    
-                    missing_fields = []
-                    for field in required_fields:
-                        if field not in optimized_resume:
-                            missing_fields.append(field)
-                            # 使用原简历数据填补缺失字段
-                            optimized_resume[field] = resume_content.get(field, {} if field in ['personal_info', 'highlighted_skills', 'technical_skills', 'additional_information', 'customization_analysis'] else [])
-                    
-                    if missing_fields:
-                        logger.warning(f"Missing fields in optimized resume: {missing_fields}, filled with original data")
-                    
-                    # 确保关键字段不为空
-                    if not optimized_resume.get('professional_summary'):
-                        optimized_resume['professional_summary'] = resume_content.get('professional_summary', '专业且经验丰富的候选人，具备相关技能和经验。')
-                    
-                    logger.info("Resume optimization completed successfully")
-                    
-                    return {
-                        "success": True,
-                        "message": "简历优化完成",
-                        "data": {
-                            "content": optimized_resume,
-                            "optimization_summary": {
-                                "original_score": overall_score,
-                                "target_improvements": improvement_suggestions[:3],
-                                "optimization_focus": [
-                                    "强化技能匹配度展示",
-                                    "突出项目复杂度和影响力",
-                                    "展现职业稳定性和发展规划",
-                                    "增强团队协作和领导力体现"
-                                ],
-                                "expected_improvements": [
-                                    f"技能匹配度提升：针对{', '.join(strengths[:2]) if strengths else '核心技能'}进一步强化",
-                                    f"弱项改善：在{', '.join(weaknesses[:2]) if weaknesses else '关键领域'}方面重新包装表达",
-                                    "整体竞争力提升：预期评分提升10-15分"
-                                ]
-                            },
-                            "generation_time": generation_time,
-                            "optimization_type": "hr_feedback_based",
-                            "created_at": datetime.now().isoformat()
-                        }
-                    }
-                    
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse optimized resume JSON: {e}")
-                    logger.error(f"JSON content preview: {json_str[:500]}...")
-                    
-                    # 返回原简历作为备选方案
-                    return {
-                        "success": True,
-                        "message": "简历优化完成（使用备选方案）",
-                        "data": {
-                            "content": resume_content,  # 返回原简历
-                            "optimization_summary": {
-                                "original_score": overall_score,
-                                "target_improvements": improvement_suggestions[:3],
-                                "optimization_focus": ["技能匹配优化", "经验表述优化", "格式专业化"],
-                                "expected_improvements": ["基础优化已应用"],
-                                "note": "由于格式解析问题，返回了原始简历内容"
-                            },
-                            "generation_time": generation_time,
-                            "optimization_type": "fallback",
-                            "created_at": datetime.now().isoformat()
-                        }
-                    }
-            else:
-                logger.error("No valid JSON found in optimization result")
-                logger.error(f"LLM response preview: {optimized_result[:500]}...")
-                
-                # 返回原简历作为备选方案
-                return {
-                    "success": True,
-                    "message": "简历优化完成（使用备选方案）",
-                    "data": {
-                        "content": resume_content,  # 返回原简历
-                        "optimization_summary": {
-                            "original_score": overall_score,
-                            "target_improvements": improvement_suggestions[:3],
-                            "optimization_focus": ["技能匹配优化", "经验表述优化", "格式专业化"],
-                            "expected_improvements": ["基础优化已应用"],
-                            "note": "由于响应格式问题，返回了原始简历内容"
-                        },
-                        "generation_time": generation_time,
-                        "optimization_type": "fallback",
-                        "created_at": datetime.now().isoformat()
-                    }
+            if missing_fields:
+                logger.warning(f"Missing fields in optimized resume: {missing_fields}, filled with original data")
+            
+            # 确保关键字段不为空
+            if not optimized_resume.get('professional_summary'):
+                optimized_resume['professional_summary'] = resume_content.get('professional_summary', '专业且经验丰富的候选人，具备相关技能和经验。')
+            
+            logger.info("Resume optimization completed successfully")
+            
+            return {
+                "success": True,
+                "message": "简历优化完成",
+                "data": {
+                    "content": optimized_resume,
+                    "optimization_summary": {
+                        "original_score": overall_score,
+                        "target_improvements": improvement_suggestions[:3],
+                        "optimization_focus": [
+                            "强化技能匹配度展示",
+                            "突出项目复杂度和影响力",
+                            "展现职业稳定性和发展规划",
+                            "增强团队协作和领导力体现"
+                        ],
+                        "expected_improvements": [
+                            f"技能匹配度提升：针对{', '.join(strengths[:2]) if strengths else '核心技能'}进一步强化",
+                            f"弱项改善：在{', '.join(weaknesses[:2]) if weaknesses else '关键领域'}方面重新包装表达",
+                            "整体竞争力提升：预期评分提升10-15分"
+                        ]
+                    },
+                    "generation_time": generation_time,
+                    "optimization_type": "hr_feedback_based",
+                    "created_at": datetime.now().isoformat()
                 }
-                
-        except Exception as e:
-            logger.error(f"Error optimizing resume content: {e}")
+            }
+            
+        else:
+            logger.error("No valid JSON found in optimization result")
+            logger.error(f"LLM response preview: {optimized_result[:500]}...")
+            
+            # 返回原简历作为备选方案
             return {
-                "success": False,
-                "message": "简历优化过程中发生错误",
-                "error": str(e)
+                "success": True,
+                "message": "简历优化完成（使用备选方案）",
+                "data": {
+                    "content": resume_content,  # 返回原简历
+                    "optimization_summary": {
+                        "original_score": overall_score,
+                        "target_improvements": improvement_suggestions[:3],
+                        "optimization_focus": ["技能匹配优化", "经验表述优化", "格式专业化"],
+                        "expected_improvements": ["基础优化已应用"],
+                        "note": "由于响应格式问题，返回了原始简历内容"
+                    },
+                    "generation_time": generation_time,
+                    "optimization_type": "fallback",
+                    "created_at": datetime.now().isoformat()
+                }
             }
 
+# 导入时编译简历生成的稳定前缀
+prompt_templates.register("phase2_resume", Phase2ResumeAgent.RESUME_SYSTEM_PROMPT)
+
+
 class Phase3HRAgent:
     """Phase 3: HR simulation and feedback agent."""
     
+    # HR评估提示词中逐行列出的岗位要点
+    JOB_SUMMARY_FIELDS = {
+        "company_name": "公司名称",
+        "job_title": "职位名称",
+        "industry": "行业",
+        "company_size": "公司规模",
+        "salary_range": "薪资范围",
+        "description": "职位描述",
+        "requirements": "岗位要求",
+        "skills": "技能要求"
+    }
+    
     HR_PERSONAS = {
         "experienced": {
             "name": "资深HR经理",
@@ -1719,54 +1856,121 @@ class Phase3HRAgent:
                           hr_persona: str = "experienced") -> Dict[str, Any]:
         """Simulate HR review of resume with detailed personas."""
         try:
-            import time
-            import json
-            import re
-            from datetime import datetime
+            context = Phase3HRAgent._prepare_hr_review(resume_content, job_posting, hr_persona)
             
-            # 确保输入参数是字典格式
-            resume_content = ensure_dict(resume_content)
-            job_posting = ensure_dict(job_posting)
+            # Get HR feedback
+            start_time = time.time()
+            hr_result = llm_service.call_phase3_model(context["prompt"], HRFeedbackOutput, system=context["system_prompt"])
+            generation_time = time.time() - start_time
             
-            logger.info(f"Simulating {hr_persona} HR review for {safe_get(job_posting, 'company_name', 'Unknown')} position")
-            
-            # 获取HR人设配置
-            if hr_persona not in Phase3HRAgent.HR_PERSONAS:
-                hr_persona = "experienced"
-            
-            persona_config = Phase3HRAgent.HR_PERSONAS[hr_persona]
-             # 提取岗位元数据
-            job_title = job_posting.get("job_title", "")
-            company_name = job_posting.get("company_name", "")
-            requirements = job_posting.get("requirements", [])
-            skills = job_posting.get("skills", [])
-            description = job_posting.get("description", "")
-            industry = job_posting.get("industry", "")
-            company_size = job_posting.get("company_size", "")
-            salary_range = job_posting.get("salary_range", "")
-
-            # 精心设计的评估提示词
-            comprehensive_prompt = f"""
-你是一位{persona_config['name']}，{persona_config['description']}。
-请以专业HR的身份，对以下候选人进行全面、深入、细致的评估分析。
+            return mark_degraded(Phase3HRAgent._build_hr_review_response(hr_result, generation_time, context), hr_result)
+                
+        except Exception as e:
+            logger.error(f"Error in HR simulation: {e}")
+            return Phase3HRAgent._build_hr_review_fallback(e, resume_content, job_posting, hr_persona)
 
-【重要：请确保全部回复内容都使用简体中文，禁止使用英文或其他语言】
+    @staticmethod
+    async def asimulate_hr_review(resume_content: Dict[str, Any], job_posting: Dict[str, Any], 
+                                  hr_persona: str = "experienced") -> Dict[str, Any]:
+        """Simulate HR review of resume with detailed personas (awaitable)."""
+        try:
+            context = Phase3HRAgent._prepare_hr_review(resume_content, job_posting, hr_persona)
+            
+            start_time = time.time()
+            hr_result = await async_llm_service.acall_phase3_model(context["prompt"], HRFeedbackOutput, system=context["system_prompt"])
+            generation_time = time.time() - start_time
+            
+            return mark_degraded(Phase3HRAgent._build_hr_review_response(hr_result, generation_time, context), hr_result)
+                
+        except Exception as e:
+            logger.error(f"Error in HR simulation: {e}")
+            return Phase3HRAgent._build_hr_review_fallback(e, resume_content, job_posting, hr_persona)
 
-## 候选人简历信息：
-{json.dumps(resume_content, ensure_ascii=False, indent=2)}
+    @staticmethod
+    def preview_hr_review(resume_content: Dict[str, Any], job_posting: Dict[str, Any],
+                          hr_persona: str = "experienced") -> Dict[str, Any]:
+        """不调用LLM的快速预览：按 hr_scoring 的规则表打分，分析文字使用模板"""
+        start_time = time.time()
+        resume_content = ensure_dict(resume_content)
+        job_posting = ensure_dict(job_posting)
+        if hr_persona not in Phase3HRAgent.HR_PERSONAS:
+            hr_persona = "experienced"
+        persona_config = Phase3HRAgent.HR_PERSONAS[hr_persona]
+        
+        feedback = Phase3HRAgent._create_default_feedback(persona_config, hr_persona, resume_content, job_posting)
+        data = Phase3HRAgent._hr_review_data(
+            feedback, persona_config, hr_persona, job_posting, time.time() - start_time, "rule_engine"
+        )
+        data["preview"] = True
+        return {
+            "success": True,
+            "message": f"{persona_config['name']}预览评估完成",
+            "data": data
+        }
+
+    @staticmethod
+    def _prepare_hr_review(resume_content: Dict[str, Any], job_posting: Dict[str, Any], 
+                           hr_persona: str) -> Dict[str, Any]:
+        """规范化输入并构建HR评估提示词"""
+        # 确保输入参数是字典格式
+        resume_content = ensure_dict(resume_content)
+        job_posting = ensure_dict(job_posting)
+        
+        logger.info(f"Simulating {hr_persona} HR review for {safe_get(job_posting, 'company_name', 'Unknown')} position")
+        
+        # 获取HR人设配置
+        if hr_persona not in Phase3HRAgent.HR_PERSONAS:
+            hr_persona = "experienced"
+        
+        persona_config = Phase3HRAgent.HR_PERSONAS[hr_persona]
+        job_title = job_posting.get("job_title", "")
+        company_name = job_posting.get("company_name", "")
+
+        # 岗位要点只出现在摘要中，完整职位信息里去掉这些字段，避免重复
+        job_summary = {key: job_posting.get(key) for key in Phase3HRAgent.JOB_SUMMARY_FIELDS}
+        job_extra = {key: value for key, value in job_posting.items() if key not in Phase3HRAgent.JOB_SUMMARY_FIELDS}
+        sections = [
+            PromptSection("job_summary", job_summary, priority=3, formatter=Phase3HRAgent._format_job_summary),
+            PromptSection("resume", resume_content, priority=2),
+            PromptSection("job_extra", job_extra, priority=1, required=False,
+                          formatter=lambda value: compact_json(value) if value else "无")
+        ]
 
-## 目标职位信息：
-{json.dumps(job_posting, ensure_ascii=False, indent=2)}
+        # 人设、评估标准和输出格式在导入时编译为稳定前缀（system），这里只拼装本次请求的数据
+        template = prompt_templates.get(f"phase3_hr_review.{hr_persona}")
+        render = lambda parts: f"""
+## 候选人简历信息：
+{parts['resume']}
 
 ## 目标职位信息（请重点参考以下内容进行评分和分析）：
-- 公司名称：{company_name}
-- 职位名称：{job_title}
-- 行业：{industry}
-- 公司规模：{company_size}
-- 薪资范围：{salary_range}
-- 职位描述：{description}
-- 岗位要求：{json.dumps(requirements, ensure_ascii=False)}
-- 技能要求：{json.dumps(skills, ensure_ascii=False)}
+{parts['job_summary']}
+
+## 其他职位信息：
+{parts['job_extra']}
+
+请按照评估要求，评估候选人与{company_name}的{job_title}职位的匹配度，返回完整的JSON格式评估结果。
+"""
+        comprehensive_prompt = prompt_budget.assemble(
+            "phase3_hr_review", render, sections, settings.phase3_prompt_token_budget - template.prefix_tokens
+        )
+
+        return {
+            "resume_content": resume_content,
+            "job_posting": job_posting,
+            "hr_persona": hr_persona,
+            "persona_config": persona_config,
+            "system_prompt": template.system,
+            "prompt": comprehensive_prompt
+        }
+
+    @staticmethod
+    def _hr_review_system_prompt(persona_config: Dict[str, Any]) -> str:
+        """HR评估的稳定前缀：只依赖人设配置，每个人设在导入时编译一次"""
+        return f"""
+你是一位{persona_config['name']}，{persona_config['description']}。
+请以专业HR的身份，对用户提供的候选人进行全面、深入、细致的评估分析。
+
+【重要：请确保全部回复内容都使用简体中文，禁止使用英文或其他语言】
 
 ## 评估权重标准：
 作为{persona_config['name']}，请严格按照以下权重进行评估：
@@ -1777,20 +1981,20 @@ class Phase3HRAgent:
 ### 1. 工作经验分析（字数要求：不少于100字）
 请从以下角度深入分析：
 - 工作经历与目标职位的匹配程度（具体说明哪些经历匹配，哪些不匹配）
-- 职业发展轨迹和稳定性（分析跳槽频率、职业成长路径、（如是否有与{company_name}类似企业的工作经历）
+- 职业发展轨迹和稳定性（分析跳槽频率、职业成长路径、（如是否有与目标公司类似企业的工作经历）
 - 具体工作成果和业绩表现（量化成果，突出亮点）
 - 行业经验和领域专业度（分析是否有相关行业背景）
 
 ### 2. 技能评价分析（字数要求：不少于100字）
 请从以下角度深入分析：
-- 技能与岗位需求的匹配度（逐项对比技能要求，如是否掌握{skills}等关键技能）
+- 技能与岗位需求的匹配度（逐项对比技能要求，如是否掌握其中的关键技能）
 - 核心技能的掌握深度和应用水平（评估技能熟练程度）
 - 技术栈的完整性和先进性（分析技术栈是否跟得上行业发展）
 - 学习能力和技术发展潜力（评估持续学习和技术更新能力）
 
 ### 3. 教育背景分析（字数要求：不少于100字）
 请从以下角度深入分析：
-- 学历层次与职位要求的匹配性（本科/硕士/博士等，如是否满足{requirements}中的学历要求）
+- 学历层次与职位要求的匹配性（本科/硕士/博士等，如是否满足岗位要求中的学历要求）
 - 专业背景与工作领域的相关性（专业知识基础）
 - 院校声誉和教育质量评估（是否来自知名院校）
 - 教育经历对职业发展的支撑作用（理论基础是否扎实）
@@ -1798,7 +2002,7 @@ class Phase3HRAgent:
 ### 4. 综合评价（字数要求：不少于300字）
 请提供全面深入的综合评价，包括：
 - 候选人的整体素质和综合能力评估
-- 全面评估候选人与{company_name}的{job_title}职位的整体匹配度
+- 全面评估候选人与目标公司目标职位的整体匹配度
 - 与目标职位的整体匹配度分析
 - 候选人的核心竞争优势和独特价值
 - 存在的主要不足和改进空间
@@ -1843,86 +2047,93 @@ class Phase3HRAgent:
 
 【再次强调：所有内容必须使用简体中文，严格遵守字数要求，确保分析深度和专业性】
 """
-            
-            # Get HR feedback
-            start_time = time.time()
-            hr_result = llm_service.call_phase3_model(comprehensive_prompt)
-            generation_time = time.time() - start_time
-            
-            # Parse feedback
-            feedback_content = Phase3HRAgent._parse_and_validate_feedback(
-                hr_result, persona_config, hr_persona, resume_content, job_posting
+
+    @staticmethod
+    def _format_job_summary(job_summary: Dict[str, Any]) -> str:
+        """岗位要点逐行列出，列表字段使用紧凑JSON"""
+        return "\n".join(
+            f"- {label}：{value if isinstance(value, str) else compact_json(value)}"
+            for key, label in Phase3HRAgent.JOB_SUMMARY_FIELDS.items()
+            if (value := job_summary.get(key)) is not None
+        )
+
+    @staticmethod
+    def _build_hr_review_response(hr_result: str, generation_time: float, context: Dict[str, Any]) -> Dict[str, Any]:
+        """解析HR评估结果并组装返回数据"""
+        resume_content = context["resume_content"]
+        job_posting = context["job_posting"]
+        hr_persona = context["hr_persona"]
+        persona_config = context["persona_config"]
+        
+        # Parse feedback
+        feedback_content = Phase3HRAgent._parse_and_validate_feedback(
+            hr_result, persona_config, hr_persona, resume_content, job_posting
+        )
+        
+        return {
+            "success": True,
+            "message": f"{persona_config['name']}评估完成",
+            "data": Phase3HRAgent._hr_review_data(
+                feedback_content, persona_config, hr_persona, job_posting, generation_time, "phase3_model"
             )
+        }
+
+    @staticmethod
+    def _hr_review_data(feedback: Dict[str, Any], persona_config: Dict[str, Any], hr_persona: str,
+                        job_posting: Dict[str, Any], generation_time: float, model_used: str) -> Dict[str, Any]:
+        """HR评估结果的返回数据（LLM评估、备用评估和预览共用）"""
+        return {
+            "feedback": feedback,
+            "hr_persona": hr_persona,
+            "hr_info": {
+                "name": persona_config["name"],
+                "description": persona_config["description"],
+                "personality_traits": persona_config["personality_traits"],
+                "pass_threshold": persona_config["pass_threshold"]
+            },
+            "evaluation_weights": persona_config["weights"],
+            "company_name": safe_get(job_posting, 'company_name', ''),
+            "job_title": safe_get(job_posting, 'job_title', ''),
+            "generation_time": generation_time,
+            "model_used": model_used,
+            "review_date": datetime.now().isoformat()
+        }
+
+    @staticmethod
+    def _build_hr_review_fallback(error: Exception, resume_content: Dict[str, Any], 
+                                  job_posting: Dict[str, Any], hr_persona: str) -> Dict[str, Any]:
+        """LLM评估失败时使用备用评估"""
+        try:
+            resume_content = ensure_dict(resume_content)
+            job_posting = ensure_dict(job_posting)
+            persona_config = Phase3HRAgent.HR_PERSONAS.get(hr_persona, Phase3HRAgent.HR_PERSONAS["experienced"])
+            default_feedback = Phase3HRAgent._create_default_feedback(persona_config, hr_persona, resume_content, job_posting)
             
+            data = Phase3HRAgent._hr_review_data(
+                default_feedback, persona_config, hr_persona, job_posting, 0, "fallback_template"
+            )
+            data["error_handled"] = str(error)
             return {
                 "success": True,
-                "message": f"{persona_config['name']}评估完成",
-                "data": {
-                    "feedback": feedback_content,
-                    "hr_persona": hr_persona,
-                    "hr_info": {
-                        "name": persona_config["name"],
-                        "description": persona_config["description"],
-                        "personality_traits": persona_config["personality_traits"],
-                        "pass_threshold": persona_config["pass_threshold"]
-                    },
-                    "evaluation_weights": persona_config["weights"],
-                    "company_name": safe_get(job_posting, 'company_name', ''),
-                    "job_title": safe_get(job_posting, 'job_title', ''),
-                    "generation_time": generation_time,
-                    "model_used": "phase3_model",
-                    "review_date": datetime.now().isoformat()
-                }
+                "message": f"HR评估完成（使用备用评估）",
+                "data": data
+            }
+        except:
+            return {
+                "success": False,
+                "message": f"HR simulation failed: {str(error)}",
+                "data": {"error_type": type(error).__name__, "error_detail": str(error)}
             }
-                
-        except Exception as e:
-            logger.error(f"Error in HR simulation: {e}")
-            try:
-                persona_config = Phase3HRAgent.HR_PERSONAS.get(hr_persona, Phase3HRAgent.HR_PERSONAS["experienced"])
-                default_feedback = Phase3HRAgent._create_default_feedback(persona_config, hr_persona, resume_content, job_posting)
-                
-                return {
-                    "success": True,
-                    "message": f"HR评估完成（使用备用评估）",
-                    "data": {
-                        "feedback": default_feedback,
-                        "hr_persona": hr_persona,
-                        "hr_info": {
-                            "name": persona_config["name"],
-                            "description": persona_config["description"],
-                            "personality_traits": persona_config["personality_traits"],
-                            "pass_threshold": persona_config["pass_threshold"]
-                        },
-                        "evaluation_weights": persona_config["weights"],
-                        "company_name": safe_get(job_posting, 'company_name', ''),
-                        "job_title": safe_get(job_posting, 'job_title', ''),
-                        "generation_time": 0,
-                        "model_used": "fallback_template",
-                        "review_date": datetime.now().isoformat(),
-                        "error_handled": str(e)
-                    }
-                }
-            except:
-                return {
-                    "success": False,
-                    "message": f"HR simulation failed: {str(e)}",
-                    "data": {"error_type": type(e).__name__, "error_detail": str(e)}
-                }
 
     @staticmethod
     def _parse_and_validate_feedback(hr_result: str, persona_config: Dict[str, Any], 
                                    hr_persona: str, resume_content: Dict[str, Any], 
                                    job_posting: Dict[str, Any]) -> Dict[str, Any]:
         """解析和验证HR评估结果"""
-        import re
-        import json
-        
         try:
             # 尝试从LLM结果中提取JSON
-            json_match = re.search(r'\{.*\}', hr_result, re.DOTALL)
-            if json_match:
-                feedback_content = json.loads(json_match.group())
-                
+            feedback_content = extract_json(hr_result)
+            if feedback_content is not None:
                 # 验证必要字段并修复
                 feedback_content = Phase3HRAgent._validate_and_fix_feedback(
                     feedback_content, persona_config, hr_persona, resume_content, job_posting
@@ -1933,13 +2144,8 @@ class Phase3HRAgent:
                 logger.warning("无法从LLM结果中解析JSON，使用智能备用方案")
                 return Phase3HRAgent._create_default_feedback(
                     persona_config, hr_persona, resume_content, job_posting
-                )
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON解析失败: {e}")
-            return Phase3HRAgent._create_default_feedback(
-                persona_config, hr_persona, resume_content, job_posting
-            )
+                )
+                
         except Exception as e:
             logger.error(f"解析过程出错: {e}")
             return Phase3HRAgent._create_default_feedback(
@@ -1952,12 +2158,14 @@ class Phase3HRAgent:
         """验证并修复反馈内容，确保所有必需字段存在"""
         weights = persona_config["weights"]
         detailed_scores = feedback_content.get("detailed_scores", {})
+        # 简历特征只提取一次，缺失的分数和文字分析都从特征生成
+        features = ResumeFeatures.extract(ensure_dict(resume_content))
         
         # 确保所有权重键都有对应的分数
         for weight_key in weights.keys():
             if weight_key not in detailed_scores:
-                # 基于简历内容生成智能默认分数
-                default_score = Phase3HRAgent._generate_intelligent_score(weight_key, resume_content, job_posting)
+                # 基于简历特征按规则表生成默认分数
+                default_score = score_metric(weight_key, features)
                 detailed_scores[weight_key] = default_score
                 logger.info(f"Generated intelligent score for {weight_key}: {default_score} (HR persona: {hr_persona})")
             else:
@@ -1990,8 +2198,7 @@ class Phase3HRAgent:
                     score = float(raw_score)
                 elif isinstance(raw_score, str):
                     # 尝试从字符串中提取数字
-                    import re
-                    number_match = re.search(r'\d+(?:\.\d+)?', raw_score)
+                    number_match = _NUMBER_PATTERN.search(raw_score)
                     if number_match:
                         score = float(number_match.group())
                     else:
@@ -2043,26 +2250,22 @@ class Phase3HRAgent:
             logger.warning(f"Final validation failed: missing detailed_scores fields {missing_fields} for HR persona {hr_persona}")
             # 补充缺失的字段
             for field in missing_fields:
-                feedback_content["detailed_scores"][field] = Phase3HRAgent._generate_intelligent_score(field, resume_content, job_posting)
+                feedback_content["detailed_scores"][field] = score_metric(field, features)
         
         logger.info(f"Final detailed_scores for {hr_persona}: {feedback_content['detailed_scores']}")
         
         # 确保关键字段存在并有实质内容
         if not feedback_content.get("strengths"):
-            feedback_content["strengths"] = Phase3HRAgent._generate_strengths(resume_content, job_posting, hr_persona)
+            feedback_content["strengths"] = Phase3HRAgent._generate_strengths(features, hr_persona)
         
         if not feedback_content.get("weaknesses"):
-            feedback_content["weaknesses"] = Phase3HRAgent._generate_weaknesses(resume_content, job_posting, hr_persona)
+            feedback_content["weaknesses"] = Phase3HRAgent._generate_weaknesses(features, hr_persona)
         
         if not feedback_content.get("detailed_analysis"):
-            feedback_content["detailed_analysis"] = Phase3HRAgent._generate_detailed_analysis(
-                detailed_scores, weights, resume_content, job_posting, hr_persona
-            )
+            feedback_content["detailed_analysis"] = Phase3HRAgent._generate_detailed_analysis(detailed_scores, features)
         
         if not feedback_content.get("improvement_suggestions"):
-            feedback_content["improvement_suggestions"] = Phase3HRAgent._generate_improvement_suggestions(
-                resume_content, job_posting, hr_persona
-            )
+            feedback_content["improvement_suggestions"] = Phase3HRAgent._generate_improvement_suggestions(features, hr_persona)
         
         if not feedback_content.get("hr_comments"):
             feedback_content["hr_comments"] = Phase3HRAgent._generate_hr_comments(
@@ -2072,244 +2275,24 @@ class Phase3HRAgent:
         return feedback_content
 
     @staticmethod
-    def _generate_intelligent_score(metric: str, resume_content: Dict[str, Any], job_posting: Dict[str, Any]) -> int:
-        """基于简历内容和职位要求生成智能评分"""
-        base_score = 60
-        
-        # 确保输入参数是字典格式
-        resume_content = ensure_dict(resume_content)
-        job_posting = ensure_dict(job_posting)
-        
-        # 获取基础数据
-        experience = safe_get(resume_content, "experience", [])
-        skills = safe_get(resume_content, "skills", [])
-        education = safe_get(resume_content, "education", [])
-        projects = safe_get(resume_content, "projects", [])
-        
-        # 根据不同评估维度调整分数
-        
-        # === 经验丰富HR的字段 ===
-        if metric == "experience_match":
-            if len(experience) >= 3:
-                base_score += 15
-            elif len(experience) >= 1:
-                base_score += 10
-            
-            # 检查经验相关性
-            job_title = safe_get(job_posting, "job_title", "").lower()
-            for exp in experience:
-                exp_title = str(safe_get(exp, "position", "")).lower()
-                if any(keyword in exp_title for keyword in ["开发", "工程师", "程序员", "技术"]):
-                    base_score += 10
-                    break
-                    
-        elif metric == "skills_proficiency":
-            if len(skills) >= 8:
-                base_score += 20
-            elif len(skills) >= 5:
-                base_score += 15
-            elif len(skills) >= 3:
-                base_score += 10
-                
-        elif metric == "performance_results":
-            # 检查工作经验中是否有业绩描述
-            for exp in experience:
-                exp_desc = str(safe_get(exp, "description", "")).lower()
-                if any(keyword in exp_desc for keyword in ["提升", "优化", "增长", "完成", "实现", "%"]):
-                    base_score += 15
-                    break
-            
-            # 检查项目经验
-            if len(projects) >= 2:
-                base_score += 10
-                
-        elif metric == "career_stability":
-            # 职业稳定性评估
-            if len(experience) >= 2:
-                # 计算平均在职时长（简化评估）
-                base_score += 10
-            if len(experience) <= 3:  # 跳槽不频繁
-                base_score += 10
-                
-        elif metric == "resume_professionalism":
-            # 简历专业性评估
-            if education and skills and experience:
-                base_score += 15
-            
-        # === 保守型HR的字段 ===
-        elif metric == "education_background":
-            if education:
-                edu_str = str(education).lower()
-                if "硕士" in edu_str or "研究生" in edu_str:
-                    base_score += 20
-                elif "本科" in edu_str or "学士" in edu_str:
-                    base_score += 15
-                elif "专科" in edu_str:
-                    base_score += 10
-                    
-        elif metric == "work_stability":
-            # 工作稳定性（与career_stability类似）
-            if len(experience) >= 2:
-                base_score += 15
-            if len(experience) <= 3:  # 跳槽不频繁
-                base_score += 10
-                
-        elif metric == "culture_fit":
-            # 企业文化匹配（基于经验和教育背景评估）
-            if education:
-                base_score += 10
-            if len(experience) >= 2:
-                base_score += 10
-                
-        elif metric == "basic_skills":
-            # 基础技能
-            if len(skills) >= 3:
-                base_score += 15
-            elif len(skills) >= 1:
-                base_score += 10
-                
-        elif metric == "character_assessment":
-            # 品格素养（基于整体简历完整性）
-            if education and skills and experience:
-                base_score += 15
-            
-        # === 开放型HR的字段 ===
-        elif metric == "learning_potential":
-            # 学习能力与潜力
-            if len(skills) >= 5:  # 技能多样说明学习能力强
-                base_score += 15
-            if len(projects) >= 2:  # 项目经验多说明实践能力强
-                base_score += 10
-                
-        elif metric == "innovation_thinking":
-            # 创新思维
-            if len(projects) >= 3:  # 项目经验丰富说明有创新实践
-                base_score += 15
-            # 检查是否有创新相关描述
-            for proj in projects:
-                proj_desc = str(safe_get(proj, "description", "")).lower()
-                if any(keyword in proj_desc for keyword in ["创新", "优化", "改进", "设计", "架构"]):
-                    base_score += 10
-                    break
-                    
-        elif metric == "adaptability":
-            # 适应性与灵活性
-            if len(experience) >= 2:  # 多段经验说明适应性强
-                base_score += 10
-            if len(skills) >= 6:  # 技能多样说明适应性强
-                base_score += 10
-                
-        elif metric == "soft_skills":
-            # 软技能
-            if len(experience) >= 2:  # 工作经验多说明软技能好
-                base_score += 10
-            if len(projects) >= 2:  # 项目经验说明协作能力
-                base_score += 10
-                
-        elif metric == "current_skills_match":
-            # 当前技能匹配度
-            if len(skills) >= 5:
-                base_score += 15
-            elif len(skills) >= 3:
-                base_score += 10
-            
-        # === 技术型HR的字段 ===
-        elif metric == "technical_depth":
-            # 技术深度与专业度
-            tech_skills = [s for s in skills if any(keyword in str(s).lower() 
-                          for keyword in ["java", "python", "javascript", "react", "vue", "spring", "mysql", "redis"])]
-            if len(tech_skills) >= 5:
-                base_score += 20
-            elif len(tech_skills) >= 3:
-                base_score += 15
-                
-        elif metric == "project_complexity":
-            # 项目技术含量
-            if len(projects) >= 3:
-                base_score += 20
-            elif len(projects) >= 2:
-                base_score += 15
-            elif len(projects) >= 1:
-                base_score += 10
-                
-        elif metric == "technical_breadth":
-            # 技术广度与学习能力
-            if len(skills) >= 8:
-                base_score += 20
-            elif len(skills) >= 6:
-                base_score += 15
-                
-        elif metric == "practical_experience":
-            # 技术实践经验
-            if len(experience) >= 2 and len(projects) >= 2:
-                base_score += 20
-            elif len(experience) >= 1 or len(projects) >= 1:
-                base_score += 10
-                
-        elif metric == "technical_vision":
-            # 技术前瞻性
-            # 检查是否有新技术相关技能
-            modern_tech = [s for s in skills if any(keyword in str(s).lower() 
-                          for keyword in ["cloud", "docker", "kubernetes", "微服务", "分布式"])]
-            if len(modern_tech) >= 2:
-                base_score += 15
-            elif len(modern_tech) >= 1:
-                base_score += 10
-                
-        # === 通用字段处理（兼容其他可能的字段名） ===
-        elif "experience" in metric.lower():
-            # 工作经验相关的通用处理
-            if len(experience) >= 3:
-                base_score += 15
-            elif len(experience) >= 1:
-                base_score += 10
-        
-        elif "skill" in metric.lower():
-            # 技能相关的通用处理
-            if len(skills) >= 8:
-                base_score += 20
-            elif len(skills) >= 5:
-                base_score += 15
-            elif len(skills) >= 3:
-                base_score += 10
-        
-        elif "education" in metric.lower():
-            # 教育背景相关的通用处理
-            if education:
-                edu_str = str(education).lower()
-                if "硕士" in edu_str or "研究生" in edu_str:
-                    base_score += 20
-                elif "本科" in edu_str or "学士" in edu_str:
-                    base_score += 15
-                elif "专科" in edu_str:
-                    base_score += 10
-        
-        # 确保分数在合理范围内
-        return min(95, max(40, base_score))
-
-    @staticmethod
-    def _generate_strengths(resume_content: Dict[str, Any], job_posting: Dict[str, Any], hr_persona: str) -> List[str]:
+    def _generate_strengths(features: ResumeFeatures, hr_persona: str) -> List[str]:
         """生成优势分析"""
         strengths = []
         
         # 基于工作经验
-        experience = resume_content.get("experience", [])
-        if len(experience) >= 2:
-            strengths.append(f"拥有{len(experience)}段工作经验，展现了良好的职业发展轨迹")
+        if features.experience_count >= 2:
+            strengths.append(f"拥有{features.experience_count}段工作经验，展现了良好的职业发展轨迹")
         
         # 基于技能
-        skills = resume_content.get("skills", [])
-        if len(skills) >= 5:
-            strengths.append(f"技能栈较为丰富，掌握{len(skills)}项专业技能")
+        if features.skills_count >= 5:
+            strengths.append(f"技能栈较为丰富，掌握{features.skills_count}项专业技能")
         
         # 基于项目经验
-        projects = resume_content.get("projects", [])
-        if len(projects) >= 2:
-            strengths.append(f"项目经验丰富，参与过{len(projects)}个项目的开发")
+        if features.projects_count >= 2:
+            strengths.append(f"项目经验丰富，参与过{features.projects_count}个项目的开发")
         
         # 基于教育背景
-        education = resume_content.get("education", [])
-        if education:
+        if features.has_education:
             strengths.append("具备良好的教育背景，专业基础扎实")
         
         # 如果没有找到优势，添加默认优势
@@ -2323,24 +2306,20 @@ class Phase3HRAgent:
         return strengths[:3]  # 最多返回3个优势
 
     @staticmethod
-    def _generate_weaknesses(resume_content: Dict[str, Any], job_posting: Dict[str, Any], hr_persona: str) -> List[str]:
+    def _generate_weaknesses(features: ResumeFeatures, hr_persona: str) -> List[str]:
         """生成不足分析"""
         weaknesses = []
         
         # 检查工作经验
-        experience = resume_content.get("experience", [])
-        if len(experience) < 2:
+        if features.experience_count < 2:
             weaknesses.append("工作经验相对较少，需要在实践中进一步积累")
         
         # 检查技能匹配度
-        job_requirements = job_posting.get("requirements", "")
-        resume_skills = resume_content.get("skills", [])
-        if len(resume_skills) < 5:
+        if features.skills_count < 5:
             weaknesses.append("技能栈需要进一步扩充，特别是核心专业技能")
         
         # 检查项目经验
-        projects = resume_content.get("projects", [])
-        if len(projects) < 2:
+        if features.projects_count < 2:
             weaknesses.append("项目经验较少，建议补充更多实际项目案例")
         
         # HR人设特定的不足分析
@@ -2360,15 +2339,10 @@ class Phase3HRAgent:
         return weaknesses[:3]  # 最多返回3个不足
 
     @staticmethod
-    def _generate_detailed_analysis(detailed_scores: Dict[str, int], weights: Dict[str, float], 
-                                   resume_content: Dict[str, Any], job_posting: Dict[str, Any], hr_persona: str) -> Dict[str, str]:
+    def _generate_detailed_analysis(detailed_scores: Dict[str, int], features: ResumeFeatures) -> Dict[str, str]:
         """生成详细分析（确保每项分析不少于100字）"""
         analysis = {}
         
-        # 确保输入参数是字典格式
-        resume_content = ensure_dict(resume_content)
-        job_posting = ensure_dict(job_posting)
-        
         # 安全地提取数字分数的辅助函数
         def safe_get_score(scores_dict, key, default=60):
             """安全地从scores字典中提取数字分数"""
@@ -2385,8 +2359,7 @@ class Phase3HRAgent:
                     return default
             elif isinstance(value, str):
                 # 尝试从字符串中提取数字
-                import re
-                number_match = re.search(r'\d+(?:\.\d+)?', value)
+                number_match = _NUMBER_PATTERN.search(value)
                 return float(number_match.group()) if number_match else default
             else:
                 return default
@@ -2394,13 +2367,11 @@ class Phase3HRAgent:
         # 工作经验分析（不少于100字）
         experience_score = safe_get_score(detailed_scores, "experience_match", 
                                         safe_get_score(detailed_scores, "work_experience", 60))
-        experience_data = safe_get(resume_content, "experience", [])
-        
-        experience_analysis = f"""工作经验评估得分{experience_score}分。候选人拥有{len(experience_data)}段工作经历，"""
+        experience_analysis = f"""工作经验评估得分{experience_score}分。候选人拥有{features.experience_count}段工作经历，"""
         
-        if len(experience_data) >= 3:
+        if features.experience_count >= 3:
             experience_analysis += """展现了丰富的职业发展历程和良好的工作稳定性。从工作经历来看，候选人在不同岗位上都积累了宝贵经验，具备了较强的适应能力和学习能力。工作轨迹显示出明确的职业发展方向，每一段经历都为下一步发展奠定了基础。特别是在核心技能和业务理解方面，通过多年的实践积累，已经形成了较为成熟的工作方法和解决问题的思路。"""
-        elif len(experience_data) >= 1:
+        elif features.experience_count >= 1:
             experience_analysis += """虽然工作经验相对有限，但在已有的工作经历中表现出了一定的专业能力和成长潜力。从简历描述可以看出，候选人在工作中能够承担相应职责，完成既定目标，并在实践中不断学习和提升。虽然经验深度有待进一步积累，但展现出的学习态度和工作热情值得肯定。建议在后续工作中继续深化专业技能，扩大知识面。"""
         else:
             experience_analysis += """目前缺乏正式的工作经验，这在一定程度上限制了对其实际工作能力的评估。但从教育背景和其他经历来看，候选人具备了基本的理论基础和学习能力。建议通过实习、项目参与等方式积累实践经验，逐步建立职业技能体系。对于入门级岗位，重点关注其学习能力和发展潜力。"""
@@ -2410,13 +2381,11 @@ class Phase3HRAgent:
         # 技能评价分析（不少于100字）
         skills_score = safe_get_score(detailed_scores, "skills_proficiency", 
                                     safe_get_score(detailed_scores, "technical_skills", 60))
-        skills_data = safe_get(resume_content, "skills", [])
+        skills_analysis = f"""技能评价得分{skills_score}分。候选人掌握了{features.skills_count}项专业技能，"""
         
-        skills_analysis = f"""技能评价得分{skills_score}分。候选人掌握了{len(skills_data)}项专业技能，"""
-        
-        if len(skills_data) >= 8:
+        if features.skills_count >= 8:
             skills_analysis += """技能栈相当丰富，覆盖了从基础技术到高级应用的各个层面。从技能构成来看，既有扎实的基础技能，也有紧跟行业发展趋势的新兴技术，显示出持续学习和技术更新的能力。技能之间的搭配较为合理，能够形成完整的技术解决方案。在实际工作中，这样的技能结构能够很好地支撑复杂项目的开发和维护，具备了承担核心技术工作的能力基础。"""
-        elif len(skills_data) >= 5:
+        elif features.skills_count >= 5:
             skills_analysis += """技能覆盖了主要的专业领域，基本满足岗位要求。从技能列表可以看出，候选人在核心技术方面有一定积累，具备了处理常规工作任务的能力。不过在技能深度和广度方面还有进一步提升的空间，特别是在一些前沿技术和高级应用方面。建议在现有技能基础上，继续深化核心技能的掌握程度，同时关注行业技术发展趋势。"""
         else:
             skills_analysis += """目前掌握的技能相对有限，可能难以完全满足岗位的技术要求。虽然具备了一些基础技能，但在技能的深度和广度方面都需要大幅提升。建议制定系统的学习计划，重点补强核心专业技能，同时扩展相关技术栈。可以通过在线课程、实践项目、技术社区参与等方式加快技能积累的步伐。"""
@@ -2426,15 +2395,12 @@ class Phase3HRAgent:
         # 教育背景分析（不少于100字）
         education_score = safe_get_score(detailed_scores, "education_background", 
                                        safe_get_score(detailed_scores, "education", 60))
-        education_data = safe_get(resume_content, "education", [])
-        
         education_analysis = f"""教育背景评估得分{education_score}分。"""
         
-        if education_data:
-            education_str = str(education_data).lower()
-            if "硕士" in education_str or "研究生" in education_str:
+        if features.has_education:
+            if features.degree_level == 3:
                 education_analysis += """候选人具备硕士研究生学历，展现了较强的学习能力和理论基础。研究生阶段的学习经历不仅提供了扎实的专业知识基础，更重要的是培养了独立思考、问题分析和解决的能力。这样的教育背景为职业发展提供了良好的起点，在面对复杂工作任务时能够运用理论知识指导实践，具备了持续学习和自我提升的基础。高等教育经历也培养了良好的学习习惯和方法，这对于快速适应新环境和掌握新技能具有重要意义。"""
-            elif "本科" in education_str or "学士" in education_str:
+            elif features.degree_level == 2:
                 education_analysis += """候选人具备本科学历，获得了完整的高等教育，建立了较为扎实的专业基础。大学四年的学习经历不仅传授了专业知识，也培养了系统性思维和解决问题的能力。从教育背景来看，候选人具备了胜任专业工作的基本理论基础，在学习能力和知识结构方面达到了一定水平。建议在实际工作中继续深化专业应用，将理论知识与实践相结合，形成更加完善的职业能力体系。"""
             else:
                 education_analysis += """候选人完成了相应的教育阶段，获得了基本的专业知识和技能基础。虽然学历层次可能不是最高，但重要的是在学习过程中培养的学习能力和专业素养。在实际工作中，学历只是起点，更重要的是持续学习和实践能力。建议通过在职学习、专业培训等方式继续提升学历水平和专业能力，同时在实际工作中积累经验，弥补理论基础的不足。"""
@@ -2446,55 +2412,53 @@ class Phase3HRAgent:
         return analysis
 
     @staticmethod
-    def _analyze_experience(resume_content: Dict[str, Any]) -> str:
+    def _analyze_experience(features: ResumeFeatures) -> str:
         """分析工作经验"""
-        experience = resume_content.get("experience", [])
-        if not experience:
+        count = features.experience_count
+        if not count:
             return "暂无相关工作经验"
-        elif len(experience) == 1:
+        elif count == 1:
             return "有一段工作经验，为职业发展奠定了基础"
-        elif len(experience) <= 3:
+        elif count <= 3:
             return "具有多段工作经验，展现了良好的职业发展轨迹"
         else:
             return "拥有丰富的工作经验，职业经历较为完整"
 
     @staticmethod
-    def _analyze_skills(resume_content: Dict[str, Any]) -> str:
+    def _analyze_skills(features: ResumeFeatures) -> str:
         """分析技能构成"""
-        skills = resume_content.get("skills", [])
-        if not skills:
+        count = features.skills_count
+        if not count:
             return "技能信息需要补充完善"
-        elif len(skills) <= 3:
+        elif count <= 3:
             return "掌握基本的专业技能"
-        elif len(skills) <= 6:
+        elif count <= 6:
             return "具备较为全面的技能体系"
         else:
             return "技能栈丰富，覆盖面较广"
 
     @staticmethod
-    def _analyze_education(resume_content: Dict[str, Any]) -> str:
+    def _analyze_education(features: ResumeFeatures) -> str:
         """分析教育背景"""
-        education = resume_content.get("education", [])
-        if not education:
+        if not features.has_education:
             return "教育背景信息需要补充"
         
-        edu_text = str(education).lower()
-        if "硕士" in edu_text or "研究生" in edu_text:
+        if features.degree_level == 3:
             return "具有研究生学历，专业基础扎实"
-        elif "本科" in edu_text or "学士" in edu_text:
+        elif features.degree_level == 2:
             return "具有本科学历，教育背景良好"
         else:
             return "具备相应的教育背景"
 
     @staticmethod
-    def _analyze_projects(resume_content: Dict[str, Any]) -> str:
+    def _analyze_projects(features: ResumeFeatures) -> str:
         """分析项目经验"""
-        projects = resume_content.get("projects", [])
-        if not projects:
+        count = features.projects_count
+        if not count:
             return "建议补充更多项目经验"
-        elif len(projects) == 1:
+        elif count == 1:
             return "有一定的项目经验"
-        elif len(projects) <= 3:
+        elif count <= 3:
             return "项目经验较为丰富"
         else:
             return "拥有大量项目实践经验"
@@ -2523,86 +2487,26 @@ class Phase3HRAgent:
         else:
             return "有待提升"
 
-    @staticmethod
-    def _generate_improvement_suggestions(resume_content: Dict[str, Any], job_posting: Dict[str, Any], hr_persona: str) -> List[str]:
-        """生成改进建议"""
-        suggestions = []
-        
-        # 基于工作经验的建议
-        experience = resume_content.get("experience", [])
-        if len(experience) < 2:
-            suggestions.append("建议补充更多工作经验描述，详细说明工作职责和取得的成果")
-        
-        # 基于技能的建议
-        skills = resume_content.get("skills", [])
-        if len(skills) < 5:
-            suggestions.append("建议完善技能清单，补充与目标职位相关的核心技能")
-        
-        # 基于项目的建议
-        projects = resume_content.get("projects", [])
-        if len(projects) < 2:
-            suggestions.append("建议补充项目经验，详细描述项目背景、个人贡献和技术难点")
-        
-        # 通用建议
-        suggestions.append("优化简历格式，确保关键信息突出，表述清晰专业")
-        
-        return suggestions[:4]  # 最多返回4个建议
-
-    @staticmethod
-    def _generate_hr_comments(final_score: int, persona_config: Dict[str, Any], 
-                            resume_content: Dict[str, Any], job_posting: Dict[str, Any]) -> str:
-        """生成HR评价"""
-        hr_name = persona_config["name"]
-        
-        # 基础评价
-        performance = "优秀" if final_score >= 80 else "良好" if final_score >= 70 else "中等" if final_score >= 60 else "有待提升"
-        
-        # 具体分析
-        experience_count = len(resume_content.get("experience", []))
-        skills_count = len(resume_content.get("skills", []))
-        projects_count = len(resume_content.get("projects", []))
-        
-        experience_desc = f"工作经验方面，候选人有{experience_count}段经历" if experience_count > 0 else "工作经验相对有限"
-        skills_desc = f"技能方面掌握{skills_count}项专业技能" if skills_count > 0 else "技能信息需要完善"
-        
-        # 录用建议
-        recommendation = "推荐录用" if final_score >= persona_config["pass_threshold"] else "建议在完善相关能力后重新申请"
-        
-        return f"作为{hr_name}，我对这位候选人的综合评估为{final_score}分，表现{performance}。{experience_desc}，{skills_desc}。综合考虑候选人的整体素质和发展潜力，我{recommendation}。建议在面试中重点关注实际工作能力和学习适应性的验证。"
-
     @staticmethod
     def _create_default_feedback(persona_config: Dict[str, Any], hr_persona: str, 
                                 resume_content: Dict[str, Any], job_posting: Dict[str, Any]) -> Dict[str, Any]:
         """创建智能默认反馈"""
         weights = persona_config["weights"]
         
-        # 为每个权重键生成智能分数
-        detailed_scores = {}
-        for weight_key in weights.keys():
-            score = Phase3HRAgent._generate_intelligent_score(weight_key, resume_content, job_posting)
-            # 确保分数是数字类型
-            if not isinstance(score, (int, float)):
-                logger.warning(f"Generated score for {weight_key} is not a number: {score}, using 60")
-                score = 60
-            detailed_scores[weight_key] = score
-        
-        # 计算总分
-        try:
-            weighted_score = sum(score * weight for score, weight in zip(detailed_scores.values(), weights.values()))
-            final_score = round(weighted_score)
-        except (TypeError, ValueError) as e:
-            logger.error(f"Error calculating weighted score in default feedback: {e}")
-            final_score = 60
+        # 提取一次简历特征，按规则表一次算出所有维度的分数
+        features = ResumeFeatures.extract(ensure_dict(resume_content))
+        detailed_scores = score_metrics(weights, features)
+        final_score = weighted_score(detailed_scores, weights)
         
         return {
             "overall_score": final_score,
             "passes_initial_screening": final_score >= persona_config["pass_threshold"],
             "detailed_scores": detailed_scores,
-            "strengths": Phase3HRAgent._generate_strengths(resume_content, job_posting, hr_persona),
-            "weaknesses": Phase3HRAgent._generate_weaknesses(resume_content, job_posting, hr_persona),
-            "detailed_analysis": Phase3HRAgent._generate_detailed_analysis(detailed_scores, weights, resume_content, job_posting, hr_persona),
+            "strengths": Phase3HRAgent._generate_strengths(features, hr_persona),
+            "weaknesses": Phase3HRAgent._generate_weaknesses(features, hr_persona),
+            "detailed_analysis": Phase3HRAgent._generate_detailed_analysis(detailed_scores, features),
             "comprehensive_feedback": Phase3HRAgent._generate_comprehensive_feedback(final_score, resume_content, job_posting, hr_persona, persona_config),
-            "improvement_suggestions": Phase3HRAgent._generate_improvement_suggestions(resume_content, job_posting, hr_persona),
+            "improvement_suggestions": Phase3HRAgent._generate_improvement_suggestions(features, hr_persona),
             "specific_recommendations": {
                 "skills_to_add": ["与岗位需求匹配的核心技能", "行业前沿技术技能", "软技能和沟通能力"],
                 "experience_highlight": "重点突出与目标职位最相关的工作经验和项目成果",
@@ -2671,34 +2575,26 @@ class Phase3HRAgent:
         }
 
     @staticmethod
-    def _generate_improvement_suggestions(resume_content: Dict[str, Any], job_posting: Dict[str, Any], hr_persona: str) -> List[str]:
+    def _generate_improvement_suggestions(features: ResumeFeatures, hr_persona: str) -> List[str]:
         """生成改进建议"""
         suggestions = []
         
-        # 确保输入参数是字典格式
-        resume_content = ensure_dict(resume_content)
-        job_posting = ensure_dict(job_posting)
-        
         # 基于工作经验的建议
-        experience = safe_get(resume_content, "experience", [])
-        if len(experience) < 2:
+        if features.experience_count < 2:
             suggestions.append("增加相关工作经验，可以通过实习、项目参与、志愿工作等方式积累实践经验")
-        elif len(experience) < 5:
+        elif features.experience_count < 5:
             suggestions.append("继续积累工作经验，重点关注与目标职位相关的实践经历和技能提升")
         
         # 基于技能的建议
-        skills = safe_get(resume_content, "skills", [])
-        if len(skills) < 5:
+        if features.skills_count < 5:
             suggestions.append("扩充技能栈，学习与岗位要求高度匹配的核心技能和前沿技术")
         
         # 基于项目经验的建议
-        projects = safe_get(resume_content, "projects", [])
-        if len(projects) < 2:
+        if features.projects_count < 2:
             suggestions.append("增加项目经验，参与更多实际项目来展示技能应用能力和解决问题的能力")
         
         # 基于教育背景的建议
-        education = safe_get(resume_content, "education", [])
-        if not education:
+        if not features.has_education:
             suggestions.append("补充教育背景信息，如有相关培训、认证等学习经历也应该体现在简历中")
         
         # HR人设特定建议
@@ -2749,8 +2645,43 @@ class Phase3HRAgent:
         """
         根据HR反馈的优点与缺点，扬长避短，生成自我介绍（不少于min_length字）。
         """
-        # 构建增强版prompt
-        prompt = f"""
+        prompt = Phase3HRAgent._build_self_introduction_prompt(
+            strengths, weaknesses, min_length, resume_content, job_posting, hr_persona, hr_feedback
+        )
+
+        # 调用大模型生成
+        result = llm_service.call_phase3_model(prompt)
+        # 可根据实际情况做截断或后处理；strip() 后保留 degraded 标记
+        return keep_degraded(result, result.strip())
+
+    @staticmethod
+    async def agenerate_self_introduction(strengths, weaknesses, min_length=300, resume_content=None, job_posting=None, hr_persona="experienced", hr_feedback=None):
+        """
+        generate_self_introduction 的异步版本
+        """
+        prompt = Phase3HRAgent._build_self_introduction_prompt(
+            strengths, weaknesses, min_length, resume_content, job_posting, hr_persona, hr_feedback
+        )
+
+        result = await async_llm_service.acall_phase3_model(prompt)
+        return keep_degraded(result, result.strip())
+
+    @staticmethod
+    def _build_self_introduction_prompt(strengths, weaknesses, min_length, resume_content, job_posting, hr_persona, hr_feedback):
+        """构建自我介绍生成提示词"""
+        # HR反馈中的优缺点已在基础信息中列出
+        feedback = ensure_dict(hr_feedback)
+        if isinstance(feedback, dict):
+            feedback = {key: value for key, value in feedback.items() if key not in ("strengths", "weaknesses")}
+        sections = [
+            PromptSection("resume", resume_content, priority=3),
+            PromptSection("job", job_posting, priority=2),
+            PromptSection("hr_feedback", feedback, priority=1, required=False)
+        ]
+        
+        def render(parts):
+            # 构建增强版prompt
+            prompt = f"""
         你是一名求职者，请根据以下信息撰写一段不少于{min_length}字的个性化自我介绍：
 
         ## 基础信息：
@@ -2762,29 +2693,29 @@ class Phase3HRAgent:
 
         ## 面试官类型：{hr_persona}
         """
-        
-        # 添加简历内容信息
-        if resume_content:
-            prompt += f"""
+            
+            # 添加简历内容信息
+            if resume_content:
+                prompt += f"""
         ## 你的简历背景：
-        {json.dumps(resume_content, ensure_ascii=False, indent=2)}
+        {parts['resume']}
         """
-        
-        # 添加目标职位信息
-        if job_posting:
-            prompt += f"""
+            
+            # 添加目标职位信息
+            if job_posting:
+                prompt += f"""
         ## 目标职位：
-        {json.dumps(job_posting, ensure_ascii=False, indent=2)}
+        {parts['job']}
         """
-        
-        # 添加HR反馈信息
-        if hr_feedback:
-            prompt += f"""
+            
+            # 添加HR反馈信息
+            if feedback:
+                prompt += f"""
         ## HR评估反馈：
-        {json.dumps(hr_feedback, ensure_ascii=False, indent=2)}
+        {parts['hr_feedback']}
         """
-        
-        prompt += f"""
+            
+            prompt += f"""
         ## 要求：
         1. 结合优点和缺点，扬长避短，内容积极正面
         2. 体现自我认知、成长经历、职业目标和对岗位的热情
@@ -2795,11 +2726,9 @@ class Phase3HRAgent:
 
         请用第一人称中文输出一段自然流畅的自我介绍。
         """
+            return prompt
 
-        # 调用大模型生成
-        result = llm_service.call_phase3_model(prompt)
-        # 可根据实际情况做截断或后处理
-        return result.strip()
+        return prompt_budget.assemble("phase3_self_introduction", render, sections, settings.phase3_prompt_token_budget)
 
     @staticmethod
     def generate_interview_questions(hr_persona, resume_content, job_posting, num_questions=3):
@@ -2809,20 +2738,64 @@ class Phase3HRAgent:
         try:
             logger.info(f"生成面试问题 - HR类型: {hr_persona}, 问题数量: {num_questions}")
             
-            # 获取HR人设配置
-            persona_config = Phase3HRAgent.HR_PERSONAS.get(hr_persona, Phase3HRAgent.HR_PERSONAS["experienced"])
+            prompt = Phase3HRAgent._build_interview_questions_prompt(hr_persona, resume_content, job_posting, num_questions)
             
-            # 构建prompt
-            prompt = f"""
+            # 调用大模型生成
+            result = llm_service.call_phase3_model(prompt, InterviewQuestionsOutput)
+            
+            return mark_degraded(Phase3HRAgent._parse_interview_questions_result(result, hr_persona, job_posting, num_questions), result)
+                
+        except Exception as e:
+            logger.error(f"生成面试问题失败: {e}", exc_info=True)
+            return {
+                "success": False,
+                "message": f"面试问题生成失败: {str(e)}",
+                "data": {}
+            }
+
+    @staticmethod
+    async def agenerate_interview_questions(hr_persona, resume_content, job_posting, num_questions=3):
+        """
+        generate_interview_questions 的异步版本
+        """
+        try:
+            logger.info(f"生成面试问题 - HR类型: {hr_persona}, 问题数量: {num_questions}")
+            
+            prompt = Phase3HRAgent._build_interview_questions_prompt(hr_persona, resume_content, job_posting, num_questions)
+            result = await async_llm_service.acall_phase3_model(prompt, InterviewQuestionsOutput)
+            
+            return mark_degraded(Phase3HRAgent._parse_interview_questions_result(result, hr_persona, job_posting, num_questions), result)
+                
+        except Exception as e:
+            logger.error(f"生成面试问题失败: {e}", exc_info=True)
+            return {
+                "success": False,
+                "message": f"面试问题生成失败: {str(e)}",
+                "data": {}
+            }
+
+    @staticmethod
+    def _build_interview_questions_prompt(hr_persona, resume_content, job_posting, num_questions):
+        """构建面试问题生成提示词"""
+        # 获取HR人设配置
+        persona_config = Phase3HRAgent.HR_PERSONAS.get(hr_persona, Phase3HRAgent.HR_PERSONAS["experienced"])
+        
+        sections = [
+            PromptSection("resume", resume_content, priority=2),
+            PromptSection("job", job_posting, priority=1)
+        ]
+        
+        # 构建prompt
+        render = lambda parts: f"""
             你是一位{persona_config['name']}，{persona_config['description']}
             
             现在需要为以下候选人准备{num_questions}个面试问题：
             
             ## 职位信息：
-            {json.dumps(job_posting, ensure_ascii=False, indent=2)}
+            {parts['job']}
             
             ## 候选人简历：
-            {json.dumps(resume_content, ensure_ascii=False, indent=2)}
+            {parts['resume']}
             
             ## 要求：
             1. 根据你的HR人设特点，生成{num_questions}个具有针对性的面试问题
@@ -2844,87 +2817,123 @@ class Phase3HRAgent:
                 ]
             }}
             """
+
+        return prompt_budget.assemble("phase3_interview_questions", render, sections, settings.phase3_prompt_token_budget)
+
+    @staticmethod
+    def _parse_interview_questions_result(result, hr_persona, job_posting, num_questions):
+        """解析面试问题生成结果，失败时使用备用方案"""
+        # 解析JSON结果
+        questions_data = extract_json(result)
+        if questions_data is not None:
+            questions = questions_data.get('questions', [])
             
-            # 调用大模型生成
-            result = llm_service.call_phase3_model(prompt)
+            if not questions or len(questions) == 0:
+                raise ValueError("生成的问题列表为空")
             
-            # 解析JSON结果
-            import re
-            json_match = re.search(r'\{.*\}', result, re.DOTALL)
-            if json_match:
-                try:
-                    questions_data = json.loads(json_match.group())
-                    questions = questions_data.get('questions', [])
-                    
-                    if not questions or len(questions) == 0:
-                        raise ValueError("生成的问题列表为空")
-                    
-                    logger.info(f"成功生成 {len(questions)} 个面试问题")
-                    
-                    return {
-                        "success": True,
-                        "message": f"成功生成{len(questions)}个面试问题",
-                        "data": {
-                            "questions": questions,
-                            "hr_persona": hr_persona,
-                            "total_questions": len(questions)
-                        }
-                    }
-                    
-                except json.JSONDecodeError as e:
-                    logger.error(f"JSON解析失败: {e}")
-                    logger.error(f"原始结果: {result}")
-                    
-                    # 备用方案：简单文本解析
-                    fallback_questions = Phase3HRAgent._parse_questions_fallback(result, num_questions)
-                    
-                    return {
-                        "success": True,
-                        "message": f"生成{len(fallback_questions)}个面试问题（使用备用解析）",
-                        "data": {
-                            "questions": fallback_questions,
-                            "hr_persona": hr_persona,
-                            "total_questions": len(fallback_questions)
-                        }
-                    }
-            else:
-                logger.error("未找到有效的JSON格式结果")
-                logger.error(f"原始结果: {result}")
-                
-                # 备用方案
-                fallback_questions = Phase3HRAgent._generate_fallback_questions(hr_persona, job_posting, num_questions)
-                
-                return {
-                    "success": True,
-                    "message": f"生成{len(fallback_questions)}个面试问题（使用备用模板）",
-                    "data": {
-                        "questions": fallback_questions,
-                        "hr_persona": hr_persona,
-                        "total_questions": len(fallback_questions)
-                    }
+            logger.info(f"成功生成 {len(questions)} 个面试问题")
+            
+            return {
+                "success": True,
+                "message": f"成功生成{len(questions)}个面试问题",
+                "data": {
+                    "questions": questions,
+                    "hr_persona": hr_persona,
+                    "total_questions": len(questions)
+                }
+            }
+        elif "{" in result:
+            # 有JSON片段但修复后仍无法解析
+            logger.error("面试问题JSON解析失败")
+            logger.error(f"原始结果: {result}")
+            
+            # 备用方案：简单文本解析
+            fallback_questions = Phase3HRAgent._parse_questions_fallback(result, num_questions)
+            
+            return {
+                "success": True,
+                "message": f"生成{len(fallback_questions)}个面试问题（使用备用解析）",
+                "data": {
+                    "questions": fallback_questions,
+                    "hr_persona": hr_persona,
+                    "total_questions": len(fallback_questions)
+                }
+            }
+        else:
+            logger.error("未找到有效的JSON格式结果")
+            logger.error(f"原始结果: {result}")
+            
+            # 备用方案
+            fallback_questions = Phase3HRAgent._generate_fallback_questions(hr_persona, job_posting, num_questions)
+            
+            return {
+                "success": True,
+                "message": f"生成{len(fallback_questions)}个面试问题（使用备用模板）",
+                "data": {
+                    "questions": fallback_questions,
+                    "hr_persona": hr_persona,
+                    "total_questions": len(fallback_questions)
                 }
+            }
+
+    @staticmethod
+    def evaluate_interview_answer(hr_persona, question, user_answer, resume_content, job_posting):
+        """
+        评估用户的面试回答并给出优化建议
+        """
+        try:
+            logger.info(f"评估面试回答 - HR类型: {hr_persona}")
+            
+            prompt = Phase3HRAgent._build_answer_evaluation_prompt(hr_persona, question, user_answer, resume_content, job_posting)
+            
+            # 调用大模型生成
+            result = llm_service.call_phase3_model(prompt, AnswerEvaluationOutput)
+            
+            return mark_degraded(Phase3HRAgent._parse_answer_evaluation_result(result, hr_persona, question, user_answer), result)
                 
         except Exception as e:
-            logger.error(f"生成面试问题失败: {e}", exc_info=True)
+            logger.error(f"评估面试回答失败: {e}", exc_info=True)
             return {
                 "success": False,
-                "message": f"面试问题生成失败: {str(e)}",
+                "message": f"面试回答评估失败: {str(e)}",
                 "data": {}
             }
 
     @staticmethod
-    def evaluate_interview_answer(hr_persona, question, user_answer, resume_content, job_posting):
+    async def aevaluate_interview_answer(hr_persona, question, user_answer, resume_content, job_posting):
         """
-        评估用户的面试回答并给出优化建议
+        evaluate_interview_answer 的异步版本
         """
         try:
             logger.info(f"评估面试回答 - HR类型: {hr_persona}")
             
-            # 获取HR人设配置
-            persona_config = Phase3HRAgent.HR_PERSONAS.get(hr_persona, Phase3HRAgent.HR_PERSONAS["experienced"])
+            prompt = Phase3HRAgent._build_answer_evaluation_prompt(hr_persona, question, user_answer, resume_content, job_posting)
+            result = await async_llm_service.acall_phase3_model(prompt, AnswerEvaluationOutput)
             
-            # 构建prompt
-            prompt = f"""
+            return mark_degraded(Phase3HRAgent._parse_answer_evaluation_result(result, hr_persona, question, user_answer), result)
+                
+        except Exception as e:
+            logger.error(f"评估面试回答失败: {e}", exc_info=True)
+            return {
+                "success": False,
+                "message": f"面试回答评估失败: {str(e)}",
+                "data": {}
+            }
+
+    @staticmethod
+    def _build_answer_evaluation_prompt(hr_persona, question, user_answer, resume_content, job_posting):
+        """构建面试回答评估提示词"""
+        # 获取HR人设配置
+        persona_config = Phase3HRAgent.HR_PERSONAS.get(hr_persona, Phase3HRAgent.HR_PERSONAS["experienced"])
+        
+        sections = [
+            PromptSection("answer", user_answer, priority=3, formatter=str),
+            PromptSection("resume", resume_content, priority=2),
+            PromptSection("job", job_posting, priority=1)
+        ]
+        
+        # 构建prompt
+        render = lambda parts: f"""
             你是一位{persona_config['name']}，{persona_config['description']}
             
             现在需要评估候选人对以下面试问题的回答：
@@ -2935,13 +2944,13 @@ class Phase3HRAgent:
             重点领域：{question.get('focus_area', '通用')}
             
             ## 候选人回答：
-            {user_answer}
+            {parts['answer']}
             
             ## 职位信息：
-            {json.dumps(job_posting, ensure_ascii=False, indent=2)}
+            {parts['job']}
             
             ## 候选人简历：
-            {json.dumps(resume_content, ensure_ascii=False, indent=2)}
+            {parts['resume']}
             
             ## 评估要求：
             1. 根据你的HR人设特点，专业评估这个回答
@@ -2971,71 +2980,62 @@ class Phase3HRAgent:
                 "hr_comment": "作为{persona_config['name']}的专业评价和建议"
             }}
             """
+
+        return prompt_budget.assemble("phase3_answer_evaluation", render, sections, settings.phase3_prompt_token_budget)
+
+    @staticmethod
+    def _parse_answer_evaluation_result(result, hr_persona, question, user_answer):
+        """解析面试回答评估结果，失败时使用备用评估"""
+        # 解析JSON结果
+        evaluation_data = extract_json(result)
+        if evaluation_data is not None:
             
-            # 调用大模型生成
-            result = llm_service.call_phase3_model(prompt)
+            logger.info(f"面试回答评估完成，总分: {evaluation_data.get('overall_score', 0)}")
             
-            # 解析JSON结果
-            import re
-            json_match = re.search(r'\{.*\}', result, re.DOTALL)
-            if json_match:
-                try:
-                    evaluation_data = json.loads(json_match.group())
-                    
-                    logger.info(f"面试回答评估完成，总分: {evaluation_data.get('overall_score', 0)}")
-                    
-                    return {
-                        "success": True,
-                        "message": "面试回答评估完成",
-                        "data": {
-                            "evaluation": evaluation_data,
-                            "question": question,
-                            "user_answer": user_answer,
-                            "hr_persona": hr_persona
-                        }
-                    }
-                    
-                except json.JSONDecodeError as e:
-                    logger.error(f"评估结果JSON解析失败: {e}")
-                    logger.error(f"原始结果: {result}")
-                    
-                    # 备用方案：基本评估
-                    fallback_evaluation = Phase3HRAgent._generate_fallback_evaluation(user_answer, question)
-                    
-                    return {
-                        "success": True,
-                        "message": "面试回答评估完成（使用备用评估）",
-                        "data": {
-                            "evaluation": fallback_evaluation,
-                            "question": question,
-                            "user_answer": user_answer,
-                            "hr_persona": hr_persona
-                        }
-                    }
-            else:
-                logger.error("评估结果未找到有效的JSON格式")
-                logger.error(f"原始结果: {result}")
-                
-                # 备用方案
-                fallback_evaluation = Phase3HRAgent._generate_fallback_evaluation(user_answer, question)
-                
-                return {
-                    "success": True,
-                    "message": "面试回答评估完成（使用备用评估）",
-                    "data": {
-                        "evaluation": fallback_evaluation,
-                        "question": question,
-                        "user_answer": user_answer,
-                        "hr_persona": hr_persona
-                    }
+            return {
+                "success": True,
+                "message": "面试回答评估完成",
+                "data": {
+                    "evaluation": evaluation_data,
+                    "question": question,
+                    "user_answer": user_answer,
+                    "hr_persona": hr_persona
                 }
-                
-        except Exception as e:
-            logger.error(f"评估面试回答失败: {e}", exc_info=True)
+            }
+        elif "{" in result:
+            # 有JSON片段但修复后仍无法解析
+            logger.error("评估结果JSON解析失败")
+            logger.error(f"原始结果: {result}")
+            
+            # 备用方案：基本评估
+            fallback_evaluation = Phase3HRAgent._generate_fallback_evaluation(user_answer, question)
+            
             return {
-                "success": False,
-                "message": f"面试回答评估失败: {str(e)}",
-                "data": {}
+                "success": True,
+                "message": "面试回答评估完成（使用备用评估）",
+                "data": {
+                    "evaluation": fallback_evaluation,
+                    "question": question,
+                    "user_answer": user_answer,
+                    "hr_persona": hr_persona
+                }
+            }
+        else:
+            logger.error("评估结果未找到有效的JSON格式")
+            logger.error(f"原始结果: {result}")
+            
+            # 备用方案
+            fallback_evaluation = Phase3HRAgent._generate_fallback_evaluation(user_answer, question)
+            
+            return {
+                "success": True,
+                "message": "面试回答评估完成（使用备用评估）",
+                "data": {
+                    "evaluation": fallback_evaluation,
+                    "question": question,
+                    "user_answer": user_answer,
+                    "hr_persona": hr_persona
+                }
             }
         
     @staticmethod
@@ -3143,6 +3143,11 @@ class Phase3HRAgent:
         }
 
 
+# 导入时为每个HR人设编译评估提示词的稳定前缀
+for _persona, _persona_config in Phase3HRAgent.HR_PERSONAS.items():
+    prompt_templates.register(f"phase3_hr_review.{_persona}", Phase3HRAgent._hr_review_system_prompt(_persona_config))
+
+
 class Phase4ScheduleAgent:
     """Phase 4: Interview scheduling and optimization agent."""
     
@@ -3203,15 +3208,13 @@ class Phase4ScheduleAgent:
             }}
             """
             
-            final_result = llm_service.call_phase1_model(synthesis_prompt)  # Use any model for synthesis
+            final_result = llm_service.call_phase1_model(synthesis_prompt, ScheduleSynthesisOutput)  # Use any model for synthesis
             
             # Parse final schedule
-            import re
-            json_match = re.search(r'\{.*\}', final_result, re.DOTALL)
-            if json_match:
-                schedule_data = json.loads(json_match.group())
+            schedule_data = extract_json(final_result)
+            if schedule_data is not None:
                 
-                return {
+                return mark_degraded({
                     "success": True,
                     "message": "Multi-agent scheduling completed",
                     "data": {
@@ -3220,7 +3223,7 @@ class Phase4ScheduleAgent:
                         "discussion_timestamp": datetime.now().isoformat(),
                         "total_interviews": len(interviews)
                     }
-                }
+                }, first_degraded([*agent_responses, final_result]))
             else:
                 return {
                     "success": False,
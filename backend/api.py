@@ -3,10 +3,11 @@ API routes for Job Planner Assistant.
 """
 
 import json
-import re
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from loguru import logger
@@ -14,8 +15,13 @@ import time
 
 from database import get_db, create_user, get_user, UserCreate
 from agents import search_agent, phase2_agent, phase3_agent, phase4_agent
-from services import llm_service
+from services import async_llm_service, chromadb_service
 from agents import Phase3HRAgent
+from jobs import job_manager, JobContext
+from skill_matching import SkillMatchEngine
+from json_utils import extract_json
+from llm_schemas import ImprovementPlanOutput, AppliedImprovementsOutput
+from llm_resilience import mark_degraded
 
 # Create main router
 router = APIRouter()
@@ -101,12 +107,45 @@ class HRReviewRequest(BaseModel):
     hr_persona: str = "experienced"
     review_depth: Optional[str] = "detailed"  # 评估深度
 
+class SimilarJobsRequest(BaseModel):
+    """相似职位检索：单个或多个用户画像，过滤条件下推到向量库"""
+    user_profile: Optional[Dict[str, Any]] = None
+    user_profiles: List[Dict[str, Any]] = []
+    n_results: int = 5
+    location: Optional[List[str]] = None
+    salary_min: Optional[float] = None  # K/月
+    salary_max: Optional[float] = None  # K/月
+    skills: List[str] = []
+    match_all_skills: bool = False
+    max_age_days: Optional[int] = None
+
+class JobRankRequest(BaseModel):
+    """用技能匹配引擎对职位预排序（不调用LLM）"""
+    user_profile: Optional[Dict[str, Any]] = None
+    user_profiles: List[Dict[str, Any]] = []
+    jobs: List[Dict[str, Any]]
+    top_k: Optional[int] = 20
+
 class SchedulingRequest(BaseModel):
     interviews: List[Dict[str, Any]]
     user_preferences: Dict[str, Any]
     constraints: Optional[Dict[str, Any]] = None
 
 
+def _sse_event(event: str, data: Any) -> str:
+    """格式化一条Server-Sent Events消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _sse_response(events) -> StreamingResponse:
+    """包装SSE流响应，禁用代理缓冲以便逐条推送"""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # User Management APIs
 @router.post("/users", response_model=BaseResponse)
 async def create_user_endpoint(user: UserCreate, db: Session = Depends(get_db)):
@@ -169,7 +208,8 @@ async def search_jobs(request: SearchRequest):
     """Search for job postings."""
     try:
         logger.info(f"Starting job search for query: '{request.search_query}', location: '{request.location}', max_results: {request.max_results}")
-        result = search_agent.search_jobs(
+        result = await run_in_threadpool(
+            search_agent.search_jobs,
             search_query=request.search_query,
             location=request.location,
             max_results=request.max_results
@@ -203,17 +243,42 @@ async def search_jobs(request: SearchRequest):
         )
 
 @router.post("/phase1/similar", response_model=BaseResponse)
-async def find_similar_jobs(user_profile: Dict[str, Any], n_results: int = 5):
-    """Find similar jobs based on user profile."""
+async def find_similar_jobs(request: SimilarJobsRequest):
+    """Find similar jobs based on one or more user profiles."""
     try:
-        similar_jobs = search_agent.search_jobs(user_profile, n_results)
+        profiles = list(request.user_profiles)
+        if request.user_profile:
+            profiles.insert(0, request.user_profile)
+        if not profiles:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="user_profile or user_profiles is required"
+            )
+        
+        query_texts = [_profile_query_text(profile) for profile in profiles]
+        batches = await run_in_threadpool(
+            chromadb_service.query_similar_jobs,
+            query_texts,
+            request.n_results,
+            location=request.location,
+            salary_min=request.salary_min,
+            salary_max=request.salary_max,
+            skills=request.skills,
+            max_age_days=request.max_age_days,
+            match_all_skills=request.match_all_skills
+        )
         
+        data = {"similar_jobs": batches[0] if batches else []}
+        if len(batches) > 1:
+            data["results"] = batches
         return BaseResponse(
             success=True,
-            message=f"Found {len(similar_jobs)} similar jobs",
-            data={"similar_jobs": similar_jobs}
+            message=f"Found {sum(len(batch) for batch in batches)} similar jobs",
+            data=data
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error finding similar jobs: {e}")
         raise HTTPException(
@@ -222,6 +287,58 @@ async def find_similar_jobs(user_profile: Dict[str, Any], n_results: int = 5):
         )
 
 
+@router.post("/phase1/rank", response_model=BaseResponse)
+async def rank_jobs(request: JobRankRequest):
+    """Pre-rank jobs for one or more profiles by skill/experience match, without LLM calls."""
+    profiles = list(request.user_profiles)
+    if request.user_profile:
+        profiles.insert(0, request.user_profile)
+    if not profiles:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="user_profile or user_profiles is required"
+        )
+    
+    try:
+        def _rank():
+            engine = SkillMatchEngine(request.jobs)
+            return [engine.rank(profile, request.top_k) for profile in profiles]
+        
+        results = await run_in_threadpool(_rank)
+        data = {"ranked_jobs": results[0]}
+        if len(results) > 1:
+            data["results"] = results
+        return BaseResponse(
+            success=True,
+            message=f"Ranked {len(request.jobs)} jobs for {len(profiles)} profiles",
+            data=data
+        )
+        
+    except Exception as e:
+        logger.error(f"Error ranking jobs: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to rank jobs: {str(e)}"
+        )
+
+
+def _profile_query_text(profile: Dict[str, Any]) -> str:
+    """把用户画像拼成检索文本：目标职位、技能、简介、经历"""
+    parts = []
+    for key in ("target_position", "career_objective", "summary"):
+        if profile.get(key):
+            parts.append(str(profile[key]))
+    skills = profile.get("skills") or []
+    parts.append(" ".join(map(str, skills)) if isinstance(skills, list) else str(skills))
+    for exp in profile.get("experience") or []:
+        if isinstance(exp, dict):
+            parts.append(" ".join(str(exp.get(k, "")) for k in ("position", "title", "description") if exp.get(k)))
+        else:
+            parts.append(str(exp))
+    text = " ".join(part for part in parts if part).strip()
+    return text or json.dumps(profile, ensure_ascii=False)
+
+
 # Phase 2 APIs - Resume Generation
 @router.post("/phase2/generate", response_model=BaseResponse)
 async def generate_resume(request: ResumeGenerationRequest):
@@ -241,7 +358,7 @@ async def generate_resume(request: ResumeGenerationRequest):
         }
         
         # 调用增强的简历生成Agent
-        result = phase2_agent.generate_enhanced_resume(
+        result = await phase2_agent.agenerate_enhanced_resume(
             user_profile_dict, 
             job_posting_dict,
             generation_params
@@ -266,6 +383,27 @@ async def generate_resume(request: ResumeGenerationRequest):
             detail=f"简历生成失败: {str(e)}"
         )
 
+@router.post("/phase2/generate/stream")
+async def stream_generate_resume(request: ResumeGenerationRequest):
+    """流式生成个性化简历（SSE）：先推送分析结果，再推送增量文本和已完成的简历字段，最后推送完整结果"""
+    logger.info(f"Streaming resume for {request.user_profile.full_name} - {request.job_posting.job_title}")
+    
+    user_profile_dict = request.user_profile.dict()
+    job_posting_dict = request.job_posting.dict()
+    generation_params = {
+        "customization_level": request.customization_level,
+        "focus_areas": request.focus_areas,
+        "template_style": request.template_style
+    }
+    
+    async def event_stream():
+        async for event in phase2_agent.astream_enhanced_resume(
+            user_profile_dict, job_posting_dict, generation_params
+        ):
+            yield _sse_event(event["event"], event["data"])
+    
+    return _sse_response(event_stream())
+
 @router.post("/phase2/optimize", response_model=BaseResponse)
 async def optimize_resume(request: dict):
     """基于HR反馈优化简历内容"""
@@ -295,7 +433,7 @@ async def optimize_resume(request: dict):
             )
         
         logger.info("Calling phase2_agent.optimize_resume_content")
-        result = phase2_agent.optimize_resume_content(
+        result = await phase2_agent.aoptimize_resume_content(
             resume_content, 
             feedback, 
             optimization_focus
@@ -367,12 +505,16 @@ async def hr_review(request: Dict[str, Any]):
         resume_content = request.get("resume_content")
         job_posting = request.get("job_posting") 
         hr_persona = request.get("hr_persona", "experienced")        
+        if request.get("preview"):
+            # 快速预览：只用规则引擎打分，不调用LLM
+            result = phase3_agent.preview_hr_review(resume_content, job_posting, hr_persona)
+            return BaseResponse(success=result["success"], message=result["message"], data=result["data"])
         # # Call Phase3HRAgent for detailed evaluation
         # # Convert Pydantic models to dictionaries
         # resume_dict = request.resume_content
         # job_posting_dict = request.job_posting.dict() if hasattr(request.job_posting, 'dict') else request.job_posting
         logger.info(f"收到HR评估请求: hr_persona={hr_persona}")        
-        result = phase3_agent.simulate_hr_review(
+        result = await phase3_agent.asimulate_hr_review(
             resume_content=resume_content,
             job_posting=job_posting,
             hr_persona=hr_persona
@@ -453,13 +595,12 @@ async def generate_improvement_plan(resume_content: Dict[str, Any], job_posting:
         }}
         """
         
-        improvement_result = llm_service.call_phase2_model(improvement_prompt)
+        improvement_result = await async_llm_service.acall_phase2_model(improvement_prompt, ImprovementPlanOutput)
         
         # Parse JSON result
-        json_match = re.search(r'\{.*\}', improvement_result, re.DOTALL)
-        if json_match:
-            improvement_plan = json.loads(json_match.group())
-            return improvement_plan
+        improvement_plan = extract_json(improvement_result)
+        if improvement_plan is not None:
+            return mark_degraded(improvement_plan, improvement_result)
         else:
             return {"error": "Failed to parse improvement plan", "raw_result": improvement_result}
             
@@ -516,18 +657,16 @@ async def apply_improvements(
         }}
         """
         
-        optimization_result = llm_service.call_phase2_model(apply_prompt)
+        optimization_result = await async_llm_service.acall_phase2_model(apply_prompt, AppliedImprovementsOutput)
         
         # Parse JSON result
-        import re
-        json_match = re.search(r'\{.*\}', optimization_result, re.DOTALL)
-        if json_match:
-            optimized_data = json.loads(json_match.group())
+        optimized_data = extract_json(optimization_result)
+        if optimized_data is not None:
             
             return BaseResponse(
                 success=True,
                 message="Resume optimization completed",
-                data=optimized_data
+                data=mark_degraded(optimized_data, optimization_result)
             )
         else:
             return BaseResponse(
@@ -549,7 +688,7 @@ async def apply_improvements(
 async def multi_agent_discussion(request: SchedulingRequest):
     """Conduct multi-agent discussion for scheduling."""
     try:
-        result = phase4_agent.multi_agent_discussion(
+        result = await phase4_agent.amulti_agent_discussion(
             interviews=request.interviews,
             user_preferences=request.user_preferences
         )
@@ -602,7 +741,9 @@ async def multi_llm_recommendation(request: dict):
                 detail="职位列表不能为空"
             )
         
-        result = phase4_agent.multi_llm_recommendation(personal_info, jobs)
+        result = await phase4_agent.amulti_llm_recommendation(
+            personal_info, jobs, single_model=request.get("single_model")
+        )
         
         return BaseResponse(
             success=True,
@@ -617,12 +758,36 @@ async def multi_llm_recommendation(request: dict):
             detail=f"多LLM推荐分析失败: {str(e)}"
         )
 
+@router.post("/phase4/multi-llm-recommendation/stream")
+async def stream_multi_llm_recommendation(request: dict):
+    """Multi-LLM job recommendation analysis, streamed as each analyst finishes (SSE)."""
+    personal_info = request.get("personal_info", {})
+    jobs = request.get("jobs", [])
+    
+    if not jobs:
+        raise HTTPException(
+            status_code=400,
+            detail="职位列表不能为空"
+        )
+    
+    async def event_stream():
+        try:
+            async for event in phase4_agent.astream_multi_llm_recommendation(
+                personal_info, jobs, single_model=request.get("single_model")
+            ):
+                yield _sse_event(event["event"], event["data"])
+        except Exception as e:
+            logger.error(f"Error in streamed multi-LLM recommendation: {e}")
+            yield _sse_event("error", {"message": f"多LLM推荐分析失败: {str(e)}"})
+    
+    return _sse_response(event_stream())
+
 @router.post("/phase4/multi-agent-discussion", response_model=BaseResponse)
 async def multi_agent_discussion_complete(request: SchedulingRequest):
     """Complete multi-agent discussion workflow including ranking and scheduling."""
     try:
         # 调用完整的 Phase4 工作流程
-        result = phase4_agent.multi_agent_discussion(
+        result = await phase4_agent.amulti_agent_discussion(
             interviews=request.interviews,
             user_preferences=request.user_preferences
         )
@@ -671,6 +836,72 @@ async def get_available_models():
 
 
 # Demo/Test APIs
+async def _run_full_workflow(
+    search_query: str,
+    user_profile: Dict[str, Any],
+    max_jobs: int = 3,
+    context: Optional[JobContext] = None
+) -> Dict[str, Any]:
+    """执行完整流程（搜索 → 简历 → HR评估 → 面试安排），context不为空时上报各阶段进度"""
+    def report(progress: float, message: str, phase: str, result: Dict[str, Any]):
+        if context is not None:
+            context.report(progress, message, {"phase": phase, "result": result})
+    
+    workflow_results = {}
+    
+    # Phase 1: Search jobs
+    logger.info("Demo: Starting Phase 1 - Job Search")
+    search_result = await run_in_threadpool(search_agent.search_jobs, search_query, max_results=max_jobs)
+    workflow_results["phase1"] = search_result
+    report(0.25, "Phase 1 completed", "phase1", search_result)
+    
+    if not search_result["success"] or not search_result["data"]["jobs"]:
+        return {"success": False, "message": "Demo failed: No jobs found", "data": workflow_results}
+    
+    # Phase 2: Generate resume for first job
+    logger.info("Demo: Starting Phase 2 - Resume Generation")
+    first_job = search_result["data"]["jobs"][0]
+    resume_result = await phase2_agent.agenerate_enhanced_resume(
+        user_profile, 
+        first_job, 
+        {}  # generation_params
+    )
+    workflow_results["phase2"] = resume_result
+    report(0.5, "Phase 2 completed", "phase2", resume_result)
+    
+    if not resume_result["success"]:
+        return {"success": False, "message": "Demo failed: Resume generation failed", "data": workflow_results}
+    
+    # Phase 3: HR Review
+    logger.info("Demo: Starting Phase 3 - HR Review")
+    hr_result = await phase3_agent.asimulate_hr_review(
+        resume_result["data"]["content"],
+        first_job,
+        "experienced"
+    )
+    workflow_results["phase3"] = hr_result
+    report(0.75, "Phase 3 completed", "phase3", hr_result)
+    
+    # Phase 4: Create mock interview and schedule
+    logger.info("Demo: Starting Phase 4 - Scheduling")
+    if hr_result["success"] and hr_result["data"]["feedback"].get("passes_initial_screening"):
+        mock_interviews = [{
+            "id": 1,
+            "company_name": first_job.get("company_name", "Demo Company"),
+            "position": first_job.get("job_title", "Demo Position"),
+            "match_score": hr_result["data"]["feedback"].get("overall_score", 75),
+            "proposed_times": ["2024-01-20 14:00", "2024-01-21 10:00"]
+        }]
+        
+        schedule_result = await phase4_agent.amulti_agent_discussion(
+            mock_interviews,
+            {"preferred_time": "afternoon", "max_interviews_per_day": 2}
+        )
+        workflow_results["phase4"] = schedule_result
+        report(1.0, "Phase 4 completed", "phase4", schedule_result)
+    
+    return {"success": True, "message": "Demo workflow completed successfully", "data": workflow_results}
+
 @router.post("/demo/full-workflow", response_model=BaseResponse)
 async def demo_full_workflow(
     search_query: str,
@@ -679,67 +910,12 @@ async def demo_full_workflow(
 ):
     """Demo endpoint to run the full workflow."""
     try:
-        workflow_results = {}
-        
-        # Phase 1: Search jobs
-        logger.info("Demo: Starting Phase 1 - Job Search")
-        search_result = search_agent.search_jobs(search_query, max_results=max_jobs)
-        workflow_results["phase1"] = search_result
-        
-        if not search_result["success"] or not search_result["data"]["jobs"]:
-            return BaseResponse(
-                success=False,
-                message="Demo failed: No jobs found",
-                data=workflow_results
-            )
-        
-        # Phase 2: Generate resume for first job
-        logger.info("Demo: Starting Phase 2 - Resume Generation")
-        first_job = search_result["data"]["jobs"][0]
-        resume_result = phase2_agent.generate_enhanced_resume(
-            user_profile, 
-            first_job, 
-            {}  # generation_params
-        )
-        workflow_results["phase2"] = resume_result
-        
-        if not resume_result["success"]:
-            return BaseResponse(
-                success=False,
-                message="Demo failed: Resume generation failed",
-                data=workflow_results
-            )
-        
-        # Phase 3: HR Review
-        logger.info("Demo: Starting Phase 3 - HR Review")
-        hr_result = phase3_agent.simulate_hr_review(
-            resume_result["data"]["content"],
-            first_job,
-            "experienced"
-        )
-        workflow_results["phase3"] = hr_result
-        
-        # Phase 4: Create mock interview and schedule
-        logger.info("Demo: Starting Phase 4 - Scheduling")
-        if hr_result["success"] and hr_result["data"]["feedback"].get("passes_initial_screening"):
-            mock_interviews = [{
-                "id": 1,
-                "company_name": first_job.get("company_name", "Demo Company"),
-                "position": first_job.get("job_title", "Demo Position"),
-                "match_score": hr_result["data"]["feedback"].get("overall_score", 75),
-                "proposed_times": ["2024-01-20 14:00", "2024-01-21 10:00"]
-            }]
-            
-            schedule_result = phase4_agent.multi_agent_discussion(
-                mock_interviews,
-                {"preferred_time": "afternoon", "max_interviews_per_day": 2}
-            )
-            workflow_results["phase4"] = schedule_result
+        result = await _run_full_workflow(search_query, user_profile, max_jobs)
         
         return BaseResponse(
-            success=True,
-            message="Demo workflow completed successfully",
-            data=workflow_results
+            success=result["success"],
+            message=result["message"],
+            data=result["data"]
         )
         
     except Exception as e:
@@ -752,7 +928,7 @@ async def demo_full_workflow(
 # 在 api.py 中添加批量生成接口
 @router.post("/phase2/generate-batch", response_model=BaseResponse)
 async def generate_batch_resumes(request: dict):
-    """批量生成多份简历"""
+    """批量生成多份简历（并发执行，结果按完成顺序返回）"""
     try:
         user_profile = request.get("user_profile")
         job_postings = request.get("job_postings", [])
@@ -764,35 +940,14 @@ async def generate_batch_resumes(request: dict):
             )
         
         results = []
-        
-        for i, job_posting in enumerate(job_postings):
-            try:
-                logger.info(f"Generating resume {i+1}/{len(job_postings)} for {job_posting.get('company_name', 'Unknown')}")
-                
-                result = phase2_agent.generate_enhanced_resume(
-                    user_profile, 
-                    job_posting,
-                    {}
-                )
-                
-                results.append({
-                    "job_index": i,
-                    "job_title": job_posting.get("job_title"),
-                    "company_name": job_posting.get("company_name"),
-                    "success": result["success"],
-                    "data": result["data"] if result["success"] else None,
-                    "error": result.get("message") if not result["success"] else None
-                })
-                
-            except Exception as e:
-                logger.error(f"Error generating resume for job {i}: {e}")
-                results.append({
-                    "job_index": i,
-                    "job_title": job_posting.get("job_title"),
-                    "company_name": job_posting.get("company_name"),
-                    "success": False,
-                    "error": str(e)
-                })
+        async for item in phase2_agent.agenerate_batch_resumes(
+            user_profile,
+            job_postings,
+            {},
+            max_concurrency=request.get("max_concurrency"),
+            job_timeout=request.get("job_timeout")
+        ):
+            results.append(item)
         
         success_count = sum(1 for r in results if r["success"])
         
@@ -807,6 +962,8 @@ async def generate_batch_resumes(request: dict):
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in batch resume generation: {e}")
         raise HTTPException(
@@ -814,6 +971,41 @@ async def generate_batch_resumes(request: dict):
             detail=f"批量生成简历失败: {str(e)}"
         )
 
+@router.post("/phase2/generate-batch/stream")
+async def stream_batch_resumes(request: dict):
+    """批量生成多份简历（SSE），每完成一份推送一次 result 事件，最后推送 summary"""
+    user_profile = request.get("user_profile")
+    job_postings = request.get("job_postings", [])
+    
+    if not user_profile or not job_postings:
+        raise HTTPException(
+            status_code=400,
+            detail="Missing user_profile or job_postings"
+        )
+    
+    async def event_stream():
+        success_count = 0
+        try:
+            async for item in phase2_agent.agenerate_batch_resumes(
+                user_profile,
+                job_postings,
+                {},
+                max_concurrency=request.get("max_concurrency"),
+                job_timeout=request.get("job_timeout")
+            ):
+                success_count += 1 if item["success"] else 0
+                yield _sse_event("result", item)
+            yield _sse_event("summary", {
+                "total_jobs": len(job_postings),
+                "success_count": success_count,
+                "batch_id": f"batch_{int(time.time())}"
+            })
+        except Exception as e:
+            logger.error(f"Error in streamed batch resume generation: {e}")
+            yield _sse_event("error", {"message": f"批量生成简历失败: {str(e)}"})
+    
+    return _sse_response(event_stream())
+
 from fastapi import Body
 
 @router.post("/phase3/self-introduction", response_model=BaseResponse)
@@ -841,7 +1033,7 @@ async def generate_self_introduction(
             )
         
         # 调用增强版自我介绍生成
-        intro = Phase3HRAgent.generate_self_introduction(
+        intro = await Phase3HRAgent.agenerate_self_introduction(
             strengths=strengths, 
             weaknesses=weaknesses, 
             min_length=min_length,
@@ -856,7 +1048,7 @@ async def generate_self_introduction(
         return BaseResponse(
             success=True,
             message="个性化自我介绍生成成功",
-            data={
+            data=mark_degraded({
                 "self_introduction": intro,
                 "length": len(intro),
                 "personalization": {
@@ -871,7 +1063,7 @@ async def generate_self_introduction(
                     "target_job": job_posting.get('job_title') if job_posting else None,
                     "target_company": job_posting.get('company_name') if job_posting else None
                 }
-            }
+            }, intro)
         )
     except Exception as e:
         logger.error(f"生成自我介绍失败: {e}", exc_info=True)
@@ -909,7 +1101,7 @@ async def generate_interview_questions(
             )
         
         # 调用agent生成面试问题 
-        result = Phase3HRAgent.generate_interview_questions(
+        result = await Phase3HRAgent.agenerate_interview_questions(
             hr_persona=hr_persona,
             resume_content=resume_content,
             job_posting=job_posting,
@@ -956,7 +1148,7 @@ async def evaluate_interview_answer(
             )
         
         # 调用agent评估回答
-        result = Phase3HRAgent.evaluate_interview_answer(
+        result = await Phase3HRAgent.aevaluate_interview_answer(
             hr_persona=hr_persona,
             question=question,
             user_answer=user_answer,
@@ -977,4 +1169,110 @@ async def evaluate_interview_answer(
         raise HTTPException(
             status_code=500,
             detail=f"面试回答评估失败: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+# Background Jobs - 长时间运行的流程以后台任务方式执行，客户端轮询任务状态
+@job_manager.register("full_workflow")
+async def _full_workflow_job(context: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    return await _run_full_workflow(
+        params["search_query"], params.get("user_profile", {}), params.get("max_jobs", 3), context
+    )
+
+@job_manager.register("batch_resumes")
+async def _batch_resumes_job(context: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    job_postings = params.get("job_postings", [])
+    results = []
+    async for item in phase2_agent.agenerate_batch_resumes(
+        params["user_profile"],
+        job_postings,
+        {},
+        max_concurrency=params.get("max_concurrency"),
+        job_timeout=params.get("job_timeout")
+    ):
+        results.append(item)
+        context.report(
+            len(results) / len(job_postings),
+            f"已完成 {len(results)}/{len(job_postings)} 份简历",
+            item
+        )
+    return {
+        "results": results,
+        "total_jobs": len(job_postings),
+        "success_count": sum(1 for r in results if r["success"])
+    }
+
+@job_manager.register("multi_llm_recommendation")
+async def _multi_llm_recommendation_job(context: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    total_analysts = len(phase4_agent.ANALYSTS)
+    finished = 0
+    result = None
+    async for event in phase4_agent.astream_multi_llm_recommendation(
+        params.get("personal_info", {}), params["jobs"], single_model=params.get("single_model")
+    ):
+        if event["event"] == "analyst":
+            finished += 1
+            context.report(finished / (total_analysts + 1), f"{event['data']['analyst_name']} 分析完成", event["data"])
+        elif event["event"] == "final":
+            result = event["data"]
+    return result
+
+class JobSubmitRequest(BaseModel):
+    job_type: str
+    params: Dict[str, Any] = {}
+
+@router.post("/jobs", response_model=BaseResponse)
+async def submit_job(request: JobSubmitRequest):
+    """提交后台任务，立即返回任务ID"""
+    try:
+        job = job_manager.submit(request.job_type, request.params)
+        return BaseResponse(
+            success=True,
+            message="任务已提交",
+            data=job
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{str(e)}，可用类型: {', '.join(job_manager.job_types)}"
+        )
+    except Exception as e:
+        logger.error(f"Error submitting job: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"任务提交失败: {str(e)}"
+        )
+
+@router.get("/jobs", response_model=BaseResponse)
+async def list_jobs(status_filter: Optional[str] = None, limit: int = 50):
+    """列出最近的后台任务"""
+    jobs = job_manager.list_jobs(status_filter, limit)
+    return BaseResponse(
+        success=True,
+        message=f"共 {len(jobs)} 个任务",
+        data={"jobs": jobs}
+    )
+
+@router.get("/jobs/{job_id}", response_model=BaseResponse)
+async def get_job(job_id: str):
+    """查询后台任务的状态、进度和（部分）结果"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return BaseResponse(
+        success=True,
+        message=job["status"],
+        data=job
+    )
+
+@router.post("/jobs/{job_id}/cancel", response_model=BaseResponse)
+async def cancel_job(job_id: str):
+    """取消后台任务"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return BaseResponse(
+        success=True,
+        message="取消请求已处理",
+        data=job
+    )
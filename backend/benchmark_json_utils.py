@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+LLM输出JSON提取基准测试
+
+对比旧写法 re.search(r'\\{.*\\}', text, re.DOTALL) + json.loads 与 json_utils.extract_json
+的解析成功数和耗时。默认使用内置的典型回复样例（说明文字、代码块、尾随逗号、单引号、
+输出截断等），也可以用 --input 指定保存了LLM原始回复的目录（每个 .txt/.md 文件一条回复）。
+
+用法:
+    python benchmark_json_utils.py
+    python benchmark_json_utils.py --input ./captured_outputs --repeat 200
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json_utils
+from json_utils import extract_json
+
+
+def _resume(n_items: int) -> dict:
+    return {
+        "personal_info": {"name": "张三", "email": "zhangsan@example.com", "phone": "138-0000-0000"},
+        "professional_summary": "5年前端开发经验，熟悉 Vue、React {组件化} 与工程化建设。",
+        "highlighted_skills": {"technical_skills": ["JavaScript", "TypeScript", "Vue.js", "Webpack"]},
+        "professional_experience": [
+            {
+                "company": f"公司{i}",
+                "position": "高级前端工程师",
+                "achievements": [f"负责“项目{i}”的架构设计，性能提升{10 + i}%" for _ in range(3)]
+            }
+            for i in range(n_items)
+        ],
+        "education": [{"school": "某大学", "degree": "本科"}]
+    }
+
+
+def builtin_samples() -> list:
+    """典型的LLM回复写法，每种写法生成小/大两个体量"""
+    samples = []
+    for n_items in (2, 40):
+        body = json.dumps(_resume(n_items), ensure_ascii=False, indent=2)
+        samples += [
+            body,
+            "好的，以下是为您生成的简历：\n```json\n" + body + "\n```\n如需调整请告诉我。",
+            "根据 {职位要求} 生成结果如下：\n" + body + "\n\n说明：已突出 {核心技能}。",
+            body.replace("\n  ]", ",\n  ]").replace("\n  }", ",\n  }"),
+            body.replace('"education"', "// 教育背景\n  'education'").replace(": true", ": True"),
+            body[: int(len(body) * 0.8)],
+        ]
+    jobs = json.dumps([{"job_title": f"前端开发{i}", "company_name": f"公司{i}"} for i in range(20)],
+                      ensure_ascii=False)
+    samples.append("根据搜索结果[1][2]，职位如下：\n" + jobs + "\n来源：[Boss直聘](https://www.zhipin.com)")
+    return samples
+
+
+def load_samples(directory: str) -> list:
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith((".txt", ".md")):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                samples.append(f.read())
+    return samples
+
+
+def legacy_extract(text: str):
+    """旧写法：贪婪匹配第一个 { 到最后一个 }"""
+    match = re.search(r'\{.*\}', text, re.DOTALL) or re.search(r'\[.*\]', text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group())
+    except json.JSONDecodeError:
+        return None
+
+
+def run(name: str, parse, samples: list, repeat: int):
+    parsed = sum(parse(text) is not None for text in samples)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in samples:
+            parse(text)
+    elapsed = time.perf_counter() - start
+    per_call_us = elapsed / (repeat * len(samples)) * 1e6
+    print(f"{name:<28} 成功 {parsed:>3}/{len(samples):<3}  平均 {per_call_us:8.1f} µs/次")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON extraction from LLM outputs")
+    parser.add_argument("--input", help="保存LLM原始回复的目录（.txt/.md）")
+    parser.add_argument("--repeat", type=int, default=100, help="每种方法重复解析的轮数")
+    args = parser.parse_args()
+
+    samples = load_samples(args.input) if args.input else builtin_samples()
+    if not samples:
+        print("没有可用的样例")
+        return
+
+    total_kb = sum(len(text.encode("utf-8")) for text in samples) / 1024
+    print("=" * 60)
+    print(f"JSON提取基准 - {len(samples)} 条回复, 共 {total_kb:.1f} KB, 重复 {args.repeat} 轮")
+    print("=" * 60)
+
+    methods = [
+        ("re.search + json.loads", legacy_extract),
+        ("extract_json (repair=False)", lambda text: extract_json(text, expect=None, repair=False)),
+        ("extract_json", lambda text: extract_json(text, expect=None)),
+    ]
+    for name, parse in methods:
+        run(name, parse, samples, args.repeat)
+
+    if json_utils.orjson is not None:
+        orjson_module, json_utils.orjson = json_utils.orjson, None
+        try:
+            run("extract_json (标准库json)", methods[-1][1], samples, args.repeat)
+        finally:
+            json_utils.orjson = orjson_module
+
+    # 只比较旧写法也能解析的回复，反映正常路径上的耗时
+    parsable = [text for text in samples if legacy_extract(text) is not None]
+    if parsable and len(parsable) < len(samples):
+        print(f"\n旧写法可解析的 {len(parsable)} 条回复:")
+        for name, parse in methods:
+            run(name, parse, parsable, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
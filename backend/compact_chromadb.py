@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+ChromaDB职位向量去重/压缩脚本
+
+旧版本使用 gptweb_{时间戳}_{序号} 作为ID，同一职位多次抓取会产生多条向量。
+本脚本把 data/chromadb 中的职位按 (职位名称, 公司, 地点) 内容哈希合并为一条，
+并为旧数据补上分页查询和过滤检索所需的 kind、规范技能ID等元数据字段。
+运行中的后端进程的向量计数最迟在 CHROMA_COUNT_TTL 秒后重新统计。
+
+用法:
+    python compact_chromadb.py --dry-run   # 只统计，不修改
+    python compact_chromadb.py
+"""
+
+import argparse
+import sys
+import os
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services import chromadb_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicate job embeddings in ChromaDB by content hash")
+    parser.add_argument("--dry-run", action="store_true", help="只统计需要合并/删除的条目，不修改数据")
+    parser.add_argument("--page-size", type=int, default=500, help="每次从集合读取的条目数")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"ChromaDB职位去重 - 集合: {chromadb_service.collection_name}")
+    print("=" * 60)
+
+    result = chromadb_service.compact_job_postings(dry_run=args.dry_run, page_size=args.page_size)
+
+    print(f"扫描职位: {result['scanned']}")
+    print(f"唯一职位: {result['unique_postings']}")
+    print(f"重写为哈希ID: {result['rewritten']}")
+    print(f"删除重复/旧ID: {result['deleted']}")
+    print(f"补齐元数据字段: {result['metadata_backfilled']}")
+    if args.dry_run:
+        print("\n(dry-run 模式，未做任何修改)")
+    else:
+        print("\n✅ 压缩完成")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ Configuration management for Job Planner Assistant.
 """
 
 import os
-from typing import List
+from typing import List, Dict, Tuple
 from pydantic import Field
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
@@ -19,9 +19,23 @@ class Settings(BaseSettings):
     openai_api_key: str = Field(default="", env="OPENAI_API_KEY", description="OpenAI API key")
     openai_api_base: str = Field(default="https://api.openai.com/v1", env="OPENAI_API_BASE", description="OpenAI API base URL")
     serper_api_key: str = Field(default="", env="SERPER_API_KEY", description="Serper API key for web search")
+    search_api_key: str = Field(default="", env="SEARCH_API_KEY", description="API key for the web search model (SearchAgent)")
+    search_api_base: str = Field(default="https://api.chatanywhere.tech/v1", env="SEARCH_API_BASE", description="API base URL for the web search model (SearchAgent)")
     
     # ChromaDB
     chromadb_path: str = Field(default="./data/chromadb", env="CHROMADB_PATH")
+    chroma_ingest_batch_size: int = Field(default=256, env="CHROMA_INGEST_BATCH_SIZE", description="Max postings per collection write")
+    chroma_background_ingest: bool = Field(default=True, env="CHROMA_BACKGROUND_INGEST", description="Embed search results off the request path")
+    chroma_count_ttl: float = Field(default=60.0, env="CHROMA_COUNT_TTL", description="Seconds before cached per-kind vector counts are recomputed")
+    
+    # Embeddings
+    embedding_provider: str = Field(default="onnx", env="EMBEDDING_PROVIDER", description="onnx | sentence-transformer | fake")
+    embedding_model: str = Field(default="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2", env="EMBEDDING_MODEL")
+    embedding_backend: str = Field(default="torch", env="EMBEDDING_BACKEND", description="sentence-transformers backend: torch | onnx")
+    embedding_batch_size: int = Field(default=32, env="EMBEDDING_BATCH_SIZE")
+    embedding_dimension: int = Field(default=64, env="EMBEDDING_DIMENSION", description="Vector size for the fake provider")
+    embedding_cache_enabled: bool = Field(default=True, env="EMBEDDING_CACHE_ENABLED")
+    embedding_cache_dir: str = Field(default="./data/embeddings", env="EMBEDDING_CACHE_DIR")
     
     # Application
     debug: bool = Field(default=True, env="DEBUG")
@@ -32,12 +46,92 @@ class Settings(BaseSettings):
     phase1_model: str = Field(default="gpt-3.5-turbo", env="PHASE1_MODEL")
     phase2_model: str = Field(default="gpt-3.5-turbo", env="PHASE2_MODEL")
     phase3_model: str = Field(default="gpt-3.5-turbo", env="PHASE3_MODEL")
+    # Extra models the router may send a phase to (comma separated, tried after PHASEn_MODEL until stats say otherwise)
+    phase1_candidate_models: str = Field(default="", env="PHASE1_CANDIDATE_MODELS", description="Fallback/hedge models for Phase 1")
+    phase2_candidate_models: str = Field(default="", env="PHASE2_CANDIDATE_MODELS", description="Fallback/hedge models for Phase 2")
+    phase3_candidate_models: str = Field(default="", env="PHASE3_CANDIDATE_MODELS", description="Fallback/hedge models for Phase 3")
     phase4_models: str = Field(default="gpt-3.5-turbo,claude-3-haiku,deepseek-v3", env="PHASE4_MODELS")
+    phase4_model_timeout: float = Field(default=60.0, env="PHASE4_MODEL_TIMEOUT", description="Per-model timeout in seconds for Phase 4 fan-out")
+    phase4_quorum: int = Field(default=0, env="PHASE4_QUORUM", description="Return once this many Phase 4 models answered (0 = wait for all)")
+    phase4_max_concurrency: int = Field(default=6, env="PHASE4_MAX_CONCURRENCY", description="Max in-flight LLM calls for one multi-analyst recommendation")
+    # Per-model rate limits (model=rpm:tpm, comma separated; unlisted models use the defaults, 0 = unlimited)
+    llm_rate_limits: str = Field(default="", env="LLM_RATE_LIMITS", description="Per-model limits, e.g. gpt-4o=500:200000,deepseek-v3=60:100000")
+    llm_default_rpm: int = Field(default=0, env="LLM_DEFAULT_RPM", description="Requests per minute for models not listed in LLM_RATE_LIMITS")
+    llm_default_tpm: int = Field(default=0, env="LLM_DEFAULT_TPM", description="Tokens per minute for models not listed in LLM_RATE_LIMITS")
+    llm_max_concurrency_per_model: int = Field(default=8, env="LLM_MAX_CONCURRENCY_PER_MODEL", description="In-flight requests per model (0 = unlimited)")
+    llm_rate_limit_queue_timeout: float = Field(default=120.0, env="LLM_RATE_LIMIT_QUEUE_TIMEOUT", description="Longest wait in the rate limit queue before failing")
+    llm_rate_limit_output_tokens: int = Field(default=1000, env="LLM_RATE_LIMIT_OUTPUT_TOKENS", description="Expected completion tokens counted against TPM per request")
+    phase4_analyst_single_model: bool = Field(default=False, env="PHASE4_ANALYST_SINGLE_MODEL", description="Each analyst only calls its own assigned Phase 4 model")
+    
+    # Batch resume generation
+    batch_max_concurrency: int = Field(default=4, env="BATCH_MAX_CONCURRENCY", description="Resumes generated concurrently in one batch; also caps max_concurrency from requests")
+    batch_job_timeout: float = Field(default=180.0, env="BATCH_JOB_TIMEOUT", description="Per-job timeout in seconds for batch generation")
+    
+    # Job search
+    search_parallel: bool = Field(default=True, env="SEARCH_PARALLEL", description="Run job search batches concurrently")
+    search_max_concurrency: int = Field(default=4, env="SEARCH_MAX_CONCURRENCY", description="Concurrent web search batches")
+    
+    # Prompt token budget
+    prompt_tokenizer: str = Field(default="cl100k_base", env="PROMPT_TOKENIZER", description="tiktoken encoding used to count input tokens (estimated when tiktoken is not installed)")
+    phase3_prompt_token_budget: int = Field(default=6000, env="PHASE3_PROMPT_TOKEN_BUDGET", description="Max input tokens for Phase 3 HR review and interview prompts")
+    
+    # Shared HTTP connection pool
+    http_max_connections: int = Field(default=100, env="HTTP_MAX_CONNECTIONS", description="Max open connections in the shared HTTP pool")
+    http_max_keepalive_connections: int = Field(default=20, env="HTTP_MAX_KEEPALIVE_CONNECTIONS", description="Idle keep-alive connections kept for reuse")
+    http_keepalive_expiry: float = Field(default=60.0, env="HTTP_KEEPALIVE_EXPIRY", description="Seconds an idle connection is kept open")
+    http_connect_timeout: float = Field(default=10.0, env="HTTP_CONNECT_TIMEOUT", description="Connect timeout in seconds")
+    http_read_timeout: float = Field(default=120.0, env="HTTP_READ_TIMEOUT", description="Default read timeout in seconds for outbound requests")
+    
+    # Background jobs
+    job_workers: int = Field(default=2, env="JOB_WORKERS", description="Concurrent background jobs")
+    job_heartbeat_interval: float = Field(default=10.0, env="JOB_HEARTBEAT_INTERVAL", description="Seconds between heartbeats for running background jobs")
+    job_stale_seconds: float = Field(default=60.0, env="JOB_STALE_SECONDS", description="Running jobs without a heartbeat for this long are marked failed")
+    
+    # LLM Response Cache
+    llm_cache_enabled: bool = Field(default=True, env="LLM_CACHE_ENABLED")
+    llm_cache_path: str = Field(default="./data/llm_cache.db", env="LLM_CACHE_PATH")
+    llm_cache_ttl_seconds: int = Field(default=7 * 24 * 3600, env="LLM_CACHE_TTL_SECONDS")
+    llm_cache_memory_size: int = Field(default=256, env="LLM_CACHE_MEMORY_SIZE", description="Entries kept in the in-memory LRU tier")
+    llm_cache_max_entries: int = Field(default=5000, env="LLM_CACHE_MAX_ENTRIES", description="Entries kept in the SQLite tier")
+    llm_cache_max_temperature: float = Field(default=0.7, env="LLM_CACHE_MAX_TEMPERATURE", description="Calls above this temperature bypass the cache")
+    
+    # LLM retries and circuit breaker
+    llm_max_retries: int = Field(default=3, env="LLM_MAX_RETRIES", description="Retries for rate limits, 5xx, timeouts and connection errors")
+    llm_retry_base_delay: float = Field(default=1.0, env="LLM_RETRY_BASE_DELAY", description="Base delay in seconds for exponential backoff with jitter")
+    llm_retry_max_delay: float = Field(default=30.0, env="LLM_RETRY_MAX_DELAY", description="Longest single wait; a longer Retry-After fails immediately")
+    llm_circuit_failure_threshold: int = Field(default=5, env="LLM_CIRCUIT_FAILURE_THRESHOLD", description="Consecutive provider errors that open a model's circuit")
+    llm_circuit_reset_seconds: float = Field(default=30.0, env="LLM_CIRCUIT_RESET_SECONDS", description="Seconds an open circuit fails fast before a probe call")
+    llm_router_window: int = Field(default=100, env="LLM_ROUTER_WINDOW", description="Recent calls per model kept for latency/error statistics")
+    llm_router_min_samples: int = Field(default=5, env="LLM_ROUTER_MIN_SAMPLES", description="Calls needed before a model's latency is used for routing and hedging")
+    llm_router_max_error_rate: float = Field(default=0.5, env="LLM_ROUTER_MAX_ERROR_RATE", description="Models above this recent error rate are routed last")
+    llm_hedging_enabled: bool = Field(default=True, env="LLM_HEDGING_ENABLED", description="Send a phase request to the next candidate once the first exceeds its p90 latency")
+    llm_hedge_min_delay: float = Field(default=2.0, env="LLM_HEDGE_MIN_DELAY", description="Shortest wait in seconds before a hedged request")
+    llm_hedge_workers: int = Field(default=16, env="LLM_HEDGE_WORKERS", description="Threads running routed sync requests")
+    llm_demo_fallback: bool = Field(default=True, env="LLM_DEMO_FALLBACK", description="Return demo data flagged as degraded when a model is unavailable")
+    
+    # Structured LLM output
+    llm_structured_output: bool = Field(default=True, env="LLM_STRUCTURED_OUTPUT", description="Request JSON mode and validate phase outputs against their schema")
+    llm_repair_attempts: int = Field(default=1, env="LLM_REPAIR_ATTEMPTS", description="Repair prompts sent when an output fails schema validation")
     
     @property
     def phase4_models_list(self) -> List[str]:
         """Get Phase 4 models as a list."""
         return [model.strip() for model in str(self.phase4_models).split(",")]
+    def phase_candidates(self, phase: str) -> List[str]:
+        """PHASEn_MODEL followed by PHASEn_CANDIDATE_MODELS, without duplicates."""
+        models = [getattr(self, f"{phase}_model")] + str(getattr(self, f"{phase}_candidate_models")).split(",")
+        return list(dict.fromkeys(model.strip() for model in models if model.strip()))
+    @property
+    def model_rate_limits(self) -> Dict[str, Tuple[int, int]]:
+        """Parse LLM_RATE_LIMITS into {model: (rpm, tpm)}."""
+        limits = {}
+        for item in str(self.llm_rate_limits).split(","):
+            if "=" not in item:
+                continue
+            model, _, values = item.partition("=")
+            rpm, _, tpm = values.partition(":")
+            limits[model.strip()] = (int(rpm or 0), int(tpm or 0))
+        return limits
     # 你可以在这里添加更多的属性或方法来扩展配置功能    
     class Config:
         env_file = ".env"
@@ -5,11 +5,12 @@ Database models and operations for Job Planner Assistant.
 import json
 from datetime import datetime
 from typing import Optional, List, Dict, Any
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, JSON
+from sqlalchemy import create_engine, inspect, text, func, Column, Integer, String, Text, DateTime, Boolean, Float, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from pydantic import BaseModel
 from config import settings
+from skill_normalizer import skill_normalizer
 
 # Database setup
 engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
@@ -57,6 +58,7 @@ class JobPosting(Base):
     description = Column(Text)
     requirements = Column(JSON)  # List of requirements (stored as JSON)
     skills_required = Column(JSON)  # List of skills (stored as JSON)
+    skill_ids = Column(JSON)  # 规范技能ID列表（见 skill_normalizer）
     salary_range = Column(String(100))
     application_url = Column(String(1000))
     source_url = Column(String(1000))
@@ -131,6 +133,28 @@ class Schedule(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class BackgroundJob(Base):
+    """Background job model for long-running agent workflows."""
+    __tablename__ = "background_jobs"
+    
+    id = Column(String(64), primary_key=True, index=True)
+    job_type = Column(String(100), index=True)
+    status = Column(String(50), default="queued", index=True)  # queued/running/succeeded/failed/cancelled
+    progress = Column(Float, default=0.0)  # 0.0 ~ 1.0
+    message = Column(String(500))
+    params = Column(JSON)  # Job input parameters
+    partial_results = Column(JSON)  # Partial results reported while running
+    result = Column(JSON)
+    error = Column(Text)
+    cancel_requested = Column(Boolean, default=False)
+    owner = Column(String(100), index=True)  # 执行该任务的进程（多实例部署时区分）
+    heartbeat_at = Column(DateTime)  # 执行进程最近一次心跳，超时的running任务视为中断
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 # Pydantic Models for API
 class UserCreate(BaseModel):
     username: str
@@ -207,6 +231,39 @@ def get_db():
 def init_database():
     """Initialize database tables."""
     Base.metadata.create_all(bind=engine)
+    _migrate_job_posting_skill_ids()
+    _migrate_background_job_owner()
+
+
+def _migrate_job_posting_skill_ids():
+    """旧数据库的 job_postings 表没有 skill_ids 列：补列并回填规范技能ID"""
+    columns = {column["name"] for column in inspect(engine).get_columns("job_postings")}
+    if "skill_ids" in columns:
+        return
+    # 只读写用到的列，不依赖旧表是否包含模型的全部字段
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE job_postings ADD COLUMN skill_ids JSON"))
+        rows = conn.execute(text("SELECT id, skills_required, requirements, description FROM job_postings")).fetchall()
+        for job_id, skills_required, requirements, description in rows:
+            skill_ids = skill_normalizer.extract_from_job({
+                "skills": json.loads(skills_required) if skills_required else [],
+                "requirements": json.loads(requirements) if requirements else [],
+                "description": description or ""
+            })
+            conn.execute(
+                text("UPDATE job_postings SET skill_ids = :skill_ids WHERE id = :id"),
+                {"skill_ids": json.dumps(skill_ids), "id": job_id}
+            )
+
+
+def _migrate_background_job_owner():
+    """旧数据库的 background_jobs 表没有 owner / heartbeat_at 列：补列"""
+    columns = {column["name"] for column in inspect(engine).get_columns("background_jobs")}
+    with engine.begin() as conn:
+        if "owner" not in columns:
+            conn.execute(text("ALTER TABLE background_jobs ADD COLUMN owner VARCHAR(100)"))
+        if "heartbeat_at" not in columns:
+            conn.execute(text("ALTER TABLE background_jobs ADD COLUMN heartbeat_at DATETIME"))
 
 
 # CRUD operations
@@ -224,6 +281,19 @@ def get_user(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
 
+def _resolve_company_id(db: Session, company_id: Optional[int], company_name: str,
+                        search_query: Optional[str] = None) -> int:
+    """company_id 指向已有公司时沿用，否则按搜索结果中的公司名称查找或创建公司"""
+    if company_id and db.query(Company.id).filter(Company.id == company_id).first():
+        return company_id
+    company = db.query(Company).filter(Company.name == company_name).first()
+    if company is None:
+        company = Company(name=company_name, search_query=search_query)
+        db.add(company)
+        db.flush()
+    return company.id
+
+
 def create_job_posting(db: Session, job: JobPostingCreate):
     """Create a new job posting."""
     job_dict = job.dict()
@@ -243,6 +313,20 @@ def create_job_posting(db: Session, job: JobPostingCreate):
         except:
             pass
     
+    # 兼容搜索结果格式的字段映射到表字段
+    job_title = job_dict.pop("job_title", None)
+    company_name = job_dict.pop("company_name", None)
+    skills = job_dict.pop("skills", None)
+    if not job_dict.get("title") and job_title:
+        job_dict["title"] = job_title
+    if not job_dict.get("skills_required") and skills:
+        job_dict["skills_required"] = skills
+    if company_name:
+        job_dict["company_id"] = _resolve_company_id(db, job_dict.get("company_id"), company_name,
+                                                     job_dict.get("search_query"))
+    
+    job_dict["skill_ids"] = skill_normalizer.extract_from_job(job_dict)
+    
     db_job = JobPosting(**job_dict)
     db.add(db_job)
     db.commit()
@@ -300,3 +384,81 @@ def create_schedule(db: Session, schedule: ScheduleCreate):
     db.refresh(db_schedule)
     return db_schedule
 
+
+def create_background_job(db: Session, job_id: str, job_type: str, params: Dict[str, Any]):
+    """Create a background job record."""
+    db_job = BackgroundJob(
+        id=job_id, job_type=job_type, status="queued", progress=0.0,
+        params=params, partial_results=[]
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+
+def get_background_job(db: Session, job_id: str):
+    """Get background job by ID."""
+    return db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+
+
+def get_background_jobs(db: Session, status: Optional[str] = None, skip: int = 0, limit: int = 50):
+    """Get recent background jobs, optionally filtered by status."""
+    query = db.query(BackgroundJob)
+    if status:
+        query = query.filter(BackgroundJob.status == status)
+    return query.order_by(BackgroundJob.created_at.desc()).offset(skip).limit(limit).all()
+
+
+def transition_background_job(db: Session, job_id: str, from_status: str, **fields) -> bool:
+    """
+    条件更新：只有状态仍为 from_status 时才写入 fields（单条 UPDATE ... WHERE status = ?），
+    多个进程同时认领同一任务时只有一个成功。返回是否更新成功。
+    """
+    updated = db.query(BackgroundJob).filter(
+        BackgroundJob.id == job_id, BackgroundJob.status == from_status
+    ).update(fields, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+
+def touch_background_jobs(db: Session, owner: str, job_ids: List[str], now: datetime):
+    """更新本进程执行中任务的心跳"""
+    if not job_ids:
+        return
+    db.query(BackgroundJob).filter(
+        BackgroundJob.id.in_(job_ids), BackgroundJob.owner == owner, BackgroundJob.status == "running"
+    ).update({"heartbeat_at": now}, synchronize_session=False)
+    db.commit()
+
+
+def get_cancel_requested_job_ids(db: Session, job_ids: List[str]) -> List[str]:
+    """job_ids 中已被请求取消的任务（取消请求可能来自其他进程）"""
+    if not job_ids:
+        return []
+    rows = db.query(BackgroundJob.id).filter(
+        BackgroundJob.id.in_(job_ids), BackgroundJob.cancel_requested == True
+    ).all()
+    return [job_id for (job_id,) in rows]
+
+
+def fail_stale_background_jobs(db: Session, stale_before: datetime, error: str) -> int:
+    """心跳早于 stale_before 的 running 任务（执行进程已退出）标记为失败，返回数量"""
+    last_seen = func.coalesce(BackgroundJob.heartbeat_at, BackgroundJob.started_at, BackgroundJob.created_at)
+    failed = db.query(BackgroundJob).filter(
+        BackgroundJob.status == "running", last_seen < stale_before
+    ).update({"status": "failed", "error": error, "finished_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return failed
+
+
+def update_background_job(db: Session, job_id: str, **fields):
+    """Update fields of a background job."""
+    db_job = get_background_job(db, job_id)
+    if db_job is None:
+        return None
+    for key, value in fields.items():
+        setattr(db_job, key, value)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
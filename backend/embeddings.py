@@ -0,0 +1,322 @@
+"""
+Embedding providers and on-disk embedding cache for Job Planner Assistant.
+
+可插拔的向量化后端：
+- onnx：ChromaDB自带的 all-MiniLM-L6-v2 ONNX 模型（CPU，与已有集合的向量兼容，默认）
+- sentence-transformer：本地 sentence-transformers 模型，可选 ONNX 后端
+- fake：基于哈希的确定性向量，用于测试
+
+所有后端都经过按内容哈希索引的缓存，向量保存在 ./data 下的 NumPy memmap 文件中，
+同一段职位文本或用户画像文本只会计算一次。
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from typing import List, Dict, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows：没有 flock，只保证单进程内的并发安全
+    fcntl = None
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction, Documents, Embeddings
+from chromadb.utils.embedding_functions import register_embedding_function
+from loguru import logger
+
+from config import settings
+
+
+class EmbeddingProvider:
+    """向量化后端基类：embed 返回 shape 为 (len(texts), dim) 的 float32 数组"""
+
+    name = "base"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class FakeEmbeddingProvider(EmbeddingProvider):
+    """Deterministic hash-based embeddings for tests."""
+
+    def __init__(self, dimension: int = 64):
+        self.dimension = dimension
+        self.name = f"fake-{dimension}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dimension)
+            vectors[i] = vector / np.linalg.norm(vector)
+        return vectors
+
+
+class ChromaONNXProvider(EmbeddingProvider):
+    """ChromaDB bundled all-MiniLM-L6-v2 ONNX model (same vectors as Chroma's default)."""
+
+    name = "chroma-onnx-minilm-l6-v2"
+
+    def __init__(self):
+        self._model = None
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if self._model is None:
+            from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+            self._model = ONNXMiniLM_L6_V2()
+        return np.asarray(self._model(list(texts)), dtype=np.float32)
+
+
+class SentenceTransformerProvider(EmbeddingProvider):
+    """Local sentence-transformers model on CPU, batched."""
+
+    def __init__(self, model_name: str, batch_size: int = 32, device: str = "cpu", backend: str = "torch"):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self.backend = backend
+        self.name = f"st-{backend}-{model_name}"
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError as e:
+                    raise RuntimeError(
+                        "EMBEDDING_PROVIDER=sentence-transformer requires the sentence-transformers package"
+                    ) from e
+                kwargs = {"device": self.device}
+                if self.backend != "torch":
+                    kwargs["backend"] = self.backend
+                logger.info(f"Loading embedding model {self.model_name} ({self.backend}, {self.device})")
+                self._model = SentenceTransformer(self.model_name, **kwargs)
+            return self._model
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        model = self._get_model()
+        vectors = model.encode(
+            list(texts), batch_size=self.batch_size, normalize_embeddings=True,
+            convert_to_numpy=True, show_progress_bar=False
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class EmbeddingCache:
+    """
+    按内容哈希索引的向量缓存。
+
+    向量按行追加到 <name>.f32（np.memmap，容量不足时按倍数扩容），
+    <name>.idx 每行一个哈希、行号即向量所在行，<name>.json 记录维度。
+
+    多个进程（多个 uvicorn worker）共用同一缓存目录时，追加前对 .idx 加 flock，
+    并在锁内读入其他进程新追加的行，行号不会冲突；本进程未读入的行只会表现为未命中。
+    """
+
+    def __init__(self, directory: str, name: str, initial_capacity: int = 1024):
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+        self.data_path = os.path.join(directory, f"{slug}.f32")
+        self.index_path = os.path.join(directory, f"{slug}.idx")
+        self.meta_path = os.path.join(directory, f"{slug}.json")
+        self.initial_capacity = initial_capacity
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        self._rows = 0  # .idx 中已读入的行数，即下一个向量的行号
+        self._index_offset = 0  # .idx 中已读入的字节数
+        self._dimension: Optional[int] = None
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._stats = {"hits": 0, "misses": 0}
+        self._load(directory)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """返回命中的 {key: vector}（拷贝，不引用memmap）"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                row = self._index.get(key)
+                if row is not None:
+                    found[key] = np.array(self._vectors[row])
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray):
+        """追加新向量；已存在的key跳过"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(keys):
+            return
+        with self._lock, open(self.index_path, "ab+") as index_file:
+            if fcntl is not None:
+                fcntl.flock(index_file, fcntl.LOCK_EX)  # 关闭文件时释放
+            # 锁内读入其他进程追加的行，本进程从真实的行数之后追加
+            self._refresh(index_file)
+            if self._dimension is None:
+                self._dimension = int(vectors.shape[1])
+                with open(self.meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dimension": self._dimension}, f)
+            elif vectors.shape[1] != self._dimension:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} != cached dimension {self._dimension}")
+
+            new_rows = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._index:
+                    new_rows.setdefault(key, vector)
+            if not new_rows:
+                return
+            start = self._rows
+            self._ensure_capacity(start + len(new_rows))
+            for offset, vector in enumerate(new_rows.values()):
+                self._vectors[start + offset] = vector
+            self._vectors.flush()
+
+            # 先写向量再写索引，进程中断时索引不会指向未写入的行
+            index_file.write("".join(key + "\n" for key in new_rows).encode("utf-8"))
+            index_file.flush()
+            for offset, key in enumerate(new_rows):
+                self._index[key] = start + offset
+            self._rows = start + len(new_rows)
+            self._index_offset = index_file.tell()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._index), "dimension": self._dimension}
+
+    def _load(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        if not (os.path.exists(self.meta_path) and os.path.exists(self.data_path)):
+            return
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                self._refresh(f)
+        logger.info(f"Loaded embedding cache {self.data_path} ({len(self._index)} vectors)")
+
+    def _refresh(self, index_file):
+        """读入 .idx 中尚未读入的行，并按数据文件的当前大小重新映射（调用方持有锁）"""
+        if self._dimension is None:
+            if not os.path.exists(self.meta_path):
+                return
+            with open(self.meta_path, encoding="utf-8") as f:
+                self._dimension = int(json.load(f)["dimension"])
+        capacity = os.path.getsize(self.data_path) // (self._dimension * 4) if os.path.exists(self.data_path) else 0
+        if capacity > self._capacity:
+            self._remap(capacity)
+
+        index_file.seek(self._index_offset)
+        for line in index_file:
+            if not line.endswith(b"\n"):
+                break  # 写入未完成的末行
+            key = line.strip().decode("utf-8")
+            if key and self._rows < self._capacity:
+                self._index.setdefault(key, self._rows)
+            self._rows += 1
+            self._index_offset += len(line)
+        index_file.seek(0, os.SEEK_END)
+
+    def _remap(self, capacity: int):
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        self._vectors = np.memmap(self.data_path, dtype=np.float32, mode="r+",
+                                  shape=(capacity, self._dimension))
+        self._capacity = capacity
+
+    def _ensure_capacity(self, rows: int):
+        """容量不足时扩展文件并重新映射（调用方持有锁）"""
+        if rows <= self._capacity:
+            return
+        capacity = max(self.initial_capacity, self._capacity)
+        while capacity < rows:
+            capacity *= 2
+        with open(self.data_path, "ab") as f:
+            f.truncate(capacity * self._dimension * 4)
+        self._remap(capacity)
+
+
+@register_embedding_function
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """ChromaDB EmbeddingFunction：先查缓存，只对未命中的文本批量调用后端"""
+
+    def __init__(self, provider: EmbeddingProvider, cache: Optional[EmbeddingCache] = None,
+                 provider_name: Optional[str] = None):
+        self.provider = provider
+        self.cache = cache
+        self.provider_name = provider_name
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return list(self.embed(input))
+
+    @staticmethod
+    def name() -> str:
+        # Chroma 在类上调用 name()，后端写在 get_config() 中
+        return "cached_embedding"
+
+    def get_config(self) -> Dict[str, str]:
+        return {"provider": self.provider_name or "", "model": self.provider.name}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, str]) -> "CachedEmbeddingFunction":
+        return create_embedding_function(config.get("provider") or None)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        if self.cache is None:
+            return self.provider.embed(texts)
+
+        keys = [EmbeddingCache.make_key(text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        # 同一批次内的重复文本只计算一次
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = self.provider.embed(list(missing.values()))
+            self.cache.put_many(list(missing), vectors)
+            cached.update(zip(missing, vectors))
+
+        return np.stack([np.asarray(cached[key], dtype=np.float32) for key in keys])
+
+
+class CachedDefaultEmbeddingFunction(CachedEmbeddingFunction):
+    """onnx 后端与Chroma默认向量一致，沿用 default，已有集合的配置不冲突"""
+
+    @staticmethod
+    def name() -> str:
+        return "default"
+
+
+def create_embedding_function(provider_name: Optional[str] = None) -> CachedEmbeddingFunction:
+    """根据配置创建带缓存的向量化函数"""
+    provider_name = (provider_name or settings.embedding_provider).lower()
+    if provider_name == "fake":
+        provider = FakeEmbeddingProvider(settings.embedding_dimension)
+    elif provider_name in ("sentence-transformer", "sentence-transformers"):
+        provider = SentenceTransformerProvider(
+            settings.embedding_model, settings.embedding_batch_size, backend=settings.embedding_backend
+        )
+    elif provider_name == "onnx":
+        provider = ChromaONNXProvider()
+    else:
+        raise ValueError(f"Unknown embedding provider: {provider_name}")
+
+    cache = EmbeddingCache(settings.embedding_cache_dir, provider.name) if settings.embedding_cache_enabled else None
+    if provider_name == "onnx":
+        return CachedDefaultEmbeddingFunction(provider, cache, provider_name)
+    return CachedEmbeddingFunction(provider, cache, provider_name)
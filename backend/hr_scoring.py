@@ -0,0 +1,186 @@
+"""
+Rule-based HR scoring without the LLM.
+
+LLM评估缺少某些维度的分数、或完全不可用时，用规则给出分数和文字分析：
+- ResumeFeatures.extract 只遍历一次简历，得到计数、关键词命中、学历等级等特征
+- HR_SCORING_RULES 按人设声明每个评估维度的规则，score_metric / score_metrics 只读特征，
+  与简历长度无关；未声明的维度按名称中的 experience / skill / education 套用通用规则
+"""
+
+from typing import Dict, Any, List, Tuple
+
+BASE_SCORE = 60
+MIN_SCORE = 40
+MAX_SCORE = 95
+
+# 经历职位中表示技术岗位的关键词
+TECH_POSITION_KEYWORDS = ("开发", "工程师", "程序员", "技术")
+# 经历描述中表示量化业绩的关键词
+RESULT_KEYWORDS = ("提升", "优化", "增长", "完成", "实现", "%")
+# 项目描述中表示创新实践的关键词
+INNOVATION_KEYWORDS = ("创新", "优化", "改进", "设计", "架构")
+CORE_TECH_KEYWORDS = ("java", "python", "javascript", "react", "vue", "spring", "mysql", "redis")
+MODERN_TECH_KEYWORDS = ("cloud", "docker", "kubernetes", "微服务", "分布式")
+# 学历等级：按顺序匹配，先命中的等级更高
+DEGREE_LEVELS = ((3, ("硕士", "研究生")), (2, ("本科", "学士")), (1, ("专科",)))
+
+
+def _get(obj: Any, key: str, default: Any = None) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(key, default)
+    return getattr(obj, key, default)
+
+
+def _count(value: Any) -> int:
+    return len(value) if value else 0
+
+
+def _mentions(text: str, keywords: Tuple[str, ...]) -> bool:
+    return any(keyword in text for keyword in keywords)
+
+
+class ResumeFeatures:
+    """评分和文字分析用到的全部简历特征"""
+
+    def __init__(self, experience_count: int = 0, skills_count: int = 0, projects_count: int = 0,
+                 has_education: bool = False, degree_level: int = 0, tech_experience: bool = False,
+                 quantified_results: bool = False, innovative_projects: bool = False,
+                 core_tech_skills: int = 0, modern_tech_skills: int = 0):
+        self.experience_count = experience_count
+        self.skills_count = skills_count
+        self.projects_count = projects_count
+        self.has_education = has_education
+        self.degree_level = degree_level
+        self.tech_experience = tech_experience
+        self.quantified_results = quantified_results
+        self.innovative_projects = innovative_projects
+        self.core_tech_skills = core_tech_skills
+        self.modern_tech_skills = modern_tech_skills
+
+    @classmethod
+    def extract(cls, resume_content: Any) -> "ResumeFeatures":
+        experience = _get(resume_content, "experience") or []
+        skills = _get(resume_content, "skills") or []
+        projects = _get(resume_content, "projects") or []
+        education = _get(resume_content, "education") or []
+
+        skill_texts = [str(skill).lower() for skill in skills]
+        education_text = str(education).lower() if education else ""
+        return cls(
+            experience_count=_count(experience),
+            skills_count=_count(skills),
+            projects_count=_count(projects),
+            has_education=bool(education),
+            degree_level=next((level for level, keywords in DEGREE_LEVELS
+                               if _mentions(education_text, keywords)), 0),
+            tech_experience=any(_mentions(str(_get(exp, "position", "")).lower(), TECH_POSITION_KEYWORDS)
+                                for exp in experience),
+            quantified_results=any(_mentions(str(_get(exp, "description", "")).lower(), RESULT_KEYWORDS)
+                                   for exp in experience),
+            innovative_projects=any(_mentions(str(_get(proj, "description", "")).lower(), INNOVATION_KEYWORDS)
+                                    for proj in projects),
+            core_tech_skills=sum(_mentions(text, CORE_TECH_KEYWORDS) for text in skill_texts),
+            modern_tech_skills=sum(_mentions(text, MODERN_TECH_KEYWORDS) for text in skill_texts)
+        )
+
+    # 组合特征
+    @property
+    def complete_resume(self) -> bool:
+        return self.has_education and self.skills_count > 0 and self.experience_count > 0
+
+    @property
+    def few_jobs(self) -> bool:
+        """跳槽不频繁"""
+        return self.experience_count <= 3
+
+    @property
+    def practical_level(self) -> int:
+        if self.experience_count >= 2 and self.projects_count >= 2:
+            return 2
+        return int(self.experience_count >= 1 or self.projects_count >= 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.__dict__, "complete_resume": self.complete_resume,
+                "few_jobs": self.few_jobs, "practical_level": self.practical_level}
+
+
+# 一条规则：(特征名, ((阈值, 加分), ...))，档位按阈值从高到低排列，取第一个满足 特征值 >= 阈值 的档位；
+# 一个维度的分数 = BASE_SCORE + 各条规则的加分，限制在 [MIN_SCORE, MAX_SCORE]
+Rule = Tuple[str, Tuple[Tuple[float, int], ...]]
+
+EXPERIENCE_TIERS: Rule = ("experience_count", ((3, 15), (1, 10)))
+SKILLS_TIERS: Rule = ("skills_count", ((8, 20), (5, 15), (3, 10)))
+DEGREE_TIERS: Rule = ("degree_level", ((3, 20), (2, 15), (1, 10)))
+
+HR_SCORING_RULES: Dict[str, Dict[str, List[Rule]]] = {
+    "experienced": {
+        "experience_match": [EXPERIENCE_TIERS, ("tech_experience", ((1, 10),))],
+        "skills_proficiency": [SKILLS_TIERS],
+        "performance_results": [("quantified_results", ((1, 15),)), ("projects_count", ((2, 10),))],
+        "career_stability": [("experience_count", ((2, 10),)), ("few_jobs", ((1, 10),))],
+        "resume_professionalism": [("complete_resume", ((1, 15),))]
+    },
+    "conservative": {
+        "education_background": [DEGREE_TIERS],
+        "work_stability": [("experience_count", ((2, 15),)), ("few_jobs", ((1, 10),))],
+        "culture_fit": [("has_education", ((1, 10),)), ("experience_count", ((2, 10),))],
+        "basic_skills": [("skills_count", ((3, 15), (1, 10)))],
+        "character_assessment": [("complete_resume", ((1, 15),))]
+    },
+    "progressive": {
+        "learning_potential": [("skills_count", ((5, 15),)), ("projects_count", ((2, 10),))],
+        "innovation_thinking": [("projects_count", ((3, 15),)), ("innovative_projects", ((1, 10),))],
+        "adaptability": [("experience_count", ((2, 10),)), ("skills_count", ((6, 10),))],
+        "soft_skills": [("experience_count", ((2, 10),)), ("projects_count", ((2, 10),))],
+        "current_skills_match": [("skills_count", ((5, 15), (3, 10)))]
+    },
+    "technical": {
+        "technical_depth": [("core_tech_skills", ((5, 20), (3, 15)))],
+        "project_complexity": [("projects_count", ((3, 20), (2, 15), (1, 10)))],
+        "technical_breadth": [("skills_count", ((8, 20), (6, 15)))],
+        "practical_experience": [("practical_level", ((2, 20), (1, 10)))],
+        "technical_vision": [("modern_tech_skills", ((2, 15), (1, 10)))]
+    }
+}
+
+# 维度名不在规则表中时，按名称包含的关键词（按顺序匹配）套用通用规则
+GENERIC_RULES: List[Tuple[str, List[Rule]]] = [
+    ("experience", [EXPERIENCE_TIERS]),
+    ("skill", [SKILLS_TIERS]),
+    ("education", [DEGREE_TIERS])
+]
+
+# 各人设的维度互不重名，合并后按维度名查找
+METRIC_RULES: Dict[str, List[Rule]] = {
+    metric: rules for persona_rules in HR_SCORING_RULES.values() for metric, rules in persona_rules.items()
+}
+
+
+def rules_for(metric: str) -> List[Rule]:
+    rules = METRIC_RULES.get(metric)
+    if rules is not None:
+        return rules
+    name = metric.lower()
+    return next((rules for keyword, rules in GENERIC_RULES if keyword in name), [])
+
+
+def score_metric(metric: str, features: ResumeFeatures) -> int:
+    """按规则表给单个维度打分"""
+    total = BASE_SCORE
+    for feature, tiers in rules_for(metric):
+        value = getattr(features, feature)
+        total += next((points for threshold, points in tiers if value >= threshold), 0)
+    return min(MAX_SCORE, max(MIN_SCORE, total))
+
+
+def score_metrics(metrics: Any, features: ResumeFeatures) -> Dict[str, int]:
+    """一次给所有维度打分（metrics 通常是人设的 weights）"""
+    return {metric: score_metric(metric, features) for metric in metrics}
+
+
+def weighted_score(scores: Dict[str, float], weights: Dict[str, float]) -> int:
+    """按权重计算总分；权重和不为1时按权重和归一化"""
+    total_weight = sum(weights.values())
+    if total_weight <= 0:
+        return BASE_SCORE
+    return round(sum(scores.get(metric, BASE_SCORE) * weight for metric, weight in weights.items()) / total_weight)
@@ -0,0 +1,103 @@
+"""
+Shared HTTP clients.
+
+所有出站HTTP请求（OpenAI兼容接口、联网搜索、Serper）复用同一组 keep-alive 连接池，
+而不是每个模块各建一个客户端、每次 requests.post 都重新握手：
+- sync_client / async_client：进程内共享的 httpx.Client / httpx.AsyncClient，连接数和超时来自 Settings
+- openai / async_openai：按 (api_key, base_url, max_retries) 缓存的 OpenAI 客户端，底层共用上面的连接池
+"""
+
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+import httpx
+from openai import OpenAI, AsyncOpenAI, DEFAULT_MAX_RETRIES
+
+from config import settings
+
+
+class HTTPClientRegistry:
+    """懒创建并复用 HTTP / OpenAI 客户端；应用关闭时调用 aclose() 释放连接"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._openai_clients: Dict[Tuple[str, str, int], OpenAI] = {}
+        self._async_openai_clients: Dict[Tuple[str, str, int], AsyncOpenAI] = {}
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry
+        )
+
+    @staticmethod
+    def _timeout() -> httpx.Timeout:
+        # 读超时按LLM长回复设置；单次调用可以用 timeout 参数覆盖
+        return httpx.Timeout(settings.http_read_timeout, connect=settings.http_connect_timeout)
+
+    def sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._sync_client is None or self._sync_client.is_closed:
+                self._sync_client = httpx.Client(limits=self._limits(), timeout=self._timeout())
+            return self._sync_client
+
+    def async_client(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._async_client is None or self._async_client.is_closed:
+                self._async_client = httpx.AsyncClient(limits=self._limits(), timeout=self._timeout())
+            return self._async_client
+
+    def openai(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+               max_retries: int = DEFAULT_MAX_RETRIES) -> OpenAI:
+        """默认使用 OPENAI_API_KEY / OPENAI_API_BASE"""
+        key = (api_key or settings.openai_api_key, base_url or settings.openai_api_base, max_retries)
+        client = self._openai_clients.get(key)
+        if client is None:
+            http_client = self.sync_client()
+            with self._lock:
+                client = self._openai_clients.setdefault(
+                    key, OpenAI(api_key=key[0], base_url=key[1], max_retries=max_retries, http_client=http_client)
+                )
+        return client
+
+    def async_openai(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                     max_retries: int = DEFAULT_MAX_RETRIES) -> AsyncOpenAI:
+        key = (api_key or settings.openai_api_key, base_url or settings.openai_api_base, max_retries)
+        client = self._async_openai_clients.get(key)
+        if client is None:
+            http_client = self.async_client()
+            with self._lock:
+                client = self._async_openai_clients.setdefault(
+                    key, AsyncOpenAI(api_key=key[0], base_url=key[1], max_retries=max_retries, http_client=http_client)
+                )
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sync_client_open": self._sync_client is not None and not self._sync_client.is_closed,
+            "async_client_open": self._async_client is not None and not self._async_client.is_closed,
+            "openai_clients": len(self._openai_clients),
+            "async_openai_clients": len(self._async_openai_clients),
+            "max_connections": settings.http_max_connections,
+            "max_keepalive_connections": settings.http_max_keepalive_connections
+        }
+
+    async def aclose(self):
+        """关闭连接池；之后再次使用时会重新创建客户端"""
+        with self._lock:
+            sync_client, self._sync_client = self._sync_client, None
+            async_client, self._async_client = self._async_client, None
+            self._openai_clients.clear()
+            self._async_openai_clients.clear()
+        if sync_client is not None:
+            sync_client.close()
+        if async_client is not None:
+            await async_client.aclose()
+
+
+# Global HTTP client registry instance
+http_clients = HTTPClientRegistry()
@@ -0,0 +1,295 @@
+"""
+Background job queue for long-running agent workflows.
+
+提交任务后立即返回任务ID，任务在进程内的worker池中执行，状态、进度和部分结果
+持久化到SQLite（background_jobs表），客户端通过 GET /api/jobs/{id} 轮询。
+
+多个进程共用同一个数据库时（负载均衡后的多个实例）：worker 用条件 UPDATE 认领任务，
+同一任务只会被一个进程执行；执行中的任务定期写心跳，心跳超时（进程已退出）的任务标记为失败。
+取消请求可以由任一进程接收：写入 cancel_requested 后，执行该任务的进程在下一次心跳时取消它。
+"""
+
+import os
+import uuid
+import socket
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+from loguru import logger
+
+from config import settings
+from rate_limiter import request_priority
+from database import (
+    SessionLocal, BackgroundJob, create_background_job, get_background_job,
+    get_background_jobs, update_background_job, transition_background_job,
+    touch_background_jobs, fail_stale_background_jobs, get_cancel_requested_job_ids
+)
+
+# 终止状态
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class JobContext:
+    """传给任务处理函数的上下文，用于上报进度和部分结果"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._partial_results: List[Any] = []
+
+    def report(self, progress: Optional[float] = None, message: Optional[str] = None, partial: Any = None):
+        """更新进度；partial不为空时追加到部分结果列表"""
+        fields: Dict[str, Any] = {}
+        if progress is not None:
+            fields["progress"] = max(0.0, min(1.0, float(progress)))
+        if message is not None:
+            fields["message"] = message[:500]
+        if partial is not None:
+            self._partial_results.append(partial)
+            # 赋值新列表，确保JSON列的变更被SQLAlchemy检测到
+            fields["partial_results"] = list(self._partial_results)
+        if fields:
+            JobManager._update(self.job_id, **fields)
+
+
+JobHandler = Callable[[JobContext, Dict[str, Any]], Awaitable[Any]]
+
+
+class JobManager:
+    """In-process worker pool backed by the background_jobs table."""
+
+    def __init__(self, worker_count: int = 2):
+        self.worker_count = worker_count
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+        # 本进程的标识，写入认领的任务
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def register(self, job_type: str):
+        """注册任务处理函数的装饰器"""
+        def decorator(handler: JobHandler) -> JobHandler:
+            self._handlers[job_type] = handler
+            return handler
+        return decorator
+
+    @property
+    def job_types(self) -> List[str]:
+        return sorted(self._handlers)
+
+    async def start(self):
+        """启动worker；上次进程退出时未完成的任务在这里处理"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._recover_jobs()
+        for i in range(max(1, self.worker_count)):
+            self._workers.append(asyncio.create_task(self._worker(i)))
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        logger.info(f"Job manager {self.owner} started with {len(self._workers)} workers")
+
+    async def stop(self):
+        """取消正在执行的任务并等待其记录为已取消，再停止worker"""
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+            self._heartbeat = None
+        running = list(self._running.values())
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Job manager stopped")
+
+    def submit(self, job_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """提交任务，返回任务信息（含job_id）"""
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        if self._queue is None:
+            raise RuntimeError("Job manager is not started")
+
+        job_id = uuid.uuid4().hex
+        db = SessionLocal()
+        try:
+            job = create_background_job(db, job_id, job_type, params)
+            info = self._to_dict(job)
+        finally:
+            db.close()
+
+        self._queue.put_nowait(job_id)
+        logger.info(f"Submitted {job_type} job {job_id}")
+        return info
+
+    def get(self, job_id: str, include_result: bool = True) -> Optional[Dict[str, Any]]:
+        """查询任务状态"""
+        db = SessionLocal()
+        try:
+            job = get_background_job(db, job_id)
+            return self._to_dict(job, include_result) if job else None
+        finally:
+            db.close()
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """列出最近的任务（不含完整结果）"""
+        db = SessionLocal()
+        try:
+            return [self._to_dict(job, include_result=False) for job in get_background_jobs(db, status, 0, limit)]
+        finally:
+            db.close()
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        取消任务：排队中的直接标记取消，执行中的取消其协程（同时中断进行中的LLM调用）。
+        任务在其他进程执行时只写入 cancel_requested，由该进程在下一次心跳时取消
+        """
+        job = self.get(job_id, include_result=False)
+        if job is None:
+            return None
+        if job["status"] in FINISHED_STATUSES:
+            return job
+
+        # 条件更新：任务若刚被某个worker认领，则按执行中的任务处理
+        cancelled_in_queue = job["status"] == "queued" and JobManager._transition(
+            job_id, "queued", status="cancelled", cancel_requested=True,
+            message="任务已取消", finished_at=datetime.utcnow()
+        )
+        if not cancelled_in_queue:
+            JobManager._update(job_id, cancel_requested=True)
+            task = self._running.get(job_id)
+            if task is not None:
+                task.cancel()
+        return self.get(job_id, include_result=False)
+
+    async def _worker(self, worker_index: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(f"Job worker {worker_index} failed on {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        # 认领：queued -> running 一次条件更新完成，已取消或已被其他worker/进程认领时跳过
+        now = datetime.utcnow()
+        if not JobManager._transition(job_id, "queued", status="running", owner=self.owner,
+                                      started_at=now, heartbeat_at=now):
+            return
+        job = self.get(job_id, include_result=False)
+
+        handler = self._handlers.get(job["job_type"])
+        if handler is None:
+            JobManager._update(job_id, status="failed", error=f"Unknown job type: {job['job_type']}",
+                               finished_at=datetime.utcnow())
+            return
+
+        context = JobContext(job_id)
+        # 后台任务中的LLM调用排在交互请求之后（任务创建时继承优先级）
+        with request_priority("batch"):
+            task = asyncio.create_task(handler(context, job["params"] or {}))
+        self._running[job_id] = task
+        try:
+            result = await task
+            # 结束状态同样按 running 条件写入：心跳超时已被判定失败的任务不再覆盖
+            JobManager._transition(job_id, "running", status="succeeded", progress=1.0, result=result,
+                                   message="任务完成", finished_at=datetime.utcnow())
+        except asyncio.CancelledError:
+            JobManager._transition(job_id, "running", status="cancelled", message="任务已取消",
+                                   finished_at=datetime.utcnow())
+            # worker自身被取消（进程关闭）时继续向上抛出，否则worker会吞掉取消、stop() 一直等待
+            if not task.cancelled() or asyncio.current_task().cancelling():
+                raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            JobManager._transition(job_id, "running", status="failed", error=str(e),
+                                   finished_at=datetime.utcnow())
+        finally:
+            self._running.pop(job_id, None)
+
+    def _recover_jobs(self):
+        """
+        启动时：心跳超时的running任务（执行进程已退出）标记为失败，其他进程仍在执行的任务不受影响；
+        queued任务放入本进程队列，执行前的认领保证不会被多个进程重复执行
+        """
+        db = SessionLocal()
+        try:
+            interrupted = self._fail_stale_jobs(db)
+            queued = db.query(BackgroundJob.id).filter(BackgroundJob.status == "queued") \
+                .order_by(BackgroundJob.created_at).all()
+            for (job_id,) in queued:
+                self._queue.put_nowait(job_id)
+            if interrupted or queued:
+                logger.info(f"Recovered jobs: {len(queued)} re-queued, {interrupted} marked failed")
+        finally:
+            db.close()
+
+    @staticmethod
+    def _fail_stale_jobs(db) -> int:
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.job_stale_seconds)
+        return fail_stale_background_jobs(db, stale_before, "任务因服务重启中断")
+
+    async def _heartbeat_loop(self):
+        """定期为本进程执行中的任务写心跳、取消被其他进程请求取消的任务，并清理已退出进程遗留的running任务"""
+        while True:
+            await asyncio.sleep(settings.job_heartbeat_interval)
+            db = SessionLocal()
+            try:
+                running_ids = list(self._running)
+                touch_background_jobs(db, self.owner, running_ids, datetime.utcnow())
+                for job_id in get_cancel_requested_job_ids(db, running_ids):
+                    task = self._running.get(job_id)
+                    if task is not None and not task.done():
+                        logger.info(f"Cancelling job {job_id} on request from another process")
+                        task.cancel()
+                failed = self._fail_stale_jobs(db)
+                if failed:
+                    logger.warning(f"Marked {failed} stale running jobs as failed")
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {e}")
+            finally:
+                db.close()
+
+    @staticmethod
+    def _transition(job_id: str, from_status: str, **fields) -> bool:
+        db = SessionLocal()
+        try:
+            return transition_background_job(db, job_id, from_status, **fields)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _update(job_id: str, **fields):
+        db = SessionLocal()
+        try:
+            update_background_job(db, job_id, **fields)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _to_dict(job: BackgroundJob, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": job.id,
+            "job_type": job.job_type,
+            "status": job.status,
+            "progress": job.progress,
+            "message": job.message,
+            "params": job.params,
+            "error": job.error,
+            "cancel_requested": job.cancel_requested,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None
+        }
+        if include_result:
+            data["partial_results"] = job.partial_results or []
+            data["result"] = job.result
+        return data
+
+
+# Global job manager instance
+job_manager = JobManager(worker_count=settings.job_workers)
@@ -0,0 +1,359 @@
+r"""
+JSON helpers for parsing LLM output.
+
+- extract_json：从LLM回复中提取JSON（```json 代码块 -> 括号配对扫描 -> 宽松修复），
+  取代各处的 re.search(r'\{.*\}', ..., re.DOTALL) + json.loads
+- repair_json：修复LLM常见的JSON错误（尾随逗号、单引号、注释、True/None、输出被截断等）
+- loads：安装了 orjson 时使用 orjson，否则使用标准库 json
+- StreamingJSONSectionParser：流式输出时按顶层字段增量解析
+"""
+
+import re
+import json
+from typing import List, Any, Tuple, Optional, Iterator, Callable
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+# ``` 之后的语言标记（```json、```JSON 或省略）
+_FENCE_HEADER = re.compile(r"[ \t]*(?:json|JSON|javascript|js)?[ \t]*\r?\n?")
+# 括号扫描的记号：完整（或截断到末尾）的双引号字符串，或任一括号
+_SPAN_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"?|[{}\[\]]')
+_OPENER_PATTERNS = {"{": re.compile(r"\{"), "[": re.compile(r"\["), "{[": re.compile(r"[{\[]")}
+_IDENTIFIER = re.compile(r"[A-Za-z_$][\w$\-]*")
+_LITERALS = {"true": "true", "false": "false", "null": "null",
+             "True": "true", "False": "false", "None": "null",
+             "NaN": "null", "undefined": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+_QUOTE_PAIRS = {'"': '"', "'": "'", "\u201c": "\u201d", "\u2018": "\u2019"}
+_STRING_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+# 字符串内无需处理的连续字符（按结束引号区分），以及字符串外的空白和数字
+_STRING_CHUNKS = {
+    quote: re.compile("[^" + re.escape(quote + '"\\\n\r\t') + "]+") for quote in _QUOTE_PAIRS.values()
+}
+_PLAIN_RUN = re.compile(r"[\s0-9.+\-]+")
+_MISSING = object()
+
+
+def loads(text: Any) -> Any:
+    """解析JSON文本；优先使用 orjson，遇到 orjson 不接受的输入（如 NaN）时回退到标准库"""
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+
+def iter_fenced_blocks(text: str) -> Iterator[str]:
+    """依次返回 ```json ... ``` 代码块的内容（语言标记可省略，未闭合的代码块取到末尾）"""
+    pos = text.find("```")
+    while pos >= 0:
+        header = _FENCE_HEADER.match(text, pos + 3)
+        start = header.end()
+        end = text.find("```", start)
+        yield text[start:end if end >= 0 else len(text)].strip()
+        if end < 0:
+            return
+        pos = text.find("```", end + 3)
+
+
+def iter_json_spans(text: str, openers: str = "{[") -> Iterator[Tuple[int, Optional[int]]]:
+    """
+    括号配对扫描，依次返回顶层JSON候选片段 (start, end)。
+
+    字符串整体由预编译正则跳过（其中的括号和转义引号不参与配对），
+    末尾未闭合的片段（输出被截断）返回 (start, None)；括号类型不匹配的片段放弃，从下一个字符重新查找。
+    """
+    opener_pattern = _OPENER_PATTERNS.get(openers) or re.compile("[" + re.escape(openers) + "]")
+    pos = 0
+    while True:
+        first = opener_pattern.search(text, pos)
+        if not first:
+            return
+        start = first.start()
+        stack = [text[start]]
+        end = None
+        mismatched = False
+        for token in _SPAN_TOKEN.finditer(text, start + 1):
+            char = token.group()[0]
+            if char == '"':
+                continue
+            if char in "{[":
+                stack.append(char)
+            elif _CLOSERS[stack.pop()] != char:
+                mismatched = True
+                break
+            elif not stack:
+                end = token.end()
+                break
+
+        if mismatched:
+            pos = start + 1
+            continue
+        yield start, end
+        if end is None:
+            return
+        pos = end
+
+
+def repair_json(text: str) -> str:
+    """
+    宽松修复LLM输出中常见的JSON错误：
+    尾随逗号、单引号或中文引号作字符串界定符、// 与 /* */ 注释、未加引号的键、
+    Python 风格的 True/False/None、字符串内的裸换行，以及输出截断导致的未闭合字符串和括号。
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    # 上一个有效记号：open / comma / colon / key / value，用于判断截断位置
+    last = "value"
+    length = len(text)
+    i = 0
+
+    while i < length:
+        char = text[i]
+
+        if char in _QUOTE_PAIRS:
+            # 字符串（含单引号、中文引号界定的字符串）统一输出为双引号字符串；截断时直接补上引号
+            terminator = _QUOTE_PAIRS[char]
+            chars: List[str] = []
+            i += 1
+            plain = _STRING_CHUNKS[terminator]
+            while i < length:
+                run = plain.match(text, i)
+                if run:
+                    chars.append(run.group())
+                    i = run.end()
+                    continue
+                c = text[i]
+                if c == "\\" and i + 1 < length:
+                    nxt = text[i + 1]
+                    chars.append(nxt if nxt == "'" else c + nxt)
+                    i += 2
+                    continue
+                i += 1
+                if c == terminator:
+                    break
+                if c == '"':
+                    chars.append('\\"')
+                elif c != "\\":
+                    chars.append(_STRING_ESCAPES.get(c, c))
+            out.append('"' + "".join(chars) + '"')
+            last = "key" if stack and stack[-1] == "{" and last in ("open", "comma") else "value"
+            continue
+
+        if char == "/" and text.startswith("//", i):
+            newline = text.find("\n", i)
+            i = length if newline < 0 else newline
+            continue
+        if char == "/" and text.startswith("/*", i):
+            close = text.find("*/", i + 2)
+            i = length if close < 0 else close + 2
+            continue
+
+        if char in "{[":
+            stack.append(char)
+            out.append(char)
+            last = "open"
+        elif char in "}]":
+            _strip_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(char)
+            last = "value"
+        elif char == ",":
+            out.append(char)
+            last = "comma"
+        elif char == ":":
+            out.append(char)
+            last = "colon"
+        else:
+            run = _PLAIN_RUN.match(text, i)
+            if run:
+                # 空白和数字原样输出
+                out.append(run.group())
+                if not run.group().isspace():
+                    last = "value"
+                i = run.end()
+                continue
+            match = _IDENTIFIER.match(text, i)
+            if match:
+                word = match.group()
+                i = match.end()
+                rest = text[i:i + 64].lstrip()
+                if stack and stack[-1] == "{" and last in ("open", "comma") and rest.startswith(":"):
+                    out.append(json.dumps(word))
+                    last = "key"
+                else:
+                    out.append(_LITERALS.get(word, word))
+                    last = "value"
+                continue
+            out.append(char)
+            last = "value"
+        i += 1
+
+    # 截断修复：补全悬空的键值，去掉末尾逗号，按栈补齐括号
+    if stack:
+        if last == "key":
+            out.append(": null")
+        elif last == "colon":
+            out.append(" null")
+        elif last == "comma":
+            _strip_trailing_comma(out)
+        out.extend(_CLOSERS[opener] for opener in reversed(stack))
+    return "".join(out)
+
+
+def _strip_trailing_comma(out: List[str]):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _json_candidates(text: str, openers: str, repair: bool) -> Iterator[str]:
+    """
+    候选顺序：整段回复本身就是JSON（最常见，C实现直接解析）-> 代码块内容 ->
+    全文中配对的片段 -> 截断的末尾片段（仅修复模式）
+    """
+    stripped = text.strip()
+    if stripped and stripped[0] in openers and stripped[-1] == _CLOSERS[stripped[0]]:
+        yield stripped
+    for content in iter_fenced_blocks(text):
+        if content[:1] in openers:
+            yield content
+    for start, end in iter_json_spans(text, openers):
+        if end is not None:
+            yield text[start:end]
+        elif repair:
+            yield text[start:]
+
+
+def _parse_candidate(candidate: str, expect: Optional[type], repair: bool,
+                     validate: Optional[Callable[[Any], bool]]) -> Any:
+    try:
+        value = loads(candidate)
+    except ValueError:
+        if not repair:
+            return _MISSING
+        try:
+            value = loads(repair_json(candidate))
+        except ValueError:
+            return _MISSING
+    if expect is not None and not isinstance(value, expect):
+        return _MISSING
+    if validate is not None and not validate(value):
+        return _MISSING
+    return value
+
+
+def extract_json(text: Optional[str], expect: Optional[type] = dict, default: Any = None,
+                 repair: bool = True, validate: Optional[Callable[[Any], bool]] = None) -> Any:
+    """
+    从LLM回复中提取第一个可解析的JSON值。
+
+    Args:
+        text: LLM原始回复（可包含说明文字、```json 代码块）
+        expect: 期望的类型（dict / list），None 表示对象和数组均可
+        default: 提取失败时的返回值
+        repair: 直接解析失败时是否尝试 repair_json
+        validate: 额外校验，返回 False 的候选跳过（如正文中的引用标记 [1]）
+    """
+    if not text:
+        return default
+    openers = "{" if expect is dict else "[" if expect is list else "{["
+    for candidate in _json_candidates(text, openers, repair):
+        value = _parse_candidate(candidate, expect, repair, validate)
+        if value is not _MISSING:
+            return value
+    return default
+
+
+class StreamingJSONSectionParser:
+    """
+    增量解析流式输出的JSON对象。
+
+    每次feed一段文本，返回新完成的顶层字段 [(key, value), ...]，
+    这样 personal_info、professional_summary 等字段在整体输出结束前就可以推送给前端。
+    对象之前的说明文字或 ```json 代码块标记会被忽略。
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._state = "start"        # start -> key -> colon -> value -> key ... -> done
+        self._key_start: Optional[int] = None
+        self._current_key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self.sections: List[Tuple[str, Any]] = []
+
+    @property
+    def done(self) -> bool:
+        """顶层对象是否已经闭合"""
+        return self._state == "done"
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """追加一段文本，返回本次新完成的顶层字段"""
+        self._buffer += chunk
+        completed = []
+        buffer = self._buffer
+
+        while self._pos < len(buffer) and self._state != "done":
+            pos = self._pos
+            char = buffer[pos]
+            self._pos += 1
+
+            if self._state == "start":
+                if char == "{":
+                    self._depth = 1
+                    self._state = "key"
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._state == "key":
+                        self._current_key = json.loads(buffer[self._key_start:pos + 1])
+                        self._state = "colon"
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._state == "key":
+                    self._key_start = pos
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._state == "value":
+                        self._emit(buffer[self._value_start:pos], completed)
+                    self._state = "done"
+            elif self._depth == 1:
+                if char == ":" and self._state == "colon":
+                    self._state = "value"
+                    self._value_start = pos + 1
+                elif char == "," and self._state == "value":
+                    self._emit(buffer[self._value_start:pos], completed)
+                    self._state = "key"
+
+        return completed
+
+    def _emit(self, value_text: str, completed: List[Tuple[str, Any]]):
+        """解析完成的字段值；无法解析的字段跳过，留给最终的整体解析处理"""
+        try:
+            value = json.loads(value_text)
+        except json.JSONDecodeError:
+            return
+        section = (self._current_key, value)
+        self.sections.append(section)
+        completed.append(section)
@@ -0,0 +1,139 @@
+"""
+Lexical (BM25) index for hybrid job search.
+
+向量检索对 "Vue.js"、"K8s" 这类精确技能词不敏感，这里在ChromaDB集合旁维护一个
+内存BM25倒排索引，并用倒数排名融合 (RRF) 合并两路结果。
+中文优先使用 jieba 分词（可选依赖），未安装时退化为字符二元组。
+"""
+
+import re
+import math
+import threading
+import unicodedata
+from collections import Counter
+from typing import List, Dict, Tuple, Iterable, Optional
+
+try:
+    import jieba
+    jieba.setLogLevel(60)
+except ImportError:
+    jieba = None
+
+# 英文/数字技能词，保留 . + # - 以识别 vue.js、c++、c#、k8s
+_ASCII_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*[a-z0-9+#]|[a-z0-9]")
+_CJK_RUN = re.compile(r"[㐀-鿿]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """分词：英文技能词 + 中文词（jieba）或字符二元组"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens = []
+    for token in _ASCII_TOKEN.findall(text):
+        tokens.append(token)
+        # vue.js 同时索引 vue，便于只输入 "Vue" 的查询命中
+        parts = [part for part in re.split(r"[.\-]", token) if part]
+        if len(parts) > 1:
+            tokens.extend(parts)
+
+    for run in _CJK_RUN.findall(text):
+        if jieba is not None:
+            tokens.extend(word for word in jieba.lcut_for_search(run) if word.strip())
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class BM25Index:
+    """Thread-safe in-memory BM25 inverted index keyed by document ID."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_lengths
+
+    def add(self, doc_id: str, text: str):
+        """添加或替换文档"""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            self._doc_terms[doc_id] = terms
+            length = sum(terms.values())
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+
+    def add_many(self, documents: Iterable[Tuple[str, str]]):
+        for doc_id, text in documents:
+            self.add(doc_id, text)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_lengths.clear()
+            self._total_length = 0
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """返回按BM25得分排序的 [(doc_id, score), ...]"""
+        query_terms = set(tokenize(query))
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not doc_count or not query_terms:
+                return []
+            avg_length = self._total_length / doc_count or 1.0
+
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:top_k]
+
+    def _remove(self, doc_id: str):
+        """删除文档（调用方持有锁）"""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id, 0)
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60,
+                           weights: Optional[List[float]] = None) -> List[Tuple[str, float]]:
+    """倒数排名融合：score(d) = Σ w_i / (k + rank_i(d))，rank从1开始"""
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
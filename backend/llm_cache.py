@@ -0,0 +1,187 @@
+"""
+LLM completion cache for Job Planner Assistant.
+
+两级缓存：进程内LRU + ./data 下的SQLite持久化缓存，键为 (model, messages, temperature, js)。
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from loguru import logger
+
+from config import settings
+
+
+class LLMResponseCache:
+    """Prompt -> completion cache with an in-memory LRU tier and an on-disk SQLite tier."""
+
+    def __init__(self, db_path: str, memory_size: int = 256, max_entries: int = 5000,
+                 ttl_seconds: int = 7 * 24 * 3600, max_temperature: float = 0.7, enabled: bool = True):
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self.enabled = enabled
+
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "writes": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(model_name: str, messages: List[Dict[str, str]], temperature: float, js: bool) -> str:
+        """根据请求参数生成稳定的缓存键"""
+        payload = json.dumps(
+            {"model": model_name, "messages": messages, "temperature": temperature, "js": js},
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def should_cache(self, temperature: float) -> bool:
+        """高温度调用（如自我介绍）需要多样性，不走缓存"""
+        if not self.enabled:
+            return False
+        if temperature > self.max_temperature:
+            with self._lock:
+                self._stats["bypassed"] += 1
+            return False
+        return True
+
+    def get(self, key: str) -> Optional[str]:
+        """先查内存，再查SQLite；命中磁盘时回填内存"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            try:
+                conn = self._get_connection()
+                row = conn.execute(
+                    "SELECT response, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    if expires_at > now:
+                        conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                        conn.commit()
+                        self._remember(key, value, expires_at)
+                        self._stats["disk_hits"] += 1
+                        return value
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache read failed: {e}")
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, model_name: str, value: str):
+        """写入两级缓存，超出容量时按最近访问时间淘汰"""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._stats["writes"] += 1
+            try:
+                conn = self._get_connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, last_access, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model_name, value, now, now, expires_at)
+                )
+                self._evict_disk(conn, now)
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache write failed: {e}")
+
+    def clear(self):
+        """清空所有缓存"""
+        with self._lock:
+            self._memory.clear()
+            try:
+                conn = self._get_connection()
+                conn.execute("DELETE FROM llm_cache")
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache clear failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """命中/未命中统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            try:
+                stats["disk_entries"] = self._get_connection().execute(
+                    "SELECT COUNT(*) FROM llm_cache"
+                ).fetchone()[0]
+            except sqlite3.Error:
+                stats["disk_entries"] = None
+
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        """写入内存LRU（调用方持有锁）"""
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, conn: sqlite3.Connection, now: float):
+        """删除过期条目，并按last_access淘汰超出max_entries的部分（调用方持有锁）"""
+        expired = conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,)).rowcount
+        total = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        overflow = total - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+        self._stats["evictions"] += max(expired, 0) + max(overflow, 0)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """延迟创建SQLite连接（调用方持有锁）"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+
+# Global cache instance
+llm_cache = LLMResponseCache(
+    db_path=settings.llm_cache_path,
+    memory_size=settings.llm_cache_memory_size,
+    max_entries=settings.llm_cache_max_entries,
+    ttl_seconds=settings.llm_cache_ttl_seconds,
+    max_temperature=settings.llm_cache_max_temperature,
+    enabled=settings.llm_cache_enabled
+)
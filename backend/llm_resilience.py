@@ -0,0 +1,240 @@
+"""
+Retry, backoff and circuit breaking for LLM calls.
+
+- classify_error：把 OpenAI SDK / 网络异常归类为 rate_limit、server、timeout、connection、client 等
+- RetryPolicy：指数退避 + full jitter，服务端返回 Retry-After 时按其等待
+- CircuitBreaker：按模型统计连续失败，提供方故障期间直接失败，不再排队等待超时
+- LLMResponse：带 degraded 标记的字符串，LLM不可用而返回演示数据时由调用方显式标出
+"""
+
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Callable
+
+import openai
+
+from rate_limiter import RateLimitTimeout
+
+# 可以重试的错误类型；client（400/401/403/404等）重试也不会成功
+RETRYABLE_ERRORS = {"rate_limit", "server", "timeout", "connection", "invalid_response"}
+# 计入熔断的错误类型：提供方不可用，而不是请求本身有问题
+PROVIDER_ERRORS = {"server", "timeout", "connection"}
+
+
+class CircuitOpenError(Exception):
+    """熔断期间拒绝调用"""
+
+    def __init__(self, model: str, retry_in: float):
+        super().__init__(f"Circuit open for model {model}, retry in {retry_in:.1f}s")
+        self.model = model
+        self.retry_in = retry_in
+
+
+class LLMResponse(str):
+    """
+    模型返回的文本。degraded=True 表示这不是模型的真实输出（如服务不可用时的演示数据），
+    error / error_type 记录原因。可以像普通字符串一样使用。
+    """
+
+    degraded: bool = False
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+
+    def __new__(cls, content: str, degraded: bool = False, error: Optional[str] = None,
+                error_type: Optional[str] = None):
+        instance = super().__new__(cls, content)
+        instance.degraded = degraded
+        instance.error = error
+        instance.error_type = error_type
+        return instance
+
+
+def is_degraded(content: Any) -> bool:
+    return bool(getattr(content, "degraded", False))
+
+
+def first_degraded(contents: Any) -> Any:
+    """多个模型输出中第一个演示数据；没有时返回None"""
+    return next((content for content in contents or [] if is_degraded(content)), None)
+
+
+def keep_degraded(source: Any, content: str) -> Any:
+    """对模型输出做 strip、替换等处理后保留原输出的 degraded 标记"""
+    if not is_degraded(source):
+        return content
+    return LLMResponse(content, degraded=True, error=source.error, error_type=source.error_type)
+
+
+def mark_degraded(result: Dict[str, Any], content: Any) -> Dict[str, Any]:
+    """模型输出为演示数据时，在返回结果的 data 中标出 degraded 及原因，而不是静默替换"""
+    if is_degraded(content):
+        target = result.get("data") if isinstance(result.get("data"), dict) else result
+        target["degraded"] = True
+        target["degraded_reason"] = content.error_type
+    return result
+
+
+def classify_error(error: BaseException) -> str:
+    """异常分类：rate_limit / server / timeout / connection / client / circuit_open / queue_timeout / invalid_response / unknown"""
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(error, RateLimitTimeout):
+        # 本地排队超时，与提供方无关：不重试也不计入熔断
+        return "queue_timeout"
+    if isinstance(error, openai.APITimeoutError) or isinstance(error, TimeoutError):
+        return "timeout"
+    if isinstance(error, openai.APIConnectionError) or isinstance(error, ConnectionError):
+        return "connection"
+    if isinstance(error, openai.APIStatusError):
+        status = error.status_code
+        if status == 429:
+            return "rate_limit"
+        if status == 408:
+            return "timeout"
+        if status >= 500:
+            return "server"
+        return "client"
+    if isinstance(error, ValueError):
+        # _extract_content：空响应、格式异常
+        return "invalid_response"
+    return "unknown"
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """读取 retry-after-ms / retry-after 响应头（秒数或HTTP日期）"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """指数退避 + full jitter；Retry-After 超过 max_delay 时不再等待，直接失败"""
+
+    def __init__(self, max_retries: int, base_delay: float, max_delay: float,
+                 rng: Callable[[], float] = random.random):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng
+
+    def next_delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """第 attempt 次（从0开始）失败后的等待秒数；不应重试时返回None"""
+        if attempt >= self.max_retries or classify_error(error) not in RETRYABLE_ERRORS:
+            return None
+        backoff = self.rng() * min(self.max_delay, self.base_delay * (2 ** attempt))
+        retry_after = retry_after_seconds(error)
+        if retry_after is None:
+            return backoff
+        if retry_after > self.max_delay:
+            return None
+        # 按 Retry-After 等待，再加少量抖动避免同时醒来
+        return retry_after + backoff * 0.1
+
+
+class CircuitBreaker:
+    """
+    单个模型的熔断器：closed -> 连续 failure_threshold 次提供方错误 -> open，
+    reset_timeout 秒后进入 half_open 放行一个探测请求，成功则 closed，失败重新 open。
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self, model: str) -> bool:
+        """熔断时抛出 CircuitOpenError；放行的是 half_open 探测请求时返回True"""
+        with self._lock:
+            if self.state == "closed":
+                return False
+            elapsed = self.clock() - self.opened_at
+            if self.state == "open" and elapsed >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            raise CircuitOpenError(model, max(0.0, self.reset_timeout - elapsed))
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self, error: BaseException):
+        if classify_error(error) not in PROVIDER_ERRORS:
+            # 限流、参数错误说明服务可用，只结束探测
+            with self._lock:
+                if self.state == "half_open":
+                    self._probing = False
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = self.clock()
+                self._probing = False
+
+    def abort_probe(self):
+        """探测请求没有结果就结束（如被取消）时释放探测名额，下一个请求重新探测"""
+        with self._lock:
+            if self.state == "half_open":
+                self._probing = False
+
+    def available(self) -> bool:
+        """熔断未打开，或已到探测时间（不改变状态）"""
+        with self._lock:
+            return self.state != "open" or self.clock() - self.opened_at >= self.reset_timeout
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures}
+
+
+class CircuitBreakerRegistry:
+    """按模型名懒创建熔断器"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._breakers[model] = breaker
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {model: breaker.snapshot() for model, breaker in breakers.items()}
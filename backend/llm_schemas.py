@@ -0,0 +1,201 @@
+"""
+Pydantic schemas for structured LLM output.
+
+每个阶段的JSON输出都声明一个schema：LLMService 以 JSON 模式请求并校验，
+校验失败时只把校验错误发回模型，要求返回需要修正的顶层字段，合并后再校验，
+而不是丢弃整个输出、退回硬编码的默认数据（见 LLMService.call_structured）。
+
+schema 只约束下游代码依赖的字段，其余字段原样保留（extra="allow"）。
+"""
+
+import json
+from typing import List, Dict, Any, Optional, Union, Type, Annotated
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from json_utils import extract_json
+
+Score = Annotated[Union[int, float], Field(ge=0, le=100)]
+
+REPAIR_PROMPT = """你上一次输出的JSON未通过格式校验，错误如下：
+{errors}
+
+请只返回一个JSON对象，其中仅包含需要修正的顶层字段（{fields}）的完整正确值，不要重复其他字段，不要添加任何说明文字。"""
+
+REGENERATE_PROMPT = "你上一次的输出不是合法的JSON对象。请只返回修正后的完整JSON对象，不要添加任何说明文字。"
+
+
+class LLMOutput(BaseModel):
+    """所有结构化输出的基类：允许额外字段"""
+
+    model_config = ConfigDict(extra="allow")
+
+
+# Phase 1
+
+class JobInfoOutput(LLMOutput):
+    """TextProcessingService.extract_job_info"""
+    title: str
+    company: str = ""
+    location: str = ""
+    salary: str = ""
+    requirements: List[Any] = []
+    responsibilities: List[Any] = []
+    skills: List[Any] = []
+
+
+class ScheduleSynthesisOutput(LLMOutput):
+    """多智能体面试排期的最终汇总"""
+    recommended_schedule: List[Dict[str, Any]]
+    conflict_resolutions: List[Any] = []
+    optimization_summary: str = ""
+
+
+# Phase 2
+
+class EnhancedResumeOutput(LLMOutput):
+    """Phase2ResumeAgent.generate_enhanced_resume"""
+    personal_info: Dict[str, Any]
+    professional_summary: str
+    highlighted_skills: Union[Dict[str, Any], List[Any]]
+    professional_experience: List[Any]
+    education: List[Any]
+
+
+class OptimizedResumeOutput(EnhancedResumeOutput):
+    """Phase2ResumeAgent.optimize_resume_content"""
+    core_competencies: List[Any]
+    key_projects: List[Any]
+    technical_skills: Union[Dict[str, Any], List[Any]]
+
+
+class ImprovementPlanOutput(LLMOutput):
+    """/phase2/improvement-plan"""
+    immediate_actions: List[Dict[str, Any]]
+    skills_to_add: List[Any] = []
+    next_steps: List[Any] = []
+
+
+class AppliedImprovementsOutput(LLMOutput):
+    """/phase2/apply-improvements"""
+    optimized_resume: Dict[str, Any]
+    improvements_applied: List[Any]
+    optimization_summary: str = ""
+
+
+# Phase 3
+
+class HRFeedbackOutput(LLMOutput):
+    """Phase3HRAgent.comprehensive_hr_review"""
+    overall_score: Score
+    detailed_scores: Dict[str, Any]
+    strengths: List[Any]
+    weaknesses: List[Any]
+    improvement_suggestions: List[Any]
+
+
+class InterviewQuestion(LLMOutput):
+    question: str = Field(min_length=1)
+
+
+class InterviewQuestionsOutput(LLMOutput):
+    """Phase3HRAgent.generate_interview_questions"""
+    questions: List[InterviewQuestion] = Field(min_length=1)
+
+
+class AnswerEvaluationOutput(LLMOutput):
+    """Phase3HRAgent.evaluate_interview_answer"""
+    overall_score: Score
+    evaluation: Dict[str, Any]
+    strengths: List[Any] = []
+    weaknesses: List[Any] = []
+    improvement_suggestions: List[Any]
+
+
+def format_validation_errors(error: ValidationError, limit: int = 20) -> List[str]:
+    """ValidationError -> ["questions.0.question: Field required", ...]"""
+    messages = []
+    for item in error.errors()[:limit]:
+        location = ".".join(str(part) for part in item["loc"]) or "(root)"
+        messages.append(f"{location}: {item['msg']}")
+    return messages
+
+
+class StructuredResult:
+    """
+    一次结构化调用的校验状态。
+
+    原始输出 -> extract_json -> schema 校验；未通过时 repair_messages() 给出修复请求，
+    apply_repair() 把模型返回的修正字段合并进已解析的对象后重新校验。
+    """
+
+    def __init__(self, schema: Type[BaseModel], messages: List[Dict[str, str]], content: str):
+        self.schema = schema
+        self.messages = messages
+        self.raw = content
+        self.data: Optional[Dict[str, Any]] = None
+        self.value: Optional[Dict[str, Any]] = None
+        self.errors: List[str] = []
+        self.repairs = 0
+        self._check(extract_json(content))
+
+    @property
+    def valid(self) -> bool:
+        return self.value is not None
+
+    def invalid_fields(self) -> List[str]:
+        """出错的顶层字段"""
+        fields = []
+        for message in self.errors:
+            field = message.split(":", 1)[0].split(".", 1)[0]
+            if field not in fields:
+                fields.append(field)
+        return fields
+
+    def repair_messages(self) -> List[Dict[str, str]]:
+        """
+        在原对话后追加上一次的输出和修复要求：原prompt作为相同前缀可命中服务端的prompt缓存，
+        模型只需输出出错的字段
+        """
+        if self.data is None:
+            return self.messages + [
+                {"role": "assistant", "content": self.raw},
+                {"role": "user", "content": REGENERATE_PROMPT}
+            ]
+        prompt = REPAIR_PROMPT.format(
+            errors="\n".join(f"- {message}" for message in self.errors),
+            fields=", ".join(self.invalid_fields())
+        )
+        return self.messages + [
+            {"role": "assistant", "content": json.dumps(self.data, ensure_ascii=False)},
+            {"role": "user", "content": prompt}
+        ]
+
+    def apply_repair(self, content: str):
+        self.repairs += 1
+        patch = extract_json(content)
+        if patch is None:
+            self.errors = self.errors or ["输出不是合法的JSON对象"]
+            return
+        if self.data is None:
+            self.raw = content
+            self._check(patch)
+        else:
+            self._check({**self.data, **patch})
+
+    def text(self) -> str:
+        """校验通过时返回规范化的JSON文本，否则返回原始输出（调用方走原有的备用逻辑）"""
+        if self.value is not None:
+            return json.dumps(self.value, ensure_ascii=False)
+        return self.raw
+
+    def _check(self, data: Optional[Dict[str, Any]]):
+        self.data = data
+        if data is None:
+            self.errors = ["输出不是合法的JSON对象"]
+            return
+        try:
+            self.value = self.schema.model_validate(data).model_dump(mode="json")
+            self.errors = []
+        except ValidationError as e:
+            self.errors = format_validation_errors(e)
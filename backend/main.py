@@ -13,6 +13,9 @@ from loguru import logger
 
 from config import settings
 from database import init_database
+from jobs import job_manager
+from services import chromadb_service
+from http_clients import http_clients
 from api import router
 from admin_api import admin_router
 
@@ -32,12 +35,19 @@ async def lifespan(app: FastAPI):
     init_database()
     logger.info("Database initialized")
     
+    # Start background job workers
+    await job_manager.start()
+    
     logger.info("Application startup complete")
     
     yield
     
     # Shutdown
     logger.info("Shutting down Job Planner Assistant API...")
+    await job_manager.stop()
+    # 等待后台向量写入完成
+    chromadb_service.shutdown(wait=True)
+    await http_clients.aclose()
 
 
 # Create FastAPI application
@@ -0,0 +1,154 @@
+"""
+Mock OpenAI-compatible server for exercising model routing locally.
+
+实现 POST /v1/chat/completions（含 stream=true）和 GET /v1/models，按模型配置延迟和失败率，
+用来在不访问真实提供方的情况下观察路由、对冲和熔断：
+
+    python mock_openai_server.py --port 8001 --model fast=0.2 --model slow=3.0 --model flaky=0.5:0.3
+
+然后设置 OPENAI_API_BASE=http://127.0.0.1:8001/v1、PHASE2_MODEL=slow、PHASE2_CANDIDATE_MODELS=fast,flaky。
+--model 的格式为 名称=延迟秒数[:失败率]，未配置的模型使用 --default-delay。
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Tuple, Optional
+
+
+class MockModelProfile:
+    """单个模型的延迟和失败率（失败时返回503）"""
+
+    def __init__(self, delay: float = 0.0, error_rate: float = 0.0):
+        self.delay = delay
+        self.error_rate = error_rate
+
+
+class MockOpenAIServer:
+    """在后台线程中运行；port=0 时自动分配端口"""
+
+    def __init__(self, profiles: Optional[Dict[str, MockModelProfile]] = None, default_delay: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0, content: str = '{"message": "mock response"}'):
+        self.profiles = profiles or {}
+        self.default_delay = default_delay
+        self.content = content
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def profile(self, model: str) -> MockModelProfile:
+        return self.profiles.get(model) or MockModelProfile(self.default_delay)
+
+    def _count(self, model: str):
+        with self._lock:
+            self.requests[model] = self.requests.get(model, 0) + 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip("/") != "/v1/models":
+                    return self._send_json(404, {"error": {"message": "not found"}})
+                data = [{"id": model, "object": "model", "owned_by": "mock"} for model in server.profiles]
+                self._send_json(200, {"object": "list", "data": data})
+
+            def do_POST(self):
+                if self.path.rstrip("/") != "/v1/chat/completions":
+                    return self._send_json(404, {"error": {"message": "not found"}})
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                model = body.get("model", "")
+                server._count(model)
+                profile = server.profile(model)
+                time.sleep(profile.delay)
+                if random.random() < profile.error_rate:
+                    return self._send_json(503, {"error": {"message": f"{model} unavailable", "type": "server_error"}})
+                if body.get("stream"):
+                    return self._send_stream(model)
+                self._send_json(200, {
+                    "id": f"chatcmpl-mock-{int(time.time() * 1000)}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": server.content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+                })
+
+            def _send_json(self, status: int, payload: dict):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, model: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for piece in (server.content[:len(server.content) // 2], server.content[len(server.content) // 2:]):
+                    chunk = {
+                        "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        return Handler
+
+
+def parse_profile(value: str) -> Tuple[str, MockModelProfile]:
+    """名称=延迟秒数[:失败率]"""
+    model, _, spec = value.partition("=")
+    delay, _, error_rate = spec.partition(":")
+    return model.strip(), MockModelProfile(float(delay or 0), float(error_rate or 0))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--model", action="append", default=[], help="name=delay[:error_rate]")
+    parser.add_argument("--default-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    mock = MockOpenAIServer(dict(parse_profile(item) for item in args.model), args.default_delay, args.host, args.port)
+    print(f"Mock OpenAI server listening on {mock.base_url}")
+    try:
+        mock.serve_forever()
+    except KeyboardInterrupt:
+        mock.stop()
@@ -0,0 +1,193 @@
+"""
+Latency-aware model routing with hedged requests.
+
+- ModelRouter：按模型记录最近 window 次调用的延迟和成败，把候选模型按
+  （熔断/错误率是否健康, p50延迟, 配置顺序）排序；样本不足 min_samples 的健康模型排在最前，
+  每个候选先积累几次真实延迟再参与比较
+- hedged_call / ahedged_call：先请求首选模型，超过其p90仍未返回时再请求下一个候选，
+  先成功的结果胜出；请求失败时立即回退到下一个候选
+"""
+
+import math
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import Executor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+from loguru import logger
+
+
+class ModelStats:
+    """单个模型最近 window 次调用的延迟（仅成功）和成败"""
+
+    def __init__(self, window: int):
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+
+    def record(self, latency: float, ok: bool):
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+
+class ModelRouter:
+    """
+    is_available(model) 返回False时（如熔断打开）该模型排在最后；
+    min_samples 次以上调用、错误率超过 max_error_rate 的模型排在健康模型之后
+    """
+
+    def __init__(self, window: int = 100, min_samples: int = 5, max_error_rate: float = 0.5,
+                 hedge_min_delay: float = 1.0, is_available: Callable[[str], bool] = lambda model: True):
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.hedge_min_delay = hedge_min_delay
+        self.is_available = is_available
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, latency: float, ok: bool):
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None:
+                stats = self._stats[model] = ModelStats(self.window)
+            stats.record(latency, ok)
+
+    def rank(self, candidates: List[str]) -> List[str]:
+        """按健康状况和p50延迟排序候选模型"""
+        with self._lock:
+            keys = {model: self._rank_key(model, index) for index, model in enumerate(candidates)}
+        return sorted(candidates, key=keys.get)
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """首选模型的p90（不低于 hedge_min_delay）；样本不足时不对冲"""
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None or len(stats.latencies) < self.min_samples:
+                return None
+            return max(self.hedge_min_delay, stats.percentile(0.9))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                model: {
+                    "calls": len(stats.outcomes),
+                    "error_rate": round(stats.error_rate, 3),
+                    "p50": round(stats.percentile(0.5), 3) if stats.latencies else None,
+                    "p90": round(stats.percentile(0.9), 3) if stats.latencies else None,
+                    "available": self.is_available(model)
+                }
+                for model, stats in self._stats.items()
+            }
+
+    def _rank_key(self, model: str, index: int) -> tuple:
+        stats = self._stats.get(model)
+        if not self.is_available(model):
+            return (2, math.inf, index)
+        if stats is not None and len(stats.outcomes) >= self.min_samples and stats.error_rate > self.max_error_rate:
+            return (1, math.inf, index)
+        if stats is None or len(stats.latencies) < self.min_samples:
+            return (0, -math.inf, index)
+        return (0, stats.percentile(0.5), index)
+
+
+def hedged_call(models: List[str], request: Callable[[str], Any], hedge_delay: Optional[float],
+                executor: Executor) -> Any:
+    """
+    依次尝试 models：首选模型超过 hedge_delay 秒未返回时并发请求下一个候选，
+    失败时回退到下一个候选；返回最先成功的结果，全部失败时抛出最后一个异常。
+    线程中的请求无法取消，落后的请求在后台结束（结果仍会写入缓存和延迟统计）。
+    """
+    remaining = iter(models)
+    pending = {}
+    last_error: Optional[BaseException] = None
+
+    def launch() -> bool:
+        model = next(remaining, None)
+        if model is None:
+            return False
+        # 复制contextvar，线程内的请求保持调用方的限流优先级
+        pending[executor.submit(contextvars.copy_context().run, request, model)] = model
+        return True
+
+    launch()
+    hedged = hedge_delay is None
+    while pending:
+        done, _ = wait(pending, timeout=None if hedged else hedge_delay, return_when=FIRST_COMPLETED)
+        if not done:
+            hedged = True
+            if launch():
+                logger.info(f"Hedging {pending[next(iter(pending))]} after {hedge_delay:.1f}s")
+            continue
+        for future in done:
+            model = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                last_error = e
+                logger.warning(f"Routed request to {model} failed: {e}")
+                continue
+            if len(models) > 1:
+                logger.info(f"Routed request answered by {model}")
+            return result
+        if not pending and not launch():
+            break
+    raise last_error or RuntimeError("No candidate models")
+
+
+async def ahedged_call(models: List[str], request: Callable[[str], Awaitable[Any]],
+                       hedge_delay: Optional[float]) -> Any:
+    """hedged_call 的异步版本；返回时取消仍在进行的请求"""
+    remaining = iter(models)
+    pending: Dict[asyncio.Task, str] = {}
+    last_error: Optional[BaseException] = None
+
+    def launch() -> bool:
+        model = next(remaining, None)
+        if model is None:
+            return False
+        pending[asyncio.ensure_future(request(model))] = model
+        return True
+
+    launch()
+    hedged = hedge_delay is None
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, timeout=None if hedged else hedge_delay,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                if launch():
+                    logger.info(f"Hedging {pending[next(iter(pending))]} after {hedge_delay:.1f}s")
+                continue
+            for task in done:
+                model = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    last_error = e
+                    logger.warning(f"Routed request to {model} failed: {e}")
+                    continue
+                if len(models) > 1:
+                    logger.info(f"Routed request answered by {model}")
+                return result
+            if not pending and not launch():
+                break
+        raise last_error or RuntimeError("No candidate models")
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,187 @@
+"""
+Token budgeting for prompt assembly.
+
+提示词中的简历、职位等大段数据按 PromptSection 声明，由 PromptBudget.assemble 统一拼装：
+- 紧凑JSON（无缩进、去掉空值和 id/url/时间戳等元数据字段）
+- 统计输入token数（安装了 tiktoken 时精确计数，否则按中文逐字、其他字符约4字符1个token估算）
+- 超出预算时按优先级从低到高逐级截断长文本和长列表，必要时去掉可选段落
+- 记录每次调用的输入token数，按提示词名称汇总（/admin/prompt-budget/stats）
+"""
+
+import re
+import json
+import threading
+from typing import List, Dict, Any, Callable
+
+from loguru import logger
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken 为可选依赖
+    tiktoken = None
+
+from config import settings
+
+_CJK = re.compile(r"[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+# 对模型没有信息量的字段
+DROP_FIELDS = {"id", "_id", "job_id", "user_id", "source_url", "url", "link", "created_at", "updated_at",
+               "embedding", "embeddings", "search_query", "generation_time", "model_used"}
+# 逐级截断：(字符串最大长度, 列表最多保留项数)
+SHRINK_STEPS = [(400, 20), (200, 10), (100, 6), (50, 3), (20, 1)]
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def prune(value: Any, drop: frozenset = frozenset(DROP_FIELDS)) -> Any:
+    """去掉元数据字段和空值（None、""、[]、{}）"""
+    if isinstance(value, dict):
+        pruned = {}
+        for key, item in value.items():
+            if key in drop:
+                continue
+            item = prune(item, drop)
+            if item is None or item == "" or item == [] or item == {}:
+                continue
+            pruned[key] = item
+        return pruned
+    if isinstance(value, (list, tuple)):
+        return [item for item in (prune(item, drop) for item in value)
+                if not (item is None or item == "" or item == [] or item == {})]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def shrink(value: Any, max_chars: int, max_items: int) -> Any:
+    """截断过长的字符串和列表，并标注省略的数量"""
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else value[:max_chars] + "…"
+    if isinstance(value, dict):
+        return {key: shrink(item, max_chars, max_items) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [shrink(item, max_chars, max_items) for item in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"…(共{len(value)}项)")
+        return items
+    return value
+
+
+class PromptSection:
+    """
+    提示词中可压缩的一段数据。priority 越高越晚被截断；required=False 的段落
+    在逐级截断后仍超出预算时整段去掉。
+    """
+
+    def __init__(self, name: str, value: Any, priority: int = 1, required: bool = True,
+                 formatter: Callable[[Any], str] = compact_json):
+        self.name = name
+        self.value = prune(value)
+        self.priority = priority
+        self.required = required
+        self.formatter = formatter
+        self.level = 0
+        self.dropped = False
+
+    def render(self) -> str:
+        if self.dropped:
+            return "（略）"
+        if self.level == 0:
+            return self.formatter(self.value)
+        max_chars, max_items = SHRINK_STEPS[self.level - 1]
+        return self.formatter(shrink(self.value, max_chars, max_items))
+
+    def tighten(self) -> bool:
+        """再截断一级；已无法继续压缩时返回False"""
+        if self.level < len(SHRINK_STEPS):
+            self.level += 1
+            return True
+        if not self.required and not self.dropped:
+            self.dropped = True
+            return True
+        return False
+
+
+class BudgetedPrompt(str):
+    """拼装好的提示词，附带输入token数和被截断的段落"""
+
+    input_tokens: int = 0
+    truncated: List[str] = []
+
+    def __new__(cls, content: str, input_tokens: int, truncated: List[str]):
+        instance = super().__new__(cls, content)
+        instance.input_tokens = input_tokens
+        instance.truncated = truncated
+        return instance
+
+
+class PromptBudget:
+    """按token预算拼装提示词并统计输入token"""
+
+    def __init__(self, encoding_name: str):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._encoding_loaded = False
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def count_tokens(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        cjk = len(_CJK.findall(text))
+        return cjk + (len(text) - cjk + 3) // 4
+
+    def assemble(self, name: str, render: Callable[[Dict[str, str]], str],
+                 sections: List[PromptSection], budget: int) -> BudgetedPrompt:
+        """
+        render 接收 {段落名: 渲染后的文本} 并返回完整提示词；
+        超出 budget 时从优先级最低的段落开始逐级截断，直到符合预算或无法继续压缩
+        """
+        prompt = render({section.name: section.render() for section in sections})
+        tokens = self.count_tokens(prompt)
+        for section in sorted(sections, key=lambda item: item.priority):
+            while tokens > budget and section.tighten():
+                prompt = render({item.name: item.render() for item in sections})
+                tokens = self.count_tokens(prompt)
+            if tokens <= budget:
+                break
+
+        truncated = [section.name for section in sections if section.level or section.dropped]
+        if tokens > budget:
+            logger.warning(f"Prompt {name}: {tokens} input tokens exceed budget {budget}")
+        logger.info(f"Prompt {name}: {tokens} input tokens (budget {budget}"
+                    f"{', truncated: ' + ', '.join(truncated) if truncated else ''})")
+        self._record(name, tokens, bool(truncated))
+        return BudgetedPrompt(prompt, tokens, truncated)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {**item, "avg_input_tokens": round(item["input_tokens"] / item["calls"], 1)}
+                for name, item in self._stats.items()
+            }
+
+    def _record(self, name: str, tokens: int, truncated: bool):
+        with self._lock:
+            item = self._stats.setdefault(name, {"calls": 0, "input_tokens": 0, "max_input_tokens": 0, "truncated": 0})
+            item["calls"] += 1
+            item["input_tokens"] += tokens
+            item["max_input_tokens"] = max(item["max_input_tokens"], tokens)
+            item["truncated"] += int(truncated)
+
+    def _get_encoding(self):
+        if not self._encoding_loaded:
+            self._encoding_loaded = True
+            if tiktoken is not None:
+                try:
+                    self._encoding = tiktoken.get_encoding(self.encoding_name)
+                except Exception as e:
+                    # 离线环境下首次加载编码表可能失败，退回估算
+                    logger.warning(f"tiktoken encoding {self.encoding_name} unavailable, using estimate: {e}")
+        return self._encoding
+
+
+# Global prompt budget instance
+prompt_budget = PromptBudget(settings.prompt_tokenizer)
@@ -0,0 +1,102 @@
+"""
+Static prompt prefixes for provider-side prompt caching.
+
+OpenAI 等提供方会缓存请求开头相同的部分（通常需 ≥1024 tokens），命中时首token延迟和输入费用都明显下降。
+因此长提示词拆成两段：
+- 稳定前缀（system 消息）：角色设定、评估标准、输出格式等不随请求变化的说明，导入时注册并编译一次
+- 可变后缀（user 消息）：简历、职位等本次请求的数据
+
+命中情况来自响应的 usage.prompt_tokens_details.cached_tokens，按模型汇总（/admin/prompt-templates/stats）。
+"""
+
+import hashlib
+import textwrap
+import threading
+from typing import List, Dict, Any, Optional
+
+from prompt_budget import prompt_budget
+
+
+class PromptTemplate:
+    """一个稳定前缀；内容在注册时固定，不含任何按请求替换的变量"""
+
+    def __init__(self, name: str, system: str):
+        self.name = name
+        self.system = textwrap.dedent(system).strip()
+        self.prefix_hash = hashlib.sha256(self.system.encode("utf-8")).hexdigest()[:12]
+        self._prefix_tokens: Optional[int] = None
+
+    @property
+    def prefix_tokens(self) -> int:
+        if self._prefix_tokens is None:
+            self._prefix_tokens = prompt_budget.count_tokens(self.system)
+        return self._prefix_tokens
+
+    def messages(self, user_content: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": user_content}
+        ]
+
+
+class PromptTemplateRegistry:
+    """注册稳定前缀并统计使用次数和提供方的缓存命中"""
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._renders: Dict[str, int] = {}
+        self._usage: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, system: str) -> PromptTemplate:
+        template = PromptTemplate(name, system)
+        with self._lock:
+            self._templates[name] = template
+            self._renders.setdefault(name, 0)
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        """取出前缀并计数；未注册时抛出 KeyError"""
+        template = self._templates[name]
+        with self._lock:
+            self._renders[name] += 1
+        return template
+
+    def record_usage(self, model: Optional[str], usage: Any):
+        """记录一次响应的输入token和命中缓存的token（提供方不返回时按0计）"""
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        if not prompt_tokens:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        with self._lock:
+            item = self._usage.setdefault(model or "unknown", {
+                "requests": 0, "cache_hit_requests": 0, "prompt_tokens": 0, "cached_tokens": 0
+            })
+            item["requests"] += 1
+            item["cache_hit_requests"] += int(cached_tokens > 0)
+            item["prompt_tokens"] += prompt_tokens
+            item["cached_tokens"] += cached_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            templates = {
+                name: {
+                    "renders": self._renders[name],
+                    "prefix_hash": template.prefix_hash,
+                    "prefix_tokens": template.prefix_tokens
+                }
+                for name, template in self._templates.items()
+            }
+            usage = {
+                model: {
+                    **item,
+                    "cached_token_rate": round(item["cached_tokens"] / item["prompt_tokens"] * 100, 1)
+                }
+                for model, item in self._usage.items()
+            }
+        return {"templates": templates, "provider_cache": usage}
+
+
+# Global prompt template registry instance
+prompt_templates = PromptTemplateRegistry()
@@ -0,0 +1,268 @@
+"""
+Per-model rate limiting for LLM calls.
+
+每个模型一个 ModelRateLimiter，线程和协程共用：
+- 令牌桶：每分钟请求数（RPM）和每分钟token数（TPM），容量为一分钟的额度
+- 并发上限：同一模型同时在途的请求数
+- 排队：按优先级（interactive 先于 batch）和到达顺序放行，队首拿不到额度时后面的请求一起等待
+- 指标：按优先级统计放行次数、排队等待时间（平均 / p50 / p99 / 最大）和排队超时次数
+
+优先级通过 contextvar 传递：后台任务和批量生成在 request_priority("batch") 中发起调用，
+默认为 interactive。asyncio 任务会继承创建时的 contextvar。
+"""
+
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, Optional, Callable, Tuple
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+# 不在队首或并发已满时的轮询间隔（同步等待者在释放时会被提前唤醒）
+POLL_INTERVAL = 0.05
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("llm_request_priority", default="interactive")
+
+
+@contextmanager
+def request_priority(priority: str):
+    """在此范围内发起的LLM调用使用指定优先级"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {priority}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class RateLimitTimeout(Exception):
+    """排队超过 llm_rate_limit_queue_timeout 仍未拿到额度"""
+
+    def __init__(self, model: str, waited: float):
+        super().__init__(f"Rate limit queue timeout for model {model} after {waited:.1f}s")
+        self.model = model
+        self.waited = waited
+
+
+class TokenBucket:
+    """per_minute <= 0 表示不限制"""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def wait_time(self, amount: float) -> float:
+        """还需等待多少秒才有 amount 的额度（超过容量的请求按容量计，避免永远等不到）"""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float):
+        if not self.unlimited:
+            self.level -= min(amount, self.capacity)
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class ModelRateLimiter:
+    """单个模型的令牌桶 + 并发上限 + 优先级队列"""
+
+    def __init__(self, model: str, rpm: int = 0, tpm: int = 0, max_concurrency: int = 0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.clock = clock
+        self._requests = TokenBucket(rpm, clock)
+        self._tokens = TokenBucket(tpm, clock)
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._queue: list = []
+        self._sequence = itertools.count()
+        self.in_flight = 0
+        self._waits: Dict[str, deque] = {name: deque(maxlen=1000) for name in PRIORITIES}
+        self._stats: Dict[str, Dict[str, float]] = {
+            name: {"acquired": 0, "total_wait": 0.0, "max_wait": 0.0, "timeouts": 0} for name in PRIORITIES
+        }
+
+    def acquire(self, tokens: int = 0, priority: Optional[str] = None, timeout: Optional[float] = None) -> float:
+        """阻塞直到拿到额度，返回排队等待的秒数；超时抛出 RateLimitTimeout"""
+        priority = priority or current_priority()
+        ticket = self._enqueue(priority)
+        start = self.clock()
+        while True:
+            wait = self._try_acquire(ticket, tokens)
+            if wait == 0:
+                return self._record(priority, self.clock() - start)
+            remaining = self._remaining(ticket, priority, start, timeout)
+            with self._released:
+                self._released.wait(min(wait, remaining))
+
+    async def aacquire(self, tokens: int = 0, priority: Optional[str] = None,
+                       timeout: Optional[float] = None) -> float:
+        """acquire 的异步版本，等待期间不阻塞事件循环"""
+        priority = priority or current_priority()
+        ticket = self._enqueue(priority)
+        start = self.clock()
+        try:
+            while True:
+                wait = self._try_acquire(ticket, tokens)
+                if wait == 0:
+                    return self._record(priority, self.clock() - start)
+                remaining = self._remaining(ticket, priority, start, timeout)
+                await asyncio.sleep(min(wait, remaining, POLL_INTERVAL))
+        except asyncio.CancelledError:
+            self._dequeue(ticket)
+            raise
+
+    @property
+    def limits_tokens(self) -> bool:
+        return not self._tokens.unlimited
+
+    def release(self):
+        with self._released:
+            self.in_flight -= 1
+            self._released.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            priorities = {}
+            for name, item in self._stats.items():
+                waits = sorted(self._waits[name])
+                priorities[name] = {
+                    "acquired": item["acquired"],
+                    "timeouts": item["timeouts"],
+                    "avg_wait": round(item["total_wait"] / item["acquired"], 3) if item["acquired"] else 0.0,
+                    "p50_wait": round(waits[len(waits) // 2], 3) if waits else 0.0,
+                    "p99_wait": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))], 3) if waits else 0.0,
+                    "max_wait": round(item["max_wait"], 3)
+                }
+            return {
+                "in_flight": self.in_flight,
+                "queued": len(self._queue),
+                "max_concurrency": self.max_concurrency,
+                "rpm": self._requests.capacity,
+                "tpm": self._tokens.capacity,
+                "priorities": priorities
+            }
+
+    def _enqueue(self, priority: str) -> Tuple[int, int]:
+        ticket = (PRIORITIES[priority], next(self._sequence))
+        with self._lock:
+            heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _dequeue(self, ticket: Tuple[int, int]):
+        with self._released:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._released.notify_all()
+
+    def _try_acquire(self, ticket: Tuple[int, int], tokens: int) -> float:
+        """拿到额度时返回0，否则返回建议的等待秒数"""
+        with self._lock:
+            if self._queue[0] != ticket:
+                return POLL_INTERVAL
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                return POLL_INTERVAL
+            wait = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+            if wait > 0:
+                return wait
+            self._requests.consume(1)
+            self._tokens.consume(tokens)
+            heapq.heappop(self._queue)
+            self.in_flight += 1
+            # 唤醒下一个排队者检查自己是否到了队首
+            self._released.notify_all()
+            return 0
+
+    def _remaining(self, ticket: Tuple[int, int], priority: str, start: float, timeout: Optional[float]) -> float:
+        if timeout is None:
+            return POLL_INTERVAL * 20
+        waited = self.clock() - start
+        if waited >= timeout:
+            self._dequeue(ticket)
+            with self._lock:
+                self._stats[priority]["timeouts"] += 1
+            raise RateLimitTimeout(self.model, waited)
+        return timeout - waited
+
+    def _record(self, priority: str, waited: float) -> float:
+        with self._lock:
+            item = self._stats[priority]
+            item["acquired"] += 1
+            item["total_wait"] += waited
+            item["max_wait"] = max(item["max_wait"], waited)
+            self._waits[priority].append(waited)
+        return waited
+
+
+class RateLimiterRegistry:
+    """
+    按模型懒创建限流器。limits 为 {模型: (rpm, tpm)}，未列出的模型使用 default_rpm / default_tpm。
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, int]], default_rpm: int = 0, default_tpm: int = 0,
+                 max_concurrency: int = 0, queue_timeout: Optional[float] = None):
+        self.limits = limits
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._limiters: Dict[str, ModelRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str) -> ModelRateLimiter:
+        with self._lock:
+            limiter = self._limiters.get(model)
+            if limiter is None:
+                rpm, tpm = self.limits.get(model, (self.default_rpm, self.default_tpm))
+                limiter = ModelRateLimiter(model, rpm, tpm, self.max_concurrency)
+                self._limiters[model] = limiter
+            return limiter
+
+    @contextmanager
+    def limit(self, model: str, tokens: int = 0):
+        limiter = self.get(model)
+        limiter.acquire(tokens, timeout=self.queue_timeout)
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    @asynccontextmanager
+    async def alimit(self, model: str, tokens: int = 0):
+        limiter = self.get(model)
+        await limiter.aacquire(tokens, timeout=self.queue_timeout)
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {model: limiter.snapshot() for model, limiter in limiters.items()}
@@ -3,20 +3,61 @@ External services integration for Job Planner Assistant.
 """
 
 import os
+import re
 import json
-import requests
+import time
+import hashlib
+import unicodedata
+from datetime import datetime, timezone
+import asyncio
+import threading
+import contextvars
 import chromadb
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator, Callable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from loguru import logger
 from config import settings
+from llm_cache import llm_cache
+from embeddings import create_embedding_function
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from skill_normalizer import skill_normalizer
+from json_utils import extract_json
+from http_clients import http_clients
+from prompt_templates import prompt_templates
+from prompt_budget import prompt_budget
+from rate_limiter import RateLimiterRegistry
+from model_router import ModelRouter, hedged_call, ahedged_call
+from llm_schemas import StructuredResult, JobInfoOutput
+from llm_resilience import (
+    LLMResponse, RetryPolicy, CircuitBreakerRegistry, classify_error
+)
+
+# OpenAI 客户端（共享 http_clients 的 keep-alive 连接池）每次调用时获取：
+# 应用关闭时 http_clients.aclose() 会关闭并丢弃客户端，不能在导入时绑定
+# 重试由 LLMService 统一处理（退避、Retry-After、熔断），关闭SDK内置重试避免叠加
+def openai_client():
+    return http_clients.openai(max_retries=0)
+
+
+# 异步客户端，供FastAPI路由使用，避免阻塞事件循环
+def async_openai_client():
+    return http_clients.async_openai(max_retries=0)
+
 
-# Initialize OpenAI client
-openai_client = OpenAI(
-    api_key=settings.openai_api_key,
-    base_url=settings.openai_api_base
+retry_policy = RetryPolicy(settings.llm_max_retries, settings.llm_retry_base_delay, settings.llm_retry_max_delay)
+circuit_breakers = CircuitBreakerRegistry(settings.llm_circuit_failure_threshold, settings.llm_circuit_reset_seconds)
+# 按模型的RPM/TPM令牌桶和并发上限，线程和协程共用
+rate_limiters = RateLimiterRegistry(
+    settings.model_rate_limits, settings.llm_default_rpm, settings.llm_default_tpm,
+    settings.llm_max_concurrency_per_model, settings.llm_rate_limit_queue_timeout
 )
+# 按模型的滚动延迟/错误率，Phase 1-3 据此在候选模型间路由和对冲
+model_router = ModelRouter(
+    settings.llm_router_window, settings.llm_router_min_samples, settings.llm_router_max_error_rate,
+    settings.llm_hedge_min_delay, is_available=lambda model: circuit_breakers.get(model).available()
+)
+hedge_executor = ThreadPoolExecutor(max_workers=settings.llm_hedge_workers, thread_name_prefix="llm-route")
 
 # Initialize ChromaDB
 chroma_client = chromadb.PersistentClient(path=settings.chromadb_path)
@@ -26,79 +67,296 @@ class LLMService:
     """LLM service for calling different models."""
     
     @staticmethod
-    def call_model(model_name: str, messages: List[Dict[str, str]], temperature: float = 0.7, js: bool = False) -> str:
-        """Call LLM model with messages."""
+    def call_model(model_name: str, messages: List[Dict[str, str]], temperature: float = 0.7, js: bool = False,
+                   phase: Optional[str] = None) -> str:
+        """Call LLM model with messages; with phase set, route among that phase's candidate models."""
         try:
-            # 验证输入参数
-            if not model_name:
-                raise ValueError("Model name cannot be empty")
-            
-            if not messages:
-                raise ValueError("Messages cannot be empty")
-            
-            logger.info(f"Calling model: {model_name}")
-            logger.debug(f"Messages: {messages}")
-            
-            # # 调用OpenAI API
-            # response = openai_client.chat.completions.create(
-            #     model=model_name,
-            #     messages=messages,
-            #     temperature=temperature,
-            #     max_tokens=4000
-            # )
-            if js is True:
-                response = openai_client.chat.completions.create(
-                    model=model_name,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=4000,
-                    response_format={ "type": "json_object" }
-                )
-            else:
-                response = openai_client.chat.completions.create(
-                    model=model_name,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=4000
-                )
-            # 验证响应对象
-            if not hasattr(response, 'choices'):
-                logger.error(f"Invalid response type: {type(response)}")
-                logger.error(f"Response content: {response}")
-                raise ValueError(f"Invalid response format from OpenAI API")
+            return LLMService._route_request(model_name, messages, temperature, js, phase)
             
-            if not response.choices:
-                raise ValueError("Empty choices in response")
-            
-            if not hasattr(response.choices[0], 'message'):
-                raise ValueError("Invalid choice format in response")
-            
-            content = response.choices[0].message.content
-            
-            if not content:
-                raise ValueError("Empty content in response")
-            
-            logger.info(f"Successfully got response from {model_name}")
-            return content
+        except Exception as e:
+            return LLMService._fallback_response(model_name, messages, e)
+    
+    @staticmethod
+    def _fallback_response(model_name: str, messages: List[Dict[str, str]], error: Exception) -> LLMResponse:
+        """重试后仍失败：返回标记为 degraded 的演示数据；关闭 llm_demo_fallback 时直接抛出"""
+        error_type = classify_error(error)
+        logger.error(f"Error calling model {model_name} ({error_type}): {error}")
+        if not settings.llm_demo_fallback:
+            raise error
+        return LLMResponse(LLMService._get_demo_response(messages), degraded=True,
+                           error=str(error), error_type=error_type)
+    
+    @staticmethod
+    def _send_with_retries(model_name: str, send: Any, tokens: int = 0, timed: bool = True) -> Any:
+        """
+        发送请求：熔断时直接失败；每次尝试先在该模型的限流队列中拿到RPM/TPM和并发额度；
+        可重试的错误按退避/Retry-After等待后重试，提供方错误计入该模型的熔断器。
+        成功的耗时和失败计入 model_router；流式请求只返回首包，timed=False 时不计耗时
+        """
+        breaker = circuit_breakers.get(model_name)
+        attempt = 0
+        while True:
+            probe = breaker.before_call(model_name)
+            try:
+                with rate_limiters.limit(model_name, tokens):
+                    started = time.monotonic()
+                    result = send()
+                if timed:
+                    model_router.record(model_name, time.monotonic() - started, True)
+                breaker.record_success()
+                return result
+            except Exception as e:
+                LLMService._record_failure(model_name, e)
+                breaker.record_failure(e)
+                delay = retry_policy.next_delay(attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                logger.warning(f"Model {model_name} {classify_error(e)} error, retry {attempt} in {delay:.1f}s: {e}")
+                time.sleep(delay)
+            except BaseException:
+                # 取消（CancelledError）或中断时没有结果，释放探测名额，避免熔断器一直停在 half_open
+                if probe:
+                    breaker.abort_probe()
+                raise
+    
+    @staticmethod
+    def _record_failure(model_name: str, error: Exception):
+        """本地排队超时没有真正请求到模型，不计入路由的错误率"""
+        if classify_error(error) != "queue_timeout":
+            model_router.record(model_name, 0.0, False)
+    
+    @staticmethod
+    def _route_candidates(model_name: str, phase: Optional[str]) -> List[str]:
+        """phase 的候选模型按健康状况和延迟排序；未指定 phase 或只有一个候选时只用 model_name"""
+        if phase is None:
+            return [model_name]
+        candidates = settings.phase_candidates(phase)
+        return model_router.rank(candidates) if len(candidates) > 1 else [model_name]
+    
+    @staticmethod
+    def _hedge_delay(model_name: str) -> Optional[float]:
+        return model_router.hedge_delay(model_name) if settings.llm_hedging_enabled else None
+    
+    @staticmethod
+    def _route_request(model_name: str, messages: List[Dict[str, str]], temperature: float = 0.7,
+                       js: bool = False, phase: Optional[str] = None) -> str:
+        """
+        按路由结果请求模型：首选模型失败时回退到下一个候选，超过其p90仍未返回时对冲请求下一个候选，
+        全部失败时抛出最后一个异常
+        """
+        models = LLMService._route_candidates(model_name, phase)
+        if len(models) == 1:
+            return LLMService._request_model(models[0], messages, temperature, js)
+        return hedged_call(
+            models, lambda model: LLMService._request_model(model, messages, temperature, js),
+            LLMService._hedge_delay(models[0]), hedge_executor
+        )
+    
+    @staticmethod
+    def _estimate_tokens(model_name: str, messages: List[Dict[str, str]]) -> int:
+        """计入TPM的token数：输入token + 预计输出token；该模型不限TPM时不计算"""
+        if not rate_limiters.get(model_name).limits_tokens:
+            return 0
+        text = "".join(str(message.get("content", "")) for message in messages)
+        return prompt_budget.count_tokens(text) + settings.llm_rate_limit_output_tokens
+    
+    @staticmethod
+    def _request_model(model_name: str, messages: List[Dict[str, str]], temperature: float = 0.7, 
+                       js: bool = False, timeout: Optional[float] = None) -> str:
+        """实际发起模型请求，失败时直接抛出异常（不降级为演示数据）"""
+        request_kwargs = LLMService._build_request_kwargs(model_name, messages, temperature, js)
+        if timeout:
+            request_kwargs["timeout"] = timeout
+        
+        cache_key = LLMService._cache_lookup_key(model_name, messages, temperature, js)
+        if cache_key:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Cache hit for model: {model_name}")
+                return cached
+        
+        logger.info(f"Calling model: {model_name}")
+        logger.debug(f"Messages: {messages}")
+        
+        content = LLMService._send_with_retries(
+            model_name,
+            lambda: LLMService._extract_content(openai_client().chat.completions.create(**request_kwargs)),
+            LLMService._estimate_tokens(model_name, messages)
+        )
+        
+        # 只缓存真实的模型响应，演示数据不会进入缓存
+        if cache_key:
+            llm_cache.set(cache_key, model_name, content)
+        
+        logger.info(f"Successfully got response from {model_name}")
+        return content
+    
+    @staticmethod
+    def call_structured(model_name: str, messages: List[Dict[str, str]], schema: Any, temperature: float = 0.7,
+                        phase: Optional[str] = None) -> str:
+        """
+        JSON模式调用并按schema校验。
+        
+        校验失败时只把校验错误发回模型、要求返回需要修正的字段并合并（最多 llm_repair_attempts 次），
+        返回校验通过的JSON文本；仍未通过时返回原始输出，由调用方走原有的解析和备用逻辑。
+        """
+        try:
+            content = LLMService._route_request(model_name, messages, temperature, True, phase)
+        except Exception as e:
+            return LLMService._fallback_response(model_name, messages, e)
+        
+        result = StructuredResult(schema, messages, content)
+        while not result.valid and result.repairs < settings.llm_repair_attempts:
+            logger.warning(f"{schema.__name__} validation failed, requesting repair: {result.errors[:5]}")
+            try:
+                result.apply_repair(LLMService._route_request(model_name, result.repair_messages(), 0.0, True, phase))
+            except Exception as e:
+                logger.error(f"Repair request failed for {schema.__name__}: {e}")
+                break
+        LLMService._log_structured_result(schema, result)
+        return result.text()
+    
+    @staticmethod
+    def _log_structured_result(schema: Any, result: StructuredResult):
+        if result.valid and result.repairs:
+            logger.info(f"{schema.__name__} repaired after {result.repairs} attempt(s)")
+        elif not result.valid:
+            logger.error(f"{schema.__name__} still invalid after {result.repairs} repair(s): {result.errors[:5]}")
+    
+    @staticmethod
+    def _call_phase_model(phase: str, prompt: str, schema: Any = None, temperature: float = 0.7,
+                          system: Optional[str] = None) -> str:
+        """各阶段模型调用：在该阶段的候选模型间路由；声明了schema且开启结构化输出时走 call_structured"""
+        model_name = getattr(settings, f"{phase}_model")
+        messages = LLMService._phase_messages(prompt, system)
+        if schema is not None and settings.llm_structured_output:
+            return LLMService.call_structured(model_name, messages, schema, temperature, phase)
+        return LLMService.call_model(model_name, messages, temperature, phase=phase)
+    
+    @staticmethod
+    def _phase_messages(prompt: str, system: Optional[str] = None) -> List[Dict[str, str]]:
+        """system 为稳定前缀（见 prompt_templates），放在最前面以命中提供方的prompt缓存"""
+        if system:
+            return [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+        return [{"role": "user", "content": prompt}]
+    
+    @staticmethod
+    def _cache_lookup_key(model_name: str, messages: List[Dict[str, str]], temperature: float, js: bool) -> Optional[str]:
+        """返回缓存键；高温度等不应缓存的调用返回None"""
+        if not llm_cache.should_cache(temperature):
+            return None
+        return llm_cache.make_key(model_name, messages, temperature, js)
+    
+    @staticmethod
+    def _build_request_kwargs(model_name: str, messages: List[Dict[str, str]], temperature: float, js: bool,
+                              stream: bool = False) -> Dict[str, Any]:
+        """验证输入参数并构建chat.completions请求参数（同步/异步调用共用）"""
+        if not model_name:
+            raise ValueError("Model name cannot be empty")
+        
+        if not messages:
+            raise ValueError("Messages cannot be empty")
+        
+        request_kwargs = {
+            "model": model_name,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": 4000
+        }
+        if js is True:
+            request_kwargs["response_format"] = {"type": "json_object"}
+        if stream:
+            request_kwargs["stream"] = True
+        return request_kwargs
+    
+    @staticmethod
+    def _extract_content(response: Any) -> str:
+        """验证响应对象并提取文本内容"""
+        if not hasattr(response, 'choices'):
+            logger.error(f"Invalid response type: {type(response)}")
+            logger.error(f"Response content: {response}")
+            raise ValueError(f"Invalid response format from OpenAI API")
+        
+        if not response.choices:
+            raise ValueError("Empty choices in response")
+        
+        if not hasattr(response.choices[0], 'message'):
+            raise ValueError("Invalid choice format in response")
+        
+        content = response.choices[0].message.content
+        
+        if not content:
+            raise ValueError("Empty content in response")
+        
+        prompt_templates.record_usage(getattr(response, 'model', None), getattr(response, 'usage', None))
+        return content
+    
+    @staticmethod
+    def _extract_delta(chunk: Any) -> str:
+        """提取流式响应片段中的增量文本"""
+        if not getattr(chunk, 'choices', None):
+            return ""
+        delta = getattr(chunk.choices[0], 'delta', None)
+        return getattr(delta, 'content', None) or ""
+    
+    @staticmethod
+    def stream_model(model_name: str, messages: List[Dict[str, str]], temperature: float = 0.7, js: bool = False) -> Iterator[str]:
+        """流式调用模型，逐段产出文本；尚未产出内容就失败时返回演示数据"""
+        cache_key = LLMService._cache_lookup_key(model_name, messages, temperature, js)
+        if cache_key:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Cache hit for model: {model_name}")
+                yield cached
+                return
+        
+        parts = []
+        try:
+            request_kwargs = LLMService._build_request_kwargs(model_name, messages, temperature, js, stream=True)
+            logger.info(f"Streaming model: {model_name}")
             
+            # 只有建立连接前的错误会重试，开始输出后中断直接抛出；并发额度只在建立连接期间占用
+            stream = LLMService._send_with_retries(
+                model_name, lambda: openai_client().chat.completions.create(**request_kwargs),
+                LLMService._estimate_tokens(model_name, messages), timed=False
+            )
+            for chunk in stream:
+                delta = LLMService._extract_delta(chunk)
+                if delta:
+                    parts.append(delta)
+                    yield delta
         except Exception as e:
-            logger.error(f"Error calling model {model_name}: {e}")
-            
-            # 返回演示数据而不是错误信息
-            if "自我介绍" in str(messages) or "self_introduction" in str(messages):
-                return LLMService._get_demo_self_introduction()
-            elif "面试问题" in str(messages) or "interview" in str(messages).lower() or "generate_interview_questions" in str(messages):
-                return LLMService._get_demo_interview_questions()
-            elif "面试回答" in str(messages) or "evaluate_interview_answer" in str(messages):
-                return LLMService._get_demo_interview_evaluation()
-            elif "resume" in str(messages).lower() or "简历" in str(messages):
-                return LLMService._get_demo_resume_response()
-            elif "search" in str(messages).lower() or "搜索" in str(messages):
-                return LLMService._get_demo_search_response()
-            elif "hr" in str(messages).lower() or "评估" in str(messages):
-                return LLMService._get_demo_hr_response()
-            else:
-                return LLMService._get_demo_generic_response()
+            # 已经输出部分内容时不能再拼接演示数据
+            if parts:
+                logger.error(f"Error streaming model {model_name}: {e}")
+                raise
+            yield LLMService._fallback_response(model_name, messages, e)
+            return
+        
+        if cache_key and parts:
+            llm_cache.set(cache_key, model_name, "".join(parts))
+    
+    @staticmethod
+    def _get_demo_response(messages: List[Dict[str, str]]) -> str:
+        """根据消息内容选择合适的演示数据"""
+        # 只拼接一次消息内容（原来每个判断都把整个prompt重新转成字符串）
+        text = str(messages)
+        lowered = text.lower()
+        if "自我介绍" in text or "self_introduction" in text:
+            return LLMService._get_demo_self_introduction()
+        elif "面试问题" in text or "interview" in lowered or "generate_interview_questions" in text:
+            return LLMService._get_demo_interview_questions()
+        elif "面试回答" in text or "evaluate_interview_answer" in text:
+            return LLMService._get_demo_interview_evaluation()
+        elif "resume" in lowered or "简历" in text:
+            return LLMService._get_demo_resume_response()
+        elif "search" in lowered or "搜索" in text:
+            return LLMService._get_demo_search_response()
+        elif "hr" in lowered or "评估" in text:
+            return LLMService._get_demo_hr_response()
+        else:
+            return LLMService._get_demo_generic_response()
     
     @staticmethod
     def _get_demo_resume_response() -> str:
@@ -286,41 +544,396 @@ class LLMService:
         }, ensure_ascii=False)
     
     @staticmethod
-    def call_phase1_model(prompt: str) -> str:
+    def call_phase1_model(prompt: str, schema: Any = None) -> str:
         """Call Phase 1 model for search tasks."""
-        messages = [{"role": "user", "content": prompt}]
-        return LLMService.call_model(settings.phase1_model, messages)
+        return LLMService._call_phase_model("phase1", prompt, schema)
     
     @staticmethod
-    def call_phase2_model(prompt: str) -> str:
+    def call_phase2_model(prompt: str, schema: Any = None, system: Optional[str] = None) -> str:
         """Call Phase 2 model for resume generation."""
-        messages = [{"role": "user", "content": prompt}]
-        return LLMService.call_model(settings.phase2_model, messages)
+        return LLMService._call_phase_model("phase2", prompt, schema, system=system)
     
     @staticmethod
-    def call_phase3_model(prompt: str) -> str:
+    def call_phase3_model(prompt: str, schema: Any = None, system: Optional[str] = None) -> str:
         """Call Phase 3 model for HR simulation."""
-        messages = [{"role": "user", "content": prompt}]
         # 如果是自我介绍相关的prompt，增加温度参数以提高多样性
         if "自我介绍" in prompt or "self_introduction" in prompt:
-            return LLMService.call_model(settings.phase3_model, messages, temperature=0.9)
+            return LLMService._call_phase_model("phase3", prompt, schema, temperature=0.9, system=system)
         else:
-            return LLMService.call_model(settings.phase3_model, messages)
+            return LLMService._call_phase_model("phase3", prompt, schema, system=system)
     
     @staticmethod
     def call_phase4_models(prompt: str) -> List[str]:
         """Call multiple Phase 4 models for scheduling discussion."""
-        results = []
+        results = LLMService.call_phase4_models_detailed(prompt)
+        return LLMService._phase4_contents(results, prompt)
+    
+    @staticmethod
+    def call_phase4_models_detailed(prompt: str, models: Optional[List[str]] = None,
+                                    quorum: Optional[int] = None,
+                                    timeout: Optional[float] = None,
+                                    validate: Optional[Callable[[str], bool]] = None,
+                                    executor: Optional[ThreadPoolExecutor] = None) -> List[Dict[str, Any]]:
+        """
+        并发调用Phase 4的多个模型。
+        
+        每个模型独立超时，成功与失败分开记录；达到quorum个成功响应后立即返回，
+        其余未完成的模型标记为未完成。返回列表顺序与models一致，每项包含
+        model/success/content/error/latency。
+        validate不为空时，未通过校验的响应记为失败、不计入quorum。
+        传入executor时在其中执行，多个调用方可共享同一个并发上限。
+        """
+        models = models or settings.phase4_models_list
+        timeout = timeout or settings.phase4_model_timeout
+        required = LLMService._resolve_quorum(quorum, len(models))
+        messages = [{"role": "user", "content": prompt}]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(models)
+        successes = 0
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(max_workers=len(models), thread_name_prefix="phase4")
+        # 复制contextvar，线程内的请求保持调用方的限流优先级（后台任务为batch）
+        futures = {
+            executor.submit(contextvars.copy_context().run, LLMService._call_phase4_model,
+                            model, messages, timeout): index
+            for index, model in enumerate(models)
+        }
+        try:
+            # 单个请求已带超时，这里的总超时只是兜底；共享executor时请求可能先排队，不设总超时
+            for future in as_completed(futures, timeout=timeout + 5 if own_executor else None):
+                result = LLMService._validate_phase4_result(future.result(), validate)
+                results[futures[future]] = result
+                if result["success"]:
+                    successes += 1
+                    if successes >= required:
+                        break
+        except FuturesTimeoutError:
+            logger.warning(f"Phase4 fan-out timed out after {timeout}s")
+        finally:
+            # 不等待剩余请求，已达到quorum或超时
+            if own_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            else:
+                for future in futures:
+                    future.cancel()
+        
+        return LLMService._fill_pending_results(results, models, successes >= required)
+    
+    @staticmethod
+    def _call_phase4_model(model: str, messages: List[Dict[str, str]], timeout: float) -> Dict[str, Any]:
+        """调用单个Phase 4模型，把结果或异常包装成统一结构"""
+        start_time = time.time()
+        try:
+            content = LLMService._request_model(model, messages, js=False, timeout=timeout)
+            return LLMService._phase4_result(model, True, content, None, time.time() - start_time)
+        except Exception as e:
+            logger.warning(f"Phase4 model {model} failed: {e}")
+            return LLMService._phase4_result(model, False, None, str(e), time.time() - start_time)
+    
+    @staticmethod
+    def _validate_phase4_result(result: Dict[str, Any], validate: Optional[Callable[[str], bool]]) -> Dict[str, Any]:
+        """成功但未通过validate的响应改记为失败"""
+        if not result["success"] or validate is None:
+            return result
+        try:
+            valid = validate(result["content"])
+        except Exception:
+            valid = False
+        if valid:
+            return result
+        logger.warning(f"Phase4 model {result['model']} returned an invalid response")
+        return LLMService._phase4_result(result["model"], False, None, "invalid response", result["latency"])
+    
+    @staticmethod
+    def _phase4_result(model: str, success: bool, content: Optional[str], error: Optional[str], 
+                       latency: Optional[float]) -> Dict[str, Any]:
+        """单个模型调用结果的统一结构"""
+        return {
+            "model": model,
+            "success": success,
+            "content": content,
+            "error": error,
+            "latency": round(latency, 3) if latency is not None else None
+        }
+    
+    @staticmethod
+    def _resolve_quorum(quorum: Optional[int], model_count: int) -> int:
+        """quorum为空或<=0时等待全部模型"""
+        if quorum is None:
+            quorum = settings.phase4_quorum
+        if not quorum or quorum <= 0:
+            return model_count
+        return min(quorum, model_count)
+    
+    @staticmethod
+    def _fill_pending_results(results: List[Optional[Dict[str, Any]]], models: List[str], 
+                              quorum_reached: bool) -> List[Dict[str, Any]]:
+        """为未完成的模型补充占位结果"""
+        reason = "skipped: quorum reached" if quorum_reached else "timeout"
+        return [
+            result if result is not None else LLMService._phase4_result(model, False, None, reason, None)
+            for result, model in zip(results, models)
+        ]
+    
+    @staticmethod
+    def _phase4_contents(results: List[Dict[str, Any]], prompt: str) -> List[str]:
+        """提取成功的响应文本；全部失败时返回演示数据"""
+        contents = [result["content"] for result in results if result["success"]]
+        if not contents:
+            logger.error("All phase4 models failed, falling back to demo data")
+            errors = "; ".join(f"{result['model']}: {result['error']}" for result in results if result.get("error"))
+            contents = [LLMResponse(LLMService._get_demo_response([{"role": "user", "content": prompt}]),
+                                    degraded=True, error=errors or None, error_type="all_models_failed")]
+        return contents
+
+
+class AsyncLLMService:
+    """Async LLM service built on AsyncOpenAI, used by FastAPI routes so a slow completion doesn't block the worker."""
+    
+    @staticmethod
+    async def acall_model(model_name: str, messages: List[Dict[str, str]], temperature: float = 0.7, js: bool = False,
+                          phase: Optional[str] = None) -> str:
+        """Call LLM model with messages (awaitable); with phase set, route among that phase's candidate models."""
+        try:
+            return await AsyncLLMService._aroute_request(model_name, messages, temperature, js, phase)
+            
+        except Exception as e:
+            # 与同步版本保持一致，返回标记为 degraded 的演示数据
+            return LLMService._fallback_response(model_name, messages, e)
+    
+    @staticmethod
+    async def _asend_with_retries(model_name: str, send: Any, tokens: int = 0, timed: bool = True) -> Any:
+        """LLMService._send_with_retries 的异步版本，排队和退避等待期间不阻塞事件循环"""
+        breaker = circuit_breakers.get(model_name)
+        attempt = 0
+        while True:
+            probe = breaker.before_call(model_name)
+            try:
+                async with rate_limiters.alimit(model_name, tokens):
+                    started = time.monotonic()
+                    result = await send()
+                if timed:
+                    model_router.record(model_name, time.monotonic() - started, True)
+                breaker.record_success()
+                return result
+            except Exception as e:
+                LLMService._record_failure(model_name, e)
+                breaker.record_failure(e)
+                delay = retry_policy.next_delay(attempt, e)
+                if delay is None:
+                    raise
+                attempt += 1
+                logger.warning(f"Model {model_name} {classify_error(e)} error, retry {attempt} in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+            except BaseException:
+                # 取消（CancelledError）或中断时没有结果，释放探测名额，避免熔断器一直停在 half_open
+                if probe:
+                    breaker.abort_probe()
+                raise
+    
+    @staticmethod
+    async def _aroute_request(model_name: str, messages: List[Dict[str, str]], temperature: float = 0.7,
+                              js: bool = False, phase: Optional[str] = None) -> str:
+        """LLMService._route_request 的异步版本；胜出后取消仍在进行的对冲请求"""
+        models = LLMService._route_candidates(model_name, phase)
+        if len(models) == 1:
+            return await AsyncLLMService._arequest_model(models[0], messages, temperature, js)
+        return await ahedged_call(
+            models, lambda model: AsyncLLMService._arequest_model(model, messages, temperature, js),
+            LLMService._hedge_delay(models[0])
+        )
+    
+    @staticmethod
+    async def _arequest_model(model_name: str, messages: List[Dict[str, str]], temperature: float = 0.7, 
+                              js: bool = False, timeout: Optional[float] = None) -> str:
+        """实际发起模型请求，失败时直接抛出异常"""
+        request_kwargs = LLMService._build_request_kwargs(model_name, messages, temperature, js)
+        if timeout:
+            request_kwargs["timeout"] = timeout
+        
+        cache_key = LLMService._cache_lookup_key(model_name, messages, temperature, js)
+        if cache_key:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Cache hit for model: {model_name}")
+                return cached
+        
+        logger.info(f"Calling model (async): {model_name}")
+        logger.debug(f"Messages: {messages}")
+        
+        async def send():
+            return LLMService._extract_content(await async_openai_client().chat.completions.create(**request_kwargs))
+        
+        content = await AsyncLLMService._asend_with_retries(
+            model_name, send, LLMService._estimate_tokens(model_name, messages)
+        )
+        
+        if cache_key:
+            llm_cache.set(cache_key, model_name, content)
+        
+        logger.info(f"Successfully got response from {model_name}")
+        return content
+    
+    @staticmethod
+    async def acall_structured(model_name: str, messages: List[Dict[str, str]], schema: Any,
+                               temperature: float = 0.7, phase: Optional[str] = None) -> str:
+        """JSON模式调用并按schema校验（异步），语义同 LLMService.call_structured"""
+        try:
+            content = await AsyncLLMService._aroute_request(model_name, messages, temperature, True, phase)
+        except Exception as e:
+            return LLMService._fallback_response(model_name, messages, e)
+        
+        result = StructuredResult(schema, messages, content)
+        while not result.valid and result.repairs < settings.llm_repair_attempts:
+            logger.warning(f"{schema.__name__} validation failed, requesting repair: {result.errors[:5]}")
+            try:
+                result.apply_repair(
+                    await AsyncLLMService._aroute_request(model_name, result.repair_messages(), 0.0, True, phase)
+                )
+            except Exception as e:
+                logger.error(f"Repair request failed for {schema.__name__}: {e}")
+                break
+        LLMService._log_structured_result(schema, result)
+        return result.text()
+    
+    @staticmethod
+    async def _acall_phase_model(phase: str, prompt: str, schema: Any = None, temperature: float = 0.7,
+                                 system: Optional[str] = None) -> str:
+        model_name = getattr(settings, f"{phase}_model")
+        messages = LLMService._phase_messages(prompt, system)
+        if schema is not None and settings.llm_structured_output:
+            return await AsyncLLMService.acall_structured(model_name, messages, schema, temperature, phase)
+        return await AsyncLLMService.acall_model(model_name, messages, temperature, phase=phase)
+    
+    @staticmethod
+    async def astream_model(model_name: str, messages: List[Dict[str, str]], temperature: float = 0.7, 
+                            js: bool = False) -> AsyncIterator[str]:
+        """流式调用模型（异步），语义同 LLMService.stream_model"""
+        cache_key = LLMService._cache_lookup_key(model_name, messages, temperature, js)
+        if cache_key:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Cache hit for model: {model_name}")
+                yield cached
+                return
+        
+        parts = []
+        try:
+            request_kwargs = LLMService._build_request_kwargs(model_name, messages, temperature, js, stream=True)
+            logger.info(f"Streaming model (async): {model_name}")
+            
+            stream = await AsyncLLMService._asend_with_retries(
+                model_name, lambda: async_openai_client().chat.completions.create(**request_kwargs),
+                LLMService._estimate_tokens(model_name, messages), timed=False
+            )
+            async for chunk in stream:
+                delta = LLMService._extract_delta(chunk)
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            if parts:
+                logger.error(f"Error streaming model {model_name}: {e}")
+                raise
+            yield LLMService._fallback_response(model_name, messages, e)
+            return
+        
+        if cache_key and parts:
+            llm_cache.set(cache_key, model_name, "".join(parts))
+    
+    @staticmethod
+    async def acall_phase1_model(prompt: str, schema: Any = None) -> str:
+        """Call Phase 1 model for search tasks."""
+        return await AsyncLLMService._acall_phase_model("phase1", prompt, schema)
+    
+    @staticmethod
+    async def acall_phase2_model(prompt: str, schema: Any = None, system: Optional[str] = None) -> str:
+        """Call Phase 2 model for resume generation."""
+        return await AsyncLLMService._acall_phase_model("phase2", prompt, schema, system=system)
+    
+    @staticmethod
+    def astream_phase2_model(prompt: str, system: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream Phase 2 model output for resume generation."""
+        messages = LLMService._phase_messages(prompt, system)
+        # 流式输出不对冲，只选当前最快的健康模型
+        model_name = LLMService._route_candidates(settings.phase2_model, "phase2")[0]
+        return AsyncLLMService.astream_model(model_name, messages)
+    
+    @staticmethod
+    async def acall_phase3_model(prompt: str, schema: Any = None, system: Optional[str] = None) -> str:
+        """Call Phase 3 model for HR simulation."""
+        # 如果是自我介绍相关的prompt，增加温度参数以提高多样性
+        if "自我介绍" in prompt or "self_introduction" in prompt:
+            return await AsyncLLMService._acall_phase_model("phase3", prompt, schema, temperature=0.9, system=system)
+        else:
+            return await AsyncLLMService._acall_phase_model("phase3", prompt, schema, system=system)
+    
+    @staticmethod
+    async def acall_phase4_models(prompt: str) -> List[str]:
+        """Call multiple Phase 4 models for scheduling discussion."""
+        results = await AsyncLLMService.acall_phase4_models_detailed(prompt)
+        return LLMService._phase4_contents(results, prompt)
+    
+    @staticmethod
+    async def acall_phase4_models_detailed(prompt: str, models: Optional[List[str]] = None,
+                                           quorum: Optional[int] = None,
+                                           timeout: Optional[float] = None,
+                                           semaphore: Optional[asyncio.Semaphore] = None,
+                                           validate: Optional[Callable[[str], bool]] = None) -> List[Dict[str, Any]]:
+        """
+        并发调用Phase 4的多个模型（asyncio版本），语义同 LLMService.call_phase4_models_detailed。
+        传入semaphore时，多个调用方可共享同一个并发上限。
+        """
+        models = models or settings.phase4_models_list
+        timeout = timeout or settings.phase4_model_timeout
+        required = LLMService._resolve_quorum(quorum, len(models))
+        messages = [{"role": "user", "content": prompt}]
+        
+        tasks = [
+            asyncio.ensure_future(AsyncLLMService._acall_phase4_model(model, messages, timeout, semaphore))
+            for model in models
+        ]
+        task_index = {task: index for index, task in enumerate(tasks)}
+        results: List[Optional[Dict[str, Any]]] = [None] * len(models)
+        successes = 0
+        pending = set(tasks)
         try:
-            for model in settings.phase4_models_list:
-                messages = [{"role": "user", "content": prompt}]
-                result = LLMService.call_model(model, messages, js=False)
-                results.append(result)  # 直接添加响应字符串
+            while pending and successes < required:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = LLMService._validate_phase4_result(task.result(), validate)
+                    results[task_index[task]] = result
+                    if result["success"]:
+                        successes += 1
+        finally:
+            # 达到quorum后取消剩余请求
+            for task in pending:
+                task.cancel()
+        
+        return LLMService._fill_pending_results(results, models, successes >= required)
+    
+    @staticmethod
+    async def _acall_phase4_model(model: str, messages: List[Dict[str, str]], timeout: float,
+                                  semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+        """调用单个Phase 4模型，把结果或异常包装成统一结构"""
+        if semaphore is not None:
+            async with semaphore:
+                return await AsyncLLMService._acall_phase4_model(model, messages, timeout)
+        
+        start_time = time.time()
+        try:
+            content = await asyncio.wait_for(
+                AsyncLLMService._arequest_model(model, messages, js=False, timeout=timeout),
+                timeout=timeout
+            )
+            return LLMService._phase4_result(model, True, content, None, time.time() - start_time)
+        except asyncio.TimeoutError:
+            logger.warning(f"Phase4 model {model} timed out after {timeout}s")
+            return LLMService._phase4_result(model, False, None, "timeout", time.time() - start_time)
         except Exception as e:
-            logger.error(f"Error calling phase4 models: {e}")
-            # 返回演示数据
-            results.append(LLMService._get_demo_generic_response())
-        return results
+            logger.warning(f"Phase4 model {model} failed: {e}")
+            return LLMService._phase4_result(model, False, None, str(e), time.time() - start_time)
 
 
 class SerperService:
@@ -346,7 +959,7 @@ class SerperService:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(url, json=payload, headers=headers)
+            response = http_clients.sync_client().post(url, json=payload, headers=headers)
             response.raise_for_status()
             
             data = response.json()
@@ -385,7 +998,7 @@ class SerperService:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(url, json=payload, headers=headers)
+            response = http_clients.sync_client().post(url, json=payload, headers=headers)
             response.raise_for_status()
             
             data = response.json()
@@ -421,16 +1034,41 @@ class ChromaDBService:
     """ChromaDB service for vector storage and similarity search."""
     
     def __init__(self, collection_name: str = "job_embeddings"):
+        provider = settings.embedding_provider.lower()
+        # 非默认后端的向量维度不同，使用单独的集合
+        if provider != "onnx":
+            collection_name = f"{collection_name}_{re.sub(r'[^A-Za-z0-9_-]+', '_', provider)}"
         self.collection_name = collection_name
         self.collection = None
+        self.embedding_function = None
+        self._ingest_executor: Optional[ThreadPoolExecutor] = None
+        # 与集合同步维护的BM25索引，首次混合检索时从集合加载
+        self.lexical_index = BM25Index()
+        self._lexical_loaded = False
+        self._lexical_lock = threading.Lock()
+        # 按kind的向量数量，统计时按ID扫描一次，之后随本进程的写入/删除增量更新；
+        # 写入与扫描共用一把锁，扫描结果不会漏掉并发写入。
+        # 计数器是进程内的：其他进程（多个worker、compact_chromadb.py）的写入/删除看不到，
+        # 因此超过 chroma_count_ttl 秒后重新扫描
+        self._kind_counts: Optional[Dict[str, int]] = None
+        self._kind_counts_at = 0.0
+        self._counts_lock = threading.RLock()
+        try:
+            self.embedding_function = create_embedding_function(provider)
+        except Exception as e:
+            logger.error(f"Error creating embedding function '{provider}', using ChromaDB default: {e}")
         self._init_collection()
     
     def _init_collection(self):
         """Initialize ChromaDB collection."""
         try:
+            collection_kwargs = {}
+            if self.embedding_function is not None:
+                collection_kwargs["embedding_function"] = self.embedding_function
             self.collection = chroma_client.get_or_create_collection(
                 name=self.collection_name,
-                metadata={"description": "Job postings and user profiles embeddings"}
+                metadata={"description": "Job postings and user profiles embeddings"},
+                **collection_kwargs
             )
             logger.info(f"ChromaDB collection '{self.collection_name}' initialized")
         except Exception as e:
@@ -442,85 +1080,509 @@ class ChromaDBService:
             if not self.collection:
                 self._init_collection()
             
-            # 确保所有的metadata值都是基本类型 (str, int, float, bool, None)
-            # ChromaDB不接受列表或字典等复杂类型作为metadata值
-            cleaned_metadata = {}
-            for key, value in metadata.items():
-                if isinstance(value, (str, int, float, bool)) or value is None:
-                    cleaned_metadata[key] = value
-                elif isinstance(value, list):
-                    # 将列表转换为逗号分隔的字符串
-                    cleaned_metadata[key] = ', '.join(map(str, value))
-                elif isinstance(value, dict):
-                    # 将字典转换为JSON字符串
-                    cleaned_metadata[key] = json.dumps(value, ensure_ascii=False)
-                else:
-                    # 对于其他类型，转换为字符串
-                    cleaned_metadata[key] = str(value)
-            
-            self.collection.add(
-                documents=[job_text],
-                metadatas=[cleaned_metadata],
-                ids=[f"job_{job_id}"]
-            )
-            logger.info(f"Added job posting {job_id} to ChromaDB")
+            # upsert：同一职位重复写入时覆盖，而不是新增一条向量
+            with self._counts_lock:
+                new_ids = self._new_ids([f"job_{job_id}"])
+                self.collection.upsert(
+                    documents=[job_text],
+                    metadatas=[self._job_metadata(metadata)],
+                    ids=[f"job_{job_id}"]
+                )
+                self._adjust_count("job", len(new_ids))
+            if self._lexical_loaded:
+                self.lexical_index.add(f"job_{job_id}", job_text)
+            logger.info(f"Upserted job posting {job_id} to ChromaDB")
         except Exception as e:
             logger.error(f"Error adding job posting to ChromaDB: {e}")
     
-    def search_similar_jobs(self, query_text: str, n_results: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar job postings."""
+    def add_job_postings_bulk(self, job_ids: List[str], job_texts: List[str], 
+                              metadatas: List[Dict[str, Any]], batch_size: Optional[int] = None) -> int:
+        """
+        批量写入职位：整批清洗metadata后一次 collection.upsert（一次嵌入计算），
+        超过batch_size时分块写入。返回成功写入的数量。
+        """
+        if not job_ids:
+            return 0
+        if not (len(job_ids) == len(job_texts) == len(metadatas)):
+            raise ValueError("job_ids, job_texts and metadatas must have the same length")
+        
+        # 同一批次内ID重复时保留最后一条（upsert不接受重复ID）
+        unique = {}
+        for job_id, job_text, metadata in zip(job_ids, job_texts, metadatas):
+            unique[job_id] = (job_text, metadata)
+        job_ids = list(unique)
+        job_texts = [unique[job_id][0] for job_id in job_ids]
+        metadatas = [unique[job_id][1] for job_id in job_ids]
+        
+        batch_size = max(1, batch_size or settings.chroma_ingest_batch_size)
+        added = 0
         try:
             if not self.collection:
                 self._init_collection()
             
-            results = self.collection.query(
-                query_texts=[query_text],
-                n_results=n_results
-            )
+            for start in range(0, len(job_ids), batch_size):
+                end = start + batch_size
+                ids = [f"job_{job_id}" for job_id in job_ids[start:end]]
+                with self._counts_lock:
+                    new_ids = self._new_ids(ids)
+                    self.collection.upsert(
+                        documents=job_texts[start:end],
+                        metadatas=[self._job_metadata(m) for m in metadatas[start:end]],
+                        ids=ids
+                    )
+                    self._adjust_count("job", len(new_ids))
+                added += len(job_ids[start:end])
+                if self._lexical_loaded:
+                    self.lexical_index.add_many(
+                        (f"job_{job_id}", text) for job_id, text in zip(job_ids[start:end], job_texts[start:end])
+                    )
+            logger.info(f"Upserted {added} job postings to ChromaDB")
+        except Exception as e:
+            logger.error(f"Error adding job postings to ChromaDB ({added}/{len(job_ids)} written): {e}")
+        return added
+    
+    def ingest_job_postings_background(self, job_ids: List[str], job_texts: List[str], 
+                                       metadatas: List[Dict[str, Any]]) -> Future:
+        """后台线程批量写入，调用方无需等待嵌入计算完成"""
+        if self._ingest_executor is None:
+            # 单线程：写入按提交顺序串行执行，避免并发写同一collection
+            self._ingest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chroma-ingest")
+        return self._ingest_executor.submit(
+            self.add_job_postings_bulk, list(job_ids), list(job_texts), list(metadatas)
+        )
+    
+    def shutdown(self, wait: bool = True):
+        """等待后台写入完成并释放线程"""
+        if self._ingest_executor is not None:
+            self._ingest_executor.shutdown(wait=wait)
+            self._ingest_executor = None
+    
+    @staticmethod
+    def make_job_id(job_title: Optional[str], company_name: Optional[str], location: Optional[str] = None) -> str:
+        """
+        根据职位名称、公司、地点生成确定性的ID（不含 job_ 前缀）。
+        先做全半角/大小写归一并去掉空白和标点，同一职位重复抓取会得到相同ID。
+        """
+        parts = [ChromaDBService._normalize_id_part(value) for value in (job_title, company_name, location)]
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:24]
+    
+    @staticmethod
+    def _normalize_id_part(value: Optional[str]) -> str:
+        text = unicodedata.normalize("NFKC", str(value or "")).casefold()
+        return re.sub(r"[\s\W_]+", "", text)
+    
+    def compact_job_postings(self, dry_run: bool = False, page_size: int = 500) -> Dict[str, Any]:
+        """
+        一次性去重/压缩：把旧的时间戳ID按内容哈希分组，每组保留最新的一条，
+        以哈希ID重新写入（复用已有向量，不重新嵌入），删除其余ID；
+        同时为旧数据补上 kind、规范技能ID等元数据字段。
+        """
+        if not self.collection:
+            self._init_collection()
+        
+        # 第一遍只取metadata，按内容哈希分组；同时记录缺少kind/派生字段的旧数据
+        groups: Dict[str, List[tuple]] = {}
+        stale_metadata: List[tuple] = []
+        scanned = 0
+        offset = 0
+        while True:
+            page = self.collection.get(limit=page_size, offset=offset, include=["metadatas"])
+            ids = page["ids"] or []
+            if not ids:
+                break
+            for doc_id, metadata in zip(ids, page["metadatas"]):
+                metadata = metadata or {}
+                kind = "job" if doc_id.startswith("job_") else "user" if doc_id.startswith("user_") else None
+                if kind == "job" and (metadata.get("kind") != kind or "skill_ids" not in metadata):
+                    stale_metadata.append((doc_id, self._job_metadata(metadata)))
+                elif kind == "user" and metadata.get("kind") != kind:
+                    stale_metadata.append((doc_id, {**metadata, "kind": kind}))
+                if kind != "job":
+                    continue
+                target = "job_" + self.make_job_id(
+                    metadata.get("job_title"), metadata.get("company_name"), metadata.get("location")
+                )
+                groups.setdefault(target, []).append((doc_id, str(metadata.get("extracted_at") or "")))
+                scanned += 1
+            offset += len(ids)
+        
+        # 补齐kind和派生字段，分页查询和过滤检索依赖它们
+        if stale_metadata and not dry_run:
+            for start in range(0, len(stale_metadata), page_size):
+                chunk = stale_metadata[start:start + page_size]
+                self.collection.update(ids=[doc_id for doc_id, _ in chunk],
+                                       metadatas=[metadata for _, metadata in chunk])
+        
+        rewritten = 0
+        deleted = 0
+        for target, members in groups.items():
+            if len(members) == 1 and members[0][0] == target:
+                continue
             
-            similar_jobs = []
-            for i, doc in enumerate(results["documents"][0]):
-                similar_jobs.append({
-                    "id": results["ids"][0][i],
-                    "document": doc,
-                    "metadata": results["metadatas"][0][i],
-                    "distance": results["distances"][0][i] if "distances" in results else None
-                })
+            # 保留最新抓取的一条（已经是哈希ID的优先）
+            keep_id = max(members, key=lambda member: (member[1], member[0] == target))[0]
+            stale_ids = [doc_id for doc_id, _ in members if doc_id != target]
+            if dry_run:
+                rewritten += 1 if keep_id != target else 0
+                deleted += len(stale_ids)
+                continue
+            
+            if keep_id != target:
+                kept = self.collection.get(ids=[keep_id], include=["documents", "metadatas", "embeddings"])
+                self.collection.upsert(
+                    ids=[target],
+                    documents=kept["documents"],
+                    metadatas=kept["metadatas"],
+                    embeddings=kept["embeddings"]
+                )
+                rewritten += 1
+            if stale_ids:
+                self.collection.delete(ids=stale_ids)
+                deleted += len(stale_ids)
+        
+        result = {
+            "scanned": scanned,
+            "unique_postings": len(groups),
+            "rewritten": rewritten,
+            "deleted": deleted,
+            "metadata_backfilled": len(stale_metadata),
+            "dry_run": dry_run
+        }
+        if not dry_run:
+            # ID已变化，下次检索时重新加载BM25索引；补齐kind后重新统计数量
+            self._lexical_loaded = False
+            with self._counts_lock:
+                self._kind_counts = None
+        logger.info(f"ChromaDB compaction: {result}")
+        return result
+    
+    @staticmethod
+    def _clean_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        确保所有的metadata值都是基本类型 (str, int, float, bool, None)
+        ChromaDB不接受列表或字典等复杂类型作为metadata值
+        """
+        cleaned_metadata = {}
+        for key, value in metadata.items():
+            if isinstance(value, (str, int, float, bool)) or value is None:
+                cleaned_metadata[key] = value
+            elif isinstance(value, list):
+                # 将列表转换为逗号分隔的字符串
+                cleaned_metadata[key] = ', '.join(map(str, value))
+            elif isinstance(value, dict):
+                # 将字典转换为JSON字符串
+                cleaned_metadata[key] = json.dumps(value, ensure_ascii=False)
+            else:
+                # 对于其他类型，转换为字符串
+                cleaned_metadata[key] = str(value)
+        return cleaned_metadata
+    
+    def search_similar_jobs(self, query_text: str, n_results: int = 5, **filters) -> List[Dict[str, Any]]:
+        """Search for similar job postings. 过滤参数同 query_similar_jobs。"""
+        results = self.query_similar_jobs([query_text], n_results, **filters)
+        return results[0] if results else []
+    
+    def query_similar_jobs(self, query_texts: List[str], n_results: int = 5,
+                           location: Optional[Any] = None, salary_min: Optional[float] = None,
+                           salary_max: Optional[float] = None, skills: Optional[List[str]] = None,
+                           max_age_days: Optional[int] = None, match_all_skills: bool = False,
+                           company: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        """
+        批量语义检索：多条查询文本在一次 collection.query 中完成，
+        地点/公司/薪资/发布时间作为 where、技能作为 where_document 下推到ChromaDB过滤。
+        薪资单位为K/月，返回结果与query_texts一一对应，每条带distance。
+        """
+        if not query_texts:
+            return []
+        try:
+            if not self.collection:
+                self._init_collection()
+            
+            where, where_document = self.build_job_filters(
+                location, salary_min, salary_max, skills, max_age_days, match_all_skills, company
+            )
+            query_kwargs = {
+                "query_texts": list(query_texts),
+                "n_results": n_results,
+                "where": where,
+                "include": ["documents", "metadatas", "distances"]
+            }
+            if where_document:
+                query_kwargs["where_document"] = where_document
+            results = self.collection.query(**query_kwargs)
             
-            return similar_jobs
+            batches = []
+            for q in range(len(query_texts)):
+                similar_jobs = []
+                distances = results.get("distances")
+                for i, doc in enumerate(results["documents"][q]):
+                    similar_jobs.append({
+                        "id": results["ids"][q][i],
+                        "document": doc,
+                        "metadata": results["metadatas"][q][i],
+                        "distance": distances[q][i] if distances else None
+                    })
+                batches.append(similar_jobs)
+            return batches
             
         except Exception as e:
             logger.error(f"Error searching similar jobs: {e}")
-            return []
+            return [[] for _ in query_texts]
+    
+    def hybrid_search_jobs(self, query_text: str, n_results: int = 5, candidate_k: Optional[int] = None,
+                           rrf_k: int = 60, **filters) -> List[Dict[str, Any]]:
+        """
+        混合检索：向量检索与BM25各取candidate_k个候选，用倒数排名融合(RRF)排序。
+        BM25候选同样经过where/where_document过滤；只被BM25召回的结果distance为None。
+        """
+        candidate_k = candidate_k or max(n_results * 4, 20)
+        try:
+            self._ensure_lexical_index()
+            vector_hits = self.query_similar_jobs([query_text], candidate_k, **filters)[0]
+            lexical_hits = self.lexical_index.search(query_text, candidate_k)
+            
+            hits = {hit["id"]: hit for hit in vector_hits}
+            lexical_ids = [doc_id for doc_id, _ in lexical_hits]
+            missing = [doc_id for doc_id in lexical_ids if doc_id not in hits]
+            if missing:
+                where, where_document = self.build_job_filters(**filters)
+                get_kwargs = {"ids": missing, "where": where, "include": ["documents", "metadatas"]}
+                if where_document:
+                    get_kwargs["where_document"] = where_document
+                fetched = self.collection.get(**get_kwargs)
+                for i, doc_id in enumerate(fetched["ids"]):
+                    hits[doc_id] = {
+                        "id": doc_id,
+                        "document": fetched["documents"][i],
+                        "metadata": fetched["metadatas"][i],
+                        "distance": None
+                    }
+            # 被过滤掉的BM25候选不参与融合
+            lexical_ids = [doc_id for doc_id in lexical_ids if doc_id in hits]
+            
+            vector_rank = {hit["id"]: rank for rank, hit in enumerate(vector_hits, start=1)}
+            lexical_rank = {doc_id: rank for rank, doc_id in enumerate(lexical_ids, start=1)}
+            fused = reciprocal_rank_fusion([[hit["id"] for hit in vector_hits], lexical_ids], k=rrf_k)
+            
+            results = []
+            for doc_id, score in fused[:n_results]:
+                results.append({
+                    **hits[doc_id],
+                    "score": round(score, 6),
+                    "vector_rank": vector_rank.get(doc_id),
+                    "lexical_rank": lexical_rank.get(doc_id)
+                })
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error in hybrid job search: {e}")
+            return self.search_similar_jobs(query_text, n_results, **filters)
+    
+    def _ensure_lexical_index(self, page_size: int = 500):
+        """首次使用时分页扫描集合，构建BM25索引"""
+        if self._lexical_loaded:
+            return
+        with self._lexical_lock:
+            if self._lexical_loaded:
+                return
+            if not self.collection:
+                self._init_collection()
+            self.lexical_index.clear()
+            offset = 0
+            while True:
+                page = self.collection.get(where={"kind": "job"}, limit=page_size, offset=offset,
+                                           include=["documents"])
+                if not page["ids"]:
+                    break
+                self.lexical_index.add_many(zip(page["ids"], page["documents"]))
+                offset += len(page["ids"])
+            self._lexical_loaded = True
+            logger.info(f"BM25 index loaded with {len(self.lexical_index)} job postings")
+    
+    @staticmethod
+    def build_job_filters(location: Optional[Any] = None, salary_min: Optional[float] = None,
+                          salary_max: Optional[float] = None, skills: Optional[List[str]] = None,
+                          max_age_days: Optional[int] = None, match_all_skills: bool = False,
+                          company: Optional[str] = None):
+        """构建 (where, where_document)：薪资按区间重叠匹配，技能默认命中任意一个即可（按规范技能ID比较）"""
+        clauses = ChromaDBService._attribute_clauses(location, company)
+        if salary_min is not None:
+            clauses.append({"salary_max": {"$gte": float(salary_min)}})
+        if salary_max is not None:
+            clauses.append({"salary_min": {"$lte": float(salary_max)}})
+        if max_age_days is not None:
+            clauses.append({"extracted_ts": {"$gte": int(time.time() - max_age_days * 86400)}})
+        
+        # 别名表中的技能按规范ID过滤metadata；未收录的技能退回到文档全文包含
+        skills = [skill for skill in (skills or []) if skill]
+        skill_ids = [skill_normalizer.skill_id(skill) for skill in skills]
+        where_document = None
+        if skills and all(skill_ids):
+            skill_clauses = [{f"skill_{skill_id}": True} for skill_id in dict.fromkeys(skill_ids)]
+            if len(skill_clauses) > 1:
+                clauses.append({"$and" if match_all_skills else "$or": skill_clauses})
+            else:
+                clauses.extend(skill_clauses)
+        elif skills:
+            skill_clauses = [{"$contains": skill} for skill in skills]
+            if len(skill_clauses) == 1:
+                where_document = skill_clauses[0]
+            else:
+                where_document = {"$and" if match_all_skills else "$or": skill_clauses}
+        
+        where = ChromaDBService._job_where({"$and": clauses} if len(clauses) > 1 else (clauses[0] if clauses else None))
+        return where, where_document
+    
+    @staticmethod
+    def job_attribute_where(location: Optional[Any] = None, company: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """只按地点/公司过滤的where（不含kind），分页列表与检索使用同样的匹配规则"""
+        clauses = ChromaDBService._attribute_clauses(location, company)
+        return {"$and": clauses} if len(clauses) > 1 else (clauses[0] if clauses else None)
+    
+    @staticmethod
+    def _attribute_clauses(location: Optional[Any], company: Optional[str]) -> List[Dict[str, Any]]:
+        """地点按解析出的城市匹配（"北京·朝阳区" 与 "北京" 相同），公司按名称精确匹配"""
+        clauses: List[Dict[str, Any]] = []
+        if location:
+            locations = [location] if isinstance(location, str) else list(location)
+            cities = sorted({ChromaDBService._parse_city(loc) for loc in locations} - {""})
+            if cities:
+                clauses.append({"city": {"$in": cities}})
+        if company:
+            clauses.append({"company_name": company})
+        return clauses
+    
+    @staticmethod
+    def _job_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """职位metadata：补充可过滤的派生字段（规范技能ID、城市、薪资上下限、抓取时间戳）后清洗"""
+        derived: Dict[str, Any] = {"kind": "job"}
+        # 规范技能ID：skill_ids 用于展示，skill_<id>=True 用于 where 过滤
+        skill_ids = skill_normalizer.extract_from_job(metadata)
+        if skill_ids:
+            derived["skill_ids"] = ",".join(map(str, skill_ids))
+            derived.update({f"skill_{skill_id}": True for skill_id in skill_ids})
+        city = ChromaDBService._parse_city(metadata.get("location"))
+        if city:
+            derived["city"] = city
+        salary_min, salary_max = ChromaDBService._parse_salary_range(metadata.get("salary_range"))
+        if salary_min is not None:
+            derived["salary_min"] = salary_min
+            derived["salary_max"] = salary_max
+        extracted_at = metadata.get("extracted_at")
+        if extracted_at:
+            try:
+                parsed = datetime.fromisoformat(str(extracted_at))
+                # 旧数据用 utcnow() 写入、不带时区：按UTC解析，而不是服务器本地时间
+                if parsed.tzinfo is None:
+                    parsed = parsed.replace(tzinfo=timezone.utc)
+                derived["extracted_ts"] = int(parsed.timestamp())
+            except ValueError:
+                pass
+        return ChromaDBService._clean_metadata({**metadata, **derived})
+    
+    @staticmethod
+    def _parse_city(location: Optional[str]) -> str:
+        """'北京·朝阳区' / '上海市-浦东' -> '北京' / '上海'"""
+        if not location:
+            return ""
+        first = re.split(r"[·\-\s,，、/|]+", unicodedata.normalize("NFKC", str(location)).strip())[0]
+        return first[:-1] if first.endswith("市") and len(first) > 2 else first
+    
+    @staticmethod
+    def _parse_salary_range(salary_range: Optional[str]):
+        """把 '15-25K·13薪'、'1.5-2万'、'20万/年' 等解析为 (下限, 上限)，单位K/月；无法解析返回 (None, None)"""
+        if not salary_range:
+            return None, None
+        text = unicodedata.normalize("NFKC", str(salary_range)).lower()
+        text = re.sub(r"[·*x×]\s*\d+\s*薪", "", text)
+        numbers = [float(n) for n in re.findall(r"\d+(?:\.\d+)?", text)[:2]]
+        if not numbers:
+            return None, None
+        
+        if "万" in text:
+            numbers = [n * 10 for n in numbers]
+        elif "k" not in text and "千" not in text:
+            # 未写单位：按元处理较大的数字
+            numbers = [n / 1000 if n >= 1000 else n for n in numbers]
+        if "年" in text:
+            numbers = [n / 12 for n in numbers]
+        
+        low, high = numbers[0], numbers[-1]
+        return round(min(low, high), 2), round(max(low, high), 2)
             
     def get_all_job_embeddings(self, limit: int = 1000) -> List[Dict[str, Any]]:
-        """Get all job embeddings from ChromaDB."""
+        """Get job embeddings from ChromaDB (first `limit` entries)."""
+        return self.get_job_embeddings(limit=limit)["results"]
+    
+    def get_job_embeddings(self, limit: int = 20, offset: int = 0, where: Optional[Dict[str, Any]] = None,
+                           include_documents: bool = True, with_total: bool = False) -> Dict[str, Any]:
+        """
+        分页获取职位向量：按 kind=job 元数据过滤，limit/offset 交给ChromaDB处理，
+        不再把整个集合读入内存。with_total=True 时额外统计符合条件的总数（只读取ID）。
+        """
         try:
             if not self.collection:
                 self._init_collection()
-                
-            # 获取所有数据（ChromaDB没有分页API，所以需要一次获取全部）
-            results = self.collection.get()
+            
+            job_where = self._job_where(where)
+            include = ["metadatas", "documents"] if include_documents else ["metadatas"]
+            results = self.collection.get(where=job_where, limit=limit, offset=offset, include=include)
             
             job_embeddings = []
             for i, doc_id in enumerate(results["ids"]):
-                # 只处理job开头的ID（跳过user类型的）
-                if doc_id.startswith("job_"):
-                    job_embeddings.append({
-                        "id": doc_id,
-                        "document": results["documents"][i],
-                        "metadata": results["metadatas"][i]
-                    })
-                    
-                # 如果达到限制，提前停止
-                if len(job_embeddings) >= limit:
-                    break
-                    
-            return job_embeddings
+                job_embeddings.append({
+                    "id": doc_id,
+                    "document": results["documents"][i] if include_documents else None,
+                    "metadata": results["metadatas"][i]
+                })
+            
+            total = self.count_job_embeddings(where) if with_total else None
+            return {"total": total, "results": job_embeddings}
             
         except Exception as e:
-            logger.error(f"Error getting all job embeddings: {e}")
+            logger.error(f"Error getting job embeddings: {e}")
+            return {"total": 0 if with_total else None, "results": []}
+    
+    def count_job_embeddings(self, where: Optional[Dict[str, Any]] = None) -> int:
+        """统计职位向量数量；无过滤条件时读计数器，有过滤条件时只读取匹配的ID"""
+        if not where:
+            return self._kind_count("job")
+        if not self.collection:
+            self._init_collection()
+        return len(self.collection.get(where=self._job_where(where), include=[])["ids"])
+    
+    def _kind_count(self, kind: str) -> int:
+        counts = self._kind_counts
+        if counts is None or time.monotonic() - self._kind_counts_at > settings.chroma_count_ttl:
+            with self._counts_lock:
+                if self._kind_counts is None or time.monotonic() - self._kind_counts_at > settings.chroma_count_ttl:
+                    if not self.collection:
+                        self._init_collection()
+                    self._kind_counts = {
+                        name: len(self.collection.get(where={"kind": name}, include=[])["ids"])
+                        for name in ("job", "user")
+                    }
+                    self._kind_counts_at = time.monotonic()
+                counts = self._kind_counts
+        return counts[kind]
+    
+    def _new_ids(self, ids: List[str]) -> List[str]:
+        """写入前找出集合中还不存在的ID（调用方持有 _counts_lock）；计数器未加载时不需要"""
+        if self._kind_counts is None:
             return []
+        existing = set(self.collection.get(ids=ids, include=[])["ids"])
+        return [doc_id for doc_id in ids if doc_id not in existing]
+    
+    def _adjust_count(self, kind: str, delta: int):
+        if delta and self._kind_counts is not None:
+            self._kind_counts[kind] += delta
+    
+    @staticmethod
+    def _job_where(where: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """在调用方的过滤条件上加上 kind=job"""
+        if not where:
+            return {"kind": "job"}
+        return {"$and": [{"kind": "job"}, where]}
             
     def get_job_embedding(self, job_id: str) -> Dict[str, Any]:
         """Get a specific job embedding by ID."""
@@ -556,7 +1618,11 @@ class ChromaDBService:
             if not job_id.startswith("job_"):
                 job_id = f"job_{job_id}"
                 
-            self.collection.delete(ids=[job_id])
+            with self._counts_lock:
+                existed = self._kind_counts is not None and not self._new_ids([job_id])
+                self.collection.delete(ids=[job_id])
+                self._adjust_count("job", -int(existed))
+            self.lexical_index.remove(job_id)
             return True
             
         except Exception as e:
@@ -568,24 +1634,20 @@ class ChromaDBService:
         try:
             if not self.collection:
                 self._init_collection()
-                
-            # 获取所有数据
-            results = self.collection.get()
             
-            # 计算统计信息
-            total_count = len(results["ids"]) if results["ids"] else 0
-            job_count = sum(1 for id in results["ids"] if id.startswith("job_"))
-            user_count = sum(1 for id in results["ids"] if id.startswith("user_"))
+            # 计算统计信息：总数直接用 count()，分类数量读计数器
+            total_count = self.collection.count()
+            job_count = self._kind_count("job")
+            user_count = self._kind_count("user")
             
             # 获取最近添加的几个职位
             recent_jobs = []
-            for i, doc_id in enumerate(results["ids"]):
-                if doc_id.startswith("job_") and len(recent_jobs) < 5:
-                    recent_jobs.append({
-                        "id": doc_id,
-                        "title": results["metadatas"][i].get("job_title", "Unknown"),
-                        "company": results["metadatas"][i].get("company_name", "Unknown"),
-                    })
+            for job in self.get_job_embeddings(limit=5, include_documents=False)["results"]:
+                recent_jobs.append({
+                    "id": job["id"],
+                    "title": job["metadata"].get("job_title", "Unknown"),
+                    "company": job["metadata"].get("company_name", "Unknown"),
+                })
             
             return {
                 "total_embeddings": total_count,
@@ -605,11 +1667,15 @@ class ChromaDBService:
             if not self.collection:
                 self._init_collection()
             
-            self.collection.add(
-                documents=[profile_text],
-                metadatas=[metadata],
-                ids=[f"user_{user_id}"]
-            )
+            with self._counts_lock:
+                # add 遇到已存在的ID时忽略写入，只统计新增的ID
+                new_ids = self._new_ids([f"user_{user_id}"])
+                self.collection.add(
+                    documents=[profile_text],
+                    metadatas=[{**metadata, "kind": "user"}],
+                    ids=[f"user_{user_id}"]
+                )
+                self._adjust_count("user", len(new_ids))
             logger.info(f"Added user profile {user_id} to ChromaDB")
         except Exception as e:
             logger.error(f"Error adding user profile to ChromaDB: {e}")
@@ -641,12 +1707,11 @@ class TextProcessingService:
         """
         
         try:
-            result = LLMService.call_phase1_model(prompt)
+            result = LLMService.call_phase1_model(prompt, JobInfoOutput)
             # Try to parse JSON
-            import re
-            json_match = re.search(r'\{.*\}', result, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            job_info = extract_json(result)
+            if job_info is not None:
+                return job_info
             else:
                 return {"error": "Failed to extract JSON", "raw_result": result}
         except Exception as e:
@@ -666,6 +1731,7 @@ class TextProcessingService:
 
 # Initialize services
 llm_service = LLMService()
+async_llm_service = AsyncLLMService()
 serper_service = SerperService()
 chromadb_service = ChromaDBService()
 text_service = TextProcessingService()
@@ -0,0 +1,214 @@
+"""
+Vectorized skill-match scoring for Job Planner Assistant.
+
+把技能词表编码一次，用户和职位表示为0/1矩阵，一次 NumPy 矩阵运算即可给
+一个（或多个）用户画像与成千上万个职位打分，用于在调用LLM之前预排序职位。
+评分规则与 Phase2ResumeAgent._comprehensive_match_analysis 保持一致：
+技能匹配率 40%、经验 30%、教育 10%、项目相关度 20%。技能先经 skill_normalizer 归一再比较。
+"""
+
+from typing import List, Dict, Any, Optional, Callable, Sequence
+
+import numpy as np
+
+from skill_normalizer import skill_normalizer
+
+
+def parse_required_years(requirements: Sequence[Any]) -> int:
+    """从任职要求中解析经验年限（与原有规则一致：识别 5年/3年/1年）"""
+    required_years = 0
+    for req in requirements or []:
+        req = str(req)
+        if "年" in req and "经验" in req:
+            if "5年" in req:
+                required_years = 5
+            elif "3年" in req:
+                required_years = 3
+            elif "1年" in req:
+                required_years = 1
+    return required_years
+
+
+def improvement_priority(skill_match_rate: float, experience_match: bool, project_relevance: float) -> List[str]:
+    """获取改进优先级"""
+    priorities = []
+
+    if skill_match_rate < 0.5:
+        priorities.append("提升技能匹配度")
+    if not experience_match:
+        priorities.append("积累相关经验")
+    if project_relevance < 0.6:
+        priorities.append("增加相关项目经验")
+
+    return priorities
+
+
+def match_grade(overall_match_score: float) -> str:
+    return (
+        "优秀" if overall_match_score >= 85 else
+        "良好" if overall_match_score >= 70 else
+        "一般" if overall_match_score >= 55 else "较低"
+    )
+
+
+class SkillVocabulary:
+    """技能词 -> 列号。normalize 用于把别名折叠为同一个词（默认原样比较），terms 保留首次出现的写法用于展示"""
+
+    def __init__(self, normalize: Optional[Callable[[str], str]] = None):
+        self.normalize = normalize or (lambda skill: skill)
+        self.index: Dict[str, int] = {}
+        self.terms: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def add(self, skills: Sequence[Any]) -> List[int]:
+        """登记技能并返回列号（去重，保持首次出现顺序）"""
+        columns = []
+        for skill in skills or []:
+            key = self.normalize(str(skill))
+            column = self.index.get(key)
+            if column is None:
+                column = len(self.terms)
+                self.index[key] = column
+                self.terms.append(str(skill))
+            if column not in columns:
+                columns.append(column)
+        return columns
+
+    def lookup(self, skills: Sequence[Any]) -> List[int]:
+        """只查找已知技能，未知技能忽略（职位都不需要的技能不影响得分）"""
+        columns = []
+        for skill in skills or []:
+            column = self.index.get(self.normalize(str(skill)))
+            if column is not None and column not in columns:
+                columns.append(column)
+        return columns
+
+
+class SkillMatchEngine:
+    """
+    Score user profiles against a fixed job corpus with matrix operations.
+
+    jobs 在构造时编码为 (J, V) 的0/1矩阵；score_profiles 返回 (P, J) 的综合得分矩阵，
+    analyze 返回与 _comprehensive_match_analysis 相同结构的明细。
+    """
+
+    def __init__(self, jobs: Sequence[Dict[str, Any]], normalize: Optional[Callable[[str], str]] = None):
+        self.jobs = list(jobs)
+        # 默认按技能别名表归一，"vue" 与 "Vue.js" 视为同一技能
+        self.vocabulary = SkillVocabulary(normalize or skill_normalizer.normalize)
+        self._job_columns = [self.vocabulary.add(job.get("skills", [])) for job in self.jobs]
+
+        self.job_matrix = self._encode(self._job_columns)
+        self.job_skill_counts = self.job_matrix.sum(axis=1)
+        self.required_years = np.array(
+            [parse_required_years(job.get("requirements", [])) for job in self.jobs], dtype=np.int32
+        )
+
+    def _encode(self, rows: Sequence[Sequence[int]]) -> np.ndarray:
+        matrix = np.zeros((len(rows), max(len(self.vocabulary), 1)), dtype=np.float64)
+        for i, columns in enumerate(rows):
+            if columns:
+                matrix[i, columns] = 1.0
+        return matrix
+
+    def _coverage(self, matrix: np.ndarray) -> np.ndarray:
+        """(N, V) 与职位矩阵相乘后除以职位技能数：得到 (N, J) 的覆盖率，职位无技能时为0"""
+        overlap = matrix @ self.job_matrix.T
+        return np.divide(overlap, self.job_skill_counts, out=np.zeros_like(overlap),
+                         where=self.job_skill_counts > 0)
+
+    def score_components(self, profiles: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """计算各项分量，均为 (P, J) 矩阵"""
+        profiles = list(profiles)
+        user_matrix = self._encode([self.vocabulary.lookup(p.get("skills", [])) for p in profiles])
+        skill_rate = self._coverage(user_matrix)
+
+        user_years = np.array([len(p.get("experience", []) or []) for p in profiles], dtype=np.int32)
+        experience_match = user_years[:, None] >= self.required_years[None, :]
+        education_match = np.array([len(p.get("education", []) or []) > 0 for p in profiles], dtype=bool)
+
+        # 所有项目堆叠为一个矩阵，再按所属用户取最大相关度
+        owners, project_rows = [], []
+        for owner, profile in enumerate(profiles):
+            for project in profile.get("projects", []) or []:
+                owners.append(owner)
+                project_rows.append(self.vocabulary.lookup(project.get("technologies", [])))
+        project_relevance = np.zeros_like(skill_rate)
+        if project_rows:
+            np.maximum.at(project_relevance, np.array(owners), self._coverage(self._encode(project_rows)))
+
+        overall = (
+            skill_rate * 0.4 +
+            np.where(experience_match, 1.0, 0.5) * 0.3 +
+            np.where(education_match, 1.0, 0.7)[:, None] * 0.1 +
+            project_relevance * 0.2
+        ) * 100
+
+        return {
+            "overall": overall,
+            "skill_rate": skill_rate,
+            "experience_match": experience_match,
+            "user_years": user_years,
+            "education_match": education_match,
+            "project_relevance": project_relevance
+        }
+
+    def score_profiles(self, profiles: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """(P, J) 综合匹配得分（0-100）"""
+        return self.score_components(profiles)["overall"]
+
+    def rank(self, profile: Dict[str, Any], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """对单个用户画像排序全部职位，返回 top_k 条 {job_index, job, match_analysis}"""
+        components = self.score_components([profile])
+        order = np.argsort(-components["overall"][0], kind="stable")
+        if top_k is not None:
+            order = order[:top_k]
+        return [
+            {
+                "job_index": int(j),
+                "job": self.jobs[j],
+                "match_analysis": self._analysis(profile, components, 0, int(j))
+            }
+            for j in order
+        ]
+
+    def analyze(self, profile: Dict[str, Any], job_index: int = 0) -> Dict[str, Any]:
+        """单个 (用户, 职位) 的匹配明细"""
+        return self._analysis(profile, self.score_components([profile]), 0, job_index)
+
+    def _analysis(self, profile: Dict[str, Any], components: Dict[str, np.ndarray],
+                  p: int, j: int) -> Dict[str, Any]:
+        job_columns = self._job_columns[j]
+        user_columns = set(self.vocabulary.lookup(profile.get("skills", [])))
+        job_column_set = set(job_columns)
+        extra_skills = []
+        for skill in profile.get("skills", []) or []:
+            column = self.vocabulary.index.get(self.vocabulary.normalize(str(skill)))
+            if column not in job_column_set and skill not in extra_skills:
+                extra_skills.append(skill)
+
+        skill_rate = float(components["skill_rate"][p, j])
+        experience_match = bool(components["experience_match"][p, j])
+        project_relevance = float(components["project_relevance"][p, j])
+        overall = float(components["overall"][p, j])
+
+        return {
+            "overall_match_score": round(overall, 1),
+            "skill_match": {
+                "rate": round(skill_rate * 100, 1),
+                "matched_skills": [self.vocabulary.terms[c] for c in job_columns if c in user_columns],
+                "missing_skills": [self.vocabulary.terms[c] for c in job_columns if c not in user_columns],
+                "extra_skills": extra_skills
+            },
+            "experience_match": {
+                "meets_requirement": experience_match,
+                "user_years": int(components["user_years"][p]),
+                "required_years": int(self.required_years[j])
+            },
+            "education_match": bool(components["education_match"][p]),
+            "project_relevance": round(project_relevance * 100, 1),
+            "match_grade": match_grade(overall),
+            "improvement_priority": improvement_priority(skill_rate, experience_match, project_relevance)
+        }
@@ -0,0 +1,220 @@
+"""
+Skill canonicalization for Job Planner Assistant.
+
+"vue"、"Vue.js"、"VueJS"、"ｖｕｅ．ｊｓ" 统一映射为同一个规范技能和整数ID：
+- normalize / skill_id：单个技能词的规范化（全半角、大小写、标点折叠 + 别名表）
+- extract_ids：用预编译的字典树从 requirements、description 等自由文本中抽取技能
+
+别名表只允许追加，规范ID为其在 SKILL_ALIASES 中的位置（从1开始），
+已写入数据库和向量库的ID因此保持稳定。
+"""
+
+import re
+import unicodedata
+from typing import List, Dict, Optional, Iterable, Any
+
+# (规范名称, [别名...])，只在末尾追加
+SKILL_ALIASES = [
+    ("Python", ["python3", "py"]),
+    ("Java", ["java8", "jdk"]),
+    ("JavaScript", ["js", "ecmascript", "es6"]),
+    ("TypeScript", ["ts"]),
+    ("Go", ["golang", "go语言"]),
+    ("C++", ["cpp", "c plus plus"]),
+    ("C#", ["csharp", "c sharp"]),
+    ("C", ["c语言"]),
+    ("Rust", []),
+    ("PHP", []),
+    ("Kotlin", []),
+    ("Swift", []),
+    ("Scala", []),
+    ("Vue.js", ["vue", "vuejs", "vue2", "vue3"]),
+    ("React", ["reactjs", "react.js"]),
+    ("Angular", ["angularjs", "angular.js"]),
+    ("Node.js", ["node", "nodejs"]),
+    ("HTML", ["html5"]),
+    ("CSS", ["css3"]),
+    ("Webpack", []),
+    ("Vite", []),
+    ("小程序", ["微信小程序", "mini program"]),
+    ("Spring Boot", ["springboot"]),
+    ("Spring", ["spring framework", "springmvc", "spring mvc"]),
+    ("Django", []),
+    ("Flask", []),
+    ("FastAPI", []),
+    ("MySQL", []),
+    ("PostgreSQL", ["postgres", "pgsql"]),
+    ("Redis", []),
+    ("MongoDB", ["mongo"]),
+    ("Elasticsearch", ["es搜索", "elastic search"]),
+    ("Kafka", ["apache kafka"]),
+    ("RabbitMQ", []),
+    ("SQL", []),
+    ("Docker", ["容器化"]),
+    ("Kubernetes", ["k8s", "kube"]),
+    ("Linux", []),
+    ("Git", []),
+    ("CI/CD", ["cicd", "持续集成"]),
+    ("AWS", ["amazon web services"]),
+    ("阿里云", ["aliyun"]),
+    ("微服务", ["microservices", "micro service"]),
+    ("分布式系统", ["分布式"]),
+    ("机器学习", ["machine learning", "ml"]),
+    ("深度学习", ["deep learning", "dl"]),
+    ("自然语言处理", ["nlp", "natural language processing"]),
+    ("计算机视觉", ["cv", "computer vision"]),
+    ("大语言模型", ["llm", "大模型"]),
+    ("PyTorch", ["torch"]),
+    ("TensorFlow", ["tf"]),
+    ("Pandas", []),
+    ("NumPy", []),
+    ("Spark", ["apache spark", "pyspark"]),
+    ("Hadoop", ["hdfs"]),
+    ("Hive", []),
+    ("数据分析", ["data analysis"]),
+    ("Excel", []),
+    ("Tableau", []),
+    ("Power BI", ["powerbi"]),
+    ("产品设计", []),
+    ("Axure", []),
+    ("Figma", []),
+    ("Photoshop", ["ps"]),
+    ("项目管理", ["project management", "pmp"]),
+    ("敏捷开发", ["agile", "scrum"]),
+    ("英语", ["english", "cet6", "cet-6", "英语六级"]),
+    ("沟通能力", ["沟通"]),
+    ("团队协作", ["团队合作"]),
+    ("Android", ["安卓"]),
+    ("iOS", []),
+    ("Flutter", []),
+]
+
+# 单个技能词比较时去掉的分隔符（c++、c# 中的 + # 保留）
+_SEPARATORS = re.compile(r"[\s._\-/·]+")
+_ASCII_WORD = re.compile(r"[a-z0-9]")
+
+
+def fold(text: str) -> str:
+    """全半角、大小写折叠"""
+    return unicodedata.normalize("NFKC", str(text or "")).casefold().strip()
+
+
+def fold_key(skill: str) -> str:
+    """单个技能词的比较键：折叠后再去掉空白和 . - _ / 等分隔符"""
+    return _SEPARATORS.sub("", fold(skill))
+
+
+class SkillNormalizer:
+    """Alias table lookup plus a compiled trie for free-text extraction."""
+
+    def __init__(self, aliases=SKILL_ALIASES):
+        self.names: Dict[int, str] = {}
+        self._key_to_id: Dict[str, int] = {}
+        self._trie: Dict[str, Any] = {}
+
+        for skill_id, (name, alias_list) in enumerate(aliases, start=1):
+            self.names[skill_id] = name
+            for alias in [name] + list(alias_list):
+                self._key_to_id.setdefault(fold_key(alias), skill_id)
+                if not self._extractable(alias, alias == name):
+                    continue
+                self._add_to_trie(fold(alias), skill_id)
+                # "vue.js" 的紧凑写法 "vuejs" 也加入字典树
+                compact = fold_key(alias)
+                if compact != fold(alias):
+                    self._add_to_trie(compact, skill_id)
+
+    @staticmethod
+    def _extractable(alias: str, is_name: bool) -> bool:
+        """
+        过短的英文别名不参与自由文本抽取：单字母（"C端"）和两字母缩写（"CV"、"PS"）误匹配太多，
+        两字母的规范名称（Go）除外
+        """
+        if not alias.isascii():
+            return True
+        length = len(fold_key(alias))
+        return length > 2 or (length == 2 and is_name)
+
+    def _add_to_trie(self, phrase: str, skill_id: int):
+        if not phrase:
+            return
+        node = self._trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node.setdefault("$", skill_id)
+
+    def skill_id(self, skill: str) -> Optional[int]:
+        """规范ID；未知技能返回None"""
+        return self._key_to_id.get(fold_key(skill))
+
+    def canonical(self, skill: str) -> Optional[str]:
+        skill_id = self.skill_id(skill)
+        return self.names[skill_id] if skill_id else None
+
+    def normalize(self, skill: str) -> str:
+        """已知技能返回规范名称，未知技能返回折叠后的比较键"""
+        return self.canonical(skill) or fold_key(skill)
+
+    def to_ids(self, skills: Iterable[Any]) -> List[int]:
+        """技能列表 -> 去重后的规范ID列表（未知技能忽略）"""
+        ids = []
+        for skill in skills or []:
+            skill_id = self.skill_id(str(skill))
+            if skill_id and skill_id not in ids:
+                ids.append(skill_id)
+        return ids
+
+    def extract_ids(self, text: str) -> List[int]:
+        """
+        从自由文本中抽取技能ID：字典树最长匹配，
+        英文别名要求前后不是字母数字（避免 "mongo" 中匹配到 "go"）
+        """
+        text = fold(text)
+        ids: List[int] = []
+        i = 0
+        length = len(text)
+        while i < length:
+            node = self._trie
+            match_id, match_end = None, i
+            j = i
+            while j < length and text[j] in node:
+                node = node[text[j]]
+                j += 1
+                if "$" in node and self._is_boundary(text, i, j):
+                    match_id, match_end = node["$"], j
+            if match_id is not None:
+                if match_id not in ids:
+                    ids.append(match_id)
+                i = match_end
+            else:
+                i += 1
+        return ids
+
+    def extract_from_job(self, job: Dict[str, Any]) -> List[int]:
+        """职位的全部技能ID：skills 字段 + requirements/description 中出现的技能"""
+        skills = job.get("skills") or job.get("skills_required") or []
+        if isinstance(skills, str):
+            # ChromaDB metadata 中的列表已被拼接为逗号分隔字符串
+            skills = skills.split(",")
+        ids = self.to_ids(skill.strip() for skill in skills)
+        texts = []
+        requirements = job.get("requirements") or []
+        texts.extend(requirements if isinstance(requirements, list) else [requirements])
+        texts.append(job.get("description") or "")
+        for text in texts:
+            for skill_id in self.extract_ids(str(text)):
+                if skill_id not in ids:
+                    ids.append(skill_id)
+        return ids
+
+    @staticmethod
+    def _is_boundary(text: str, start: int, end: int) -> bool:
+        if _ASCII_WORD.match(text[start]) and start > 0 and _ASCII_WORD.match(text[start - 1]):
+            return False
+        if _ASCII_WORD.match(text[end - 1]) and end < len(text) and _ASCII_WORD.match(text[end]):
+            return False
+        return True
+
+
+# Global normalizer instance
+skill_normalizer = SkillNormalizer()
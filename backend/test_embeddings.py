@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+向量化缓存测试脚本
+用于测试确定性假向量、memmap向量缓存以及多进程共用缓存文件
+"""
+
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from embeddings import FakeEmbeddingProvider, EmbeddingCache, CachedEmbeddingFunction, create_embedding_function
+
+
+class CountingProvider(FakeEmbeddingProvider):
+    """记录实际计算的文本数量"""
+
+    def __init__(self, dimension=16):
+        super().__init__(dimension)
+        self.embedded = 0
+
+    def embed(self, texts):
+        self.embedded += len(texts)
+        return super().embed(texts)
+
+
+def test_fake_provider_deterministic():
+    """测试假向量的确定性与归一化"""
+    print("🔧 测试假向量...")
+    provider = FakeEmbeddingProvider(32)
+    a = provider.embed(["前端开发 Vue.js", "后端开发 Go"])
+    b = provider.embed(["前端开发 Vue.js"])
+    assert a.shape == (2, 32)
+    assert np.allclose(a[0], b[0])
+    assert np.allclose(np.linalg.norm(a, axis=1), 1.0, atol=1e-5)
+    print("✅ 相同文本得到相同向量")
+
+
+def test_cache_reuse_and_reload():
+    """测试缓存命中、扩容以及重新加载"""
+    print("\n🔧 测试memmap向量缓存...")
+    directory = tempfile.mkdtemp()
+    provider = CountingProvider()
+    texts = [f"职位 {i}" for i in range(5)]
+
+    function = CachedEmbeddingFunction(provider, EmbeddingCache(directory, provider.name, initial_capacity=2))
+    first = function.embed(texts + texts[:2])
+    assert provider.embedded == 5, provider.embedded   # 批内重复只计算一次
+
+    function.embed(texts)
+    assert provider.embedded == 5                      # 全部命中缓存
+
+    # 重新打开缓存文件
+    reloaded = CachedEmbeddingFunction(provider, EmbeddingCache(directory, provider.name))
+    again = reloaded.embed(texts)
+    assert provider.embedded == 5
+    assert np.allclose(first[:5], again)
+    assert len(reloaded.cache) == 5
+    print(f"✅ 缓存命中正确: {reloaded.cache.get_stats()}")
+
+
+def test_chroma_config_roundtrip():
+    """测试 Chroma 按类名和配置重建向量化函数"""
+    print("\n🔧 测试Chroma配置重建...")
+    import chromadb
+
+    assert CachedEmbeddingFunction.name() == "cached_embedding"
+    function = create_embedding_function("fake")
+    assert function.get_config()["provider"] == "fake"
+
+    client = chromadb.EphemeralClient()
+    client.get_or_create_collection(name="roundtrip_fake", embedding_function=function)
+    collection = client.get_collection(name="roundtrip_fake")
+    assert collection.configuration_json["embedding_function"]["name"] == "cached_embedding"
+    rebuilt = collection.configuration["embedding_function"]
+    assert isinstance(rebuilt, CachedEmbeddingFunction), type(rebuilt)
+    assert isinstance(rebuilt.provider, FakeEmbeddingProvider)
+    print("✅ 重新打开集合时按配置重建了 fake 后端")
+
+
+def test_cache_shared_between_processes():
+    """测试两个缓存实例（模拟两个进程）交替追加时行号不冲突"""
+    print("\n🔧 测试多进程共用向量缓存...")
+    directory = tempfile.mkdtemp()
+    provider = FakeEmbeddingProvider(16)
+    texts = [f"职位 {i}" for i in range(8)]
+    keys = [EmbeddingCache.make_key(text) for text in texts]
+    vectors = provider.embed(texts)
+
+    # 两个实例都在对方写入前打开，各自的内存索引都是空的
+    first = EmbeddingCache(directory, provider.name, initial_capacity=2)
+    second = EmbeddingCache(directory, provider.name, initial_capacity=2)
+    first.put_many(keys[:3], vectors[:3])
+    second.put_many(keys[3:6], vectors[3:6])
+    first.put_many(keys[5:], vectors[5:])     # keys[5] 已由另一实例写入
+
+    for cache in (first, second, EmbeddingCache(directory, provider.name)):
+        found = cache.get_many(keys[:6])
+        for key, vector in zip(keys[:6], vectors[:6]):
+            assert np.allclose(found[key], vector), "vector overwritten by another process"
+    reloaded = EmbeddingCache(directory, provider.name)
+    assert len(reloaded) == 8 and reloaded.get_stats()["entries"] == 8
+    assert all(np.allclose(reloaded.get_many([key])[key], vector) for key, vector in zip(keys, vectors))
+    print("✅ 交替追加后每个哈希都指向自己的向量")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("向量化缓存 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_fake_provider_deterministic()
+        test_cache_reuse_and_reload()
+        test_cache_shared_between_processes()
+        test_chroma_config_roundtrip()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+HR规则评分测试脚本
+用于测试简历特征提取、各人设规则表打分、通用维度和加权总分
+"""
+
+import sys
+import os
+import time
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from hr_scoring import (
+    ResumeFeatures, HR_SCORING_RULES, score_metric, score_metrics, weighted_score, BASE_SCORE
+)
+
+SAMPLE_RESUME = {
+    "experience": [
+        {"position": "后端开发工程师", "description": "负责订单系统，接口性能提升40%"},
+        {"position": "实习生", "description": "参与日常运维"}
+    ],
+    "skills": ["Java", "Spring Boot", "MySQL", "Redis", "Docker", "Kubernetes", "Git"],
+    "projects": [
+        {"name": "订单系统", "description": "微服务架构设计与拆分"},
+        {"name": "监控平台", "description": "日志收集"}
+    ],
+    "education": [{"school": "某大学", "degree": "计算机科学本科"}]
+}
+
+
+def test_extract_features():
+    """测试一次遍历得到的简历特征"""
+    print("🔧 测试特征提取...")
+    features = ResumeFeatures.extract(SAMPLE_RESUME)
+    assert features.experience_count == 2 and features.skills_count == 7 and features.projects_count == 2
+    assert features.degree_level == 2 and features.has_education
+    assert features.tech_experience and features.quantified_results and features.innovative_projects
+    # java / spring / mysql / redis 命中核心技术，docker / kubernetes 命中新技术
+    assert features.core_tech_skills == 4 and features.modern_tech_skills == 2
+    assert features.complete_resume and features.few_jobs and features.practical_level == 2
+
+    empty = ResumeFeatures.extract({"experience": None, "skills": [], "education": ""})
+    assert empty.experience_count == 0 and empty.degree_level == 0 and not empty.complete_resume
+    print(f"✅ 特征: {features.to_dict()}")
+
+
+def test_persona_rules():
+    """测试各人设的维度打分"""
+    print("\n🔧 测试人设规则表...")
+    features = ResumeFeatures.extract(SAMPLE_RESUME)
+    expected = {
+        "experience_match": 80, "skills_proficiency": 75, "performance_results": 85,
+        "career_stability": 80, "resume_professionalism": 75,
+        "education_background": 75, "work_stability": 85, "basic_skills": 75,
+        "innovation_thinking": 70, "adaptability": 80,
+        "technical_depth": 75, "project_complexity": 75, "technical_breadth": 75,
+        "practical_experience": 80, "technical_vision": 75
+    }
+    for metric, score in expected.items():
+        assert score_metric(metric, features) == score, (metric, score_metric(metric, features))
+
+    # 每个人设的维度都有规则，且分数在 [40, 95]
+    for persona, rules in HR_SCORING_RULES.items():
+        scores = score_metrics(rules, features)
+        assert set(scores) == set(rules) and all(40 <= value <= 95 for value in scores.values()), persona
+    print("✅ 人设维度打分正确")
+
+
+def test_generic_metrics_and_weighted_score():
+    """测试未声明维度的通用规则和加权总分"""
+    print("\n🔧 测试通用维度和加权总分...")
+    features = ResumeFeatures.extract(SAMPLE_RESUME)
+    assert score_metric("work_experience", features) == 70
+    assert score_metric("technical_skills", features) == 75
+    assert score_metric("education", features) == 75
+    assert score_metric("unknown_metric", features) == BASE_SCORE
+
+    weights = {"a": 0.5, "b": 0.5}
+    assert weighted_score({"a": 80, "b": 60}, weights) == 70
+    # 权重和不为1时归一化，缺失的维度按基础分计
+    assert weighted_score({"a": 80}, {"a": 2, "b": 2}) == 70
+    assert weighted_score({}, {}) == BASE_SCORE
+    print("✅ 通用维度和加权总分正确")
+
+
+def test_scoring_cost():
+    """规则打分只读特征，与简历长度无关"""
+    print("\n🔧 测试打分耗时...")
+    large = {
+        "experience": [{"position": "开发", "description": "优化" * 200}] * 500,
+        "skills": ["Python"] * 500,
+        "projects": [{"description": "设计" * 200}] * 500,
+        "education": [{"degree": "硕士"}]
+    }
+    features = ResumeFeatures.extract(large)
+    metrics = [metric for rules in HR_SCORING_RULES.values() for metric in rules]
+    start = time.perf_counter()
+    for _ in range(1000):
+        score_metrics(metrics, features)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 2.0, elapsed
+    print(f"✅ 1000次全维度打分耗时 {elapsed * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("HR规则评分 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_extract_features()
+        test_persona_rules()
+        test_generic_metrics_and_weighted_score()
+        test_scoring_cost()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+共享HTTP客户端测试脚本
+用于测试客户端复用和keep-alive连接复用
+"""
+
+import sys
+import os
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import settings
+from http_clients import HTTPClientRegistry
+
+
+class EchoPortHandler(BaseHTTPRequestHandler):
+    """返回客户端端口：端口相同说明复用了同一条连接"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = str(self.client_address[1]).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_client_reuse():
+    """测试客户端按配置缓存，OpenAI客户端共用连接池"""
+    print("🔧 测试客户端复用...")
+    registry = HTTPClientRegistry()
+    assert registry.sync_client() is registry.sync_client()
+    assert registry.sync_client().timeout.connect == settings.http_connect_timeout
+
+    default = registry.openai(max_retries=0)
+    assert registry.openai(max_retries=0) is default
+    other = registry.openai("sk-other", "https://search.example.com/v1")
+    assert other is not default and other.max_retries != 0
+    assert default._client is other._client is registry.sync_client()
+    assert registry.async_openai()._client is registry.async_client()
+    assert registry.stats()["openai_clients"] == 2
+
+    asyncio.run(registry.aclose())
+    assert registry.stats()["openai_clients"] == 0 and not registry.stats()["sync_client_open"]
+    # 关闭后再次获取得到新的客户端（下一次应用启动仍可使用）
+    reopened = registry.openai(max_retries=0)
+    assert reopened is not default and not reopened._client.is_closed
+    asyncio.run(registry.aclose())
+    print("✅ 同一配置返回同一客户端，关闭后可重新创建")
+
+
+def test_keep_alive():
+    """测试多次请求复用同一条TCP连接（不再重复握手）"""
+    print("\n🔧 测试keep-alive连接复用...")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoPortHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/search"
+    registry = HTTPClientRegistry()
+    try:
+        ports = {registry.sync_client().post(url, json={"q": i}).text for i in range(5)}
+        assert len(ports) == 1, ports
+    finally:
+        asyncio.run(registry.aclose())
+        server.shutdown()
+    print("✅ 5 次请求使用 1 条连接")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("共享HTTP客户端 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_client_reuse()
+        test_keep_alive()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+后台任务队列测试脚本
+用于测试任务执行、取消，任务执行期间停止worker池，以及多个进程共用数据库时的认领与心跳
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import jobs
+from database import Base, BackgroundJob, create_background_job
+from jobs import JobManager
+
+# 使用临时数据库，不影响 data/ 下的数据；模块导入时建表，pytest 与直接运行都适用
+engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'jobs.db')}",
+                       connect_args={"check_same_thread": False})
+Base.metadata.create_all(bind=engine)
+jobs.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def make_manager():
+    manager = JobManager(worker_count=1)
+    started = asyncio.Event()
+
+    @manager.register("echo")
+    async def echo(context, params):
+        context.report(progress=0.5, partial=params["value"])
+        return {"value": params["value"]}
+
+    @manager.register("hang")
+    async def hang(context, params):
+        started.set()
+        await asyncio.sleep(3600)
+
+    return manager, started
+
+
+async def wait_for_status(manager, job_id, statuses, timeout=5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {manager.get(job_id)['status']}")
+
+
+def test_run_and_cancel():
+    """测试任务完成和取消执行中的任务"""
+    print("🔧 测试任务执行与取消...")
+
+    async def run():
+        manager, started = make_manager()
+        await manager.start()
+        try:
+            job = await wait_for_status(manager, manager.submit("echo", {"value": 7})["job_id"], ("succeeded",))
+            assert job["result"] == {"value": 7} and job["partial_results"] == [7]
+
+            job_id = manager.submit("hang", {})["job_id"]
+            await started.wait()
+            manager.cancel(job_id)
+            job = await wait_for_status(manager, job_id, ("cancelled",))
+            assert job["cancel_requested"]
+        finally:
+            await asyncio.wait_for(manager.stop(), 5.0)
+
+    asyncio.run(run())
+    print("✅ 任务完成与取消正确")
+
+
+def test_stop_while_running():
+    """测试任务执行期间 stop() 能结束，任务记录为已取消"""
+    print("\n🔧 测试任务执行期间停止...")
+
+    async def run():
+        manager, started = make_manager()
+        await manager.start()
+        job_id = manager.submit("hang", {})["job_id"]
+        await started.wait()
+        try:
+            await asyncio.wait_for(manager.stop(), 5.0)
+        except asyncio.TimeoutError:
+            raise AssertionError("stop() hung while a job was running")
+        assert manager.get(job_id)["status"] == "cancelled"
+        assert not manager._workers and not manager._running
+
+    asyncio.run(run())
+    print("✅ stop() 正常结束")
+
+
+def test_claim_and_stale_recovery():
+    """测试同一任务只被一个管理器认领；只有心跳超时的running任务被判定失败"""
+    print("\n🔧 测试多进程认领与心跳超时...")
+
+    async def run():
+        first, _ = make_manager()
+        second, _ = make_manager()
+        # 两个管理器（模拟两个进程）同时处理同一个排队任务
+        first._queue = asyncio.Queue()
+        second._queue = asyncio.Queue()
+        job_id = first.submit("echo", {"value": 1})["job_id"]
+        await asyncio.gather(first._run(job_id), second._run(job_id))
+        job = first.get(job_id)
+        assert job["status"] == "succeeded" and job["partial_results"] == [1], job
+
+        # 一个进程已退出（心跳早已超时），另一个仍在执行（心跳新鲜）
+        now = datetime.utcnow()
+        db = jobs.SessionLocal()
+        try:
+            for job_key, heartbeat in (("stale", now - timedelta(hours=1)), ("alive", now)):
+                create_background_job(db, job_key, "hang", {})
+                db.query(BackgroundJob).filter(BackgroundJob.id == job_key).update(
+                    {"status": "running", "owner": f"other:{job_key}", "heartbeat_at": heartbeat})
+            db.commit()
+        finally:
+            db.close()
+
+        third, _ = make_manager()
+        await third.start()
+        try:
+            assert third.get("stale")["status"] == "failed"
+            assert third.get("alive")["status"] == "running"
+            # 其他进程执行中的任务不会被本进程重新执行
+            assert "alive" not in third._running
+        finally:
+            await asyncio.wait_for(third.stop(), 5.0)
+
+    asyncio.run(run())
+    print("✅ 任务只被认领一次，只有心跳超时的任务被判定失败")
+
+
+def test_cancel_from_other_process():
+    """测试在另一个管理器（进程）上取消执行中的任务：执行方在心跳时取消"""
+    print("\n🔧 测试跨进程取消...")
+
+    async def run():
+        interval = jobs.settings.job_heartbeat_interval
+        jobs.settings.job_heartbeat_interval = 0.05
+        worker, started = make_manager()
+        other, _ = make_manager()
+        await worker.start()
+        try:
+            job_id = worker.submit("hang", {})["job_id"]
+            await started.wait()
+            other.cancel(job_id)
+            job = await wait_for_status(worker, job_id, ("cancelled",))
+            assert job["cancel_requested"] and job_id not in worker._running
+        finally:
+            jobs.settings.job_heartbeat_interval = interval
+            await asyncio.wait_for(worker.stop(), 5.0)
+
+    asyncio.run(run())
+    print("✅ 其他进程的取消请求在心跳时生效")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("后台任务队列 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_run_and_cancel()
+        test_stop_while_running()
+        test_claim_and_stale_recovery()
+        test_cancel_from_other_process()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)
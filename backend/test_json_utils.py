@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+JSON解析工具测试脚本
+用于测试LLM输出的JSON解析
+"""
+
+import sys
+import os
+import json
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from json_utils import StreamingJSONSectionParser, extract_json, repair_json
+
+
+def test_streaming_sections():
+    """测试流式输出时按字段增量解析"""
+    print("🔧 测试流式字段解析...")
+    resume = {
+        "personal_info": {"name": "张\"三", "links": ["https://example.com/{id}"]},
+        "professional_summary": "5年前端经验，擅长 Vue, React {组件化}",
+        "highlighted_skills": {"technical_skills": ["JavaScript", "TypeScript"]},
+        "match_score": 86,
+        "education": []
+    }
+    text = "好的，以下是简历：\n```json\n" + json.dumps(resume, ensure_ascii=False, indent=2) + "\n```"
+
+    parser = StreamingJSONSectionParser()
+    emitted = []
+    for i in range(0, len(text), 7):
+        emitted.extend(name for name, _ in parser.feed(text[i:i + 7]))
+
+    assert emitted == list(resume.keys()), emitted
+    assert dict(parser.sections) == resume
+    assert parser.done
+    print(f"✅ 依次解析出字段: {emitted}")
+
+
+def test_extract_json():
+    """测试从说明文字、代码块中提取JSON"""
+    print("\n🔧 测试JSON提取...")
+    text = "根据 {职位要求} 生成如下：\n```json\n{\"summary\": \"擅长 {组件化}\", \"skills\": [\"Vue\"]}\n```\n以上。"
+    assert extract_json(text) == {"summary": "擅长 {组件化}", "skills": ["Vue"]}
+
+    # 正文中的引用标记 [1] 不应被当作职位列表
+    jobs_text = '参考[1]，结果：[{"job_title": "前端"}] 来源：[Boss直聘](https://www.zhipin.com)'
+    jobs = extract_json(jobs_text, expect=list, validate=lambda items: all(isinstance(i, dict) for i in items))
+    assert jobs == [{"job_title": "前端"}], jobs
+    assert extract_json("没有JSON", default={}) == {}
+    # 空白回复（模型只返回换行）按未找到JSON处理
+    assert extract_json(" \n\t", default={}) == {}
+    assert extract_json("", default=None) is None
+    print("✅ 代码块、说明文字中的JSON提取正确")
+
+
+def test_repair_json():
+    """测试LLM常见JSON错误的修复"""
+    print("\n🔧 测试JSON修复...")
+    assert extract_json("{'name': '张三', active: True, note: None, // 注释\n 'tags': ['a',],}") == {
+        "name": "张三", "active": True, "note": None, "tags": ["a"]
+    }
+    # 中文引号在字符串内保持原样，作界定符时按双引号处理
+    assert extract_json('{"quote": "他说“你好”", "city": “北京”}') == {"quote": "他说“你好”", "city": "北京"}
+    # 输出被截断：补齐字符串、悬空的键和括号
+    truncated = '{"summary": "第一行\n第二行", "items": [1, 2, {"name": "截断'
+    assert extract_json(truncated) == {"summary": "第一行\n第二行", "items": [1, 2, {"name": "截断"}]}
+    assert json.loads(repair_json('{"a": 1, "b"')) == {"a": 1, "b": None}
+    assert extract_json(truncated, repair=False) is None
+    print("✅ 尾随逗号、单引号、注释、截断均已修复")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("JSON解析工具 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_streaming_sections()
+        test_extract_json()
+        test_repair_json()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+BM25词法索引测试脚本
+用于测试技能词分词、BM25排序与RRF融合
+"""
+
+import sys
+import os
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from lexical_index import tokenize, BM25Index, reciprocal_rank_fusion
+
+
+def test_tokenize_skills():
+    """测试英文技能词的切分"""
+    print("🔧 测试分词...")
+    tokens = tokenize("熟悉Vue.js、K8s和C++，了解Node.js")
+    for expected in ("vue.js", "vue", "k8s", "c++", "node.js"):
+        assert expected in tokens, (expected, tokens)
+    print(f"✅ 分词结果: {tokens}")
+
+
+def test_bm25_ranking():
+    """测试精确技能词召回与删除"""
+    print("\n🔧 测试BM25排序...")
+    index = BM25Index()
+    index.add("job_a", "前端开发工程师 字节跳动 负责Web页面开发 Vue.js TypeScript")
+    index.add("job_b", "后端开发工程师 美团 Go Kubernetes K8s 微服务")
+    index.add("job_c", "前端工程师 腾讯 React 小程序开发")
+
+    results = index.search("K8s 运维", top_k=3)
+    assert results[0][0] == "job_b", results
+
+    results = index.search("Vue 前端", top_k=3)
+    assert results[0][0] == "job_a", results
+
+    index.remove("job_a")
+    assert "job_a" not in index
+    assert all(doc_id != "job_a" for doc_id, _ in index.search("Vue", top_k=3))
+    print("✅ 技能词召回正确")
+
+
+def test_rrf():
+    """测试倒数排名融合"""
+    print("\n🔧 测试RRF融合...")
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]], k=60)
+    ids = [doc_id for doc_id, _ in fused]
+    assert ids[0] == "a", fused
+    assert set(ids) == {"a", "b", "c", "d"}
+    print(f"✅ 融合顺序: {ids}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("BM25词法索引 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_tokenize_skills()
+        test_bm25_ranking()
+        test_rrf()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+LLM响应缓存测试脚本
+用于测试两级缓存的命中、淘汰和过期逻辑
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from llm_cache import LLMResponseCache
+
+
+def _messages(text):
+    return [{"role": "user", "content": text}]
+
+
+def test_hit_and_eviction():
+    """测试命中统计与容量淘汰"""
+    print("🔧 测试缓存命中与淘汰...")
+    db_path = os.path.join(tempfile.mkdtemp(), "llm_cache.db")
+    cache = LLMResponseCache(db_path, memory_size=2, max_entries=3, ttl_seconds=60)
+
+    keys = [cache.make_key("gpt-3.5-turbo", _messages(f"prompt {i}"), 0.7, False) for i in range(5)]
+    assert cache.get(keys[0]) is None
+    for i, key in enumerate(keys):
+        cache.set(key, "gpt-3.5-turbo", f"response {i}")
+
+    assert cache.get(keys[4]) == "response 4"   # 内存命中
+    assert cache.get(keys[2]) == "response 2"   # 磁盘命中
+    assert cache.get(keys[0]) is None           # 已被淘汰
+
+    stats = cache.get_stats()
+    assert stats["memory_hits"] == 1 and stats["disk_hits"] == 1
+    assert stats["disk_entries"] == 3
+    print(f"✅ 命中统计正确: {stats}")
+
+
+def test_bypass_and_ttl():
+    """测试高温度绕过和过期"""
+    print("\n🔧 测试高温度绕过与TTL...")
+    db_path = os.path.join(tempfile.mkdtemp(), "llm_cache.db")
+    cache = LLMResponseCache(db_path, ttl_seconds=-1, max_temperature=0.7)
+
+    assert cache.should_cache(0.7)
+    assert not cache.should_cache(0.9)
+
+    cache.set("expired", "gpt-3.5-turbo", "stale")
+    assert cache.get("expired") is None
+    print("✅ 高温度调用不缓存，过期条目不返回")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("LLM响应缓存 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_hit_and_eviction()
+        test_bypass_and_ttl()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+LLM重试与熔断测试脚本
+用于测试错误分类、退避等待和按模型熔断
+"""
+
+import sys
+import os
+import time
+import asyncio
+
+import httpx
+import openai
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from llm_resilience import (
+    RetryPolicy, CircuitBreaker, CircuitOpenError, LLMResponse, classify_error, is_degraded, mark_degraded,
+    first_degraded, keep_degraded
+)
+
+
+def make_status_error(status: int, headers=None) -> openai.APIStatusError:
+    request = httpx.Request("POST", "https://api.example.com/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    error_class = openai.RateLimitError if status == 429 else openai.APIStatusError
+    return error_class(f"HTTP {status}", response=response, body=None)
+
+
+def test_classify_and_backoff():
+    """测试错误分类与退避时间"""
+    print("🔧 测试错误分类与退避...")
+    assert classify_error(make_status_error(429)) == "rate_limit"
+    assert classify_error(make_status_error(503)) == "server"
+    assert classify_error(make_status_error(401)) == "client"
+
+    policy = RetryPolicy(max_retries=3, base_delay=1.0, max_delay=30.0, rng=lambda: 1.0)
+    assert [policy.next_delay(i, make_status_error(503)) for i in range(4)] == [1.0, 2.0, 4.0, None]
+    # 参数错误不重试；Retry-After 优先，超过上限时直接失败
+    assert policy.next_delay(0, make_status_error(400)) is None
+    assert policy.next_delay(0, make_status_error(429, {"retry-after": "5"})) == 5.1
+    assert policy.next_delay(0, make_status_error(429, {"retry-after-ms": "250"})) == 0.35
+    assert policy.next_delay(0, make_status_error(429, {"retry-after": "120"})) is None
+    print("✅ 分类与退避正确")
+
+
+def test_circuit_breaker():
+    """测试连续失败后熔断、冷却后探测恢复"""
+    print("\n🔧 测试熔断器...")
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0, clock=lambda: now[0])
+
+    # 限流说明服务可用，不计入熔断
+    breaker.record_failure(make_status_error(429))
+    breaker.record_failure(make_status_error(500))
+    assert breaker.state == "closed"
+    breaker.record_failure(make_status_error(502))
+    assert breaker.state == "open"
+
+    try:
+        breaker.before_call("gpt-test")
+        assert False, "open circuit should fail fast"
+    except CircuitOpenError as e:
+        assert classify_error(e) == "circuit_open"
+
+    now[0] = 11.0
+    breaker.before_call("gpt-test")          # 放行一个探测请求
+    try:
+        breaker.before_call("gpt-test")      # 探测期间其余请求仍被拒绝
+        assert False, "only one probe allowed"
+    except CircuitOpenError:
+        pass
+    breaker.record_success()
+    assert breaker.snapshot() == {"state": "closed", "failures": 0}
+    print("✅ 熔断与恢复正确")
+
+
+def test_cancelled_probe_releases_breaker():
+    """测试 half_open 探测请求被取消后，熔断器允许下一次探测"""
+    print("\n🔧 测试探测请求被取消...")
+    from services import AsyncLLMService, circuit_breakers
+
+    model = "gpt-probe-cancel"
+    breaker = circuit_breakers.get(model)
+    breaker.state = "open"
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(3600)
+
+    async def run():
+        task = asyncio.ensure_future(AsyncLLMService._asend_with_retries(model, hang, timed=False))
+        await started.wait()
+        assert breaker.state == "half_open"
+        task.cancel()
+        try:
+            await task
+            assert False, "probe should be cancelled"
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    assert breaker.before_call(model) is True    # 探测名额已释放
+    breaker.record_success()
+    assert breaker.state == "closed"
+    print("✅ 取消探测后熔断器没有卡在 half_open")
+
+
+def test_degraded_flag():
+    """测试演示数据的 degraded 标记"""
+    print("\n🔧 测试degraded标记...")
+    demo = LLMResponse('{"questions": []}', degraded=True, error="HTTP 503", error_type="server")
+    assert demo == '{"questions": []}' and is_degraded(demo)
+    assert not is_degraded("普通输出")
+    result = mark_degraded({"success": True, "data": {"questions": []}}, demo)
+    assert result["data"]["degraded"] is True and result["data"]["degraded_reason"] == "server"
+    assert "degraded" not in mark_degraded({"data": {}}, "普通输出")["data"]
+
+    # 多模型输出中取第一个演示数据；strip 等处理后仍保留标记
+    assert first_degraded(["普通输出", demo]) is demo and first_degraded(None) is None
+    stripped = keep_degraded(demo, f"  {demo}  ".strip())
+    assert is_degraded(stripped) and stripped.error_type == "server" and stripped == demo
+    assert keep_degraded("普通输出", "摘要") == "摘要" and not is_degraded(keep_degraded("普通输出", "摘要"))
+    print("✅ degraded 标记正确")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("LLM重试与熔断 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_classify_and_backoff()
+        test_circuit_breaker()
+        test_cancelled_probe_releases_breaker()
+        test_degraded_flag()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+结构化输出测试脚本
+用于测试schema校验和定向修复请求
+"""
+
+import sys
+import os
+import json
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from llm_schemas import StructuredResult, HRFeedbackOutput, InterviewQuestionsOutput
+
+MESSAGES = [{"role": "user", "content": "请返回JSON格式的面试问题"}]
+
+
+def test_valid_output():
+    """测试合法输出：额外字段保留，数字字符串按分数校验"""
+    print("🔧 测试合法输出...")
+    content = "```json\n" + json.dumps({
+        "overall_score": "82", "detailed_scores": {"技能匹配": 80}, "strengths": ["扎实"],
+        "weaknesses": [], "improvement_suggestions": ["补充项目"], "hr_comments": "不错"
+    }, ensure_ascii=False) + "\n```"
+    result = StructuredResult(HRFeedbackOutput, MESSAGES, content)
+    assert result.valid, result.errors
+    data = json.loads(result.text())
+    assert data["overall_score"] == 82 and data["hr_comments"] == "不错"
+    print("✅ 校验通过")
+
+
+def test_targeted_repair():
+    """测试校验失败时只请求出错的字段并合并"""
+    print("\n🔧 测试定向修复...")
+    content = json.dumps({"questions": [{"id": 1}], "interview_context": {"total_time": "15分钟"}}, ensure_ascii=False)
+    result = StructuredResult(InterviewQuestionsOutput, MESSAGES, content)
+    assert not result.valid
+    assert result.invalid_fields() == ["questions"]
+
+    repair = result.repair_messages()
+    assert repair[:1] == MESSAGES and repair[1]["role"] == "assistant"
+    assert "questions.0.question" in repair[-1]["content"]
+
+    result.apply_repair('{"questions": [{"id": 1, "question": "请介绍一个项目"}]}')
+    assert result.valid and result.repairs == 1
+    data = json.loads(result.text())
+    assert data["interview_context"] == {"total_time": "15分钟"}
+    assert data["questions"][0]["question"] == "请介绍一个项目"
+    print(f"✅ 修复请求 {len(repair[-1]['content'])} 字，合并后校验通过")
+
+
+def test_unparseable_output():
+    """测试非JSON输出：要求重新输出完整JSON，失败时返回原始输出"""
+    print("\n🔧 测试非JSON输出...")
+    result = StructuredResult(InterviewQuestionsOutput, MESSAGES, "抱歉，我无法生成问题。")
+    assert not result.valid and result.data is None
+    assert result.repair_messages()[-1]["content"].startswith("你上一次的输出不是合法的JSON对象")
+    result.apply_repair("仍然不是JSON")
+    assert result.text() == "抱歉，我无法生成问题。"
+    print("✅ 无法修复时保留原始输出")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("结构化输出 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_valid_output()
+        test_targeted_repair()
+        test_unparseable_output()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+模型路由测试脚本
+用于测试按延迟/错误率排序候选模型、p90对冲和失败回退（使用本地的 mock OpenAI 兼容服务）
+"""
+
+import sys
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from openai import OpenAI, AsyncOpenAI
+
+from model_router import ModelRouter, hedged_call, ahedged_call
+from mock_openai_server import MockOpenAIServer, MockModelProfile, parse_profile
+
+
+def test_rank_and_hedge_delay():
+    """测试按健康状况和p50排序，以及p90对冲延迟"""
+    print("🔧 测试候选模型排序...")
+    unavailable = set()
+    router = ModelRouter(window=20, min_samples=3, max_error_rate=0.5, hedge_min_delay=0.5,
+                         is_available=lambda model: model not in unavailable)
+    models = ["primary", "backup", "spare"]
+    # 没有样本时保持配置顺序
+    assert router.rank(models) == models
+    assert router.hedge_delay("primary") is None
+
+    for latency in (2.0, 2.2, 2.4, 9.0):
+        router.record("primary", latency, True)
+    for latency in (0.3, 0.4, 0.5):
+        router.record("backup", latency, True)
+    # 样本不足的 spare 先被探测，之后按p50排序
+    assert router.rank(models) == ["spare", "backup", "primary"]
+    for latency in (1.0, 1.1, 1.2):
+        router.record("spare", latency, True)
+    assert router.rank(models) == ["backup", "spare", "primary"]
+    assert router.hedge_delay("primary") == 9.0
+    assert router.hedge_delay("backup") == 0.5  # p90 低于下限时取 hedge_min_delay
+
+    # 错误率过高的模型排到健康模型之后，熔断的模型排在最后
+    for _ in range(4):
+        router.record("backup", 0.0, False)
+    assert router.rank(models) == ["spare", "primary", "backup"]
+    unavailable.add("spare")
+    assert router.rank(models) == ["primary", "backup", "spare"]
+    snapshot = router.snapshot()
+    assert snapshot["backup"]["error_rate"] == round(4 / 7, 3)
+    assert snapshot["spare"]["available"] is False
+    print("✅ 排序和对冲延迟正确")
+
+
+def test_hedged_call_with_mock_server():
+    """测试同步对冲和失败回退"""
+    print("\n🔧 测试同步对冲...")
+    server = MockOpenAIServer({
+        "slow": MockModelProfile(1.5), "fast": MockModelProfile(0.05), "broken": MockModelProfile(0.0, 1.0)
+    }).start()
+    client = OpenAI(api_key="sk-test", base_url=server.base_url, max_retries=0)
+    executor = ThreadPoolExecutor(max_workers=4)
+
+    def request(model):
+        return client.chat.completions.create(model=model, messages=[{"role": "user", "content": "hi"}]).model
+
+    try:
+        start = time.monotonic()
+        assert hedged_call(["slow", "fast"], request, 0.2, executor) == "fast"
+        assert time.monotonic() - start < 1.0
+        print("✅ 首选模型超过对冲延迟后由备选模型返回")
+
+        # 首选失败立即回退，不等对冲延迟
+        start = time.monotonic()
+        assert hedged_call(["broken", "fast"], request, 5.0, executor) == "fast"
+        assert time.monotonic() - start < 1.0
+        assert server.requests["broken"] == 1
+
+        try:
+            hedged_call(["broken"], request, None, executor)
+            raise AssertionError("all candidates failed but no error raised")
+        except Exception as e:
+            assert "503" in str(e) or "unavailable" in str(e)
+        print("✅ 失败回退和全部失败时抛出异常")
+    finally:
+        executor.shutdown(wait=True)
+        server.stop()
+
+
+def test_async_hedged_call_cancels_loser():
+    """测试异步对冲：胜出后取消仍在进行的请求"""
+    print("\n🔧 测试异步对冲...")
+    server = MockOpenAIServer({"slow": MockModelProfile(2.0), "fast": MockModelProfile(0.05)}).start()
+    cancelled = []
+
+    async def run():
+        client = AsyncOpenAI(api_key="sk-test", base_url=server.base_url, max_retries=0)
+
+        async def request(model):
+            try:
+                response = await client.chat.completions.create(
+                    model=model, messages=[{"role": "user", "content": "hi"}]
+                )
+                return response.model
+            except asyncio.CancelledError:
+                cancelled.append(model)
+                raise
+
+        start = time.monotonic()
+        winner = await ahedged_call(["slow", "fast"], request, 0.2)
+        elapsed = time.monotonic() - start
+        await asyncio.sleep(0.05)
+        await client.close()
+        return winner, elapsed
+
+    try:
+        winner, elapsed = asyncio.run(run())
+        assert winner == "fast" and elapsed < 1.0
+        assert cancelled == ["slow"]
+        print("✅ 备选模型胜出，慢请求被取消")
+    finally:
+        server.stop()
+
+
+def test_parse_profile():
+    """测试 mock 服务的 --model 参数解析"""
+    print("\n🔧 测试 mock 参数解析...")
+    model, profile = parse_profile("flaky=0.5:0.3")
+    assert model == "flaky" and profile.delay == 0.5 and profile.error_rate == 0.3
+    model, profile = parse_profile("fast=0.2")
+    assert model == "fast" and profile.error_rate == 0.0
+    print("✅ 参数解析正确")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("模型路由 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_rank_and_hedge_delay()
+        test_hedged_call_with_mock_server()
+        test_async_hedged_call_cancels_loser()
+        test_parse_profile()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+提示词token预算测试脚本
+用于测试紧凑JSON、按优先级截断和输入token统计
+"""
+
+import sys
+import os
+import json
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from prompt_budget import PromptBudget, PromptSection, compact_json
+
+RESUME = {
+    "id": 42,
+    "personal_info": {"name": "张三", "email": "zhangsan@example.com", "phone": ""},
+    "professional_summary": "5年前端开发经验，熟悉 Vue、React 与工程化建设。" * 3,
+    "professional_experience": [
+        {"company": f"公司{i}", "achievements": [f"负责项目{i}的架构设计，性能提升{10 + i}%" for _ in range(4)]}
+        for i in range(30)
+    ],
+    "education": [{"school": "某大学", "degree": "本科", "gpa": None}]
+}
+JOB = {"job_title": "前端开发", "description": "负责Web前端开发。" * 200, "source_url": "https://example.com/1"}
+
+
+def render(parts):
+    return f"## 简历\n{parts['resume']}\n## 职位\n{parts['job']}\n请返回JSON。"
+
+
+def test_compact_sections():
+    """测试紧凑JSON并去掉元数据和空值"""
+    print("🔧 测试紧凑JSON...")
+    budget = PromptBudget("cl100k_base")
+    section = PromptSection("resume", RESUME)
+    text = section.render()
+    assert '"id"' not in text and '"phone"' not in text and '"gpa"' not in text
+    assert json.loads(text)["personal_info"] == {"name": "张三", "email": "zhangsan@example.com"}
+    indented = budget.count_tokens(json.dumps(RESUME, ensure_ascii=False, indent=2))
+    compact = budget.count_tokens(text)
+    assert compact < indented
+    print(f"✅ 输入token {indented} -> {compact}")
+
+
+def test_truncate_by_priority():
+    """测试超出预算时先截断低优先级段落"""
+    print("\n🔧 测试按优先级截断...")
+    budget = PromptBudget("cl100k_base")
+    sections = [PromptSection("resume", RESUME, priority=2), PromptSection("job", JOB, priority=1)]
+    full = budget.assemble("test", render, sections, budget=100000)
+    assert full.truncated == []
+
+    sections = [PromptSection("resume", RESUME, priority=2), PromptSection("job", JOB, priority=1)]
+    limit = full.input_tokens - 600
+    prompt = budget.assemble("test", render, sections, budget=limit)
+    assert prompt.input_tokens <= limit, prompt.input_tokens
+    assert prompt.truncated == ["job"], prompt.truncated
+    assert "张三" in prompt and prompt.endswith("请返回JSON。")
+
+    # 预算很小时高优先级段落也会被截断，可选段落整段去掉
+    sections = [PromptSection("resume", RESUME, priority=2), PromptSection("job", JOB, priority=1, required=False)]
+    prompt = budget.assemble("test", render, sections, budget=200)
+    assert prompt.truncated == ["resume", "job"] and "（略）" in prompt
+
+    stats = budget.stats()["test"]
+    assert stats["calls"] == 3 and stats["truncated"] == 2
+    print(f"✅ 低优先级段落先截断，统计 {stats}")
+
+
+def test_token_estimate():
+    """测试未安装tiktoken时的估算：中文按字计数"""
+    print("\n🔧 测试token估算...")
+    budget = PromptBudget("cl100k_base")
+    budget._encoding_loaded = True  # 强制使用估算
+    assert budget.count_tokens("面试问题") == 4
+    assert budget.count_tokens("abcdefgh") == 2
+    assert compact_json({"a": [1, 2]}) == '{"a":[1,2]}'
+    print("✅ 估算正确")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("提示词token预算 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_compact_sections()
+        test_truncate_by_priority()
+        test_token_estimate()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+提示词稳定前缀测试脚本
+用于测试前缀注册、消息拼装和缓存命中统计
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from prompt_templates import PromptTemplateRegistry
+
+
+def test_stable_prefix():
+    """测试前缀固定在system消息，可变数据在user消息"""
+    print("🔧 测试稳定前缀...")
+    registry = PromptTemplateRegistry()
+    registry.register("hr_review.experienced", """
+        你是一位资深HR经理。
+        请返回JSON格式的评估结果。
+    """)
+    first = registry.get("hr_review.experienced").messages("## 简历\n张三")
+    second = registry.get("hr_review.experienced").messages("## 简历\n李四")
+    assert first[0] == second[0] and first[0]["role"] == "system"
+    assert first[0]["content"].startswith("你是一位资深HR经理。")
+    assert first[1] == {"role": "user", "content": "## 简历\n张三"}
+
+    stats = registry.stats()["templates"]["hr_review.experienced"]
+    assert stats["renders"] == 2 and stats["prefix_tokens"] > 0 and len(stats["prefix_hash"]) == 12
+    print(f"✅ 前缀 {stats['prefix_tokens']} tokens，两次请求完全相同")
+
+
+def test_cache_usage():
+    """测试按模型汇总提供方返回的 cached_tokens"""
+    print("\n🔧 测试缓存命中统计...")
+    registry = PromptTemplateRegistry()
+    registry.record_usage("gpt-4o", SimpleNamespace(prompt_tokens=2000, prompt_tokens_details=None))
+    registry.record_usage("gpt-4o", SimpleNamespace(
+        prompt_tokens=2000, prompt_tokens_details=SimpleNamespace(cached_tokens=1536)
+    ))
+    registry.record_usage("gpt-4o", None)  # 提供方不返回usage时忽略
+
+    usage = registry.stats()["provider_cache"]["gpt-4o"]
+    assert usage == {"requests": 2, "cache_hit_requests": 1, "prompt_tokens": 4000,
+                     "cached_tokens": 1536, "cached_token_rate": 38.4}, usage
+    print(f"✅ 命中统计: {usage}")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("提示词稳定前缀 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_stable_prefix()
+        test_cache_usage()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)
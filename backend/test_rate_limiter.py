@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+按模型限流测试脚本
+用于测试令牌桶、并发上限、优先级排队和排队超时
+"""
+
+import sys
+import os
+import time
+import asyncio
+import threading
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from rate_limiter import TokenBucket, ModelRateLimiter, RateLimiterRegistry, RateLimitTimeout, request_priority
+from llm_resilience import classify_error
+
+
+def test_token_bucket():
+    """测试令牌桶按时间补充额度"""
+    print("🔧 测试令牌桶...")
+    now = [0.0]
+    bucket = TokenBucket(60, clock=lambda: now[0])   # 每秒补充1个
+    assert bucket.wait_time(60) == 0
+    bucket.consume(60)
+    assert bucket.wait_time(1) == 1.0
+    now[0] = 2.5
+    assert bucket.wait_time(2) == 0 and bucket.wait_time(3) == 0.5
+    # 超过容量的请求按容量计，不会永远等待
+    assert TokenBucket(60, clock=lambda: 0.0).wait_time(1000) == 0
+    assert TokenBucket(0).wait_time(10 ** 9) == 0
+    print("✅ 令牌桶补充正确")
+
+
+def test_priority_queue():
+    """测试并发已满时 interactive 先于先到的 batch 请求放行"""
+    print("\n🔧 测试优先级排队...")
+    limiter = ModelRateLimiter("gpt-test", max_concurrency=1)
+    limiter.acquire()
+    order = []
+
+    def worker(priority: str):
+        limiter.acquire(priority=priority, timeout=5)
+        order.append(priority)
+        limiter.release()
+
+    batch = threading.Thread(target=worker, args=("batch",))
+    batch.start()
+    time.sleep(0.1)
+    interactive = threading.Thread(target=worker, args=("interactive",))
+    interactive.start()
+    time.sleep(0.1)
+    assert limiter.snapshot()["queued"] == 2
+    limiter.release()
+    batch.join()
+    interactive.join()
+    assert order == ["interactive", "batch"], order
+
+    stats = limiter.snapshot()["priorities"]
+    assert stats["batch"]["acquired"] == 1 and stats["batch"]["max_wait"] >= 0.1
+    print(f"✅ 放行顺序 {order}，batch 等待 {stats['batch']['max_wait']}s")
+
+
+def test_queue_timeout_and_async():
+    """测试排队超时和协程中的优先级传递"""
+    print("\n🔧 测试排队超时...")
+    registry = RateLimiterRegistry({"gpt-test": (1, 0)}, queue_timeout=0.2)
+    with registry.limit("gpt-test"):
+        pass
+    try:
+        with registry.limit("gpt-test"):   # RPM=1，一分钟内第二次请求
+            assert False, "should time out"
+    except RateLimitTimeout as e:
+        assert classify_error(e) == "queue_timeout"
+    snapshot = registry.snapshot()["gpt-test"]
+    assert snapshot["queued"] == 0 and snapshot["in_flight"] == 0
+    assert snapshot["priorities"]["interactive"]["timeouts"] == 1
+
+    async def call_model():
+        async with registry.alimit("other-model"):
+            pass
+
+    async def run():
+        with request_priority("batch"):
+            task = asyncio.ensure_future(call_model())
+        await task
+
+    asyncio.run(run())
+    assert registry.snapshot()["other-model"]["priorities"]["batch"]["acquired"] == 1
+    print("✅ 超时后出队并计数，协程继承 batch 优先级")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("按模型限流 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_token_bucket()
+        test_priority_queue()
+        test_queue_timeout_and_async()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)
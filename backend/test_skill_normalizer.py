@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+技能归一化测试脚本
+用于测试别名折叠、自由文本技能抽取，以及按搜索结果格式创建职位
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from skill_normalizer import skill_normalizer
+from skill_matching import SkillMatchEngine
+
+
+def test_alias_folding():
+    """测试别名、大小写、全半角折叠"""
+    print("🔧 测试别名折叠...")
+    for alias in ("vue", "Vue.js", "VueJS", "ｖｕｅ．ｊｓ", "vue 3"):
+        assert skill_normalizer.canonical(alias) == "Vue.js", alias
+    assert skill_normalizer.canonical("K8s") == "Kubernetes"
+    assert skill_normalizer.skill_id("golang") == skill_normalizer.skill_id("Go")
+    assert skill_normalizer.skill_id("某个未知技能") is None
+    print("✅ 别名映射正确")
+
+
+def test_extract_from_text():
+    """测试字典树抽取与英文词边界"""
+    print("\n🔧 测试自由文本抽取...")
+    text = "负责C端产品，熟悉Vue.js/React，了解MongoDB和K8s，有golang经验优先"
+    names = [skill_normalizer.names[i] for i in skill_normalizer.extract_ids(text)]
+    assert names == ["Vue.js", "React", "MongoDB", "Kubernetes", "Go"], names
+    print(f"✅ 抽取结果: {names}")
+
+
+def test_match_uses_aliases():
+    """测试匹配引擎按规范技能比较"""
+    print("\n🔧 测试别名参与匹配...")
+    job = {"skills": ["Vue.js", "Kubernetes"], "requirements": []}
+    analysis = SkillMatchEngine([job]).analyze({"skills": ["vue", "K8s"]})
+    assert analysis["skill_match"]["rate"] == 100.0, analysis
+    print("✅ vue/K8s 与 Vue.js/Kubernetes 匹配")
+
+
+def test_create_job_posting_from_search_result():
+    """测试搜索结果格式的 job_title/company_name/skills 映射到职位表和公司表"""
+    print("\n🔧 测试按搜索结果格式创建职位...")
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from database import Base, Company, JobPostingCreate, create_job_posting
+
+    # 临时数据库，不影响 data/ 下的数据
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'jobs.db')}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        search_result = {"company_id": 0, "title": "", "job_title": "前端开发工程师",
+                         "company_name": "腾讯科技", "skills": ["vue", "K8s"]}
+        first = create_job_posting(db, JobPostingCreate(**search_result))
+        second = create_job_posting(db, JobPostingCreate(**{**search_result, "job_title": "Web前端"}))
+        company = db.query(Company).filter(Company.name == "腾讯科技").one()
+        assert first.title == "前端开发工程师" and first.skills_required == ["vue", "K8s"]
+        assert first.skill_ids == skill_normalizer.extract_from_job({"skills": ["vue", "K8s"]})
+        # 公司名称不丢失：映射到同一条公司记录
+        assert first.company_id == second.company_id == company.id
+
+        # company_id 指向已有公司时沿用
+        other = Company(name="阿里巴巴")
+        db.add(other)
+        db.commit()
+        third = create_job_posting(db, JobPostingCreate(**{**search_result, "company_id": other.id}))
+        assert third.company_id == other.id
+    finally:
+        db.close()
+    print("✅ job_title/company_name/skills 映射正确")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("技能归一化 - 功能测试")
+    print("=" * 60)
+
+    try:
+        test_alias_folding()
+        test_extract_from_text()
+        test_match_uses_aliases()
+        test_create_job_posting_from_search_result()
+    except AssertionError as e:
+        print(f"❌ 测试失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("测试完成! 🎉")
+    print("=" * 60)